@@ -7,14 +7,31 @@ Scans modules/ directory for module.json files and provides:
 - Dependency resolution
 - Platform compatibility checking
 - Dynamic INSTALLED_APPS generation
+
+Parsed manifests are kept in a compiled index (data/cache/module_registry.index,
+marshal format) keyed by each module directory's and module.json's mtime
+and size, plus the manifest's hash. Startup reads the index once and stats each module;
+only modules whose key changed are read and parsed again. Creating or
+removing .enabled changes the module directory's mtime, so enabling and
+disabling are picked up too. Set UNIBOS_REGISTRY_INDEX to another path,
+or to "off" to scan without an index.
 """
+import hashlib
+import importlib
 import json
+import marshal
+import os
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, field
 from enum import Enum
 
 
+# Bumped when index entries change shape; marshal data is also tied to the Python version
+INDEX_FORMAT = (1, sys.version_info[:2])
+
+
 class ModuleStatus(Enum):
     """Module status"""
     ENABLED = "enabled"
@@ -79,6 +96,10 @@ class ModuleInfo:
         """Get Django app label for INSTALLED_APPS"""
         return f"modules.{self.id}.backend"
 
+    def load_backend(self):
+        """Import the module's backend package; discovery never imports module code"""
+        return importlib.import_module(self.get_django_app_label())
+
 
 class ModuleRegistry:
     """
@@ -87,80 +108,151 @@ class ModuleRegistry:
     Discovers and manages modules in the modules/ directory.
     """
 
-    def __init__(self, modules_dir: Optional[Path] = None):
+    def __init__(self, modules_dir: Optional[Path] = None, index_path: Optional[Path] = None, use_index: bool = True):
         """
         Initialize module registry
 
         Args:
             modules_dir: Path to modules directory (default: GIT_ROOT/modules/)
+            index_path: Manifest index file (default: data/cache/module_registry.index
+                next to modules/, or UNIBOS_REGISTRY_INDEX)
+            use_index: False to parse every module.json without an index
         """
-        # Set modules directory
-        if modules_dir is None:
-            # Try to find git root (for pipx installed packages)
-            import subprocess
-            import os
-
-            # First check UNIBOS_ROOT environment variable
-            unibos_root = os.environ.get('UNIBOS_ROOT')
-            if unibos_root:
-                modules_dir = Path(unibos_root) / 'modules'
-            else:
-                # Try git root
-                try:
-                    result = subprocess.run(
-                        ['git', 'rev-parse', '--show-toplevel'],
-                        cwd=Path.cwd(),
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        timeout=2
-                    )
-                    if result.returncode == 0:
-                        git_root = Path(result.stdout.strip())
-                        modules_dir = git_root / 'modules'
-                    else:
-                        # Fallback to relative path from __file__
-                        project_root = Path(__file__).parent.parent.parent
-                        modules_dir = project_root / 'modules'
-                except (FileNotFoundError, subprocess.TimeoutExpired):
-                    # Git not available, use relative path
-                    project_root = Path(__file__).parent.parent.parent
-                    modules_dir = project_root / 'modules'
-
-        self.modules_dir = Path(modules_dir)
+        self.modules_dir = Path(modules_dir) if modules_dir is not None else self._find_modules_dir()
+        if not use_index:
+            self.index_path = None
+        else:
+            self.index_path = Path(index_path) if index_path is not None else self._default_index_path()
         self.modules: Dict[str, ModuleInfo] = {}
 
         # Discover modules
         self._discover_modules()
 
+    @staticmethod
+    def _find_modules_dir() -> Path:
+        """modules/ under UNIBOS_ROOT, else under the git root of the working directory"""
+        # First check UNIBOS_ROOT environment variable
+        unibos_root = os.environ.get('UNIBOS_ROOT')
+        if unibos_root:
+            return Path(unibos_root) / 'modules'
+
+        # Git root (for pipx installed packages), found the way
+        # `git rev-parse --show-toplevel` does, without running git
+        cwd = Path.cwd()
+        for directory in (cwd, *cwd.parents):
+            if (directory / '.git').exists():
+                return directory / 'modules'
+
+        # Fallback to relative path from __file__
+        return Path(__file__).resolve().parents[3] / 'modules'
+
+    def _default_index_path(self) -> Optional[Path]:
+        configured = os.environ.get('UNIBOS_REGISTRY_INDEX')
+        if configured:
+            return None if configured.lower() == 'off' else Path(configured)
+        return self.modules_dir.parent / 'data' / 'cache' / 'module_registry.index'
+
     def _discover_modules(self):
-        """Discover all modules by scanning module.json files"""
+        """Discover all modules, re-reading only module.json files changed since the index"""
         if not self.modules_dir.exists():
             return
 
-        for module_dir in self.modules_dir.iterdir():
-            if not module_dir.is_dir():
-                continue
+        index = self._load_index()
+        entries = {}
+        changed = False
 
-            if module_dir.name.startswith('.') or module_dir.name.startswith('_'):
-                continue
+        with os.scandir(self.modules_dir) as dir_entries:
+            module_dirs = sorted(
+                (e for e in dir_entries if e.is_dir() and not e.name.startswith(('.', '_'))),
+                key=lambda e: e.name
+            )
 
+        for dir_entry in module_dirs:
+            module_dir = Path(dir_entry.path)
             json_file = module_dir / 'module.json'
-            if not json_file.exists():
+            try:
+                json_stat = os.stat(json_file)
+            except FileNotFoundError:
                 continue
 
+            dir_stat = dir_entry.stat()
+            key = [dir_stat.st_mtime_ns, json_stat.st_mtime_ns, json_stat.st_size]
+            entry = index.get(dir_entry.name)
+            if not entry or entry.get('key') != key:
+                entry = self._read_manifest(json_file, module_dir, key, entry)
+                changed = True
+            entries[dir_entry.name] = entry
+
             # Load module info
-            try:
-                module_info = self._load_module_info(json_file, module_dir)
-                self.modules[module_info.id] = module_info
-            except Exception as e:
-                print(f"Warning: Failed to load module {module_dir.name}: {e}")
+            if 'error' in entry:
+                print(f"Warning: Failed to load module {module_dir.name}: {entry['error']}")
+                continue
+            module_info = self._module_info_from_data(entry['data'], json_file, module_dir, entry['enabled'])
+            self.modules[module_info.id] = module_info
+
+        if changed or entries.keys() != index.keys():
+            self._save_index(entries)
+
+    def _read_manifest(self, json_file: Path, module_dir: Path, key: list, previous: Optional[dict]) -> dict:
+        """Index entry for a module whose key changed"""
+        try:
+            # Check if enabled (check for marker file)
+            enabled = (module_dir / '.enabled').exists()
+            if previous and 'data' in previous and previous['key'][1:] == key[1:]:
+                # Only the directory changed (.enabled created or removed)
+                return dict(previous, key=key, enabled=enabled)
+
+            raw = json_file.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if previous and previous.get('sha1') == digest and 'data' in previous:
+                # Touched or checked out again, but the same manifest
+                data = previous['data']
+            else:
+                data = json.loads(raw.decode('utf-8'))
+            return {'key': key, 'sha1': digest, 'enabled': enabled, 'data': data}
+        except Exception as e:
+            return {'key': key, 'error': str(e)}
+
+    def _load_index(self) -> Dict[str, dict]:
+        if self.index_path is None:
+            return {}
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = marshal.loads(f.read())
+        except (OSError, ValueError, EOFError, TypeError):
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        if index.get('format') != INDEX_FORMAT or index.get('modules_dir') != str(self.modules_dir):
+            return {}
+        return index.get('modules', {})
+
+    def _save_index(self, entries: Dict[str, dict]):
+        if self.index_path is None:
+            return
+        index = {'format': INDEX_FORMAT, 'modules_dir': str(self.modules_dir), 'modules': entries}
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+            with open(tmp, 'wb') as f:
+                marshal.dump(index, f)
+            os.replace(tmp, self.index_path)
+        except (OSError, ValueError):
+            # Read-only installs still work, just without the index
+            pass
 
     def _load_module_info(self, json_file: Path, module_dir: Path) -> ModuleInfo:
         """Load module info from module.json"""
         with open(json_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
+        # Check if enabled (check for marker file)
+        enabled = (module_dir / '.enabled').exists()
+
+        return self._module_info_from_data(data, json_file, module_dir, enabled)
+
+    def _module_info_from_data(self, data: Dict, json_file: Path, module_dir: Path, enabled: bool) -> ModuleInfo:
+        """Build module info from parsed module.json data"""
         # Extract basic info
         module_id = data.get('id', module_dir.name)
         name = data.get('name', module_id)
@@ -178,10 +270,6 @@ class ModuleRegistry:
         # Platform requirements
         platforms = data.get('platforms', ['linux', 'macos', 'windows'])
 
-        # Check if enabled (check for marker file)
-        enabled_file = module_dir / '.enabled'
-        enabled = enabled_file.exists()
-
         # Determine status
         status = ModuleStatus.ENABLED if enabled else ModuleStatus.AVAILABLE
 
@@ -332,7 +332,7 @@ class MessengerService {
     String? messageType,
     bool? hasAttachments,
     int limit = 50,
-    int offset = 0,
+    String? cursor,
   }) async {
     final data = await _apiClient.post<Map<String, dynamic>>(
       '/messenger/search/',
@@ -344,7 +344,7 @@ class MessengerService {
         if (messageType != null) 'message_type': messageType,
         if (hasAttachments != null) 'has_attachments': hasAttachments,
         'limit': limit,
-        'offset': offset,
+        if (cursor != null) 'cursor': cursor,
       },
     );
     return SearchResult.fromJson(data);
@@ -391,11 +391,19 @@ class SearchResult {
   final int limit;
   final int total;
 
+  /// Pass to searchMessages for the next page; null on the last page
+  final String? nextCursor;
+
+  /// True when total is a lower bound (large result sets are not fully counted)
+  final bool totalIsEstimate;
+
   SearchResult({
     required this.messages,
     required this.offset,
     required this.limit,
     required this.total,
+    this.nextCursor,
+    this.totalIsEstimate = false,
   });
 
   factory SearchResult.fromJson(Map<String, dynamic> json) {
@@ -406,6 +414,8 @@ class SearchResult {
       offset: json['offset'],
       limit: json['limit'],
       total: json['total'],
+      nextCursor: json['next_cursor'],
+      totalIsEstimate: json['total_is_estimate'] ?? false,
     );
   }
 }
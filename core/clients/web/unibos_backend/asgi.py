@@ -54,6 +54,12 @@ try:
 except (ImportError, AttributeError):
     pass
 
+try:
+    import modules.cctv.backend.routing
+    websocket_urlpatterns += modules.cctv.backend.routing.websocket_urlpatterns
+except (ImportError, AttributeError):
+    pass
+
 try:
     import core.system.web_ui.backend.routing
     websocket_urlpatterns += core.system.web_ui.backend.routing.websocket_urlpatterns
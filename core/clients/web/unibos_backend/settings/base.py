@@ -502,14 +502,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'modules.birlikteyiz.backend.tasks.fetch_earthquakes',
         'schedule': timedelta(minutes=5),  # Fetch earthquake data every 5 minutes
     },
+    'dispatch-earthquake-alerts': {
+        'task': 'modules.birlikteyiz.backend.tasks.dispatch_earthquake_alerts',
+        'schedule': timedelta(minutes=1),  # Safety net; saves also schedule a dispatch
+    },
+    'reconcile-budget-spend': {
+        'task': 'modules.wimm.backend.tasks.reconcile_budget_spend',
+        'schedule': timedelta(days=1),  # Repair totals drifted by writes that skip signals
+    },
+    'prune-omdb-cache': {
+        'task': 'modules.movies.backend.tasks.prune_omdb_cache',
+        'schedule': timedelta(days=1),  # Drop responses past their stale-while-revalidate window
+    },
     # Node Registry Tasks
     'check-node-heartbeats': {
         'task': 'core.system.nodes.backend.tasks.check_node_heartbeats',
         'schedule': timedelta(minutes=1),  # Check every minute for stale nodes
     },
+    'rollup-node-metrics': {
+        'task': 'core.system.nodes.backend.tasks.rollup_node_metrics',
+        'schedule': timedelta(minutes=1),  # Downsample metrics into 1m/1h/1d buckets
+    },
     'cleanup-stale-node-metrics': {
         'task': 'core.system.nodes.backend.tasks.cleanup_stale_metrics',
-        'schedule': timedelta(days=1),  # Daily cleanup of old metrics
+        'schedule': timedelta(hours=1),  # Prune each metrics tier past its retention
     },
     'cleanup-old-node-events': {
         'task': 'core.system.nodes.backend.tasks.cleanup_old_events',
@@ -531,7 +547,12 @@ SERVER_EMAIL = 'berk@recaria.org'
 # Node Registry Settings
 NODE_HEARTBEAT_TIMEOUT_MINUTES = 5  # Mark offline after no heartbeat
 NODE_STALE_THRESHOLD_MINUTES = 15  # Consider stale after this time
-NODE_METRICS_RETENTION_DAYS = 7  # Keep metrics for 7 days
+NODE_HEARTBEAT_INTERVAL_SECONDS = 30  # Expected heartbeat interval (raw chart resolution)
+NODE_METRICS_RAW_RETENTION_HOURS = 48  # Keep raw heartbeat metrics for 2 days
+NODE_METRICS_MINUTE_RETENTION_DAYS = 7  # Keep 1-minute rollups for 7 days
+NODE_METRICS_HOUR_RETENTION_DAYS = 90  # Keep 1-hour rollups for 90 days
+NODE_METRICS_DAY_RETENTION_DAYS = None  # Keep 1-day rollups forever
+NODE_METRICS_MAX_CHART_POINTS = 720  # Charts pick the finest tier within this many points
 NODE_EVENTS_RETENTION_DAYS = 30  # Keep events for 30 days
 CENTRAL_REGISTRY_URL = None  # Set in server/prod settings if not central
 
@@ -543,6 +564,100 @@ P2P_MESSAGE_TTL = 3  # Time to live for relayed messages
 P2P_HEALTH_CHECK_INTERVAL = 60  # Seconds between health checks
 P2P_HUB_SYNC_INTERVAL = 300  # Seconds between hub peer list sync
 
+# Log Collector (AsyncLogCollector)
+LOG_COLLECTOR_MAX_QUEUE_SIZE = 10000  # Entries buffered in memory before the overflow policy applies
+LOG_COLLECTOR_OVERFLOW_POLICY = 'drop_oldest'  # drop_oldest, sample (keep every Nth) or spill (to a JSONL file)
+LOG_COLLECTOR_SAMPLE_RATE = 10  # sample policy: one in this many overflowing entries is kept
+LOG_COLLECTOR_SPILL_PATH = LOGS_DIR / 'log_collector_spill.jsonl'  # spill policy: replayed once the buffer is idle
+LOG_COLLECTOR_FLUSH_INTERVAL = 5.0  # Seconds between flushes when no full batch wakes the writer sooner
+LOG_COLLECTOR_MIN_BATCH_SIZE = 50  # Batch size adapts between these bounds...
+LOG_COLLECTOR_MAX_BATCH_SIZE = 2000
+LOG_COLLECTOR_TARGET_FLUSH_SECONDS = 0.25  # ...aiming for a bulk insert of about this long
+
+# Birlikteyiz Earthquake Ingestion
+BIRLIKTEYIZ_FETCH_INITIAL_LOOKBACK_DAYS = 7  # First fetch of a source (no cursor yet)
+BIRLIKTEYIZ_FETCH_OVERLAP_MINUTES = 15  # Re-request this much before the cursor for late events
+BIRLIKTEYIZ_FETCH_MAX_PAGES = 10  # Full pages followed per source and run; the rest waits for the next run
+BIRLIKTEYIZ_CIRCUIT_FAILURE_THRESHOLD = 3  # Consecutive failures before a source is skipped
+BIRLIKTEYIZ_CIRCUIT_COOLDOWN_MINUTES = 15  # First skip period, doubles while failures continue
+BIRLIKTEYIZ_DEDUP_TIME_SECONDS = 60  # Cross-source duplicates: origin time tolerance
+BIRLIKTEYIZ_DEDUP_DISTANCE_KM = 50  # Cross-source duplicates: epicentre distance tolerance
+BIRLIKTEYIZ_DEDUP_MAGNITUDE = 0.6  # Cross-source duplicates: magnitude tolerance
+BIRLIKTEYIZ_SOURCE_PRIORITY = ['AFAD', 'KANDILLI', 'EMSC', 'USGS', 'GFZ', 'IRIS']  # Which duplicate wins
+
+# Birlikteyiz Earthquake Alerts
+BIRLIKTEYIZ_ALERT_MIN_MAGNITUDE = 3.0  # Earthquakes below this are never queued
+BIRLIKTEYIZ_ALERT_MAX_EVENT_AGE_SECONDS = 3600  # Older events (backfills) are never queued
+BIRLIKTEYIZ_ALERT_COALESCE_SECONDS = 30  # Hold bursts this long and send one digest per subscriber
+BIRLIKTEYIZ_ALERT_URGENT_MAGNITUDE = 5.0  # Dispatch immediately at or above this magnitude
+BIRLIKTEYIZ_ALERT_DISPATCH_ON_SAVE = True  # Schedule a dispatch task when events are queued
+BIRLIKTEYIZ_ALERT_CHANNEL_RATES = {'push': '600/minute', 'email': '60/minute'}  # Per-channel send limits
+BIRLIKTEYIZ_ALERT_MAX_ATTEMPTS = 5  # Give a delivery up after this many failures
+BIRLIKTEYIZ_ALERT_RETRY_BASE_SECONDS = 60  # Backoff: 1m, 2m, 4m ... capped at the max
+BIRLIKTEYIZ_ALERT_RETRY_MAX_SECONDS = 3600
+BIRLIKTEYIZ_ALERT_CLAIM_SECONDS = 300  # A claimed delivery is retried after this if its worker dies
+
+# Recaria World State
+RECARIA_GRID_CELL_SIZE = 50  # Spatial grid cell size in world units
+RECARIA_ENCOUNTER_RANGE = 50  # Spawns within this range can trigger an encounter
+RECARIA_ENCOUNTER_CHANCE = 0.1  # Encounter chance per nearby spawn per move
+RECARIA_NEARBY_RANGE = 200  # Range of the nearby entities pushed each tick
+RECARIA_TICK_SECONDS = 5  # One realm tick per realm, not per connection
+RECARIA_POSITION_FLUSH_SECONDS = 2  # Batch-write moved positions this often
+RECARIA_SPAWN_REFRESH_SECONDS = 300  # Reload creature spawns of a realm
+
+# CCTV Camera Hub
+CCTV_HUB_RING_SIZE = 8  # Encoded frames buffered per camera; slower viewers skip ahead
+CCTV_HUB_MAX_FPS = 15  # Capture/encode rate per camera
+CCTV_HUB_JPEG_QUALITY = 80
+CCTV_HUB_IDLE_SECONDS = 30  # Release a camera's RTSP session after this long without viewers
+CCTV_HUB_READ_TIMEOUT = 10  # Viewers give up after this long without a frame
+CCTV_SNAPSHOT_MAX_AGE_SECONDS = 2  # Snapshots reuse a shared frame up to this old
+
+# Currencies Firebase Import
+CURRENCIES_FIREBASE_IMPORT_BATCH_SIZE = 2000  # Parsed rates checked for existence and bulk-inserted per batch
+CURRENCIES_FIREBASE_OVERLAP_MINUTES = 10  # Re-request this much before the newest stored rate, for late writes
+
+# Movies OMDB Cache
+OMDB_CACHE_LOCAL_SIZE = 1024  # Responses kept per worker (LRU) in front of the OMDBCache table
+OMDB_CACHE_LOCAL_SECONDS = 300  # Re-read a worker's copy from the table after this long
+OMDB_CACHE_STALE_SECONDS = 21600  # Expired responses are served this long while a refresh runs
+OMDB_CACHE_HIT_FLUSH_SECONDS = 60  # Hit counts are written in one batch at most this often
+
+# Store Sentos Sync
+STORE_SENTOS_POOL_SIZE = 8  # Pooled HTTP connections per client
+STORE_SENTOS_CONCURRENCY = 4  # Listing pages (or order item lookups) in flight at once
+STORE_SENTOS_PAGE_SIZE = 100
+STORE_SENTOS_MAX_RETRIES = 4  # Connection errors and 429/5xx; only 429 is retried for POST
+STORE_SENTOS_BACKOFF_SECONDS = 0.5  # First retry delay, doubled per attempt; Retry-After wins when sent
+STORE_SENTOS_CURSOR_OVERLAP_MINUTES = 10  # Incremental syncs re-read this much before the last change seen
+STORE_SENTOS_INITIAL_ORDER_DAYS = 7  # Orders pulled by a marketplace's first sync
+STORE_SENTOS_INVENTORY_BATCH_SIZE = 500  # Stock changes per bulk_update_inventory call
+
+# Personal Inflation
+PERSONAL_INFLATION_SERIES_CACHE_SECONDS = 86400  # Basket index series; price and basket item changes invalidate them sooner
+
+# Messenger Delivery
+MESSENGER_DELIVERY_BATCH_SIZE = 500  # Rows per bulk insert when queueing a message for offline members
+MESSENGER_DELIVERY_TTL_DAYS = 30  # Queued messages without their own expiry are dropped after this
+MESSENGER_DRAIN_BATCH_SIZE = 200  # Queued messages sent (and marked delivered) per batch on reconnect
+MESSENGER_SEARCH_TOKENS_ENABLED = True  # Accept client-side blind search tokens with messages
+MESSENGER_SEARCH_COUNT_LIMIT = 1000  # Search totals stop counting here and are reported as estimates
+MESSENGER_SEARCH_COUNT_CACHE_SECONDS = 60  # A search's total is counted once and reused while paging
+MESSENGER_RATCHET_STORE_KEY = env('MESSENGER_RATCHET_STORE_KEY', default='')  # Fernet key for ratchet state at rest; derived from SECRET_KEY when empty
+MESSENGER_RATCHET_CACHE_SIZE = 1024  # Decoded ratchet sessions kept per worker (LRU)
+MESSENGER_RATCHET_MAX_SKIPPED_KEYS = 2000  # Skipped message keys kept per session; oldest dropped first
+MESSENGER_RATCHET_SKIPPED_KEY_MAX_AGE_HOURS = 72  # Skipped message keys expire after this
+
+# Version Manager Archive Scan
+VERSION_MANAGER_SCAN_WORKERS = 8  # Archive directories measured at once
+VERSION_MANAGER_SCAN_INDEX = CACHE_DIR / 'version_manager_scan.json'  # Per-archive sizes, reused while a directory's mtime and inode are unchanged
+VERSION_MANAGER_SCAN_PROGRESS_SECONDS = 0.5  # Scan progress and log entries are written at most this often
+
+# SDK Cache (UnibosCache)
+UNIBOS_CACHE_L1_SIZE = 1024  # Entries each UnibosCache keeps in process, in front of the shared cache
+UNIBOS_CACHE_L1_SECONDS = 5  # Other processes' writes and namespace clears show up within this long
+
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -644,4 +759,6 @@ MAIL_SERVER_SSH_USER = env('MAIL_SERVER_SSH_USER', default='ubuntu')
 MAIL_SERVER_SSH_KEY = env('MAIL_SERVER_SSH_KEY', default='/home/ubuntu/.ssh/id_ed25519')
 MAIL_DOMAIN = env('MAIL_DOMAIN', default='recaria.org')
 # Set to False in development to log commands instead of executing
-MAIL_USE_SSH = env.bool('MAIL_USE_SSH', default=True)
\ No newline at end of file
+MAIL_USE_SSH = env.bool('MAIL_USE_SSH', default=True)
+# Seconds the mail server status page reuses a status check
+MAIL_STATUS_CACHE_SECONDS = 10
\ No newline at end of file
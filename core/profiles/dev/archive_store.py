@@ -0,0 +1,465 @@
+"""
+UNIBOS Release Archive Store
+Content-addressed, deduplicated storage for version archives
+
+Layout under archive/:
+    store/objects/ab/abcdef...    file contents, named by sha256 (read-only)
+    store/manifests/<name>.json   one per version: path -> object, size, mode
+    store/index.json              size/mtime -> hash of the last snapshot's
+                                  files, so unchanged files aren't re-read
+    versions/<name>/              optional materialized tree
+
+A release writes only the files that changed since any earlier release,
+plus its manifest. Symlinks are followed, as copytree did: a linked file
+is archived as its content and a linked directory as its tree (links back
+into an enclosing directory are skipped, dangling links are left out).
+Empty directories are kept in the manifest. Materialized trees are hardlinks (or reflinks) to the
+objects, so archive/versions keeps working for everything that browses it
+without costing a copy. Objects are read-only: edit a restored copy, never
+a materialized archive.
+
+Usage:
+    from core.profiles.dev.archive_store import ArchiveStore
+
+    store = ArchiveStore(project_root / "archive")
+    manifest, stats = store.snapshot(project_root, "unibos_v1.2.0_b20250101120000")
+    store.diff("unibos_v1.1.0_b...", "unibos_v1.2.0_b...")
+    store.restore("unibos_v1.1.0_b...", Path("/tmp/v1.1.0"))
+    store.gc()
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Materialization modes
+MATERIALIZE_MODES = ('hardlink', 'reflink', 'copy', 'none')
+
+CHUNK_SIZE = 1024 * 1024
+
+# Directories to completely exclude
+EXCLUDE_DIRS = {
+    '.git',
+    '__pycache__',
+    'node_modules',
+    'venv',
+    '.venv',
+    'dist',
+    'build',
+    '.pytest_cache',
+    # Flutter/Mobile SDK directories
+    '.dart_tool',
+    'Pods',
+    '.symlinks',
+    'ephemeral',
+    '.pub-cache',
+    '.pub',
+    '.gradle',
+}
+
+# Files to exclude
+EXCLUDE_FILES = {
+    '.DS_Store',
+    '.coverage',
+    # Flutter/Mobile files
+    '.flutter-plugins',
+    '.flutter-plugins-dependencies',
+    '.packages',
+    'Podfile.lock',
+    'local.properties',
+    'Generated.xcconfig',
+    'ServiceDefinitions.json',
+    'flutter_export_environment.sh',
+}
+
+# File extensions to exclude
+EXCLUDE_EXTENSIONS = ('.pyc', '.sql')
+
+# Paths relative to project root to exclude
+EXCLUDE_PATHS = (
+    'archive',  # Don't archive the archive
+    'data',     # Runtime data (logs, backups, cache, media)
+    'data_db',  # Database files
+    'core/clients/mobile',  # Mobile SDK source (development only)
+)
+
+
+def release_excluded(rel_path: str, name: str) -> bool:
+    """whether a project path stays out of release archives"""
+    return (
+        name in EXCLUDE_DIRS
+        or name in EXCLUDE_FILES
+        or name.endswith(EXCLUDE_EXTENSIONS)
+        or name.endswith('.egg-info')
+        or any(rel_path.startswith(ep) for ep in EXCLUDE_PATHS)
+    )
+
+
+@dataclass
+class ArchiveManifest:
+    """one archived version: relative path -> [object hash, size, executable], plus empty directories"""
+    name: str
+    version: str = ''
+    build: str = ''
+    created: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+    files: Dict[str, list] = field(default_factory=dict)
+    dirs: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return sum(entry[1] for entry in self.files.values())
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name, 'version': self.version, 'build': self.build,
+            'created': self.created, 'files': self.files, 'dirs': self.dirs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ArchiveManifest':
+        return cls(**data)
+
+
+@dataclass
+class SnapshotStats:
+    """what a snapshot cost"""
+    files: int = 0
+    hashed: int = 0  # files read because they changed (or had no index entry)
+    new_objects: int = 0
+    bytes_written: int = 0  # new objects + manifest
+    duration: float = 0.0
+
+
+class ArchiveStore:
+    """content-addressed archive of release trees"""
+
+    def __init__(self, archive_root: Path):
+        self.archive_root = Path(archive_root)
+        self.store_dir = self.archive_root / "store"
+        self.objects_dir = self.store_dir / "objects"
+        self.manifests_dir = self.store_dir / "manifests"
+        self.index_file = self.store_dir / "index.json"
+        self.versions_dir = self.archive_root / "versions"
+        self._objects = str(self.objects_dir)
+
+    # ========== objects ==========
+
+    def object_path(self, digest: str, executable: bool = False) -> Path:
+        return Path(self._object_file(digest, executable))
+
+    def _object_file(self, digest: str, executable: bool) -> str:
+        # exec bit lives on the inode, so executables get their own object
+        return os.path.join(self._objects, digest[:2], digest + ('.x' if executable else ''))
+
+    def _store_object(self, source: Path, executable: bool) -> Tuple[str, int]:
+        """hash a file into the store; returns (digest, bytes written)"""
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.objects_dir, delete=False) as tmp:
+            try:
+                with open(source, 'rb') as f:
+                    while chunk := f.read(CHUNK_SIZE):
+                        digest.update(chunk)
+                        tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        digest = digest.hexdigest()
+
+        target = self.object_path(digest, executable)
+        if target.exists():
+            os.unlink(tmp.name)
+            return digest, 0
+        target.parent.mkdir(exist_ok=True)
+        os.chmod(tmp.name, 0o555 if executable else 0o444)
+        os.replace(tmp.name, target)
+        return digest, target.stat().st_size
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # ========== manifests ==========
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests_dir / f"{name}.json"
+
+    def load_manifest(self, name: str) -> ArchiveManifest:
+        path = self.manifest_path(name)
+        if not path.exists():
+            raise FileNotFoundError(f"no archive manifest: {name}")
+        return ArchiveManifest.from_dict(json.loads(path.read_text()))
+
+    def list_manifests(self) -> List[str]:
+        if not self.manifests_dir.exists():
+            return []
+        return sorted(path.stem for path in self.manifests_dir.glob('*.json'))
+
+    def _write_manifest(self, manifest: ArchiveManifest) -> int:
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(manifest.to_dict(), sort_keys=True, separators=(',', ':'))
+        tmp = self.manifest_path(manifest.name).with_suffix('.tmp')
+        tmp.write_text(data)
+        os.replace(tmp, self.manifest_path(manifest.name))
+        return len(data)
+
+    # ========== snapshot ==========
+
+    def _walk(self, source: Path, excluded: Callable[[str, str], bool]) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        (relative path, stat) of every regular file to archive, following symlinks,
+        and of every directory left empty (stat of a directory)
+        """
+        for directory, dirs, files in os.walk(source, followlinks=True):
+            rel_dir = os.path.relpath(directory, source)
+            rel_dir = '' if rel_dir == '.' else rel_dir + '/'
+            real_dir = os.path.realpath(directory)
+            dirs[:] = sorted(
+                d for d in dirs
+                if not excluded(rel_dir + d, d) and not _links_to_ancestor(os.path.join(directory, d), real_dir)
+            )
+            found = bool(dirs)
+            for name in sorted(files):
+                rel_path = rel_dir + name
+                if excluded(rel_path, name):
+                    continue
+                try:
+                    st = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue  # dangling symlink
+                if stat.S_ISREG(st.st_mode):
+                    found = True
+                    yield rel_path, st
+            if rel_dir and not found:
+                yield rel_dir.rstrip('/'), os.stat(directory)
+
+    def snapshot(
+        self,
+        source: Path,
+        name: str,
+        version: str = '',
+        build: str = '',
+        excluded: Callable[[str, str], bool] = release_excluded,
+        extra_files: Optional[Dict[str, str]] = None,
+        materialize: str = 'hardlink',
+        use_index: bool = True
+    ) -> Tuple[ArchiveManifest, SnapshotStats]:
+        """
+        archive a tree as a manifest, storing only content not seen before
+        extra_files are added to the archive as text (e.g. README.txt)
+        """
+        if materialize not in MATERIALIZE_MODES:
+            raise ValueError(f"unknown materialize mode: {materialize}")
+        if self.manifest_path(name).exists():
+            raise FileExistsError(f"archive already exists: {name}")
+
+        started = datetime.now()
+        source = Path(source)
+        stats = SnapshotStats()
+        index = self._load_index(source) if use_index else {}
+        new_index = {}
+        manifest = ArchiveManifest(name=name, version=version, build=build)
+
+        for rel_path, st in self._walk(source, excluded):
+            if stat.S_ISDIR(st.st_mode):
+                manifest.dirs.append(rel_path)
+                continue
+            executable = bool(st.st_mode & stat.S_IXUSR)
+            key = [st.st_size, st.st_mtime_ns, executable]
+            cached = index.get(rel_path)
+            digest = cached[3] if cached and cached[:3] == key else None
+            # trust the index only while the object is still there
+            if digest is None or not os.path.exists(self._object_file(digest, executable)):
+                digest, written = self._store_object(source / rel_path, executable)
+                stats.hashed += 1
+                if written:
+                    stats.new_objects += 1
+                    stats.bytes_written += written
+            new_index[rel_path] = key + [digest]
+            manifest.files[rel_path] = [digest, st.st_size, executable]
+
+        for rel_path, text in (extra_files or {}).items():
+            with tempfile.NamedTemporaryFile('w', delete=False) as tmp:
+                tmp.write(text)
+            try:
+                digest, written = self._store_object(Path(tmp.name), False)
+            finally:
+                os.unlink(tmp.name)
+            stats.new_objects += bool(written)
+            stats.bytes_written += written
+            manifest.files[rel_path] = [digest, len(text.encode()), False]
+
+        stats.files = len(manifest.files)
+        stats.bytes_written += self._write_manifest(manifest)
+        if use_index:
+            self._save_index(source, new_index)
+
+        if materialize != 'none':
+            self.materialize(name, mode=materialize)
+
+        stats.duration = (datetime.now() - started).total_seconds()
+        return manifest, stats
+
+    def _load_index(self, source: Path) -> Dict[str, list]:
+        try:
+            data = json.loads(self.index_file.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data.get('files', {}) if data.get('source') == str(source.resolve()) else {}
+
+    def _save_index(self, source: Path, files: Dict[str, list]) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'source': str(source.resolve()), 'files': files}, separators=(',', ':')))
+        os.replace(tmp, self.index_file)
+
+    # ========== materialize / restore ==========
+
+    def materialize(self, name: str, dest: Optional[Path] = None, mode: str = 'hardlink') -> Path:
+        """
+        build a version's tree from its objects, at archive/versions/<name> by default
+        hardlink and reflink fall back to copying where the filesystem can't
+        """
+        manifest = self.load_manifest(name)
+        dest = Path(dest) if dest else self.versions_dir / name
+        if dest.exists():
+            raise FileExistsError(f"destination exists: {dest}")
+
+        link = {'hardlink': _hardlink, 'reflink': _reflink, 'copy': _copy}[mode]
+        tmp_dest = dest.with_name(f".{dest.name}.tmp")
+        shutil.rmtree(tmp_dest, ignore_errors=True)
+        tmp_dest.mkdir(parents=True)
+        root = str(tmp_dest)
+        created = {''}
+        for rel_path, (digest, _, executable) in manifest.files.items():
+            parent = os.path.dirname(rel_path)
+            if parent not in created:
+                os.makedirs(os.path.join(root, parent), exist_ok=True)
+                created.add(parent)
+            link(self._object_file(digest, executable), os.path.join(root, rel_path))
+        for rel_path in manifest.dirs:
+            os.makedirs(os.path.join(root, rel_path), exist_ok=True)
+        os.replace(tmp_dest, dest)
+        return dest
+
+    def restore(self, name: str, dest: Path) -> Path:
+        """restore a version as a plain, writable copy"""
+        dest = self.materialize(name, dest, mode='copy')
+        for path in dest.rglob('*'):
+            if path.is_file():
+                path.chmod(path.stat().st_mode | stat.S_IWUSR)
+        return dest
+
+    # ========== diff / gc ==========
+
+    def diff(self, old: str, new: str) -> Dict[str, List[str]]:
+        """paths added, removed and changed between two versions"""
+        old_files = self.load_manifest(old).files
+        new_files = self.load_manifest(new).files
+        return {
+            'added': sorted(new_files.keys() - old_files.keys()),
+            'removed': sorted(old_files.keys() - new_files.keys()),
+            'changed': sorted(
+                path for path in new_files.keys() & old_files.keys()
+                if new_files[path][0] != old_files[path][0] or new_files[path][2] != old_files[path][2]
+            ),
+        }
+
+    def gc(self, dry_run: bool = False) -> Tuple[int, int]:
+        """delete objects no manifest refers to; returns (objects, bytes)"""
+        referenced = set()
+        for name in self.list_manifests():
+            for digest, _, executable in self.load_manifest(name).files.values():
+                referenced.add(digest + ('.x' if executable else ''))
+
+        removed = freed = 0
+        if not self.objects_dir.exists():
+            return removed, freed
+        # temp files left by an interrupted snapshot sit at the top level
+        candidates = list(self.objects_dir.glob('*/*')) + [p for p in self.objects_dir.iterdir() if p.is_file()]
+        for path in candidates:
+            if path.name in referenced:
+                continue
+            removed += 1
+            freed += path.stat().st_size
+            if not dry_run:
+                path.unlink()
+        return removed, freed
+
+    def adopt(self, name: str) -> SnapshotStats:
+        """
+        move a full-copy archive at archive/versions/<name> into the store,
+        replacing it with a hardlinked tree
+        """
+        tree = self.versions_dir / name
+        if not tree.is_dir():
+            raise FileNotFoundError(f"no archive directory: {tree}")
+
+        match = re.match(r'unibos_v(\d+\.\d+\.\d+)_b(\d+)', name)
+        version, build = match.groups() if match else ('', '')
+        # the copy was already filtered when it was made
+        _, stats = self.snapshot(
+            tree, name, version=version, build=build,
+            excluded=lambda rel_path, name: False, materialize='none', use_index=False
+        )
+        old_tree = tree.with_name(f".{name}.old")
+        os.replace(tree, old_tree)
+        try:
+            self.materialize(name)
+        except BaseException:
+            os.replace(old_tree, tree)
+            raise
+        shutil.rmtree(old_tree, ignore_errors=True)
+        return stats
+
+    def delete(self, name: str) -> None:
+        """drop a version's manifest and materialized tree; run gc() to free its objects"""
+        self.manifest_path(name).unlink(missing_ok=True)
+        shutil.rmtree(self.versions_dir / name, ignore_errors=True)
+
+    def stored_size(self) -> int:
+        """bytes held in objects"""
+        if not self.objects_dir.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.objects_dir.glob('*/*'))
+
+
+def _links_to_ancestor(path: str, real_parent: str) -> bool:
+    """whether a directory is a symlink back to real_parent or above it (a loop)"""
+    if not os.path.islink(path):
+        return False
+    real = os.path.realpath(path)
+    return real_parent == real or real_parent.startswith(real + os.sep)
+
+
+def _hardlink(source: str, target: str) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        _copy(source, target)
+
+
+def _reflink(source: str, target: str) -> None:
+    # copy-on-write clone: APFS (cp -c), btrfs/xfs (cp --reflink)
+    flag = ['-c'] if sys.platform == 'darwin' else ['--reflink=always']
+    result = subprocess.run(['cp', *flag, source, target], capture_output=True)
+    if result.returncode != 0:
+        _copy(source, target)
+
+
+def _copy(source: str, target: str) -> None:
+    shutil.copy2(source, target)
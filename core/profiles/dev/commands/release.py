@@ -254,6 +254,13 @@ def release_analyze():
 
     click.echo()
     click.echo(click.style(f'{len(sizes)} archives · {format_size(total_size)} total', fg='cyan', bold=True))
+
+    # hardlinked archives share their files, so the store is the real footprint
+    from core.profiles.dev.archive_store import ArchiveStore
+    store = ArchiveStore(archive_dir.parent)
+    manifests = store.list_manifests()
+    if manifests:
+        click.echo(f"store: {len(manifests)} manifests · {format_size(store.stored_size())} on disk")
     click.echo()
 
     if sizes:
@@ -273,6 +280,81 @@ def release_analyze():
             click.echo(click.style(f"⚠ {len(anomalies)} anomalies (>2x average size)", fg='yellow'))
 
 
+def get_archive_store():
+    """Get the content-addressed archive store"""
+    from core.profiles.dev.archive_store import ArchiveStore
+    return ArchiveStore(get_project_root() / "archive")
+
+
+@release_group.command(name='diff')
+@click.argument('old')
+@click.argument('new')
+@click.option('--json', 'as_json', is_flag=True, help='Output as JSON')
+def release_diff(old, new, as_json):
+    """Show files changed between two archived versions"""
+    try:
+        changes = get_archive_store().diff(old, new)
+    except FileNotFoundError as e:
+        click.echo(click.style(f'❌ {e}', fg='red'))
+        sys.exit(1)
+
+    if as_json:
+        click.echo(json.dumps(changes, indent=2))
+        return
+
+    markers = {'added': ('+', 'green'), 'removed': ('-', 'red'), 'changed': ('~', 'yellow')}
+    for kind, (marker, color) in markers.items():
+        for path in changes[kind]:
+            click.echo(click.style(f"{marker} {path}", fg=color))
+    click.echo()
+    click.echo(
+        f"{len(changes['added'])} added · {len(changes['removed'])} removed · "
+        f"{len(changes['changed'])} changed"
+    )
+
+
+@release_group.command(name='restore')
+@click.argument('name')
+@click.argument('destination', type=click.Path(path_type=Path))
+def release_restore(name, destination):
+    """Restore an archived version as a writable copy"""
+    try:
+        path = get_archive_store().restore(name, destination)
+    except (FileNotFoundError, FileExistsError) as e:
+        click.echo(click.style(f'❌ {e}', fg='red'))
+        sys.exit(1)
+    click.echo(click.style(f'✅ restored {name} to {path}', fg='green'))
+
+
+@release_group.command(name='gc')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed')
+def release_gc(dry_run):
+    """Remove archive objects no version refers to"""
+    removed, freed = get_archive_store().gc(dry_run=dry_run)
+    verb = 'would remove' if dry_run else 'removed'
+    click.echo(f"{verb} {removed} objects · {freed / (1024 * 1024):.1f}mb")
+
+
+@release_group.command(name='adopt')
+def release_adopt():
+    """Move full-copy archives into the archive store"""
+    store = get_archive_store()
+    known = set(store.list_manifests())
+    pending = [
+        item.name for item in sorted(store.versions_dir.iterdir())
+        if item.is_dir() and not item.name.startswith('.') and item.name not in known
+    ] if store.versions_dir.exists() else []
+
+    if not pending:
+        click.echo('all archives are in the store')
+        return
+
+    with click.progressbar(pending, label=f'adopting {len(pending)} archives') as names:
+        for name in names:
+            store.adopt(name)
+    click.echo(f"store: {store.stored_size() / (1024 * 1024):.1f}mb on disk")
+
+
 @release_group.command(name='current')
 def release_current():
     """Show current version (short format)"""
@@ -9,7 +9,6 @@ Usage:
     result = pipeline.run(release_type='minor', message='feat: new feature')
 """
 
-import os
 import sys
 import json
 import shutil
@@ -59,6 +58,10 @@ class ReleasePipeline:
     - worker: Worker deployment (dedicated)
     """
 
+    # How archive/versions/<name> is built from the archive store:
+    # hardlink, reflink, copy, or none (manifest only)
+    ARCHIVE_MATERIALIZE = 'hardlink'
+
     def __init__(self, project_root: Optional[Path] = None):
         self.project_root = project_root or self._find_project_root()
         self.steps: List[PipelineStep] = []
@@ -351,109 +354,33 @@ class ReleasePipeline:
             version_py.write_text('\n'.join(new_lines))
 
     def _step_create_archive(self, version: str, build: str) -> str:
-        """Create version archive"""
-        archive_name = f"unibos_v{version}_b{build}"
-        archive_dir = self.project_root / "archive" / "versions" / archive_name
+        """Create version archive in the content-addressed store"""
+        from core.profiles.dev.archive_store import ArchiveStore
 
+        archive_name = f"unibos_v{version}_b{build}"
         self._log(f"creating {archive_name}/")
 
-        # Directories to completely exclude (won't be copied at all)
-        exclude_dirs = {
-            '.git',
-            '__pycache__',
-            'node_modules',
-            'venv',
-            '.venv',
-            'dist',
-            'build',
-            '.pytest_cache',
-            # Flutter/Mobile SDK directories
-            '.dart_tool',
-            'Pods',
-            '.symlinks',
-            'ephemeral',
-            '.pub-cache',
-            '.pub',
-            '.gradle',
-        }
-
-        # Files to exclude
-        exclude_files = {
-            '.DS_Store',
-            '.coverage',
-            # Flutter/Mobile files
-            '.flutter-plugins',
-            '.flutter-plugins-dependencies',
-            '.packages',
-            'Podfile.lock',
-            'local.properties',
-            'Generated.xcconfig',
-            'ServiceDefinitions.json',
-            'flutter_export_environment.sh',
-        }
-
-        # File extensions to exclude
-        exclude_extensions = {'.pyc', '.sql'}
-
-        # Paths relative to project root to exclude
-        exclude_paths = {
-            'archive',  # Don't copy archive directory at all
-            'data',     # Runtime data (logs, backups, cache, media)
-            'data_db',  # Database files
-            'core/clients/mobile',  # Mobile SDK source (development only)
-        }
-
-        def ignore_patterns(directory, files):
-            ignored = []
-            rel_dir = os.path.relpath(directory, self.project_root)
-
-            for f in files:
-                full_path = os.path.join(directory, f)
-                rel_path = os.path.relpath(full_path, self.project_root)
-
-                # Check if it's an excluded directory
-                if f in exclude_dirs:
-                    ignored.append(f)
-                    continue
-
-                # Check if it's an excluded file
-                if f in exclude_files:
-                    ignored.append(f)
-                    continue
-
-                # Check file extension
-                if any(f.endswith(ext) for ext in exclude_extensions):
-                    ignored.append(f)
-                    continue
-
-                # Check if path starts with excluded path
-                if any(rel_path.startswith(ep) or rel_path == ep for ep in exclude_paths):
-                    ignored.append(f)
-                    continue
-
-                # Check for .egg-info directories
-                if f.endswith('.egg-info'):
-                    ignored.append(f)
-                    continue
-
-            return ignored
-
-        # Create archive
-        shutil.copytree(
-            self.project_root,
-            archive_dir,
-            ignore=ignore_patterns,
-            dirs_exist_ok=False
-        )
-
-        # Create README
-        readme = archive_dir / "README.txt"
-        readme.write_text(
+        store = ArchiveStore(self.project_root / "archive")
+        readme = (
             f"v{version}+build.{build}\n"
             f"Archived: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
         )
+        # Only files changed since earlier releases are written; the
+        # versions/ tree is hardlinked to the shared objects
+        _, stats = store.snapshot(
+            self.project_root,
+            archive_name,
+            version=version,
+            build=build,
+            extra_files={'README.txt': readme},
+            materialize=self.ARCHIVE_MATERIALIZE
+        )
+        self._log(
+            f"{stats.files} files, {stats.hashed} read, {stats.new_objects} new objects, "
+            f"{stats.bytes_written / 1024:.0f} KB written"
+        )
 
-        return str(archive_dir)
+        return str(store.versions_dir / archive_name)
 
     def _step_git_commit(self, message: str):
         """Git add and commit"""
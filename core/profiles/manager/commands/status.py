@@ -5,30 +5,47 @@ Check status of remote UNIBOS instances.
 """
 
 import click
+import json
 import subprocess
 import socket
 
+from core.profiles.manager.fleet import HostStatus, get_fleet_collector
+
 
 @click.command('status')
 @click.argument('target', type=click.Choice(['rocksteady', 'local', 'all'], case_sensitive=False), default='all')
-def status_command(target):
+@click.option('--host', 'hosts', multiple=True, help='Remote host to check (repeatable, default: rocksteady)')
+@click.option('--json', 'as_json', is_flag=True, help='Print remote status as JSON')
+def status_command(target, hosts, as_json):
     """
     Check status of UNIBOS instances
 
+    Remote hosts are checked concurrently, one ssh round trip each.
+
     Examples:
         unibos-dev manager status
         unibos-dev manager status rocksteady
         unibos-dev manager status local
+        unibos-dev manager status rocksteady --host node-1 --host node-2
+        unibos-dev manager status rocksteady --json
     """
+    hosts = list(hosts) or ['rocksteady']
+
+    if as_json:
+        collector = get_fleet_collector()
+        statuses = collector.collect(hosts, refresh=True)
+        click.echo(json.dumps([status.to_dict() for status in statuses.values()], indent=2))
+        return 0
+
     click.echo("📊 Checking UNIBOS instance status...")
     click.echo()
 
     if target == 'all':
-        check_rocksteady_status()
+        check_remote_status(hosts)
         click.echo()
         check_local_status()
     elif target == 'rocksteady':
-        check_rocksteady_status()
+        check_remote_status(hosts)
     elif target == 'local':
         check_local_status()
     else:
@@ -38,96 +55,63 @@ def status_command(target):
     return 0
 
 
+def check_remote_status(hosts):
+    """Check remote hosts, printing each as it answers"""
+    collector = get_fleet_collector()
+    for index, status in enumerate(collector.iter_statuses(hosts, refresh=True)):
+        if index:
+            click.echo()
+        print_host_status(status)
+
+
 def check_rocksteady_status():
     """Check rocksteady server status"""
-    click.echo("🌍 Rocksteady (Production Server)")
+    print_host_status(get_fleet_collector().collect(['rocksteady'], refresh=True)['rocksteady'])
+
+
+def print_host_status(status: HostStatus):
+    """Print one remote host's status"""
+    if status.host == 'rocksteady':
+        click.echo("🌍 Rocksteady (Production Server)")
+    else:
+        click.echo(f"🌍 {status.host}")
     click.echo("─" * 50)
 
-    # Check SSH connectivity
+    # SSH connectivity
     click.echo("🔐 SSH Connectivity:")
-    try:
-        result = subprocess.run(
-            ['ssh', '-o', 'ConnectTimeout=5', 'rocksteady', 'echo "connected"'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0:
-            click.echo("  ✅ SSH connection successful")
+    if not status.reachable:
+        if status.error and status.error.startswith('timeout'):
+            click.echo("  ❌ SSH connection timeout")
         else:
-            click.echo("  ❌ SSH connection failed")
-            return
-    except subprocess.TimeoutExpired:
-        click.echo("  ❌ SSH connection timeout")
-        return
-    except Exception as e:
-        click.echo(f"  ❌ Error: {e}")
+            click.echo(f"  ❌ SSH connection failed: {status.error}")
         return
+    click.echo(f"  ✅ SSH connection successful ({status.elapsed:.2f}s)")
 
-    # Check git status
+    # Git status
     click.echo()
     click.echo("📦 Git Repository:")
-    try:
-        result = subprocess.run(
-            ['ssh', 'rocksteady', 'cd /opt/unibos && git branch --show-current'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0:
-            branch = result.stdout.strip()
-            click.echo(f"  → Branch: {branch}")
-
-            # Get commit hash
-            result = subprocess.run(
-                ['ssh', 'rocksteady', 'cd /opt/unibos && git rev-parse --short HEAD'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                commit = result.stdout.strip()
-                click.echo(f"  → Commit: {commit}")
-        else:
-            click.echo("  ⚠️  Could not get git status")
-    except Exception as e:
-        click.echo(f"  ⚠️  Error: {e}")
+    if status.branch:
+        click.echo(f"  → Branch: {status.branch}")
+        if status.commit:
+            click.echo(f"  → Commit: {status.commit}")
+    else:
+        click.echo("  ⚠️  Could not get git status")
 
-    # Check service status
+    # Service status
     click.echo()
     click.echo("🏥 Services:")
-    try:
-        result = subprocess.run(
-            ['ssh', 'rocksteady', 'systemctl is-active unibos'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0 and result.stdout.strip() == 'active':
-            click.echo("  ✅ UNIBOS service: Running")
-        else:
-            click.echo("  ❌ UNIBOS service: Stopped")
-    except Exception as e:
-        click.echo(f"  ⚠️  Error: {e}")
+    if status.service == 'active':
+        click.echo("  ✅ UNIBOS service: Running")
+    else:
+        click.echo("  ❌ UNIBOS service: Stopped")
 
-    # Check disk usage
+    # Disk usage
     click.echo()
     click.echo("💾 Disk Usage:")
-    try:
-        result = subprocess.run(
-            ['ssh', 'rocksteady', 'df -h /opt/unibos | tail -1'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0:
-            parts = result.stdout.strip().split()
-            if len(parts) >= 5:
-                click.echo(f"  → Used: {parts[2]} / {parts[1]} ({parts[4]})")
-        else:
-            click.echo("  ⚠️  Could not get disk usage")
-    except Exception as e:
-        click.echo(f"  ⚠️  Error: {e}")
+    if status.disk:
+        click.echo(f"  → Used: {status.disk['used']} / {status.disk['size']} ({status.disk['percent']})")
+    else:
+        click.echo("  ⚠️  Could not get disk usage")
 
 
 def check_local_status():
@@ -0,0 +1,192 @@
+"""
+Fleet Status Collector for Manager Profile
+
+Collects the status of remote UNIBOS instances: one ssh round trip per host
+running a compound probe (git branch and commit, service state, disk
+usage), all hosts at once, each with its own timeout.
+
+Results are cached for a few seconds so the TUI can refresh without
+reconnecting, and can be streamed as hosts answer:
+
+    collector = get_fleet_collector()
+    for status in collector.iter_statuses(['rocksteady', 'node-1']):
+        print(status.to_dict())
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, Optional, Sequence
+
+DEFAULT_DEPLOY_PATH = '/opt/unibos'
+DEFAULT_SERVICE = 'unibos'
+DEFAULT_TIMEOUT = 10  # seconds per host, connection included
+DEFAULT_CACHE_TTL = 15  # seconds
+MAX_WORKERS = 64
+
+
+@dataclass
+class HostStatus:
+    """status of one remote instance"""
+    host: str
+    reachable: bool
+    branch: Optional[str] = None
+    commit: Optional[str] = None
+    service: Optional[str] = None
+    disk: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    checked_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def build_probe(deploy_path: str = DEFAULT_DEPLOY_PATH, service: str = DEFAULT_SERVICE) -> str:
+    """shell script printing key=value status lines"""
+    return "; ".join([
+        f"echo \"branch=$(cd {deploy_path} 2>/dev/null && git branch --show-current 2>/dev/null)\"",
+        f"echo \"commit=$(cd {deploy_path} 2>/dev/null && git rev-parse --short HEAD 2>/dev/null)\"",
+        f"echo \"service=$(systemctl is-active {service} 2>/dev/null)\"",
+        f"echo \"disk=$(df -h {deploy_path} 2>/dev/null | tail -1)\"",
+    ])
+
+
+def parse_probe(host: str, output: str, elapsed: float) -> HostStatus:
+    """HostStatus from the probe's key=value lines"""
+    values = {}
+    for line in output.splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            values[key.strip()] = value.strip()
+
+    disk = None
+    parts = values.get('disk', '').split()
+    if len(parts) >= 5:
+        disk = {'size': parts[1], 'used': parts[2], 'available': parts[3], 'percent': parts[4]}
+
+    return HostStatus(
+        host=host,
+        reachable=True,
+        branch=values.get('branch') or None,
+        commit=values.get('commit') or None,
+        service=values.get('service') or None,
+        disk=disk,
+        elapsed=elapsed,
+    )
+
+
+class FleetStatusCollector:
+    """concurrent, cached status collection for many hosts"""
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        ttl: float = DEFAULT_CACHE_TTL,
+        deploy_path: str = DEFAULT_DEPLOY_PATH,
+        service: str = DEFAULT_SERVICE,
+        ssh_binary: str = 'ssh',
+        max_workers: int = MAX_WORKERS
+    ):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.probe = build_probe(deploy_path, service)
+        self.ssh_binary = ssh_binary
+        self.max_workers = max_workers
+        self._cache: Dict[str, HostStatus] = {}
+        self._lock = threading.Lock()
+
+    def check_host(self, host: str) -> HostStatus:
+        """run the probe on one host, bypassing the cache"""
+        command = [
+            self.ssh_binary,
+            '-o', f'ConnectTimeout={max(int(self.timeout), 1)}',
+            '-o', 'BatchMode=yes',
+            host,
+            self.probe
+        ]
+        started = time.monotonic()
+        try:
+            # own session, so a timeout kills ssh and anything it started
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            )
+        except OSError as e:
+            return HostStatus(host=host, reachable=False, error=str(e))
+
+        try:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            return HostStatus(
+                host=host, reachable=False, error=f"timeout after {self.timeout:g}s",
+                elapsed=time.monotonic() - started
+            )
+
+        elapsed = time.monotonic() - started
+        if process.returncode != 0:
+            error = stderr.strip().splitlines()[-1] if stderr.strip() else f"ssh exited with {process.returncode}"
+            return HostStatus(host=host, reachable=False, error=error, elapsed=elapsed)
+        return parse_probe(host, stdout, elapsed)
+
+    def cached(self, host: str) -> Optional[HostStatus]:
+        """cached status younger than the ttl, if any"""
+        with self._lock:
+            status = self._cache.get(host)
+        if status and time.time() - status.checked_at < self.ttl:
+            return status
+        return None
+
+    def iter_statuses(self, hosts: Sequence[str], refresh: bool = False) -> Iterator[HostStatus]:
+        """
+        yield host statuses as they become available
+        cached ones first, then the rest in the order hosts answer
+        """
+        pending = []
+        for host in dict.fromkeys(hosts):
+            status = None if refresh else self.cached(host)
+            if status:
+                yield status
+            else:
+                pending.append(host)
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+            futures = [executor.submit(self.check_host, host) for host in pending]
+            for future in as_completed(futures):
+                status = future.result()
+                with self._lock:
+                    self._cache[status.host] = status
+                yield status
+
+    def collect(self, hosts: Sequence[str], refresh: bool = False) -> Dict[str, HostStatus]:
+        """statuses of all hosts, in the order given"""
+        statuses = {status.host: status for status in self.iter_statuses(hosts, refresh=refresh)}
+        return {host: statuses[host] for host in dict.fromkeys(hosts)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared collector, so repeated TUI refreshes hit its cache
+_collector: Optional[FleetStatusCollector] = None
+
+
+def get_fleet_collector() -> FleetStatusCollector:
+    """Get the shared fleet status collector"""
+    global _collector
+    if _collector is None:
+        _collector = FleetStatusCollector()
+    return _collector
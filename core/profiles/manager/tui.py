@@ -5,6 +5,7 @@ Manager TUI for controlling rocksteady and client nodes remotely
 
 import subprocess
 import socket
+import time
 from pathlib import Path
 from typing import List, Optional
 
@@ -491,6 +492,9 @@ class ManagerTUI(BaseTUI):
         target = self.targets.get(self.current_target, {})
         target_name = target.get('name', self.current_target)
 
+        if target.get('type') == 'server':
+            return self.show_remote_status(target_name, target.get('host', target_name))
+
         self.update_content(
             title="System Status",
             lines=[
@@ -516,6 +520,45 @@ class ManagerTUI(BaseTUI):
         self.render()
         return True
 
+    def show_remote_status(self, target_name: str, host: str) -> bool:
+        """Show a server's status from the fleet collector (cached for a few seconds)"""
+        from core.profiles.manager.fleet import get_fleet_collector
+
+        status = get_fleet_collector().collect([host])[host]
+        age = max(0, int(time.time() - status.checked_at))
+
+        if not status.reachable:
+            lines = [
+                f"💔 System Status: {target_name}",
+                "",
+                f"✗ {host} unreachable: {status.error}",
+            ]
+            color = Colors.RED
+        else:
+            disk = status.disk or {}
+            lines = [
+                f"💚 System Status: {target_name}",
+                "",
+                f"→ Service: {status.service or 'unknown'}",
+                f"→ Branch: {status.branch or 'unknown'}",
+                f"→ Commit: {status.commit or 'unknown'}",
+                f"→ Disk: {disk.get('used', '?')} / {disk.get('size', '?')} ({disk.get('percent', '?')})",
+            ]
+            color = Colors.GREEN if status.service == 'active' else Colors.YELLOW
+
+        lines += [
+            "",
+            f"checked {age}s ago ({status.elapsed:.2f}s round trip)",
+            "",
+            "For detailed status, run:",
+            f"  ssh {target_name} 'systemctl status unibos'",
+            "",
+            "Press ESC to continue"
+        ]
+        self.update_content(title="System Status", lines=lines, color=color)
+        self.render()
+        return True
+
     def handle_service_health(self, item: MenuItem) -> bool:
         """Check service health"""
         target = self.targets.get(self.current_target, {})
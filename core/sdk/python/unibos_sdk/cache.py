@@ -1,12 +1,38 @@
 """
 UNIBOS Cache Service
 Provides unified caching interface for modules
+
+Two tiers: a small in-process LRU (L1) in front of the shared Django cache
+(Redis in production). Hot keys are served from L1 for up to
+UNIBOS_CACHE_L1_SECONDS without a network round trip; writes go to both.
+Other processes see a set, delete or clear once their L1 copy expires.
+
+Keys carry their namespace's generation, so clear() drops a whole
+namespace by bumping one counter, without touching other namespaces.
+Entries of old generations are never read again and expire on their own.
 """
 
 import logging
-from typing import Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
 from datetime import timedelta
 
+DEFAULT_L1_SIZE = 1024  # Entries kept in process per UnibosCache
+DEFAULT_L1_SECONDS = 5  # How long a process may serve a value without asking the backend
+
+_MISSING = object()
+
+
+def _setting(name: str, default: Any) -> Any:
+    """Django setting, or default outside a configured Django project"""
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
 
 class UnibosCache:
     """
@@ -14,16 +40,36 @@ class UnibosCache:
     Wraps Django cache with additional features
     """
 
-    def __init__(self, namespace: Optional[str] = None):
+    def __init__(
+        self,
+        namespace: Optional[str] = None,
+        backend: Any = None,
+        l1_size: Optional[int] = None,
+        l1_ttl: Optional[float] = None
+    ):
         """
         Initialize cache service
 
         Args:
             namespace: Optional namespace prefix for cache keys
+            backend: Shared cache (default: Django's default cache)
+            l1_size: Entries kept in process (0 disables the L1 tier)
+            l1_ttl: Seconds an L1 entry is served before going back to the backend
         """
         self.namespace = namespace or "unibos"
         self.logger = logging.getLogger(f"unibos.cache.{self.namespace}")
-        self._cache = None
+        self._cache = backend
+        self.l1_size = _setting('UNIBOS_CACHE_L1_SIZE', DEFAULT_L1_SIZE) if l1_size is None else l1_size
+        self.l1_ttl = _setting('UNIBOS_CACHE_L1_SECONDS', DEFAULT_L1_SECONDS) if l1_ttl is None else l1_ttl
+
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._generation_checked = 0.0
+        self._flights: Dict[str, threading.Lock] = {}
+        self._stats = dict.fromkeys(
+            ('l1_hits', 'backend_hits', 'misses', 'sets', 'deletes', 'computes', 'clears', 'errors'), 0
+        )
 
     def _get_cache(self):
         """Get Django cache instance lazily"""
@@ -36,14 +82,89 @@ class UnibosCache:
                 self._cache = NullCache()
         return self._cache
 
+    # ========== keys and generations ==========
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.namespace}:__generation__"
+
+    def _current_generation(self) -> int:
+        """
+        Namespace generation, re-read from the backend at most every l1_ttl
+        so clears in other processes are seen as soon as L1 entries would be
+        """
+        now = time.monotonic()
+        if self._generation is not None and now - self._generation_checked < self.l1_ttl:
+            return self._generation
+
+        backend = self._get_cache()
+        generation = backend.get(self._generation_key)
+        if generation is None:
+            # A fresh start value, so entries written before the counter was
+            # evicted can't come back
+            backend.add(self._generation_key, time.time_ns(), None)
+            generation = backend.get(self._generation_key) or 0
+        self._set_generation(generation, now)
+        return generation
+
+    def _set_generation(self, generation: int, checked: float) -> None:
+        with self._lock:
+            if generation != self._generation:
+                self._l1.clear()
+            self._generation = generation
+            self._generation_checked = checked
+
     def _make_key(self, key: str) -> str:
         """Create namespaced cache key"""
-        return f"{self.namespace}:{key}"
+        return f"{self.namespace}:{self._current_generation()}:{key}"
+
+    # ========== L1 tier ==========
+
+    def _l1_get(self, cache_key: str) -> Any:
+        if not self.l1_size:
+            return _MISSING
+        with self._lock:
+            entry = self._l1.get(cache_key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._l1[cache_key]
+                return _MISSING
+            self._l1.move_to_end(cache_key)
+            return value
+
+    def _l1_set(self, cache_key: str, value: Any, timeout: Any = None) -> None:
+        if not self.l1_size:
+            return
+        ttl = self.l1_ttl
+        if isinstance(timeout, (int, float)) and not isinstance(timeout, bool):
+            if timeout <= 0:
+                self._l1_delete(cache_key)
+                return
+            ttl = min(ttl, timeout)
+        with self._lock:
+            self._l1[cache_key] = (time.monotonic() + ttl, value)
+            self._l1.move_to_end(cache_key)
+            while len(self._l1) > self.l1_size:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, cache_key: str) -> None:
+        with self._lock:
+            self._l1.pop(cache_key, None)
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += amount
+
+    # ========== single keys ==========
 
     def get(self, key: str, default: Any = None) -> Any:
         """
         Get value from cache
 
+        Values served from L1 are shared between callers; don't mutate them.
+
         Args:
             key: Cache key
             default: Default value if key not found
@@ -53,9 +174,20 @@ class UnibosCache:
         """
         try:
             cache_key = self._make_key(key)
-            value = self._get_cache().get(cache_key, default)
+            value = self._l1_get(cache_key)
+            if value is not _MISSING:
+                self._count('l1_hits')
+                return value
+
+            value = self._get_cache().get(cache_key, _MISSING)
+            if value is _MISSING:
+                self._count('misses')
+                return default
+            self._count('backend_hits')
+            self._l1_set(cache_key, value)
             return value
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error getting cache key '{key}': {e}")
             return default
 
@@ -74,8 +206,11 @@ class UnibosCache:
         try:
             cache_key = self._make_key(key)
             self._get_cache().set(cache_key, value, timeout)
+            self._l1_set(cache_key, value, timeout)
+            self._count('sets')
             return True
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error setting cache key '{key}': {e}")
             return False
 
@@ -91,26 +226,201 @@ class UnibosCache:
         """
         try:
             cache_key = self._make_key(key)
+            self._l1_delete(cache_key)
             self._get_cache().delete(cache_key)
+            self._count('deletes')
             return True
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error deleting cache key '{key}': {e}")
             return False
 
+    def get_or_set(self, key: str, compute: Callable[[], Any], timeout: Optional[int] = None) -> Any:
+        """
+        Get value from cache, computing and storing it on a miss
+
+        Concurrent misses for the same key in this process wait for a single
+        compute() call instead of each running it.
+
+        Args:
+            key: Cache key
+            compute: Called without arguments to produce the value
+            timeout: Cache timeout in seconds, as for set()
+
+        Returns:
+            Cached or computed value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._flights.setdefault(key, threading.Lock())
+        with flight:
+            try:
+                # Whoever held the flight before us may have stored it
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                value = compute()
+                self._count('computes')
+                self.set(key, value, timeout)
+                return value
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+
+    # ========== batches ==========
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values, in one backend round trip for those not in L1
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dict of the keys found and their values
+        """
+        found = {}
+        try:
+            cache_keys = {self._make_key(key): key for key in keys}
+            pending = []
+            for cache_key, key in cache_keys.items():
+                value = self._l1_get(cache_key)
+                if value is _MISSING:
+                    pending.append(cache_key)
+                else:
+                    found[key] = value
+            self._count('l1_hits', len(found))
+
+            if pending:
+                values = _get_many(self._get_cache(), pending)
+                for cache_key, value in values.items():
+                    found[cache_keys[cache_key]] = value
+                    self._l1_set(cache_key, value)
+                self._count('backend_hits', len(values))
+                self._count('misses', len(pending) - len(values))
+            return found
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting cache keys: {e}")
+            return found
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> bool:
+        """
+        Set several values in one backend round trip
+
+        Args:
+            mapping: Cache keys and values
+            timeout: Cache timeout in seconds, as for set()
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            data = {self._make_key(key): value for key, value in mapping.items()}
+            failed = _set_many(self._get_cache(), data, timeout) or []
+            for cache_key, value in data.items():
+                if cache_key not in failed:
+                    self._l1_set(cache_key, value, timeout)
+            self._count('sets', len(data) - len(failed))
+            return not failed
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error setting cache keys: {e}")
+            return False
+
+    def delete_many(self, keys: Iterable[str]) -> bool:
+        """
+        Delete several values in one backend round trip
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            cache_keys = [self._make_key(key) for key in keys]
+            for cache_key in cache_keys:
+                self._l1_delete(cache_key)
+            _delete_many(self._get_cache(), cache_keys)
+            self._count('deletes', len(cache_keys))
+            return True
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error deleting cache keys: {e}")
+            return False
+
+    # ========== namespace ==========
+
     def clear(self) -> bool:
         """
         Clear all cache entries in this namespace
 
+        Bumps the namespace generation; other namespaces are untouched.
+
         Returns:
             True if successful, False otherwise
         """
         try:
-            self._get_cache().clear()
+            backend = self._get_cache()
+            try:
+                generation = backend.incr(self._generation_key)
+            except ValueError:
+                # Counter missing (never written, or evicted): start afresh
+                generation = time.time_ns()
+                backend.set(self._generation_key, generation, None)
+            self._set_generation(generation, time.monotonic())
+            self._count('clears')
             return True
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error clearing cache: {e}")
             return False
 
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters of this instance
+
+        Returns:
+            Counters, L1 size and hit rate over all reads
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['l1_entries'] = len(self._l1)
+        reads = stats['l1_hits'] + stats['backend_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['l1_hits'] + stats['backend_hits']) / reads if reads else 0.0
+        return stats
+
+
+def _get_many(backend, keys):
+    if hasattr(backend, 'get_many'):
+        return backend.get_many(keys)
+    values = {}
+    for key in keys:
+        value = backend.get(key, _MISSING)
+        if value is not _MISSING:
+            values[key] = value
+    return values
+
+
+def _set_many(backend, data, timeout):
+    if hasattr(backend, 'set_many'):
+        return backend.set_many(data, timeout)
+    for key, value in data.items():
+        backend.set(key, value, timeout)
+    return []
+
+
+def _delete_many(backend, keys):
+    if hasattr(backend, 'delete_many'):
+        return backend.delete_many(keys)
+    for key in keys:
+        backend.delete(key)
+
 
 class NullCache:
     """Null cache implementation for when Django cache is not available"""
@@ -121,6 +431,12 @@ class NullCache:
     def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
         pass
 
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        return False
+
+    def incr(self, key: str, delta: int = 1) -> int:
+        raise ValueError(f"Key '{key}' not found")
+
     def delete(self, key: str) -> None:
         pass
 
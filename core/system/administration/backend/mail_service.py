@@ -1,16 +1,24 @@
 """
 recaria.org mail server provisioning service
 manages postfix/dovecot mailboxes via ssh commands
+
+commands go through a MailChannel: one long-lived shell on the mail server
+(over a single ssh connection, or a local bash in local mode) that takes
+scripted batches of commands and answers with per-command exit code,
+stdout and stderr. read-only server status is cached for a few seconds.
 """
 
+import atexit
 import subprocess
 import logging
 import hashlib
 import secrets
 import string
-from typing import Optional, Tuple, Dict, Any
+import threading
+from typing import Optional, Tuple, Dict, Any, List, Sequence
 from dataclasses import dataclass
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger('unibos.mail')
 
@@ -27,6 +35,8 @@ class MailConfig:
     dovecot_users_file: str = '/etc/dovecot/users'
     use_ssh: bool = True  # set to false for local testing
     local_mode: bool = False  # set to true when mail server is localhost
+    ssh_binary: str = 'ssh'
+    command_timeout: int = 30  # seconds per batch
 
 
 def get_mail_config() -> MailConfig:
@@ -76,69 +86,198 @@ def hash_password_dovecot(password: str) -> str:
         return f"$6${salt}${hashlib.sha512((salt + password).encode()).hexdigest()}"
 
 
-def run_ssh_command(command: str, config: Optional[MailConfig] = None) -> Tuple[bool, str]:
-    """run a command on the mail server via ssh or locally"""
+@dataclass
+class CommandResult:
+    """result of one command in a batch"""
+    command: str
+    returncode: int
+    stdout: str = ''
+    stderr: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def skipped(self) -> bool:
+        """not run, because an earlier command in a stop-on-error batch failed"""
+        return self.returncode == SKIPPED
+
+
+SKIPPED = -1
+
+
+class MailChannel:
+    """
+    one long-lived shell on the mail server, driven over stdin
+
+    each command runs in a subshell with its output captured to temp files;
+    the shell then writes a frame header (marker, exit code, stdout and
+    stderr lengths) followed by the output, so results are read back
+    exactly, whatever the commands print. commands are sent as script
+    text, so they need no extra quoting for ssh.
+    """
+
+    def __init__(self, config: MailConfig):
+        self.config = config
+        self.marker = f"__mail_{secrets.token_hex(8)}"
+        self.process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _shell_command(self) -> List[str]:
+        if self.config.local_mode:
+            return ['bash', '-s']
+        return [
+            self.config.ssh_binary,
+            '-i', self.config.ssh_key_path,
+            '-o', 'StrictHostKeyChecking=no',
+            '-o', 'BatchMode=yes',
+            '-o', 'ServerAliveInterval=30',
+            f'{self.config.ssh_user}@{self.config.mail_server}',
+            'bash -s'
+        ]
+
+    def _start(self) -> None:
+        self.process = subprocess.Popen(
+            self._shell_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._send(
+            '__out=$(mktemp) && __err=$(mktemp) || exit 1\n'
+            'trap \'rm -f "$__out" "$__err"\' EXIT\n'
+        )
+
+    def _send(self, script: str) -> None:
+        self.process.stdin.write(script.encode())
+        self.process.stdin.flush()
+
+    def close(self) -> None:
+        """end the shell session"""
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def _frame(self, command: str) -> str:
+        """script running one command and printing its frame"""
+        return (
+            f'if [ "$__halt" = 1 ]; then printf \'{self.marker} {SKIPPED} 0 0\\n\'; else\n'
+            f'( {command}\n) >"$__out" 2>"$__err" </dev/null; __rc=$?\n'
+            f'[ "$__stop" = 1 ] && [ $__rc != 0 ] && __halt=1\n'
+            f'set -- $(wc -c "$__out" "$__err")\n'
+            f'printf \'{self.marker} %d %d %d\\n\' $__rc $1 $3\n'
+            f'cat "$__out" "$__err"\n'
+            f'fi\n'
+        )
+
+    def run_batch(self, commands: Sequence[str], stop_on_error: bool = False) -> List[CommandResult]:
+        """
+        run commands in one round trip, in order
+        with stop_on_error, commands after the first failure are skipped
+        """
+        script = f'__halt=0; __stop={1 if stop_on_error else 0}\n' + ''.join(
+            self._frame(command) for command in commands
+        )
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self._close()
+                try:
+                    self._start()
+                except OSError as e:
+                    self.process = None
+                    return [CommandResult(command, 255, '', str(e)) for command in commands]
+
+            # a hung command kills the session; the next batch starts a new one
+            watchdog = threading.Timer(self.config.command_timeout, self.process.kill)
+            watchdog.start()
+            try:
+                self._send(script)
+                results = [self._read_frame(command) for command in commands]
+            except (OSError, ValueError) as e:
+                self._close()
+                error = "command timed out" if not watchdog.is_alive() else f"mail server session lost: {e}"
+                results = [CommandResult(command, 255, '', error) for command in commands]
+            finally:
+                watchdog.cancel()
+        return results
+
+    def _read_frame(self, command: str) -> CommandResult:
+        header = self.process.stdout.readline().decode()
+        marker, _, fields = header.partition(' ')
+        if marker != self.marker:
+            raise ValueError("unexpected output" if header else "connection closed")
+        returncode, out_length, err_length = (int(field) for field in fields.split())
+        stdout = self.process.stdout.read(out_length).decode(errors='replace')
+        stderr = self.process.stdout.read(err_length).decode(errors='replace')
+        return CommandResult(command, returncode, stdout, stderr)
+
+
+_channels: Dict[tuple, MailChannel] = {}
+_channels_lock = threading.Lock()
+
+
+def get_mail_channel(config: MailConfig) -> MailChannel:
+    """shared channel for this mail server, reused across requests"""
+    key = (config.mail_server, config.ssh_user, config.ssh_key_path, config.local_mode, config.ssh_binary)
+    with _channels_lock:
+        channel = _channels.get(key)
+        if channel is None:
+            channel = _channels[key] = MailChannel(config)
+        return channel
+
+
+@atexit.register
+def close_mail_channels() -> None:
+    """end every open mail server session"""
+    with _channels_lock:
+        channels = list(_channels.values())
+        _channels.clear()
+    for channel in channels:
+        channel.close()
+
+
+def run_ssh_batch(
+    commands: Sequence[str],
+    config: Optional[MailConfig] = None,
+    stop_on_error: bool = False
+) -> List[CommandResult]:
+    """run commands on the mail server in one round trip"""
     if config is None:
         config = get_mail_config()
 
     if not config.use_ssh:
         # development mode - just log commands
-        logger.info(f"[dev mode] would run: {command}")
-        return True, "dev mode - command logged"
+        for command in commands:
+            logger.info(f"[dev mode] would run: {command}")
+        return [CommandResult(command, 0, "dev mode - command logged") for command in commands]
 
-    # if mail server is local, run command directly (no SSH needed)
-    if config.local_mode:
-        try:
-            result = subprocess.run(
-                ['bash', '-c', command],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+    results = get_mail_channel(config).run_batch(commands, stop_on_error=stop_on_error)
+    for result in results:
+        if not result.ok and not result.skipped:
+            logger.error(f"mail server command failed: {result.command[:80]}: {result.stderr.strip()}")
+    return results
 
-            if result.returncode == 0:
-                return True, result.stdout.strip()
-            else:
-                logger.error(f"local command failed: {result.stderr}")
-                return False, result.stderr.strip()
-
-        except subprocess.TimeoutExpired:
-            logger.error("local command timed out")
-            return False, "command timed out"
-        except Exception as e:
-            logger.error(f"local command error: {e}")
-            return False, str(e)
-
-    # remote mode - use SSH
-    ssh_cmd = [
-        'ssh',
-        '-i', config.ssh_key_path,
-        '-o', 'StrictHostKeyChecking=no',
-        '-o', 'BatchMode=yes',
-        f'{config.ssh_user}@{config.mail_server}',
-        command
-    ]
 
-    try:
-        result = subprocess.run(
-            ssh_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+def run_ssh_command(command: str, config: Optional[MailConfig] = None) -> Tuple[bool, str]:
+    """run a command on the mail server via ssh or locally"""
+    result = run_ssh_batch([command], config)[0]
+    if result.ok:
+        return True, result.stdout.strip()
+    return False, result.stderr.strip()
 
-        if result.returncode == 0:
-            return True, result.stdout.strip()
-        else:
-            logger.error(f"ssh command failed: {result.stderr}")
-            return False, result.stderr.strip()
 
-    except subprocess.TimeoutExpired:
-        logger.error("ssh command timed out")
-        return False, "command timed out"
-    except Exception as e:
-        logger.error(f"ssh command error: {e}")
-        return False, str(e)
+def _result_message(result: CommandResult) -> str:
+    return result.stdout.strip() if result.ok else result.stderr.strip()
 
 
 class MailProvisioner:
@@ -172,37 +311,35 @@ class MailProvisioner:
         vmailbox_entry = f"{email} {self.config.domain}/{username}/"
         cmd_vmailbox = f"echo '{vmailbox_entry}' | sudo tee -a {self.config.vmailbox_file}"
 
-        success, msg = run_ssh_command(cmd_vmailbox, self.config)
-        if not success:
-            return False, f"failed to add vmailbox entry: {msg}", None
-
         # step 2: add to dovecot users file
         # format: email:password_hash:uid:gid::home:
         dovecot_entry = f"{email}:{password_hash}:5000:5000::{self.config.vmail_path}/{self.config.domain}/{username}:"
         cmd_dovecot = f"echo '{dovecot_entry}' | sudo tee -a {self.config.dovecot_users_file}"
 
-        success, msg = run_ssh_command(cmd_dovecot, self.config)
-        if not success:
-            return False, f"failed to add dovecot user: {msg}", None
-
         # step 3: create maildir structure
         maildir = f"{self.config.vmail_path}/{self.config.domain}/{username}"
         cmd_maildir = f"sudo mkdir -p {maildir}/{{cur,new,tmp}} && sudo chown -R vmail:vmail {maildir}"
 
-        success, msg = run_ssh_command(cmd_maildir, self.config)
-        if not success:
-            return False, f"failed to create maildir: {msg}", None
-
-        # step 4: set quota
+        # step 4: set quota (optional)
         quota_bytes = quota_mb * 1024 * 1024
         cmd_quota = f"sudo setquota -u vmail {quota_bytes} {quota_bytes} 0 0 /var/mail 2>/dev/null || true"
-        run_ssh_command(cmd_quota, self.config)  # quota is optional
 
         # step 5: reload postfix
         cmd_reload = "sudo postmap /etc/postfix/vmailbox && sudo systemctl reload postfix"
-        success, msg = run_ssh_command(cmd_reload, self.config)
-        if not success:
-            logger.warning(f"postfix reload warning: {msg}")
+
+        # one round trip; a failed step skips the rest
+        vmailbox, dovecot, maildir_result, _, reload = run_ssh_batch(
+            [cmd_vmailbox, cmd_dovecot, cmd_maildir, cmd_quota, cmd_reload], self.config, stop_on_error=True
+        )
+        invalidate_server_status(self.config)
+        if not vmailbox.ok:
+            return False, f"failed to add vmailbox entry: {_result_message(vmailbox)}", None
+        if not dovecot.ok:
+            return False, f"failed to add dovecot user: {_result_message(dovecot)}", None
+        if not maildir_result.ok:
+            return False, f"failed to create maildir: {_result_message(maildir_result)}", None
+        if not reload.ok:
+            logger.warning(f"postfix reload warning: {_result_message(reload)}")
 
         logger.info(f"mailbox created successfully: {email}")
         return True, f"mailbox {email} created successfully", password
@@ -216,25 +353,25 @@ class MailProvisioner:
 
         # remove from vmailbox
         cmd_vmailbox = f"sudo sed -i '/{email}/d' {self.config.vmailbox_file}"
-        success, msg = run_ssh_command(cmd_vmailbox, self.config)
-        if not success:
-            return False, f"failed to remove vmailbox entry: {msg}"
 
         # remove from dovecot users
         cmd_dovecot = f"sudo sed -i '/^{email}:/d' {self.config.dovecot_users_file}"
-        success, msg = run_ssh_command(cmd_dovecot, self.config)
-        if not success:
-            return False, f"failed to remove dovecot user: {msg}"
 
         # optionally delete mail data
+        commands = [cmd_vmailbox, cmd_dovecot]
         if delete_data:
             maildir = f"{self.config.vmail_path}/{self.config.domain}/{username}"
-            cmd_delete = f"sudo rm -rf {maildir}"
-            run_ssh_command(cmd_delete, self.config)
+            commands.append(f"sudo rm -rf {maildir} || true")
 
         # reload postfix
-        cmd_reload = "sudo postmap /etc/postfix/vmailbox && sudo systemctl reload postfix"
-        run_ssh_command(cmd_reload, self.config)
+        commands.append("sudo postmap /etc/postfix/vmailbox && sudo systemctl reload postfix || true")
+
+        results = run_ssh_batch(commands, self.config, stop_on_error=True)
+        invalidate_server_status(self.config)
+        if not results[0].ok:
+            return False, f"failed to remove vmailbox entry: {_result_message(results[0])}"
+        if not results[1].ok:
+            return False, f"failed to remove dovecot user: {_result_message(results[1])}"
 
         logger.info(f"mailbox deleted: {email}")
         return True, f"mailbox {email} deleted"
@@ -270,8 +407,7 @@ class MailProvisioner:
         virtual_file = '/etc/postfix/virtual'
 
         # remove existing forward if any
-        cmd_remove = f"sudo sed -i '/^{email}/d' {virtual_file}"
-        run_ssh_command(cmd_remove, self.config)
+        commands = [f"sudo sed -i '/^{email}/d' {virtual_file} || true"]
 
         if forward_to:
             # add new forwarding rule
@@ -282,14 +418,14 @@ class MailProvisioner:
                 # forward only
                 forward_rule = f"{email} {forward_to}"
 
-            cmd_add = f"echo '{forward_rule}' | sudo tee -a {virtual_file}"
-            success, msg = run_ssh_command(cmd_add, self.config)
-            if not success:
-                return False, f"failed to set forwarding: {msg}"
+            commands.append(f"echo '{forward_rule}' | sudo tee -a {virtual_file}")
 
             # rebuild virtual map
-            cmd_postmap = "sudo postmap /etc/postfix/virtual && sudo systemctl reload postfix"
-            run_ssh_command(cmd_postmap, self.config)
+            commands.append("sudo postmap /etc/postfix/virtual && sudo systemctl reload postfix || true")
+
+        results = run_ssh_batch(commands, self.config, stop_on_error=True)
+        if forward_to and not results[1].ok:
+            return False, f"failed to set forwarding: {_result_message(results[1])}"
 
         logger.info(f"forwarding set for {email} -> {forward_to}")
         return True, f"forwarding {'enabled' if forward_to else 'disabled'}"
@@ -310,18 +446,17 @@ class MailProvisioner:
         if enabled and message:
             # create vacation message
             cmd_mkdir = f"sudo mkdir -p {vacation_dir}"
-            run_ssh_command(cmd_mkdir, self.config)
 
             # escape message for shell
             escaped_message = message.replace("'", "'\\''")
             cmd_msg = f"echo '{escaped_message}' | sudo tee {vacation_dir}/.vacation.msg"
-            success, msg = run_ssh_command(cmd_msg, self.config)
-            if not success:
-                return False, f"failed to create vacation message: {msg}"
 
             # enable vacation
             cmd_enable = f"sudo touch {vacation_dir}/.vacation.db && sudo chown -R vmail:vmail {vacation_dir}"
-            run_ssh_command(cmd_enable, self.config)
+
+            _, message_result, _ = run_ssh_batch([cmd_mkdir, cmd_msg, cmd_enable], self.config)
+            if not message_result.ok:
+                return False, f"failed to create vacation message: {_result_message(message_result)}"
 
             logger.info(f"auto-responder enabled for: {email}")
             return True, "auto-responder enabled"
@@ -341,17 +476,18 @@ class MailProvisioner:
         username = email.split('@')[0]
         maildir = f"{self.config.vmail_path}/{self.config.domain}/{username}"
 
-        # get directory size
-        cmd = f"sudo du -sb {maildir} 2>/dev/null | cut -f1"
-        success, output = run_ssh_command(cmd, self.config)
+        # get directory size and count messages, in one round trip
+        size_result, count_result = run_ssh_batch([
+            f"sudo du -sb {maildir} 2>/dev/null | cut -f1",
+            f"find {maildir} -type f 2>/dev/null | wc -l",
+        ], self.config)
+        output = size_result.stdout.strip()
 
-        if success and output.isdigit():
+        if size_result.ok and output.isdigit():
             size_bytes = int(output)
             size_mb = size_bytes / (1024 * 1024)
 
-            # count messages
-            cmd_count = f"find {maildir} -type f 2>/dev/null | wc -l"
-            _, count_output = run_ssh_command(cmd_count, self.config)
+            count_output = count_result.stdout.strip()
             message_count = int(count_output) if count_output.isdigit() else 0
 
             return True, {
@@ -378,6 +514,7 @@ class MailProvisioner:
             cmd = f"sudo mv {maildir}.suspended {maildir} 2>/dev/null || true"
 
         success, msg = run_ssh_command(cmd, self.config)
+        invalidate_server_status(self.config)
 
         action = "suspended" if suspend else "activated"
         logger.info(f"mailbox {action}: {email}")
@@ -388,8 +525,17 @@ class MailProvisioner:
         success, output = run_ssh_command("echo 'connection ok'", self.config)
         return success, output
 
-    def get_server_status(self) -> Dict[str, Any]:
-        """get mail server status information"""
+    def get_server_status(self, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        get mail server status information
+        one round trip, cached for MAIL_STATUS_CACHE_SECONDS
+        """
+        cache_key = _status_cache_key(self.config)
+        if use_cache:
+            status = cache.get(cache_key)
+            if status is not None:
+                return status
+
         status = {
             "postfix": False,
             "dovecot": False,
@@ -399,42 +545,42 @@ class MailProvisioner:
             "disk_usage": "unknown"
         }
 
-        # test connection
-        success, _ = self.test_connection()
-        status["connection"] = success
-
-        if not success:
-            return status
-
-        # check postfix
-        success, _ = run_ssh_command("systemctl is-active postfix", self.config)
-        status["postfix"] = success
+        connection, postfix, dovecot, opendkim, count, disk = run_ssh_batch([
+            "echo 'connection ok'",
+            "systemctl is-active postfix",
+            "systemctl is-active dovecot",
+            "systemctl is-active opendkim",
+            f"wc -l < {self.config.dovecot_users_file} 2>/dev/null || echo 0",
+            f"df -h {self.config.vmail_path} | tail -1 | awk '{{print $5}}'",
+        ], self.config)
 
-        # check dovecot
-        success, _ = run_ssh_command("systemctl is-active dovecot", self.config)
-        status["dovecot"] = success
+        # test connection
+        status["connection"] = connection.ok
+        if connection.ok:
+            status["postfix"] = postfix.ok
+            status["dovecot"] = dovecot.ok
+            status["opendkim"] = opendkim.ok
+
+            # count mailboxes
+            output = count.stdout.strip()
+            if count.ok and output.isdigit():
+                status["mailbox_count"] = int(output)
+
+            # disk usage
+            if disk.ok:
+                status["disk_usage"] = disk.stdout.strip()
+
+        cache.set(cache_key, status, getattr(settings, 'MAIL_STATUS_CACHE_SECONDS', 10))
+        return status
 
-        # check opendkim
-        success, _ = run_ssh_command("systemctl is-active opendkim", self.config)
-        status["opendkim"] = success
 
-        # count mailboxes
-        success, output = run_ssh_command(
-            f"wc -l < {self.config.dovecot_users_file} 2>/dev/null || echo 0",
-            self.config
-        )
-        if success and output.isdigit():
-            status["mailbox_count"] = int(output)
+def _status_cache_key(config: MailConfig) -> str:
+    return f"mail:server_status:{config.mail_server}"
 
-        # get disk usage
-        success, output = run_ssh_command(
-            f"df -h {self.config.vmail_path} | tail -1 | awk '{{print $5}}'",
-            self.config
-        )
-        if success:
-            status["disk_usage"] = output
 
-        return status
+def invalidate_server_status(config: Optional[MailConfig] = None) -> None:
+    """drop cached server status after a change on the server"""
+    cache.delete(_status_cache_key(config or get_mail_config()))
 
 
 # convenience functions
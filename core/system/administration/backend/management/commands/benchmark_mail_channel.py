@@ -0,0 +1,160 @@
+"""
+benchmark mail server status checks
+runs get_server_status against a fake mail server and reports latency and
+processes spawned per request:
+
+  per-command ssh    one ssh process (and handshake) per status command,
+                     as run_ssh_command used to work
+  channel            one batch over the shared MailChannel session
+  channel + cache    status page reloads within MAIL_STATUS_CACHE_SECONDS
+
+the fake ssh sleeps --handshake-ms on every connection, then runs the
+commands locally against stub systemctl. the local rows do the same
+without ssh: bash -c per command before, one bash session now.
+
+usage: python manage.py benchmark_mail_channel --requests 50 --handshake-ms 150
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.system.administration.backend.mail_service import (
+    MailConfig, MailProvisioner, close_mail_channels, invalidate_server_status,
+)
+
+FAKE_SSH = '''#!/bin/bash
+sleep {handshake}
+export PATH="{bin_dir}:$PATH"
+command="${{@: -1}}"
+if [ "$command" = "bash -s" ]; then exec bash -s; fi
+exec bash -c "$command"
+'''
+
+STATUS_COMMANDS = [
+    "echo 'connection ok'",
+    "systemctl is-active postfix",
+    "systemctl is-active dovecot",
+    "systemctl is-active opendkim",
+    "wc -l < {users_file} 2>/dev/null || echo 0",
+    "df -h {vmail_path} | tail -1 | awk '{{print $5}}'",
+]
+
+
+class SpawnCounter:
+    """audit hook counting subprocesses started by this process"""
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+
+    def __call__(self, event, args):
+        if self.active and event == 'subprocess.Popen':
+            self.count += 1
+
+
+def previous_status(config, local):
+    """get_server_status as it was: a new process per command"""
+    def run(command):
+        if local:
+            argv = ['bash', '-c', command]
+        else:
+            argv = [config.ssh_binary, '-i', config.ssh_key_path, '-o', 'StrictHostKeyChecking=no',
+                    '-o', 'BatchMode=yes', f'{config.ssh_user}@{config.mail_server}', command]
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=30)
+        return result.returncode == 0, result.stdout.strip()
+
+    commands = [c.format(users_file=config.dovecot_users_file, vmail_path=config.vmail_path) for c in STATUS_COMMANDS]
+    status = {"postfix": False, "dovecot": False, "opendkim": False, "connection": False,
+              "mailbox_count": 0, "disk_usage": "unknown"}
+    status["connection"], _ = run(commands[0])
+    if not status["connection"]:
+        return status
+    status["postfix"], _ = run(commands[1])
+    status["dovecot"], _ = run(commands[2])
+    status["opendkim"], _ = run(commands[3])
+    success, output = run(commands[4])
+    if success and output.isdigit():
+        status["mailbox_count"] = int(output)
+    success, output = run(commands[5])
+    if success:
+        status["disk_usage"] = output
+    return status
+
+
+class Command(BaseCommand):
+    help = 'benchmark mail server status: latency and process spawns per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='status requests per design (default: 50)')
+        parser.add_argument('--handshake-ms', type=int, default=150, help='fake ssh handshake (default: 150)')
+
+    def handle(self, *args, **options):
+        root = Path(tempfile.mkdtemp(prefix='mail-bench-'))
+        self.spawns = SpawnCounter()
+        sys.addaudithook(self.spawns)
+        try:
+            bin_dir = root / 'bin'
+            bin_dir.mkdir()
+            systemctl = bin_dir / 'systemctl'
+            systemctl.write_text('#!/bin/bash\n[ "$2" = opendkim ] && { echo inactive; exit 3; }\necho active\n')
+            ssh = root / 'ssh'
+            ssh.write_text(FAKE_SSH.format(handshake=options['handshake_ms'] / 1000, bin_dir=bin_dir))
+            for path in (systemctl, ssh):
+                path.chmod(0o755)
+            users_file = root / 'users'
+            users_file.write_text(''.join(f'user{i}@recaria.org:x:5000:5000::/var/mail:\n' for i in range(250)))
+            (root / 'vhosts').mkdir()
+
+            remote = MailConfig(mail_server='mail.fake', ssh_binary=str(ssh), ssh_key_path=str(root / 'key'),
+                                dovecot_users_file=str(users_file), vmail_path=str(root / 'vhosts'))
+            local = MailConfig(mail_server='localhost', local_mode=True,
+                               dovecot_users_file=str(users_file), vmail_path=str(root / 'vhosts'))
+
+            count = options['requests']
+            self.stdout.write(
+                f"{count} status requests, {options['handshake_ms']} ms ssh handshake\n"
+                f"{'design':<24} {'mean ms':>8} {'p95 ms':>8} {'spawns/req':>11}"
+            )
+            expected = previous_status(remote, local=False)
+            self.run('per-command ssh', count, lambda: previous_status(remote, local=False), expected)
+            self.run('channel', count, lambda: MailProvisioner(remote).get_server_status(use_cache=False), expected)
+            invalidate_server_status(remote)
+            self.run('channel + cache', count, lambda: MailProvisioner(remote).get_server_status(), expected)
+
+            # local mode: systemctl has to resolve to the stub
+            path = subprocess.os.environ['PATH']
+            subprocess.os.environ['PATH'] = f"{bin_dir}:{path}"
+            try:
+                self.run('local: bash per command', count, lambda: previous_status(local, local=True), expected)
+                self.run('local: channel', count, lambda: MailProvisioner(local).get_server_status(use_cache=False), expected)
+            finally:
+                subprocess.os.environ['PATH'] = path
+        finally:
+            self.spawns.active = False
+            close_mail_channels()
+            invalidate_server_status(remote)
+            shutil.rmtree(root, ignore_errors=True)
+
+    def run(self, design, count, get_status, expected):
+        self.spawns.count = 0
+        self.spawns.active = True
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            status = get_status()
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != expected:
+                raise RuntimeError(f"{design}: status {status} != {expected}")
+        self.spawns.active = False
+
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f"{design:<24} {statistics.mean(timings):>8.1f} {p95:>8.1f} {self.spawns.count / count:>11.2f}"
+        )
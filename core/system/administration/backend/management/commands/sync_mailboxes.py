@@ -68,7 +68,7 @@ class Command(BaseCommand):
         """check and display mail server status"""
         self.stdout.write('\n=== mail server status ===')
 
-        status = provisioner.get_server_status()
+        status = provisioner.get_server_status(use_cache=False)
 
         self.stdout.write(f"connection: {'OK' if status['connection'] else 'FAILED'}")
         self.stdout.write(f"postfix: {'running' if status['postfix'] else 'stopped'}")
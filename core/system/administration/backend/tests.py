@@ -0,0 +1,132 @@
+"""
+Tests for the mail server command channel
+
+MailChannel runs against a local bash (local mode), so the framing is
+checked end to end without a mail server.
+"""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from .mail_service import (
+    CommandResult, MailChannel, MailConfig, MailProvisioner, SKIPPED, invalidate_server_status
+)
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class MailChannelTests(SimpleTestCase):
+    """Test batches run through one local shell session"""
+
+    def channel(self, **options):
+        channel = MailChannel(MailConfig(**{'local_mode': True, **options}))
+        self.addCleanup(channel.close)
+        return channel
+
+    def test_batch_returns_each_command_result_in_order(self):
+        """Test exit codes and output are framed per command, in one session"""
+        channel = self.channel()
+        results = channel.run_batch([
+            'echo one',
+            'printf "no newline"',
+            f'echo {channel.marker} 0 0 0',
+            'cat',
+            'exit 7',
+            'echo after',
+        ])
+        self.assertEqual([result.returncode for result in results], [0, 0, 0, 0, 7, 0])
+        self.assertEqual(
+            [result.stdout for result in results],
+            ['one\n', 'no newline', f'{channel.marker} 0 0 0\n', '', '', 'after\n']
+        )
+        process = channel.process
+
+        # The next batch reuses the same shell
+        self.assertEqual(channel.run_batch(['echo again'])[0].stdout, 'again\n')
+        self.assertIs(channel.process, process)
+
+    def test_stderr_and_binary_output(self):
+        """Test stderr is kept apart from stdout and undecodable bytes are replaced"""
+        result, = self.channel().run_batch(["printf 'ok\\377'; printf 'bad\\n' >&2; exit 3"])
+        self.assertEqual((result.returncode, result.stdout, result.stderr), (3, 'ok\ufffd', 'bad\n'))
+        self.assertFalse(result.ok)
+
+    def test_stop_on_error_skips_the_rest_of_the_batch(self):
+        """Test commands after the first failure are skipped, and only in that batch"""
+        channel = self.channel()
+        results = channel.run_batch(['true', 'false', 'echo skipped', 'echo skipped'], stop_on_error=True)
+        self.assertEqual([result.returncode for result in results], [0, 1, SKIPPED, SKIPPED])
+        self.assertTrue(results[2].skipped)
+        self.assertEqual(results[2].stdout, '')
+
+        # Without stop_on_error every command runs
+        results = channel.run_batch(['false', 'echo ran'])
+        self.assertEqual([result.stdout for result in results], ['', 'ran\n'])
+
+    def test_timeout_kills_the_session_and_the_next_batch_starts_a_new_one(self):
+        """Test a hung command fails the batch and doesn't break later batches"""
+        channel = self.channel(command_timeout=1)
+        channel.run_batch(['true'])
+        process = channel.process
+
+        results = channel.run_batch(['sleep 5', 'echo never'])
+        self.assertEqual([result.returncode for result in results], [255, 255])
+        self.assertEqual(results[0].stderr, 'command timed out')
+        self.assertIsNone(channel.process)
+        self.assertIsNotNone(process.poll())
+
+        self.assertEqual(channel.run_batch(['echo back'])[0].stdout, 'back\n')
+
+    def test_shell_that_cannot_start_fails_every_command(self):
+        """Test a missing ssh binary is reported per command instead of raised"""
+        channel = self.channel(local_mode=False, ssh_binary='/nonexistent/ssh')
+        results = channel.run_batch(['echo a', 'echo b'])
+        self.assertEqual([result.returncode for result in results], [255, 255])
+        self.assertIsNone(channel.process)
+
+
+@override_settings(CACHES=LOCMEM, MAIL_STATUS_CACHE_SECONDS=60)
+class ServerStatusCacheTests(SimpleTestCase):
+    """Test server status is cached until a provisioning change"""
+
+    def setUp(self):
+        cache.clear()
+        self.config = MailConfig(local_mode=True)
+        self.provisioner = MailProvisioner(self.config)
+        batch = patch('core.system.administration.backend.mail_service.run_ssh_batch', side_effect=self.run_batch)
+        self.batch = batch.start()
+        self.addCleanup(batch.stop)
+
+    def run_batch(self, commands, config=None, stop_on_error=False):
+        return [CommandResult(command, 0, '3\n' if command.startswith('wc') else 'active\n') for command in commands]
+
+    def test_status_is_read_once_until_invalidated(self):
+        """Test repeated status reads make one round trip"""
+        status = self.provisioner.get_server_status()
+        self.assertEqual(status['mailbox_count'], 3)
+        self.provisioner.get_server_status()
+        self.assertEqual(self.batch.call_count, 1)
+
+        self.provisioner.get_server_status(use_cache=False)
+        self.assertEqual(self.batch.call_count, 2)
+
+        invalidate_server_status(self.config)
+        self.provisioner.get_server_status()
+        self.assertEqual(self.batch.call_count, 3)
+
+    def test_provisioning_changes_invalidate_the_status(self):
+        """Test creating, deleting and suspending mailboxes drop the cached status"""
+        changes = [
+            lambda: self.provisioner.create_mailbox('ayse@recaria.org', password='secret'),
+            lambda: self.provisioner.delete_mailbox('ayse@recaria.org'),
+            lambda: self.provisioner.suspend_mailbox('ayse@recaria.org'),
+        ]
+        with patch('core.system.administration.backend.mail_service.hash_password_dovecot', return_value='hash'):
+            for change in changes:
+                self.provisioner.get_server_status()
+                calls = self.batch.call_count
+                change()
+                self.provisioner.get_server_status()
+                self.assertEqual(self.batch.call_count, calls + 2)
@@ -16,6 +16,7 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from core.system.authentication.backend.models import UserSession
+from .ratelimit import RateLimitPolicy, SlidingWindowRateLimiter, LocalPreFilter
 
 logger = logging.getLogger(__name__)
 
@@ -101,40 +102,72 @@ class RequestLoggingMiddleware(MiddlewareMixin):
 
 
 class RateLimitMiddleware(MiddlewareMixin):
-    """Global rate limiting middleware"""
-    
+    """
+    Global rate limiting middleware
+
+    Sliding-window limits per route and user class, counted with atomic cache
+    increments (see ratelimit.py). Adds RateLimit-* headers to responses.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.policy = RateLimitPolicy()
+        prefilter = None
+        if getattr(settings, 'RATE_LIMIT_LOCAL_PREFILTER', False):
+            prefilter = LocalPreFilter(
+                headroom=getattr(settings, 'RATE_LIMIT_PREFILTER_HEADROOM', 0.5),
+                sync_every=getattr(settings, 'RATE_LIMIT_PREFILTER_SYNC_EVERY', 20),
+            )
+        self.limiter = SlidingWindowRateLimiter(prefilter=prefilter)
+
     def process_request(self, request):
         # Skip rate limiting for certain paths
-        exempt_paths = ['/admin/', '/static/', '/media/', '/health/', '/administration/unlock/', '/birlikteyiz/']
-        if any(request.path.startswith(path) for path in exempt_paths):
+        if self.policy.is_exempt(request.path):
             return None
-        
+
+        user = getattr(request, 'user', None)
+        user_class = self.policy.user_class(user)
+        scope, rate = self.policy.resolve(request.path, user_class)
+        if rate is None:
+            return None
+        limit, window = rate
+
         # Get client identifier
-        if request.user.is_authenticated:
-            identifier = f"user_{request.user.id}"
-            limit = 50000  # Authenticated users: 50000 requests per hour
-        else:
+        if user_class == 'anonymous':
             identifier = f"ip_{self.get_client_ip(request)}"
-            limit = 10000  # Anonymous users: 10000 requests per hour
-        
-        # Check rate limit
-        cache_key = f"rate_limit_{identifier}"
-        requests_count = cache.get(cache_key, 0)
-        
-        if requests_count >= limit:
-            return JsonResponse(
+        else:
+            identifier = f"user_{user.id}"
+
+        try:
+            result = self.limiter.hit(f"{scope}:{identifier}", limit, window)
+        except Exception as e:
+            # Never fail a request because the cache is unavailable
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return None
+
+        request._rate_limit = result
+
+        if not result.allowed:
+            response = JsonResponse(
                 {
                     'error': 'Rate limit exceeded',
-                    'detail': f'Too many requests. Limit: {limit} requests per hour.'
+                    'detail': f'Too many requests. Limit: {limit} requests per {window} seconds.'
                 },
                 status=429
             )
-        
-        # Increment counter
-        cache.set(cache_key, requests_count + 1, 3600)  # 1 hour TTL
-        
+            for header, value in result.headers().items():
+                response[header] = value
+            return response
+
         return None
-    
+
+    def process_response(self, request, response):
+        result = getattr(request, '_rate_limit', None)
+        if result is not None and result.allowed:
+            for header, value in result.headers().items():
+                response[header] = value
+        return response
+
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
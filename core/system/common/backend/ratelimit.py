@@ -0,0 +1,306 @@
+"""
+Sliding-window rate limiting for UNIBOS backend
+
+Counters live in the shared cache (Redis in production) and are only ever
+changed with atomic increments, so concurrent requests from any number of
+workers are counted exactly. The sliding window is approximated with the
+standard two-window weighting: the previous fixed window's count is scaled by
+how much of it still overlaps the sliding window.
+
+Configuration (settings.py):
+
+    RATE_LIMIT_DEFAULTS = {
+        'anonymous': '10000/hour',
+        'authenticated': '50000/hour',
+        'staff': None,                  # None = unlimited
+    }
+    RATE_LIMIT_RULES = [
+        {'path': '/api/v1/auth/', 'anonymous': '30/minute', 'authenticated': '120/minute'},
+        {'path': '/api/v1/messenger/', 'authenticated': '600/minute'},
+    ]
+    RATE_LIMIT_EXEMPT_PATHS = ['/admin/', '/static/', ...]
+    RATE_LIMIT_LOCAL_PREFILTER = False
+"""
+
+import math
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+USER_CLASSES = ('anonymous', 'authenticated', 'staff')
+
+DEFAULT_LIMITS = {
+    'anonymous': '10000/hour',
+    'authenticated': '50000/hour',
+    'staff': '50000/hour',
+}
+
+DEFAULT_EXEMPT_PATHS = [
+    '/admin/', '/static/', '/media/', '/health/', '/administration/unlock/', '/birlikteyiz/',
+]
+
+PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse a DRF-style rate string into (limit, window_seconds)
+
+    '100/hour' -> (100, 3600), '30/5m' -> (30, 300), None -> None (unlimited)
+    """
+    if rate is None:
+        return None
+    count, _, period = str(rate).partition('/')
+    period = period.strip().lower()
+    multiplier = ''
+    while period and period[0].isdigit():
+        multiplier += period[0]
+        period = period[1:]
+    if period not in PERIODS:
+        raise ValueError(f"invalid rate period in '{rate}'")
+    return int(count), PERIODS[period] * int(multiplier or 1)
+
+
+@dataclass
+class RateLimitRule:
+    """Limits for one path prefix, per user class"""
+    path: str
+    limits: Dict[str, Optional[Tuple[int, int]]]
+
+    def limit_for(self, user_class: str) -> Optional[Tuple[int, int]]:
+        return self.limits.get(user_class)
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # seconds until the current window ends
+    window: int
+
+    def headers(self) -> Dict[str, str]:
+        """Standard RateLimit-* response headers"""
+        headers = {
+            'RateLimit-Limit': str(self.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(self.reset),
+            'RateLimit-Policy': f'{self.limit};w={self.window}',
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.reset)
+        return headers
+
+
+class LocalPreFilter:
+    """
+    In-process pre-filter for clients that are obviously under their limit
+
+    While the last known shared count plus locally admitted requests stays
+    below `headroom` of the limit, requests are admitted without a cache
+    round trip. The locally admitted requests are folded into the shared
+    counter with a single incr(delta) on the next synchronisation, so the
+    shared count still ends up exact.
+    """
+
+    def __init__(self, headroom: float = 0.5, sync_every: int = 20):
+        self.headroom = headroom
+        self.sync_every = sync_every
+        self._lock = threading.Lock()
+        # key -> [window_id, known_shared_count, pending_local_hits]
+        self._state: Dict[str, List[int]] = {}
+
+    def try_admit(self, key: str, window_id: int, limit: int) -> Optional[int]:
+        """
+        Admit locally if safely under the limit
+
+        Returns the local estimate of used requests, or None when the caller
+        has to synchronise with the shared counter.
+        """
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or state[0] != window_id:
+                return None
+            known, pending = state[1], state[2]
+            if pending + 1 >= self.sync_every or known + pending + 1 > limit * self.headroom:
+                return None
+            state[2] += 1
+            return known + state[2]
+
+    def take_pending(self, key: str, window_id: int) -> Tuple[int, Optional[int], int]:
+        """
+        Return (pending hits for window_id, stale window id, pending hits for the stale window)
+
+        Clears the pending count so the caller can fold it into the shared
+        counter. A stale window is reported when locally admitted hits belong
+        to a window that has since rolled over.
+        """
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or not state[2]:
+                return 0, None, 0
+            pending = state[2]
+            state[2] = 0
+            if state[0] != window_id:
+                return 0, state[0], pending
+            return pending, None, 0
+
+    def record(self, key: str, window_id: int, shared_count: int):
+        """Remember the shared count returned by the last synchronisation"""
+        with self._lock:
+            state = self._state.get(key)
+            if state is not None and state[0] == window_id:
+                # Keep hits admitted by other threads since take_pending()
+                state[1] = max(state[1], shared_count)
+                return
+            if len(self._state) > 10000:
+                self._state.clear()
+            self._state[key] = [window_id, shared_count, 0]
+
+    def clear(self):
+        with self._lock:
+            self._state.clear()
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window counter backed by atomic cache increments
+
+    One request costs a single incr in the steady state: the previous
+    window's count is immutable once that window has closed, so it is
+    memoised in-process after the first read.
+    """
+
+    KEY_PREFIX = 'rl'
+
+    def __init__(self, cache=None, prefilter: Optional[LocalPreFilter] = None, clock=time.time):
+        self._cache = cache
+        self.prefilter = prefilter
+        self.clock = clock
+        self._closed_windows: Dict[str, int] = {}
+        self._closed_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = caches[getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default')]
+        return self._cache
+
+    def _key(self, identifier: str, window: int, window_id: int) -> str:
+        return f'{self.KEY_PREFIX}:{identifier}:{window}:{window_id}'
+
+    def _incr(self, key: str, delta: int, ttl: int) -> int:
+        """Atomic increment, creating the counter with add() on first use"""
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # Key missing: add() is atomic, so only one racer creates it
+            if self.cache.add(key, delta, ttl):
+                return delta
+            return self.cache.incr(key, delta)
+
+    def _previous_count(self, key: str) -> int:
+        with self._closed_lock:
+            if key in self._closed_windows:
+                return self._closed_windows[key]
+        count = self.cache.get(key, 0) or 0
+        with self._closed_lock:
+            if len(self._closed_windows) > 10000:
+                self._closed_windows.clear()
+            self._closed_windows[key] = count
+        return count
+
+    def hit(self, identifier: str, limit: int, window: int) -> RateLimitResult:
+        """Count one request for identifier and decide whether it is allowed"""
+        now = self.clock()
+        window_id = int(now // window)
+        elapsed = now - window_id * window
+        reset = max(1, int(window - elapsed))
+        ttl = window * 2 + 1
+        current_key = self._key(identifier, window, window_id)
+        local_key = f'{identifier}:{window}'
+
+        if self.prefilter is not None:
+            used = self.prefilter.try_admit(local_key, window_id, limit)
+            if used is not None:
+                return RateLimitResult(True, limit, max(0, limit - used), reset, window)
+
+        delta = 1
+        if self.prefilter is not None:
+            pending, stale_window, stale_pending = self.prefilter.take_pending(local_key, window_id)
+            delta += pending
+            if stale_window is not None:
+                stale_key = self._key(identifier, window, stale_window)
+                self._incr(stale_key, stale_pending, ttl)
+                with self._closed_lock:
+                    self._closed_windows.pop(stale_key, None)
+
+        current = self._incr(current_key, delta, ttl)
+        previous = self._previous_count(self._key(identifier, window, window_id - 1))
+
+        weight = (window - elapsed) / window
+        estimated = previous * weight + current
+
+        if self.prefilter is not None:
+            self.prefilter.record(local_key, window_id, math.ceil(estimated))
+
+        allowed = estimated <= limit
+        remaining = max(0, int(limit - estimated))
+        return RateLimitResult(allowed, limit, remaining, reset, window)
+
+    def count(self, identifier: str, window: int, at: Optional[float] = None) -> int:
+        """Raw count of the fixed window containing `at` (default: now)"""
+        window_id = int((self.clock() if at is None else at) // window)
+        return self.cache.get(self._key(identifier, window, window_id), 0) or 0
+
+
+class RateLimitPolicy:
+    """Resolve which limit applies to a request"""
+
+    def __init__(self, rules=None, defaults=None, exempt_paths=None):
+        rules = getattr(settings, 'RATE_LIMIT_RULES', []) if rules is None else rules
+        defaults = {**DEFAULT_LIMITS, **(getattr(settings, 'RATE_LIMIT_DEFAULTS', {}) if defaults is None else defaults)}
+        self.exempt_paths = (
+            getattr(settings, 'RATE_LIMIT_EXEMPT_PATHS', DEFAULT_EXEMPT_PATHS)
+            if exempt_paths is None else exempt_paths
+        )
+        self.defaults = {user_class: parse_rate(rate) for user_class, rate in defaults.items()}
+
+        self.rules = []
+        for rule in rules:
+            limits = {
+                user_class: parse_rate(rule[user_class]) if user_class in rule else self.defaults.get(user_class)
+                for user_class in USER_CLASSES
+            }
+            self.rules.append(RateLimitRule(path=rule['path'], limits=limits))
+        # Longest prefix wins
+        self.rules.sort(key=lambda r: len(r.path), reverse=True)
+
+    def is_exempt(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.exempt_paths)
+
+    def user_class(self, user) -> str:
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        if user.is_staff or user.is_superuser:
+            return 'staff'
+        return 'authenticated'
+
+    def resolve(self, path: str, user_class: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """Return (scope, (limit, window)) for path, or (scope, None) when unlimited"""
+        for rule in self.rules:
+            if path.startswith(rule.path):
+                return rule.path, rule.limit_for(user_class)
+        return 'global', self.defaults.get(user_class)
@@ -0,0 +1,153 @@
+"""
+Tests for the sliding-window rate limiter
+"""
+
+import threading
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+
+from .ratelimit import (
+    LocalPreFilter, RateLimitPolicy, SlidingWindowRateLimiter, parse_rate,
+)
+from .middleware import RateLimitMiddleware
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(name):
+    return LocMemCache(name, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+class ParseRateTests(TestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('100/hour'), (100, 3600))
+        self.assertEqual(parse_rate('30/5m'), (30, 300))
+        self.assertEqual(parse_rate('10/second'), (10, 1))
+        self.assertIsNone(parse_rate(None))
+        with self.assertRaises(ValueError):
+            parse_rate('10/fortnight')
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    """Test counting, window sliding and contention behaviour"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = SlidingWindowRateLimiter(cache=make_cache('rl-tests'), clock=self.clock)
+
+    def test_allows_up_to_limit(self):
+        results = [self.limiter.hit('client', 5, 60) for _ in range(7)]
+        self.assertEqual([r.allowed for r in results], [True] * 5 + [False] * 2)
+        self.assertEqual(results[0].remaining, 4)
+        self.assertEqual(results[4].remaining, 0)
+
+    def test_window_slides(self):
+        """Test previous window count decays instead of resetting the TTL"""
+        window_start = (self.clock.now // 60) * 60
+        self.clock.now = window_start + 59
+        for _ in range(10):
+            self.limiter.hit('client', 10, 60)
+
+        # Just after the boundary almost all of the previous window still counts
+        self.clock.now = window_start + 61
+        self.assertFalse(self.limiter.hit('client', 10, 60).allowed)
+
+        # Three quarters through the next window only a quarter still counts
+        self.clock.now = window_start + 105
+        self.assertTrue(self.limiter.hit('client', 10, 60).allowed)
+
+    def test_counts_are_exact_under_contention(self):
+        """Test concurrent hits are never lost and exactly `limit` are allowed"""
+        threads, per_thread, limit = 16, 250, 1000
+        allowed = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            local_allowed = 0
+            barrier.wait()
+            for _ in range(per_thread):
+                if self.limiter.hit('contended', limit, 3600).allowed:
+                    local_allowed += 1
+            with lock:
+                allowed.append(local_allowed)
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        self.assertEqual(self.limiter.count('contended', 3600), threads * per_thread)
+        self.assertEqual(sum(allowed), limit)
+
+    def test_prefilter_folds_local_hits_into_shared_count(self):
+        """Test pre-filtered hits still reach the shared counter"""
+        limiter = SlidingWindowRateLimiter(
+            cache=make_cache('rl-prefilter'),
+            prefilter=LocalPreFilter(headroom=0.5, sync_every=10),
+            clock=self.clock,
+        )
+        for _ in range(45):
+            self.assertTrue(limiter.hit('client', 1000, 3600).allowed)
+
+        # One more synchronising hit flushes whatever is still pending
+        limiter.prefilter.sync_every = 1
+        limiter.hit('client', 1000, 3600)
+        self.assertEqual(limiter.count('client', 3600), 46)
+
+    def test_prefilter_defers_to_shared_count_near_limit(self):
+        """Test the pre-filter stops admitting locally past its headroom"""
+        limiter = SlidingWindowRateLimiter(
+            cache=make_cache('rl-prefilter-limit'),
+            prefilter=LocalPreFilter(headroom=0.5, sync_every=1000),
+            clock=self.clock,
+        )
+        results = [limiter.hit('client', 10, 60).allowed for _ in range(12)]
+        self.assertEqual(results, [True] * 10 + [False] * 2)
+        self.assertEqual(limiter.count('client', 60), 12)
+
+
+class RateLimitPolicyTests(TestCase):
+    def test_longest_prefix_and_user_class(self):
+        policy = RateLimitPolicy(
+            rules=[
+                {'path': '/api/', 'anonymous': '100/hour'},
+                {'path': '/api/v1/auth/', 'anonymous': '5/minute', 'authenticated': None},
+            ],
+            defaults={'anonymous': '10/hour', 'authenticated': '20/hour'},
+            exempt_paths=['/static/'],
+        )
+        self.assertEqual(policy.resolve('/api/v1/auth/login/', 'anonymous'), ('/api/v1/auth/', (5, 60)))
+        self.assertEqual(policy.resolve('/api/v1/auth/login/', 'authenticated'), ('/api/v1/auth/', None))
+        self.assertEqual(policy.resolve('/api/v1/items/', 'authenticated'), ('/api/', (20, 3600)))
+        self.assertEqual(policy.resolve('/other/', 'anonymous'), ('global', (10, 3600)))
+        self.assertTrue(policy.is_exempt('/static/app.js'))
+
+
+class RateLimitMiddlewareTests(TestCase):
+    @override_settings(RATE_LIMIT_RULES=[{'path': '/limited/', 'anonymous': '2/minute'}])
+    def test_headers_and_429(self):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+        middleware.limiter = SlidingWindowRateLimiter(cache=make_cache('rl-middleware'))
+        factory = RequestFactory()
+
+        responses = []
+        for _ in range(3):
+            request = factory.get('/limited/')
+            request.user = AnonymousUser()
+            responses.append(middleware(request))
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(responses[0]['RateLimit-Limit'], '2')
+        self.assertEqual(responses[0]['RateLimit-Remaining'], '1')
+        self.assertEqual(responses[1]['RateLimit-Remaining'], '0')
+        self.assertIn('Retry-After', responses[2])
@@ -0,0 +1,132 @@
+"""
+Management command to benchmark request-path overhead of the async log collector
+Drives SystemLoggingMiddleware at a fixed request rate and reports per-request
+overhead percentiles together with the collector's own counters
+
+Usage: python manage.py benchmark_log_collector --rate 2000 --duration 10
+"""
+
+import time
+import threading
+import statistics
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+from core.system.logging.backend.middleware import AsyncLogCollector, SystemLoggingMiddleware, log_collector
+from core.system.logging.backend.models import SystemLog
+
+BENCH_PATH = '/__bench__/log-collector/'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request overhead of the async log collector'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=int, default=2000, help='Requests per second (default: 2000)')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to run (default: 10)')
+        parser.add_argument('--threads', type=int, default=4, help='Request threads (default: 4)')
+        parser.add_argument(
+            '--policy',
+            choices=AsyncLogCollector.OVERFLOW_POLICIES,
+            default=None,
+            help='Overflow policy override',
+        )
+        parser.add_argument('--queue-size', type=int, default=None, help='Buffer size override')
+        parser.add_argument('--keep', action='store_true', help='Keep benchmark rows in system_logs')
+
+    def handle(self, *args, **options):
+        rate = options['rate']
+        duration = options['duration']
+        threads = max(1, options['threads'])
+
+        overrides = {}
+        if options['policy']:
+            overrides['overflow_policy'] = options['policy']
+        if options['queue_size']:
+            overrides['max_queue_size'] = options['queue_size']
+        log_collector.configure(**overrides)
+        log_collector.reset_stats()
+
+        factory = RequestFactory()
+
+        def view(request):
+            return HttpResponse('ok')
+
+        middleware = SystemLoggingMiddleware(view)
+
+        def make_request():
+            request = factory.get(BENCH_PATH, HTTP_USER_AGENT='unibos-bench')
+            request.user = AnonymousUser()
+            return request
+
+        # Baseline: the bare view without the logging middleware
+        baseline = []
+        for _ in range(2000):
+            request = make_request()
+            started = time.perf_counter()
+            view(request)
+            baseline.append(time.perf_counter() - started)
+        baseline_s = statistics.median(baseline)
+
+        per_thread = int(rate * duration / threads)
+        interval = threads / rate
+        samples = [[] for _ in range(threads)]
+        lag = [0] * threads
+
+        def worker(index):
+            requests = [make_request() for _ in range(per_thread)]
+            start = time.perf_counter()
+            for i, request in enumerate(requests):
+                due = start + i * interval
+                now = time.perf_counter()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    lag[index] += 1
+                started = time.perf_counter()
+                middleware(request)
+                samples[index].append(time.perf_counter() - started - baseline_s)
+
+        self.stdout.write(
+            f'Driving {rate} req/s for {duration}s on {threads} threads '
+            f'(policy={log_collector.overflow_policy}, queue={log_collector.max_queue_size})'
+        )
+        wall_start = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+
+        drain_start = time.perf_counter()
+        log_collector.flush()
+        drain = time.perf_counter() - drain_start
+
+        overhead = sorted(s for thread_samples in samples for s in thread_samples)
+        total = len(overhead)
+
+        def pct(p):
+            return overhead[min(total - 1, int(total * p))] * 1_000_000
+
+        stats = log_collector.stats()
+        self.stdout.write(self.style.SUCCESS(f'Requests: {total} in {wall:.2f}s ({total / wall:.0f} req/s achieved)'))
+        self.stdout.write(f'Late requests (pacing missed): {sum(lag)}')
+        self.stdout.write(
+            f'Overhead per request: p50={pct(0.50):.1f}us p95={pct(0.95):.1f}us '
+            f'p99={pct(0.99):.1f}us max={overhead[-1] * 1_000_000:.1f}us'
+        )
+        self.stdout.write(f'Final drain: {drain * 1000:.1f}ms')
+        self.stdout.write(
+            f"Collector: enqueued={stats['enqueued']} written={stats['written']} "
+            f"dropped={stats['dropped']} spilled={stats['spilled']} failed={stats['failed']}"
+        )
+        self.stdout.write(
+            f"Flushes: {stats['flushes']} batch_size={stats['batch_size']} "
+            f"latency avg={stats['flush_latency_ms']['avg']}ms max={stats['flush_latency_ms']['max']}ms"
+        )
+
+        if not options['keep']:
+            deleted, _ = SystemLog.objects.filter(request_path=BENCH_PATH).delete()
+            self.stdout.write(f'Removed {deleted} benchmark log rows')
@@ -1,94 +1,230 @@
 """
 High-performance logging middleware with async support
-Uses background threads for non-blocking log writes
+Uses a background thread and a bounded in-memory buffer for non-blocking log writes
 """
 
+import os
+import json
 import time
+import atexit
+import itertools
 import threading
 import logging
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.core.cache import cache
-from queue import Queue
 import traceback
 
 logger = logging.getLogger(__name__)
 
 
+class _Counter:
+    """Thread-safe monotonic counter for the collector's statistics"""
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self._count += 1
+
+    @property
+    def value(self):
+        return self._count
+
+
 class AsyncLogCollector:
     """
-    Asynchronous log collector using thread-safe queue
-    Processes logs in background thread
+    Asynchronous log collector with a bounded buffer and a blocking consumer
+
+    Request threads append to a deque (atomic in CPython, no lock taken),
+    bump a counter under a short lock, and wake the consumer once a batch is ready. The consumer waits on an event
+    instead of sleep-polling, writes adaptively sized batches with
+    bulk_create, and drains whatever is left when the process exits.
+
+    When the buffer is full the configured overflow policy applies:
+        drop_oldest - evict the oldest buffered entry to make room
+        sample      - admit only every Nth overflowing entry
+        spill       - append the entry to a local JSONL file, replayed once
+                      the buffer is idle again
     """
     _instance = None
-    
+
+    OVERFLOW_DROP_OLDEST = 'drop_oldest'
+    OVERFLOW_SAMPLE = 'sample'
+    OVERFLOW_SPILL = 'spill'
+    OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_SAMPLE, OVERFLOW_SPILL)
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.queue = Queue(maxsize=10000)
+            cls._instance.buffer = deque()
             cls._instance.running = False
             cls._instance.thread = None
+            cls._instance._wakeup = threading.Event()
+            cls._instance._flush_lock = threading.Lock()
+            cls._instance._spill_lock = threading.Lock()
+            cls._instance._atexit_registered = False
+            cls._instance.configure()
+            cls._instance.reset_stats()
         return cls._instance
-    
+
+    def configure(self, **options):
+        """
+        (Re)load collector settings
+
+        Keyword arguments override the matching LOG_COLLECTOR_* setting,
+        e.g. configure(overflow_policy='spill', max_queue_size=500)
+        """
+        def option(name, default):
+            return options.get(name, getattr(settings, f'LOG_COLLECTOR_{name.upper()}', default))
+
+        self.max_queue_size = int(option('max_queue_size', 10000))
+        self.flush_interval = float(option('flush_interval', 5.0))
+        self.min_batch_size = int(option('min_batch_size', 50))
+        self.max_batch_size = int(option('max_batch_size', 2000))
+        self.target_flush_seconds = float(option('target_flush_seconds', 0.25))
+        self.sample_rate = max(1, int(option('sample_rate', 10)))
+
+        policy = option('overflow_policy', self.OVERFLOW_DROP_OLDEST)
+        if policy not in self.OVERFLOW_POLICIES:
+            logger.warning(f"unknown log overflow policy '{policy}', using drop_oldest")
+            policy = self.OVERFLOW_DROP_OLDEST
+        self.overflow_policy = policy
+
+        spill_path = option('spill_path', None)
+        if spill_path is None:
+            logs_dir = getattr(settings, 'LOGS_DIR', None) or '/tmp'
+            spill_path = os.path.join(str(logs_dir), 'log_collector_spill.jsonl')
+        self.spill_path = str(spill_path)
+
+        self.batch_size = min(max(self.min_batch_size, 100), self.max_batch_size)
+
+    def reset_stats(self):
+        """Reset collector counters"""
+        self._enqueued = _Counter()
+        self._dropped = _Counter()
+        self._spilled = _Counter()
+        self._overflow_seq = itertools.count()
+        # Consumer-side counters are only touched by the flushing thread
+        self._written = 0
+        self._failed = 0
+        self._flushes = 0
+        self._flush_seconds_total = 0.0
+        self._flush_seconds_max = 0.0
+        self._flush_seconds_last = 0.0
+
     def start(self):
         """Start the background processing thread"""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._process_queue, daemon=True)
+            self.thread = threading.Thread(
+                target=self._process_queue, name='unibos-log-collector', daemon=True
+            )
             self.thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
             logger.info("async log collector started")
-    
-    def stop(self):
-        """Stop the background thread"""
-        self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
-    
+
+    def stop(self, timeout=10):
+        """Stop the background thread, draining buffered logs first"""
+        if self.running:
+            self.running = False
+            self._wakeup.set()
+            if self.thread:
+                self.thread.join(timeout=timeout)
+        # Thread gone (or never started): drain in the caller
+        if self.buffer and not (self.thread and self.thread.is_alive()):
+            self.flush()
+
     def add_log(self, log_type, log_data):
-        """Add log to queue (non-blocking)"""
+        """Add log to buffer (non-blocking, never waits on the database)"""
         try:
-            if not self.queue.full():
-                self.queue.put((log_type, log_data), block=False)
-            else:
-                # Queue full, log to file as fallback
-                logger.warning("log queue full, dropping log entry")
+            if len(self.buffer) >= self.max_queue_size and not self._handle_overflow(log_type, log_data):
+                return
+
+            self.buffer.append((log_type, log_data))
+            self._enqueued.increment()
+
+            if len(self.buffer) >= self.batch_size and not self._wakeup.is_set():
+                self._wakeup.set()
         except Exception as e:
             logger.error(f"error adding log to queue: {e}")
-    
+
+    def _handle_overflow(self, log_type, log_data):
+        """
+        Apply the overflow policy to an entry arriving at a full buffer
+
+        Returns True if the entry should still be appended
+        """
+        if self.overflow_policy == self.OVERFLOW_SPILL:
+            self._spill([(log_type, log_data)])
+            return False
+
+        if self.overflow_policy == self.OVERFLOW_SAMPLE and next(self._overflow_seq) % self.sample_rate:
+            self._dropped.increment()
+            return False
+
+        # drop_oldest, or a sampled entry that earned a slot
+        try:
+            self.buffer.popleft()
+            self._dropped.increment()
+        except IndexError:
+            pass
+        return True
+
     def _process_queue(self):
-        """Background thread to process log queue"""
-        from .models import SystemLog, ActivityLog, log_buffer
-        
-        batch = []
-        last_flush = time.time()
-        
+        """Background thread to process the log buffer"""
         while self.running:
             try:
-                # Collect logs for batch insert
-                while not self.queue.empty() and len(batch) < 100:
-                    log_type, log_data = self.queue.get(timeout=0.1)
-                    batch.append((log_type, log_data))
-                
-                # Flush if batch is full or 5 seconds passed
-                if batch and (len(batch) >= 100 or time.time() - last_flush > 5):
-                    self._flush_batch(batch)
-                    batch.clear()
-                    last_flush = time.time()
-                
-                # Small sleep to prevent CPU spinning
-                if self.queue.empty():
-                    time.sleep(0.1)
-                    
+                # Block until a batch is ready or the flush interval elapses
+                self._wakeup.wait(timeout=self.flush_interval)
+                self._wakeup.clear()
+                # Drop connections past CONN_MAX_AGE before touching the database
+                close_old_connections()
+                self.flush()
+
+                if not self.buffer:
+                    self._replay_spill()
             except Exception as e:
                 logger.error(f"error processing log queue: {e}")
                 time.sleep(1)
-    
+
+        # Drain on shutdown
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"error draining log queue: {e}")
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """Write everything currently buffered, one adaptive batch at a time"""
+        written = 0
+        with self._flush_lock:
+            while self.buffer:
+                batch = []
+                while self.buffer and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.buffer.popleft())
+                    except IndexError:
+                        break
+                if batch:
+                    written += self._flush_batch(batch)
+        return written
+
     def _flush_batch(self, batch):
         """Flush batch of logs to database"""
         from .models import SystemLog, ActivityLog
-        
+
         system_logs = []
         activity_logs = []
-        
+
         for log_type, log_data in batch:
             try:
                 if log_type == 'system':
@@ -96,9 +232,11 @@ class AsyncLogCollector:
                 elif log_type == 'activity':
                     activity_logs.append(ActivityLog(**log_data))
             except Exception as e:
+                self._failed += 1
                 logger.error(f"error creating log object: {e}")
-        
+
         # Bulk insert
+        started = time.perf_counter()
         try:
             if system_logs:
                 SystemLog.objects.bulk_create(system_logs, ignore_conflicts=True)
@@ -106,6 +244,104 @@ class AsyncLogCollector:
                 ActivityLog.objects.bulk_create(activity_logs, ignore_conflicts=True)
         except Exception as e:
             logger.error(f"error bulk inserting logs: {e}")
+            if self.overflow_policy == self.OVERFLOW_SPILL:
+                self._spill(batch)
+            else:
+                self._failed += len(system_logs) + len(activity_logs)
+            return 0
+
+        elapsed = time.perf_counter() - started
+        written = len(system_logs) + len(activity_logs)
+        self._written += written
+        self._flushes += 1
+        self._flush_seconds_last = elapsed
+        self._flush_seconds_total += elapsed
+        self._flush_seconds_max = max(self._flush_seconds_max, elapsed)
+        self._adapt_batch_size(len(batch), elapsed)
+        return written
+
+    def _adapt_batch_size(self, batch_len, elapsed):
+        """Grow batches while the database keeps up, shrink them when it doesn't"""
+        if elapsed > self.target_flush_seconds:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif batch_len >= self.batch_size and elapsed < self.target_flush_seconds / 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def _spill(self, entries):
+        """Append entries to the local spill file"""
+        lines = []
+        for log_type, log_data in entries:
+            data = dict(log_data)
+            user = data.pop('user', None)
+            if user is not None:
+                data['user_id'] = str(user.pk)
+            lines.append(json.dumps({'type': log_type, 'data': data}, cls=DjangoJSONEncoder, default=str))
+
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(self.spill_path) or '.', exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+            for _ in lines:
+                self._spilled.increment()
+        except OSError as e:
+            logger.error(f"error spilling logs to {self.spill_path}: {e}")
+            for _ in lines:
+                self._dropped.increment()
+
+    def _replay_spill(self):
+        """Load spilled entries back into the buffer once it has room"""
+        if not os.path.exists(self.spill_path):
+            return 0
+
+        replay_path = f"{self.spill_path}.replay"
+        with self._spill_lock:
+            try:
+                if os.path.getsize(self.spill_path) == 0:
+                    return 0
+                os.replace(self.spill_path, replay_path)
+            except OSError:
+                return 0
+
+        replayed = 0
+        with open(replay_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.buffer.append((entry['type'], entry['data']))
+                replayed += 1
+                if len(self.buffer) >= self.batch_size:
+                    self.flush()
+        os.remove(replay_path)
+        self.flush()
+
+        if replayed:
+            logger.info(f"replayed {replayed} spilled log entries")
+        return replayed
+
+    def stats(self):
+        """Collector counters for monitoring"""
+        flushes = self._flushes
+        return {
+            'running': self.running,
+            'overflow_policy': self.overflow_policy,
+            'queue_depth': len(self.buffer),
+            'max_queue_size': self.max_queue_size,
+            'batch_size': self.batch_size,
+            'enqueued': self._enqueued.value,
+            'written': self._written,
+            'dropped': self._dropped.value,
+            'spilled': self._spilled.value,
+            'failed': self._failed,
+            'flushes': flushes,
+            'flush_latency_ms': {
+                'last': round(self._flush_seconds_last * 1000, 2),
+                'avg': round(self._flush_seconds_total / flushes * 1000, 2) if flushes else 0.0,
+                'max': round(self._flush_seconds_max * 1000, 2),
+            },
+        }
 
 
 # Global collector instance
@@ -0,0 +1,105 @@
+"""
+Tests for the async log collector
+"""
+
+import os
+import tempfile
+from django.test import TestCase
+
+from .middleware import log_collector
+from .models import SystemLog, LogLevel, LogCategory
+
+
+def make_log(n):
+    return {
+        'level': LogLevel.INFO,
+        'category': LogCategory.SYSTEM,
+        'message': f'collector test {n}',
+        'request_path': '/collector-test/',
+    }
+
+
+class AsyncLogCollectorTests(TestCase):
+    """Test buffering, overflow policies and draining"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.tmpdir.name, 'spill.jsonl')
+        log_collector.buffer.clear()
+        log_collector.configure(max_queue_size=10, spill_path=self.spill_path)
+        log_collector.reset_stats()
+
+    def tearDown(self):
+        log_collector.buffer.clear()
+        log_collector.configure()
+        log_collector.reset_stats()
+        self.tmpdir.cleanup()
+
+    def test_flush_writes_all_buffered_logs(self):
+        """Test flush bulk inserts everything in the buffer"""
+        for n in range(8):
+            log_collector.add_log('system', make_log(n))
+
+        self.assertEqual(log_collector.flush(), 8)
+        self.assertEqual(SystemLog.objects.filter(request_path='/collector-test/').count(), 8)
+
+        stats = log_collector.stats()
+        self.assertEqual(stats['enqueued'], 8)
+        self.assertEqual(stats['written'], 8)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['flushes'], 1)
+
+    def test_drop_oldest_keeps_newest_entries(self):
+        """Test drop_oldest evicts the head of the buffer"""
+        log_collector.configure(max_queue_size=10, overflow_policy='drop_oldest')
+        for n in range(15):
+            log_collector.add_log('system', make_log(n))
+
+        self.assertEqual(len(log_collector.buffer), 10)
+        self.assertEqual(log_collector.buffer[0][1]['message'], 'collector test 5')
+        self.assertEqual(log_collector.stats()['dropped'], 5)
+
+    def test_sample_admits_every_nth_overflow(self):
+        """Test sample policy keeps one in sample_rate overflowing entries"""
+        log_collector.configure(max_queue_size=10, overflow_policy='sample', sample_rate=5)
+        for n in range(30):
+            log_collector.add_log('system', make_log(n))
+
+        self.assertEqual(len(log_collector.buffer), 10)
+        # 20 overflowing entries: 4 admitted (each evicting one), 16 rejected
+        self.assertEqual(log_collector.stats()['dropped'], 20)
+        self.assertEqual(log_collector.stats()['enqueued'], 14)
+
+    def test_spill_and_replay(self):
+        """Test spilled entries reach the database once the buffer drains"""
+        log_collector.configure(max_queue_size=10, overflow_policy='spill', spill_path=self.spill_path)
+        for n in range(25):
+            log_collector.add_log('system', make_log(n))
+
+        self.assertEqual(len(log_collector.buffer), 10)
+        self.assertEqual(log_collector.stats()['spilled'], 15)
+        self.assertTrue(os.path.exists(self.spill_path))
+
+        log_collector.flush()
+        self.assertEqual(log_collector._replay_spill(), 15)
+        self.assertFalse(os.path.exists(self.spill_path))
+        self.assertEqual(SystemLog.objects.filter(request_path='/collector-test/').count(), 25)
+
+    def test_stop_drains_buffer(self):
+        """Test stop() writes pending logs even without a running thread"""
+        for n in range(5):
+            log_collector.add_log('system', make_log(n))
+
+        log_collector.stop()
+        self.assertEqual(SystemLog.objects.filter(request_path='/collector-test/').count(), 5)
+
+    def test_batch_size_adapts_to_flush_latency(self):
+        """Test batches grow when fast and shrink when slow"""
+        log_collector.configure(min_batch_size=10, max_batch_size=400, target_flush_seconds=0.2)
+        log_collector.batch_size = 100
+
+        log_collector._adapt_batch_size(100, 0.01)
+        self.assertEqual(log_collector.batch_size, 200)
+
+        log_collector._adapt_batch_size(200, 0.5)
+        self.assertEqual(log_collector.batch_size, 100)
@@ -19,5 +19,6 @@ urlpatterns = [
     
     # API endpoints
     path('api/detail/<int:log_id>/', views.log_detail_api, name='log_detail'),
+    path('api/collector-stats/', views.collector_stats_api, name='collector_stats'),
     path('export/', views.export_logs, name='export_logs'),
 ]
\ No newline at end of file
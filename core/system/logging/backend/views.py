@@ -284,6 +284,15 @@ def log_detail_api(request, log_id):
         return JsonResponse({'success': False, 'error': 'Log not found'}, status=404)
 
 
+@login_required
+@user_passes_test(is_admin)
+def collector_stats_api(request):
+    """API endpoint exposing the async log collector counters"""
+    from .middleware import log_collector
+
+    return JsonResponse({'success': True, 'data': log_collector.stats()})
+
+
 @login_required
 @user_passes_test(is_admin)
 def export_logs(request):
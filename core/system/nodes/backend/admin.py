@@ -4,7 +4,7 @@ Django Admin Configuration for Node Registry
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Node, NodeCapability, NodeMetric, NodeEvent
+from .models import Node, NodeCapability, NodeMetric, NodeMetricRollup, NodeEvent
 
 
 class NodeCapabilityInline(admin.StackedInline):
@@ -111,3 +111,20 @@ class NodeMetricAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(NodeMetricRollup)
+class NodeMetricRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'node', 'resolution', 'bucket_start', 'sample_count',
+        'cpu_percent_avg', 'memory_percent_avg', 'disk_percent_max',
+    ]
+    list_filter = ['resolution', 'node']
+    search_fields = ['node__hostname']
+    ordering = ['-bucket_start']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
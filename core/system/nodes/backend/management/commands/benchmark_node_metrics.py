@@ -0,0 +1,191 @@
+"""
+Benchmark the node metrics storage tier
+Simulates N nodes sending heartbeats every few seconds for D days, running the
+rollup/prune schedule day by day, then measures chart and summary latency per
+range against the tiered store (and optionally a raw-table scan)
+
+Usage: python manage.py benchmark_node_metrics --nodes 100 --days 30 --interval 30
+"""
+
+import time
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.system.nodes.backend.models import Node, NodeMetric, NodeMetricRollup, NodeStatus
+from core.system.nodes.backend import metrics_store
+
+BENCH_PREFIX = 'bench-metrics-'
+
+INSERT_COLUMNS = [
+    'id', 'node_id', 'recorded_at', 'cpu_percent', 'memory_percent', 'memory_used_mb',
+    'disk_percent', 'disk_used_gb', 'network_bytes_sent', 'network_bytes_recv',
+    'requests_per_minute', 'avg_response_time_ms',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark node metrics rollup, retention and chart queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=100, help='Simulated nodes (default: 100)')
+        parser.add_argument('--days', type=int, default=30, help='Days of history (default: 30)')
+        parser.add_argument('--interval', type=int, default=30, help='Heartbeat interval in seconds (default: 30)')
+        parser.add_argument(
+            '--compare-raw',
+            action='store_true',
+            help='Keep every raw row until the end and also time raw-table scans',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep benchmark nodes and metrics')
+
+    def handle(self, *args, **options):
+        node_count = options['nodes']
+        days = options['days']
+        interval = options['interval']
+        compare_raw = options['compare_raw']
+
+        now = timezone.now()
+        start = now - timedelta(days=days)
+        per_day = 86400 // interval
+
+        self.stdout.write(
+            f'Simulating {node_count} nodes x {days} days x {per_day} heartbeats/day '
+            f'({node_count * days * per_day:,} raw samples)'
+        )
+
+        nodes = Node.objects.bulk_create([
+            Node(hostname=f'{BENCH_PREFIX}{i:03d}', platform='linux', status=NodeStatus.ONLINE)
+            for i in range(node_count)
+        ])
+        node_ids = [node.id for node in nodes]
+
+        try:
+            timings = {'insert': 0.0, 'rollup': 0.0, 'prune': 0.0}
+            rng = random.Random(42)
+
+            day_start = start
+            while day_start < now:
+                day_end = min(now, day_start + timedelta(days=1))
+
+                started = time.perf_counter()
+                self._insert_day(node_ids, day_start, day_end, interval, rng)
+                timings['insert'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                metrics_store.rollup_all(now=day_end)
+                timings['rollup'] += time.perf_counter() - started
+
+                if not compare_raw:
+                    started = time.perf_counter()
+                    metrics_store.prune(now=day_end)
+                    timings['prune'] += time.perf_counter() - started
+
+                self.stdout.write(f'  {day_start:%Y-%m-%d} done', ending='\r')
+                self.stdout.flush()
+                day_start = day_end
+
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(
+                f"Ingest {timings['insert']:.1f}s, rollup {timings['rollup']:.1f}s, prune {timings['prune']:.1f}s"
+            ))
+
+            self._report_sizes(node_ids)
+            self._report_queries(nodes[0], now, compare_raw)
+
+            if compare_raw:
+                started = time.perf_counter()
+                deleted = metrics_store.prune(now=now)
+                self.stdout.write(f'Final prune: {deleted} in {time.perf_counter() - started:.1f}s')
+                self._report_sizes(node_ids)
+                self._report_queries(nodes[0], now, compare_raw=False)
+
+        finally:
+            if not options['keep']:
+                Node.objects.filter(id__in=node_ids).delete()
+                self.stdout.write('Removed benchmark nodes and metrics')
+
+    def _insert_day(self, node_ids, day_start, day_end, interval, rng):
+        """Bulk insert one day of raw heartbeats (bypasses auto_now_add)"""
+        rows = []
+        steps = int((day_end - day_start).total_seconds() // interval)
+        for node_index, node_id in enumerate(node_ids):
+            base_cpu = 10 + node_index % 50
+            for step in range(steps):
+                recorded_at = day_start + timedelta(seconds=step * interval + rng.random())
+                rows.append((
+                    uuid.uuid4(), node_id, recorded_at,
+                    min(100.0, base_cpu + rng.random() * 30),
+                    40 + rng.random() * 20,
+                    2048 + rng.randint(0, 1024),
+                    55 + rng.random(),
+                    120 + rng.random(),
+                    0, 0,
+                    rng.randint(0, 600),
+                    20 + rng.random() * 80,
+                ))
+            if len(rows) >= 50000:
+                self._write_rows(rows)
+                rows = []
+        if rows:
+            self._write_rows(rows)
+
+    def _write_rows(self, rows):
+        table = NodeMetric._meta.db_table
+        columns = ', '.join(INSERT_COLUMNS)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                from psycopg2.extras import execute_values
+                execute_values(
+                    cursor.cursor, f'INSERT INTO {table} ({columns}) VALUES %s', rows, page_size=5000
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(INSERT_COLUMNS))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+    def _report_sizes(self, node_ids):
+        raw = NodeMetric.objects.filter(node_id__in=node_ids).count()
+        self.stdout.write(f'Rows: raw={raw:,}')
+        for resolution in metrics_store.TIERS:
+            count = NodeMetricRollup.objects.filter(node_id__in=node_ids, resolution=resolution).count()
+            self.stdout.write(f'      {resolution}={count:,}')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (NodeMetric, NodeMetricRollup):
+                    cursor.execute('SELECT pg_size_pretty(pg_total_relation_size(%s))', [model._meta.db_table])
+                    self.stdout.write(f'Table {model._meta.db_table}: {cursor.fetchone()[0]}')
+
+    def _report_queries(self, node, now, compare_raw):
+        ranges = [('1h', timedelta(hours=1)), ('24h', timedelta(days=1)),
+                  ('7d', timedelta(days=7)), ('30d', timedelta(days=30))]
+
+        self.stdout.write('Chart/summary latency (median of 5):')
+        for label, span in ranges:
+            start = now - span
+            resolution, points, chart_ms = self._time(
+                lambda: metrics_store.get_series(node, start, now)
+            )
+            _, _, summary_ms = self._time(lambda: metrics_store.get_summary(node, start, now))
+            line = (
+                f'  {label:>4}: {resolution:>3} {len(points):>5} points  '
+                f'chart {chart_ms:7.2f}ms  summary {summary_ms:7.2f}ms'
+            )
+            if compare_raw:
+                _, raw_points, raw_ms = self._time(
+                    lambda: metrics_store.get_series(node, start, now, resolution=metrics_store.RAW)
+                )
+                line += f'  | raw scan {len(raw_points):>6} points {raw_ms:8.2f}ms'
+            self.stdout.write(line)
+
+    def _time(self, func, repeat=5):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            resolution, data = func()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return resolution, data, samples[len(samples) // 2]
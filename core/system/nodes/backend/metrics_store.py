@@ -0,0 +1,387 @@
+"""
+Node Metrics Storage Tier
+
+Downsamples raw heartbeat metrics into 1-minute, 1-hour and 1-day
+min/avg/max buckets, prunes each tier on its own retention schedule and
+answers chart/summary queries from the finest tier that covers the requested
+range within a bounded number of points.
+
+    raw NodeMetric --> 1m rollup --> 1h rollup --> 1d rollup
+
+Rollups only ever cover completed buckets and are upserted, so running the
+rollup task repeatedly (or after a crash) is safe.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, FloatField, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import NodeMetric, NodeMetricRollup, MetricResolution
+
+logger = logging.getLogger(__name__)
+
+RAW = 'raw'
+
+# Metrics carried from NodeMetric into the rollup tiers
+ROLLUP_FIELDS = [
+    'cpu_percent',
+    'memory_percent',
+    'memory_used_mb',
+    'disk_percent',
+    'disk_used_gb',
+    'requests_per_minute',
+    'avg_response_time_ms',
+]
+
+# resolution -> (bucket seconds, Trunc kind, source resolution)
+TIERS = {
+    MetricResolution.MINUTE: (60, 'minute', RAW),
+    MetricResolution.HOUR: (3600, 'hour', MetricResolution.MINUTE),
+    MetricResolution.DAY: (86400, 'day', MetricResolution.HOUR),
+}
+
+# Finest to coarsest; used for automatic resolution selection
+RESOLUTION_ORDER = [RAW, MetricResolution.MINUTE, MetricResolution.HOUR, MetricResolution.DAY]
+
+# Span of source buckets aggregated per INSERT ... SELECT
+CHUNKS = {
+    MetricResolution.MINUTE: timedelta(hours=6),
+    MetricResolution.HOUR: timedelta(days=7),
+    MetricResolution.DAY: timedelta(days=90),
+}
+
+
+def get_retention():
+    """Retention per tier (None = keep forever)"""
+    day_retention = getattr(settings, 'NODE_METRICS_DAY_RETENTION_DAYS', None)
+    return {
+        RAW: timedelta(hours=getattr(settings, 'NODE_METRICS_RAW_RETENTION_HOURS', 48)),
+        MetricResolution.MINUTE: timedelta(days=getattr(settings, 'NODE_METRICS_MINUTE_RETENTION_DAYS', 7)),
+        MetricResolution.HOUR: timedelta(days=getattr(settings, 'NODE_METRICS_HOUR_RETENTION_DAYS', 90)),
+        MetricResolution.DAY: timedelta(days=day_retention) if day_retention else None,
+    }
+
+
+def get_step_seconds(resolution):
+    if resolution == RAW:
+        return getattr(settings, 'NODE_HEARTBEAT_INTERVAL_SECONDS', 30)
+    return TIERS[resolution][0]
+
+
+def _floor(moment, seconds):
+    """Floor an aware datetime to a bucket boundary (UTC epoch aligned)"""
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def _rollup_fields():
+    return [f'{field}_{agg}' for field in ROLLUP_FIELDS for agg in ('min', 'avg', 'max')]
+
+
+def _watermark(resolution):
+    """End of the last rolled-up bucket for a resolution, or None"""
+    last = (
+        NodeMetricRollup.objects.filter(resolution=resolution)
+        .order_by('-bucket_start')
+        .values_list('bucket_start', flat=True)
+        .first()
+    )
+    if last is None:
+        return None
+    return last + timedelta(seconds=TIERS[resolution][0])
+
+
+def _source_start(source):
+    """Earliest timestamp available in a source tier"""
+    if source == RAW:
+        return NodeMetric.objects.order_by('recorded_at').values_list('recorded_at', flat=True).first()
+    return (
+        NodeMetricRollup.objects.filter(resolution=source)
+        .order_by('bucket_start')
+        .values_list('bucket_start', flat=True)
+        .first()
+    )
+
+
+def _source_end(source, now):
+    """Timestamp up to which a source tier is complete"""
+    if source == RAW:
+        return now
+    return _watermark(source)
+
+
+def _raw_aggregates():
+    """Aggregates that fold raw samples into one bucket"""
+    aggregates = {'agg_sample_count': Count('id')}
+    for field in ROLLUP_FIELDS:
+        aggregates[f'agg_{field}_min'] = Min(field)
+        aggregates[f'agg_{field}_wsum'] = Sum(field, output_field=FloatField())
+        aggregates[f'agg_{field}_max'] = Max(field)
+    return aggregates
+
+
+def _rollup_aggregates():
+    """
+    Aggregates that merge finer rollup buckets into one coarser bucket
+
+    Annotation names are prefixed so they don't shadow the model fields
+    they are computed from.
+    """
+    aggregates = {'agg_sample_count': Sum('sample_count')}
+    for field in ROLLUP_FIELDS:
+        aggregates[f'agg_{field}_min'] = Min(f'{field}_min')
+        aggregates[f'agg_{field}_wsum'] = Sum(F(f'{field}_avg') * F('sample_count'), output_field=FloatField())
+        aggregates[f'agg_{field}_max'] = Max(f'{field}_max')
+    return aggregates
+
+
+def _merge_rollup_row(row):
+    """Turn an aggregate result into rollup column values"""
+    merged = {'sample_count': row.pop('agg_sample_count') or 0}
+    count = merged['sample_count']
+    for field in ROLLUP_FIELDS:
+        wsum = row.pop(f'agg_{field}_wsum') or 0
+        merged[f'{field}_min'] = row.pop(f'agg_{field}_min')
+        merged[f'{field}_avg'] = wsum / count if count else None
+        merged[f'{field}_max'] = row.pop(f'agg_{field}_max')
+    merged.update(row)
+    return merged
+
+
+def _bucket_queryset(source, start, end, kind):
+    """GROUP BY (node, bucket) over one chunk of the source tier"""
+    if source == RAW:
+        queryset = NodeMetric.objects.filter(recorded_at__gte=start, recorded_at__lt=end)
+        time_field, aggregates = 'recorded_at', _raw_aggregates()
+    else:
+        queryset = NodeMetricRollup.objects.filter(
+            resolution=source, bucket_start__gte=start, bucket_start__lt=end
+        )
+        time_field, aggregates = 'bucket_start', _rollup_aggregates()
+
+    return (
+        queryset.annotate(bucket=Trunc(time_field, kind, tzinfo=dt_timezone.utc))
+        .order_by()
+        .values('node_id', 'bucket')
+        .annotate(**aggregates)
+    )
+
+
+def _upsert_buckets(resolution, queryset):
+    """
+    INSERT ... SELECT the grouped buckets straight into the rollup table
+
+    The aggregation never leaves the database; ON CONFLICT makes reruns
+    overwrite buckets instead of duplicating them.
+    """
+    qn = connection.ops.quote_name
+    select_sql, params = queryset.query.sql_with_params()
+
+    columns = ['node_id', 'resolution', 'bucket_start', 'sample_count']
+    expressions = ['sub.node_id', '%s', 'sub.bucket', 'sub.agg_sample_count']
+    for field in ROLLUP_FIELDS:
+        columns += [f'{field}_min', f'{field}_avg', f'{field}_max']
+        expressions += [
+            f'sub.agg_{field}_min',
+            f'sub.agg_{field}_wsum * 1.0 / sub.agg_sample_count',
+            f'sub.agg_{field}_max',
+        ]
+    updates = ', '.join(f'{qn(col)} = EXCLUDED.{qn(col)}' for col in columns[3:])
+
+    # "WHERE true" keeps SQLite from parsing ON CONFLICT as a join clause
+    sql = (
+        f'INSERT INTO {qn(NodeMetricRollup._meta.db_table)} ({", ".join(qn(c) for c in columns)}) '
+        f'SELECT {", ".join(expressions)} FROM ({select_sql}) sub WHERE true '
+        f'ON CONFLICT (node_id, resolution, bucket_start) DO UPDATE SET {updates}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (str(resolution), *params))
+        return max(cursor.rowcount, 0)
+
+
+def rollup(resolution, now=None, source_complete=None):
+    """
+    Roll completed buckets of the source tier up into `resolution`
+
+    `source_complete` is the point up to which the source tier is known to
+    be complete; rollup_all() passes it after rolling the finer tier. On its
+    own, a tier trusts the source tier's last written bucket.
+
+    Returns the number of buckets written.
+    """
+    now = now or timezone.now()
+    seconds, kind, source = TIERS[resolution]
+
+    start = _watermark(resolution) or _source_start(source)
+    source_end = source_complete or _source_end(source, now)
+    if start is None or source_end is None:
+        return 0
+
+    start = _floor(start, seconds)
+    end = _floor(min(source_end, now), seconds)
+    if end <= start:
+        return 0
+
+    written = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(end, chunk_start + CHUNKS[resolution])
+        written += _upsert_buckets(resolution, _bucket_queryset(source, chunk_start, chunk_end, kind))
+        chunk_start = chunk_end
+
+    if written:
+        logger.debug(f"Rolled up {written} {resolution} node metric buckets")
+    return written
+
+
+def rollup_all(now=None):
+    """Run every rollup tier in order (finest first)"""
+    now = now or timezone.now()
+    written = {}
+    source_complete = now
+    for resolution, (seconds, _, _) in TIERS.items():
+        written[str(resolution)] = rollup(resolution, now=now, source_complete=source_complete)
+        # Everything before the current bucket of this tier is now final
+        source_complete = _floor(now, seconds)
+    return written
+
+
+def prune(now=None):
+    """
+    Delete data past each tier's retention
+
+    A tier is never pruned past what the next tier has already absorbed,
+    so a stalled rollup cannot lose data.
+    """
+    now = now or timezone.now()
+    retention = get_retention()
+    deleted = {}
+
+    next_tier = {
+        RAW: MetricResolution.MINUTE,
+        MetricResolution.MINUTE: MetricResolution.HOUR,
+        MetricResolution.HOUR: MetricResolution.DAY,
+        MetricResolution.DAY: None,
+    }
+
+    for tier in RESOLUTION_ORDER:
+        keep = retention[tier]
+        if keep is None:
+            deleted[str(tier)] = 0
+            continue
+
+        cutoff = now - keep
+        absorbed = _watermark(next_tier[tier]) if next_tier[tier] else cutoff
+        if absorbed is None:
+            deleted[str(tier)] = 0
+            continue
+        cutoff = min(cutoff, absorbed)
+
+        if tier == RAW:
+            count, _ = NodeMetric.objects.filter(recorded_at__lt=cutoff).delete()
+        else:
+            count, _ = NodeMetricRollup.objects.filter(resolution=tier, bucket_start__lt=cutoff).delete()
+        deleted[str(tier)] = count
+
+    return deleted
+
+
+def choose_resolution(start, end, max_points=None, now=None):
+    """
+    Pick the finest tier that still holds data for `start` and yields at
+    most `max_points` buckets over the range
+    """
+    now = now or timezone.now()
+    max_points = max_points or getattr(settings, 'NODE_METRICS_MAX_CHART_POINTS', 720)
+    retention = get_retention()
+    span = max(1, (end - start).total_seconds())
+
+    for resolution in RESOLUTION_ORDER:
+        keep = retention[resolution]
+        if keep is not None and start < now - keep:
+            continue
+        if span / get_step_seconds(resolution) <= max_points:
+            return resolution
+    return MetricResolution.DAY
+
+
+def get_series(node, start, end, resolution='auto', max_points=None):
+    """
+    Chart series for one node
+
+    Every point has bucket_start, sample_count and <metric>_min/_avg/_max,
+    regardless of the tier it came from.
+    """
+    if resolution == 'auto':
+        resolution = choose_resolution(start, end, max_points=max_points)
+
+    if resolution == RAW:
+        values = {'bucket_start': F('recorded_at')}
+        for field in ROLLUP_FIELDS:
+            for agg in ('min', 'avg', 'max'):
+                values[f'{field}_{agg}'] = F(field)
+        rows = (
+            NodeMetric.objects.filter(node=node, recorded_at__gte=start, recorded_at__lt=end)
+            .order_by('recorded_at')
+            .values(**values)
+        )
+        points = [{**row, 'sample_count': 1} for row in rows]
+    else:
+        points = list(
+            NodeMetricRollup.objects.filter(
+                node=node, resolution=resolution, bucket_start__gte=start, bucket_start__lt=end
+            )
+            .order_by('bucket_start')
+            .values('bucket_start', 'sample_count', *_rollup_fields())
+        )
+
+    return resolution, points
+
+
+def get_summary(node, start, end, resolution='auto'):
+    """min/avg/max of every metric over a range, computed from one tier"""
+    if resolution == 'auto':
+        resolution = choose_resolution(start, end)
+
+    if resolution == RAW:
+        queryset = NodeMetric.objects.filter(node=node, recorded_at__gte=start, recorded_at__lt=end)
+        aggregates = _raw_aggregates()
+    else:
+        queryset = NodeMetricRollup.objects.filter(
+            node=node, resolution=resolution, bucket_start__gte=start, bucket_start__lt=end
+        )
+        aggregates = _rollup_aggregates()
+
+    summary = _merge_rollup_row(queryset.aggregate(**aggregates))
+    summary['sample_count'] = summary['sample_count'] or 0
+    return resolution, summary
+
+
+def parse_range(params, default='24h'):
+    """
+    Turn query params into (start, end)
+
+    Accepts ?range=15m|6h|7d|30d, or explicit ISO ?start=&end=.
+    """
+    from django.utils.dateparse import parse_datetime
+
+    end = timezone.now()
+    if params.get('end'):
+        end = parse_datetime(params['end']) or end
+    if params.get('start'):
+        start = parse_datetime(params['start'])
+        if start is not None:
+            return start, end
+
+    value = params.get('range', default)
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+    try:
+        amount, unit = int(value[:-1]), units[value[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid range '{value}'")
+    return end - timedelta(**{unit: amount}), end
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resolution', models.CharField(choices=[('1m', '1 Minute'), ('1h', '1 Hour'), ('1d', '1 Day')], max_length=2)),
+                ('bucket_start', models.DateTimeField()),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('cpu_percent_min', models.FloatField(default=0)),
+                ('cpu_percent_avg', models.FloatField(default=0)),
+                ('cpu_percent_max', models.FloatField(default=0)),
+                ('memory_percent_min', models.FloatField(default=0)),
+                ('memory_percent_avg', models.FloatField(default=0)),
+                ('memory_percent_max', models.FloatField(default=0)),
+                ('memory_used_mb_min', models.FloatField(default=0)),
+                ('memory_used_mb_avg', models.FloatField(default=0)),
+                ('memory_used_mb_max', models.FloatField(default=0)),
+                ('disk_percent_min', models.FloatField(default=0)),
+                ('disk_percent_avg', models.FloatField(default=0)),
+                ('disk_percent_max', models.FloatField(default=0)),
+                ('disk_used_gb_min', models.FloatField(default=0)),
+                ('disk_used_gb_avg', models.FloatField(default=0)),
+                ('disk_used_gb_max', models.FloatField(default=0)),
+                ('requests_per_minute_min', models.FloatField(default=0)),
+                ('requests_per_minute_avg', models.FloatField(default=0)),
+                ('requests_per_minute_max', models.FloatField(default=0)),
+                ('avg_response_time_ms_min', models.FloatField(default=0)),
+                ('avg_response_time_ms_avg', models.FloatField(default=0)),
+                ('avg_response_time_ms_max', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Node Metric Rollup',
+                'verbose_name_plural': 'Node Metric Rollups',
+                'db_table': 'node_metric_rollups',
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='nodemetric',
+            index=models.Index(fields=['recorded_at'], name='node_metric_recorde_558d96_idx'),
+        ),
+        migrations.AddField(
+            model_name='nodemetricrollup',
+            name='node',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_rollups', to='nodes.node'),
+        ),
+        migrations.AddIndex(
+            model_name='nodemetricrollup',
+            index=models.Index(fields=['resolution', 'bucket_start'], name='node_metric_resolut_83a112_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='nodemetricrollup',
+            constraint=models.UniqueConstraint(fields=('node', 'resolution', 'bucket_start'), name='unique_node_metric_rollup_bucket'),
+        ),
+    ]
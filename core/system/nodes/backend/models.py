@@ -202,12 +202,86 @@ class NodeMetric(models.Model):
         ordering = ['-recorded_at']
         indexes = [
             models.Index(fields=['node', 'recorded_at']),
+            models.Index(fields=['recorded_at']),  # Rollup and pruning range scans
         ]
 
     def __str__(self):
         return f"{self.node.hostname} @ {self.recorded_at}"
 
 
+class MetricResolution(models.TextChoices):
+    """Downsampled resolutions for node metrics"""
+    MINUTE = '1m', '1 Minute'
+    HOUR = '1h', '1 Hour'
+    DAY = '1d', '1 Day'
+
+
+class NodeMetricRollup(models.Model):
+    """
+    Downsampled node metrics
+
+    One row per node, resolution and bucket holding min/avg/max of each
+    heartbeat metric. Raw NodeMetric rows are rolled up into 1-minute
+    buckets, which are rolled up into hourly and then daily buckets.
+    """
+    id = models.BigAutoField(primary_key=True)
+    node = models.ForeignKey(
+        Node,
+        on_delete=models.CASCADE,
+        related_name='metric_rollups'
+    )
+    resolution = models.CharField(max_length=2, choices=MetricResolution.choices)
+    bucket_start = models.DateTimeField()
+    sample_count = models.PositiveIntegerField(default=0)
+
+    # CPU metrics
+    cpu_percent_min = models.FloatField(default=0)
+    cpu_percent_avg = models.FloatField(default=0)
+    cpu_percent_max = models.FloatField(default=0)
+
+    # Memory metrics
+    memory_percent_min = models.FloatField(default=0)
+    memory_percent_avg = models.FloatField(default=0)
+    memory_percent_max = models.FloatField(default=0)
+    memory_used_mb_min = models.FloatField(default=0)
+    memory_used_mb_avg = models.FloatField(default=0)
+    memory_used_mb_max = models.FloatField(default=0)
+
+    # Disk metrics
+    disk_percent_min = models.FloatField(default=0)
+    disk_percent_avg = models.FloatField(default=0)
+    disk_percent_max = models.FloatField(default=0)
+    disk_used_gb_min = models.FloatField(default=0)
+    disk_used_gb_avg = models.FloatField(default=0)
+    disk_used_gb_max = models.FloatField(default=0)
+
+    # Request metrics
+    requests_per_minute_min = models.FloatField(default=0)
+    requests_per_minute_avg = models.FloatField(default=0)
+    requests_per_minute_max = models.FloatField(default=0)
+    avg_response_time_ms_min = models.FloatField(default=0)
+    avg_response_time_ms_avg = models.FloatField(default=0)
+    avg_response_time_ms_max = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'node_metric_rollups'
+        verbose_name = 'Node Metric Rollup'
+        verbose_name_plural = 'Node Metric Rollups'
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['node', 'resolution', 'bucket_start'],
+                name='unique_node_metric_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.node.hostname} [{self.resolution}] @ {self.bucket_start}"
+
+
 class NodeEvent(models.Model):
     """
     Node events for audit logging
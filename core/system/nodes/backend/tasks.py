@@ -86,30 +86,50 @@ def check_node_heartbeats(self):
         raise self.retry(exc=e)
 
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def rollup_node_metrics(self):
+    """
+    Downsample raw node metrics into 1m/1h/1d buckets.
+
+    Runs every minute via Celery Beat.
+    Only completed buckets are written, so each tier lags by at most one bucket.
+    """
+    from .metrics_store import rollup_all
+
+    try:
+        written = rollup_all()
+
+        return {
+            'status': 'success',
+            'buckets_written': written,
+        }
+
+    except Exception as e:
+        logger.error(f"Error rolling up node metrics: {e}")
+        raise self.retry(exc=e)
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def cleanup_stale_metrics(self):
     """
-    Clean up old node metrics to prevent database bloat.
+    Prune node metrics past each tier's retention to prevent database bloat.
 
-    Runs daily via Celery Beat.
-    Removes metrics older than 7 days by default.
+    Runs hourly via Celery Beat.
+    Raw samples are kept for NODE_METRICS_RAW_RETENTION_HOURS, rollups for
+    NODE_METRICS_{MINUTE,HOUR,DAY}_RETENTION_DAYS. Raw rows are only removed
+    once they have been rolled up.
     """
-    from .models import NodeMetric
+    from .metrics_store import rollup_all, prune
 
     try:
-        retention_days = getattr(settings, 'NODE_METRICS_RETENTION_DAYS', 7)
-        cutoff_date = timezone.now() - timedelta(days=retention_days)
+        rollup_all()
+        deleted = prune()
 
-        deleted_count, _ = NodeMetric.objects.filter(
-            recorded_at__lt=cutoff_date
-        ).delete()
-
-        logger.info(f"Cleaned up {deleted_count} old node metrics (older than {retention_days} days)")
+        logger.info(f"Pruned node metrics: {deleted}")
 
         return {
             'status': 'success',
-            'deleted_metrics': deleted_count,
-            'retention_days': retention_days
+            'deleted': deleted,
         }
 
     except Exception as e:
@@ -0,0 +1,106 @@
+"""
+Tests for the node metrics storage tier
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.test import TestCase, override_settings
+
+from .models import Node, NodeMetric, NodeMetricRollup, MetricResolution
+from . import metrics_store
+
+
+def add_sample(node, recorded_at, cpu):
+    metric = NodeMetric.objects.create(node=node, cpu_percent=cpu, memory_percent=50)
+    # recorded_at is auto_now_add; backdate it explicitly
+    NodeMetric.objects.filter(pk=metric.pk).update(recorded_at=recorded_at)
+
+
+@override_settings(
+    NODE_METRICS_RAW_RETENTION_HOURS=2,
+    NODE_METRICS_MINUTE_RETENTION_DAYS=1,
+    NODE_METRICS_HOUR_RETENTION_DAYS=30,
+    NODE_METRICS_DAY_RETENTION_DAYS=None,
+)
+class MetricsStoreTests(TestCase):
+    """Test rollups, retention and resolution selection"""
+
+    def setUp(self):
+        self.node = Node.objects.create(hostname='metrics-test', platform='linux')
+        self.start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+    def test_minute_and_hour_rollups(self):
+        """Test min/avg/max per bucket and sample-weighted averages upstream"""
+        # Minute 0: two samples, minute 1: one sample
+        add_sample(self.node, self.start + timedelta(seconds=0), 10)
+        add_sample(self.node, self.start + timedelta(seconds=30), 30)
+        add_sample(self.node, self.start + timedelta(seconds=60), 80)
+
+        now = self.start + timedelta(hours=1, minutes=5)
+        written = metrics_store.rollup_all(now=now)
+        self.assertEqual(written['1m'], 2)
+        self.assertEqual(written['1h'], 1)
+
+        minute = NodeMetricRollup.objects.get(
+            node=self.node, resolution=MetricResolution.MINUTE, bucket_start=self.start
+        )
+        self.assertEqual(minute.sample_count, 2)
+        self.assertEqual(minute.cpu_percent_min, 10)
+        self.assertEqual(minute.cpu_percent_avg, 20)
+        self.assertEqual(minute.cpu_percent_max, 30)
+
+        hour = NodeMetricRollup.objects.get(node=self.node, resolution=MetricResolution.HOUR)
+        self.assertEqual(hour.sample_count, 3)
+        self.assertEqual(hour.cpu_percent_min, 10)
+        self.assertEqual(hour.cpu_percent_max, 80)
+        self.assertAlmostEqual(hour.cpu_percent_avg, 40)
+
+    def test_rollup_is_idempotent_and_skips_open_buckets(self):
+        """Test rerunning the rollup writes nothing new and open buckets wait"""
+        add_sample(self.node, self.start, 10)
+        add_sample(self.node, self.start + timedelta(seconds=90), 20)
+
+        now = self.start + timedelta(seconds=100)
+        self.assertEqual(metrics_store.rollup_all(now=now)['1m'], 1)
+        self.assertEqual(metrics_store.rollup_all(now=now)['1m'], 0)
+
+        later = self.start + timedelta(minutes=3)
+        self.assertEqual(metrics_store.rollup_all(now=later)['1m'], 1)
+        self.assertEqual(NodeMetricRollup.objects.filter(resolution=MetricResolution.MINUTE).count(), 2)
+
+    def test_prune_never_drops_unrolled_raw_samples(self):
+        """Test raw rows are only pruned once the minute tier absorbed them"""
+        for minute in range(10):
+            add_sample(self.node, self.start + timedelta(minutes=minute), minute)
+
+        now = self.start + timedelta(days=1)
+        self.assertEqual(metrics_store.prune(now=now)['raw'], 0)
+
+        metrics_store.rollup_all(now=now)
+        self.assertEqual(metrics_store.prune(now=now)['raw'], 10)
+        self.assertEqual(
+            NodeMetricRollup.objects.filter(resolution=MetricResolution.MINUTE).count(), 10
+        )
+
+    def test_choose_resolution(self):
+        now = self.start + timedelta(days=60)
+        choose = metrics_store.choose_resolution
+
+        self.assertEqual(choose(now - timedelta(hours=1), now, max_points=720, now=now), 'raw')
+        self.assertEqual(choose(now - timedelta(hours=6), now, max_points=720, now=now), '1m')
+        self.assertEqual(choose(now - timedelta(days=7), now, max_points=720, now=now), '1h')
+        # Past the hour tier's retention only daily buckets remain
+        self.assertEqual(choose(now - timedelta(days=45), now, max_points=720, now=now), '1d')
+
+    def test_series_has_same_shape_for_every_tier(self):
+        add_sample(self.node, self.start, 10)
+        add_sample(self.node, self.start + timedelta(seconds=30), 30)
+        metrics_store.rollup_all(now=self.start + timedelta(minutes=2))
+
+        end = self.start + timedelta(minutes=1)
+        _, raw = metrics_store.get_series(self.node, self.start, end, resolution='raw')
+        _, minute = metrics_store.get_series(self.node, self.start, end, resolution='1m')
+
+        self.assertEqual(len(raw), 2)
+        self.assertEqual(len(minute), 1)
+        self.assertEqual(set(raw[0]), set(minute[0]))
+        self.assertEqual(minute[0]['cpu_percent_avg'], 20)
@@ -12,6 +12,7 @@ from django.utils import timezone
 from django.db.models import Count
 
 from .models import Node, NodeCapability, NodeMetric, NodeEvent, NodeStatus, NodeType
+from .metrics_store import RESOLUTION_ORDER, get_series, get_summary, parse_range
 from .serializers import (
     NodeSerializer,
     NodeDetailSerializer,
@@ -206,6 +207,10 @@ class NodeViewSet(viewsets.ModelViewSet):
         Get node metrics history
 
         GET /api/v1/nodes/{id}/metrics/?limit=24
+        GET /api/v1/nodes/{id}/metrics/?range=7d&resolution=auto
+
+        With a range (or start/end) the series is served from the finest
+        tier that fits the range in NODE_METRICS_MAX_CHART_POINTS points.
         """
         try:
             node = Node.objects.get(id=id)
@@ -215,10 +220,65 @@ class NodeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        limit = int(request.query_params.get('limit', 24))
-        metrics = node.metrics.all()[:limit]
-        serializer = NodeMetricSerializer(metrics, many=True)
-        return Response(serializer.data)
+        params = request.query_params
+        if not any(key in params for key in ('range', 'start', 'end')):
+            limit = int(params.get('limit', 24))
+            metrics = node.metrics.all()[:limit]
+            serializer = NodeMetricSerializer(metrics, many=True)
+            return Response(serializer.data)
+
+        try:
+            start, end = parse_range(params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolution = params.get('resolution', 'auto')
+        if resolution not in ('auto', *RESOLUTION_ORDER):
+            return Response(
+                {'error': f'Invalid resolution. Use one of: auto, {", ".join(RESOLUTION_ORDER)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_points = int(params['max_points']) if params.get('max_points') else None
+        resolution, points = get_series(node, start, end, resolution=resolution, max_points=max_points)
+
+        return Response({
+            'node': str(node.id),
+            'start': start,
+            'end': end,
+            'resolution': resolution,
+            'points': points,
+        })
+
+    @action(detail=True, methods=['get'], url_path='metrics/summary')
+    def metrics_summary(self, request, id=None):
+        """
+        Get min/avg/max of node metrics over a range
+
+        GET /api/v1/nodes/{id}/metrics/summary/?range=30d
+        """
+        try:
+            node = Node.objects.get(id=id)
+        except Node.DoesNotExist:
+            return Response(
+                {'error': 'Node not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            start, end = parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolution, summary = get_summary(node, start, end)
+
+        return Response({
+            'node': str(node.id),
+            'start': start,
+            'end': end,
+            'resolution': resolution,
+            'summary': summary,
+        })
 
     @action(detail=True, methods=['get'])
     def events(self, request, id=None):
@@ -0,0 +1,168 @@
+"""
+benchmark archive scans
+builds a synthetic archive/versions tree and times:
+
+  os.walk            the previous scan: serial os.walk + getsize per file
+  cold               ArchiveScanner without an index (parallel scandir)
+  warm               rescan with the index, nothing changed
+  warm + 1 release   rescan after one new archive was added
+
+then runs a full ScanService scan into a ScanSession and counts the
+session saves and cache writes its progress reporting made (the previous
+scan saved the session once and wrote the log cache three times per
+archive).
+
+files are hardlinks to a few shared blobs, so building the tree costs
+inodes, not data. "cold" means no index, not a cold page cache.
+
+usage: python manage.py benchmark_archive_scan --versions 300 --files 5000
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.system.version_manager.backend.models import ScanSession, VersionArchive
+from core.system.version_manager.backend.scanner import ArchiveScanner, ScanService
+
+FILES_PER_DIR = 100
+BLOB_SIZES = (512, 2048, 8192, 32768)
+MAX_LINKS = 60000  # ext4 allows 65000 links per inode
+
+
+class Blobs:
+    """shared file contents to hardlink, replaced before they run out of links"""
+
+    def __init__(self, root):
+        self.root = root
+        self.links = 0
+        self.generation = 0
+        self.paths = []
+        self.renew()
+
+    def renew(self):
+        self.generation += 1
+        self.links = 0
+        self.paths = []
+        for size in BLOB_SIZES:
+            path = self.root / f'blob{size}_{self.generation}'
+            path.write_bytes(b'x' * size)
+            self.paths.append(path)
+
+    def link(self, index, target):
+        if self.links >= MAX_LINKS:
+            self.renew()
+        self.links += 1
+        os.link(self.paths[index % len(self.paths)], target)
+
+
+def build_archive(path, files, blobs):
+    """one synthetic archive of files spread over directories of FILES_PER_DIR"""
+    for start in range(0, files, FILES_PER_DIR):
+        directory = path / f'module{start // FILES_PER_DIR}'
+        directory.mkdir(parents=True)
+        for i in range(start, min(start + FILES_PER_DIR, files)):
+            blobs.link(i, directory / f'file{i}.py')
+
+
+def walk_scan(archive_path):
+    """the previous scan loop, sizes only"""
+    results = {}
+    for version_dir in sorted(archive_path.glob('unibos_v*')):
+        dir_size = file_count = dir_count = 0
+        for dirpath, dirnames, filenames in os.walk(version_dir):
+            file_count += len(filenames)
+            dir_count += len(dirnames)
+            for filename in filenames:
+                try:
+                    dir_size += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        results[version_dir.name] = (dir_size, file_count, dir_count)
+    return results
+
+
+class Command(BaseCommand):
+    help = 'benchmark archive scans: os.walk vs incremental parallel scanner'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--versions', type=int, default=300, help='archives to build (default: 300)')
+        parser.add_argument('--files', type=int, default=5000, help='files per archive (default: 5000)')
+        parser.add_argument('--workers', type=int, default=8, help='scanner threads (default: 8)')
+
+    def handle(self, *args, **options):
+        root = Path(tempfile.mkdtemp(prefix='archive-scan-bench-'))
+        try:
+            archive_path = root / 'archive' / 'versions'
+            archive_path.mkdir(parents=True)
+            blobs = Blobs(root)
+
+            versions, files = options['versions'], options['files']
+            self.stdout.write(f"building {versions} archives x {files} files...")
+            started = time.perf_counter()
+            for v in range(versions):
+                build_archive(archive_path / f'unibos_v{v:04d}_20250101_0000', files + v % 7, blobs)
+            self.stdout.write(f"built in {time.perf_counter() - started:.1f}s\n")
+
+            scanner = ArchiveScanner(archive_path, root / 'index.json', max_workers=options['workers'])
+            self.stdout.write(f"{'scan':<18} {'seconds':>8} {'measured':>9}")
+
+            started = time.perf_counter()
+            expected = walk_scan(archive_path)
+            self.row('os.walk', time.perf_counter() - started, len(expected))
+
+            for label in ('cold', 'warm'):
+                started = time.perf_counter()
+                results, measured = scanner.scan()
+                self.row(label, time.perf_counter() - started, measured)
+                got = {s.dirname: (s.size_bytes, s.file_count, s.directory_count) for s in results}
+                if got != expected:
+                    raise RuntimeError(f"{label} scan results differ from os.walk")
+
+            build_archive(archive_path / f'unibos_v{versions:04d}_20250101_0000', files, blobs)
+            started = time.perf_counter()
+            results, measured = scanner.scan()
+            self.row('warm + 1 release', time.perf_counter() - started, measured)
+
+            self.service_writes(archive_path, root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def row(self, label, seconds, measured):
+        self.stdout.write(f"{label:<18} {seconds:>8.2f} {measured:>9}")
+
+    def service_writes(self, archive_path, root):
+        """progress writes of one full ScanService scan"""
+        session = ScanSession.objects.create(status_message="benchmark")
+        saves = cache_writes = 0
+        save, cache_set = ScanSession.save, cache.set
+
+        def counting_save(obj, *args, **kwargs):
+            nonlocal saves
+            saves += 1
+            return save(obj, *args, **kwargs)
+
+        def counting_set(*args, **kwargs):
+            nonlocal cache_writes
+            cache_writes += 1
+            return cache_set(*args, **kwargs)
+
+        service = ScanService(ArchiveScanner(archive_path, root / 'service-index.json'))
+        started = time.perf_counter()
+        with mock.patch.object(ScanSession, 'save', counting_save), mock.patch.object(cache, 'set', counting_set):
+            service.run(session)
+        elapsed = time.perf_counter() - started
+
+        session.refresh_from_db()
+        self.stdout.write(
+            f"\nscan service (cold): {elapsed:.2f}s, {session.total_archives} archives, "
+            f"{saves} session saves, {cache_writes} cache writes\n{session.status_message}"
+        )
+        VersionArchive.objects.filter(path__startswith=str(archive_path)).delete()
+        session.delete()
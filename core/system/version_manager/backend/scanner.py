@@ -0,0 +1,429 @@
+"""
+Version Archive Scanner
+Incremental, parallel size scan of archive/versions
+
+Archive directories are measured with os.scandir, several at once. Results
+are kept in a JSON index keyed by each directory's mtime and inode.
+Archives are written once (the release pipeline builds them under a
+temporary name and renames them into place), so an unchanged pair means an
+unchanged archive, and a rescan only measures new or replaced ones.
+
+ScanService runs one scan at a time in a background thread and reports to
+its ScanSession and the scan log cache at most every
+VERSION_MANAGER_SCAN_PROGRESS_SECONDS.
+"""
+
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = 'unibos_v'
+INDEX_FORMAT = 1
+MAX_LOGS = 100  # Scan log entries kept in the cache
+ANOMALY_Z_SCORE = 2.5  # Reduces false positives (99% confidence)
+
+
+def get_archive_path() -> Path:
+    """archive/versions under the UNIBOS root"""
+    root = getattr(settings, 'UNIBOS_ROOT', None) or Path(__file__).resolve().parents[4]
+    return Path(root) / 'archive' / 'versions'
+
+
+def measure_tree(path: str) -> Tuple[int, int, int]:
+    """(bytes, files, directories) under path, without following symlinks"""
+    size = files = dirs = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs += 1
+                        stack.append(entry.path)
+                    else:
+                        files += 1
+                        size += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    return size, files, dirs
+
+
+def size_status(size_mb: float) -> str:
+    """VersionArchive status for an archive size"""
+    if size_mb < 50:
+        return 'normal'
+    elif size_mb < 200:
+        return 'large'
+    elif size_mb < 500:
+        return 'very_large'
+    return 'huge'
+
+
+@dataclass
+class ArchiveStats:
+    """measured size of one archive directory"""
+    dirname: str
+    path: str
+    size_bytes: int
+    file_count: int
+    directory_count: int
+    mtime_ns: int
+    inode: int
+
+    @property
+    def size_mb(self) -> float:
+        return self.size_bytes / (1024 * 1024)
+
+    @property
+    def version(self) -> Optional[str]:
+        parts = self.dirname.split('_')
+        if len(parts) < 2:
+            return None
+        return parts[1][1:] if parts[1].startswith('v') else parts[1]
+
+
+class ArchiveScanner:
+    """measures archive directories, skipping those unchanged since the last scan"""
+
+    def __init__(
+        self,
+        archive_path: Optional[Path] = None,
+        index_path: Optional[Path] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.archive_path = Path(archive_path or get_archive_path())
+        self.index_path = Path(index_path or getattr(
+            settings, 'VERSION_MANAGER_SCAN_INDEX',
+            self.archive_path.parent.parent / 'data' / 'cache' / 'version_manager_scan.json'
+        ))
+        self.max_workers = max_workers or getattr(settings, 'VERSION_MANAGER_SCAN_WORKERS', 8)
+
+    def list_archives(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.archive_path) as entries:
+                archives = [e for e in entries if e.name.startswith(ARCHIVE_PREFIX) and e.is_dir()]
+        except FileNotFoundError:
+            return []
+        return sorted(archives, key=lambda e: e.name)
+
+    def load_index(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if data.get('format') != INDEX_FORMAT or data.get('archive_path') != str(self.archive_path):
+            return {}
+        return data.get('archives', {})
+
+    def save_index(self, results: Dict[str, ArchiveStats]) -> None:
+        data = {
+            'format': INDEX_FORMAT,
+            'archive_path': str(self.archive_path),
+            'archives': {name: asdict(stats) for name, stats in results.items()},
+        }
+        # The dashboard view and the scan thread can both save; each writes its own file
+        tmp = self.index_path.with_name(f'{self.index_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data, separators=(',', ':')))
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not save archive scan index {self.index_path}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def scan(
+        self,
+        on_result: Optional[Callable[[ArchiveStats, bool], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Tuple[List[ArchiveStats], int]:
+        """
+        measure every archive, reusing indexed results for unchanged directories
+        on_result(stats, cached) is called per archive as results come in
+        returns (results sorted by name, number of archives measured)
+        """
+        index = self.load_index()
+        results: Dict[str, ArchiveStats] = {}
+        pending = []
+
+        for entry in self.list_archives():
+            st = entry.stat()
+            cached = index.get(entry.name)
+            if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['inode'] == st.st_ino:
+                stats = ArchiveStats(**{**cached, 'path': entry.path})
+                results[entry.name] = stats
+                if on_result:
+                    on_result(stats, True)
+            else:
+                pending.append((entry, st))
+
+        measured = 0
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                futures = {executor.submit(measure_tree, entry.path): (entry, st) for entry, st in pending}
+                for future in as_completed(futures):
+                    entry, st = futures[future]
+                    size, files, dirs = future.result()
+                    stats = ArchiveStats(entry.name, entry.path, size, files, dirs, st.st_mtime_ns, st.st_ino)
+                    results[entry.name] = stats
+                    measured += 1
+                    if on_result:
+                        on_result(stats, False)
+                    if should_stop and should_stop():
+                        for other in futures:
+                            other.cancel()
+                        break
+
+        # Archives that no longer exist drop out of the index here
+        self.save_index(results)
+        return [results[name] for name in sorted(results)], measured
+
+
+class ScanProgress:
+    """ScanSession fields and scan log entries, written at most every interval seconds"""
+
+    def __init__(self, session, interval: float):
+        self.session = session
+        self.interval = interval
+        self.logs: List[dict] = []
+        self.log_count = 0
+        self.current: Optional[dict] = None
+        self.anomaly: Optional[dict] = None
+        self._fields = set()
+        self._last_flush = 0.0
+
+        cache.delete(f'scan_logs_{session.id}')
+        cache.delete(f'scan_current_{session.id}')
+        cache.delete(f'scan_anomaly_{session.id}')
+
+    def log(self, log_type: str, message: str) -> None:
+        self.logs.append({
+            'index': self.log_count,
+            'type': log_type,
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        })
+        self.log_count += 1
+        del self.logs[:-MAX_LOGS]
+        self.flush()
+
+    def update(self, **fields) -> None:
+        for name, value in fields.items():
+            setattr(self.session, name, value)
+        self._fields.update(fields)
+        self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.interval:
+            return
+        self._last_flush = now
+
+        session_id = self.session.id
+        if self._fields:
+            self.session.save(update_fields=sorted(self._fields))
+            self._fields.clear()
+        cache.set(f'scan_logs_{session_id}', self.logs, 3600)
+        if self.current:
+            cache.set(f'scan_current_{session_id}', self.current, 60)
+        if self.anomaly:
+            cache.set(f'scan_anomaly_{session_id}', self.anomaly, 60)
+
+
+class ScanService:
+    """runs archive scans in a background thread, one at a time"""
+
+    def __init__(self, scanner: Optional[ArchiveScanner] = None):
+        self.scanner = scanner
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._session_id: Optional[int] = None
+        self._stop = threading.Event()
+
+    def start(self, session) -> int:
+        """
+        scan in the background, reporting to session
+        while a scan is running, returns that scan's session id instead
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self._session_id
+            self._session_id = session.id
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self.run, args=(session, self._stop), name='archive-scan', daemon=True
+            )
+            self._thread.start()
+            return session.id
+
+    def stop(self, session_id: int) -> bool:
+        """ask the running scan to stop; False if session_id isn't running here"""
+        with self._lock:
+            if session_id != self._session_id or not (self._thread and self._thread.is_alive()):
+                return False
+            self._stop.set()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def run(self, session, stop: Optional[threading.Event] = None) -> None:
+        """scan and record the results; runs in the scan thread"""
+        from .models import VersionArchive
+
+        stop = stop or threading.Event()
+        scanner = self.scanner or ArchiveScanner()
+        progress = ScanProgress(session, getattr(settings, 'VERSION_MANAGER_SCAN_PROGRESS_SECONDS', 0.5))
+        try:
+            progress.log('info', f'Starting scan of archive directory: {scanner.archive_path}')
+            total = len(scanner.list_archives())
+            progress.log('success', f'Found {total} version directories')
+
+            if total == 0:
+                progress.log('warning', 'No version archives found in the specified path')
+                progress.update(
+                    status_message="No version archives found",
+                    is_complete=True,
+                    completed_at=timezone.now()
+                )
+                return
+
+            progress.update(total_archives=total, status_message="Scanning archives...")
+            done = 0
+
+            def on_result(stats, cached):
+                nonlocal done
+                done += 1
+                if not cached:
+                    progress.current = {'size': stats.size_bytes, 'files': stats.file_count, 'dirs': stats.directory_count}
+                    progress.log(
+                        'success',
+                        f'[{done}/{total}] {stats.dirname}: {stats.size_mb:.2f} MB | '
+                        f'Files: {stats.file_count} | Dirs: {stats.directory_count}'
+                    )
+                progress.update(
+                    progress_percent=int(done / total * 100),
+                    current_archive=stats.dirname[:100],
+                    status_message=f"Scanning {stats.dirname}..."
+                )
+
+            results, measured = scanner.scan(on_result=on_result, should_stop=stop.is_set)
+            progress.log('info', f'{measured} archives measured, {len(results) - measured} unchanged since the last scan')
+
+            if stop.is_set():
+                progress.log('warning', 'Scan stopped by user request')
+                progress.update(
+                    status_message="Scan stopped by user",
+                    is_complete=True,
+                    completed_at=timezone.now()
+                )
+                return
+
+            archives = [stats for stats in results if stats.version]
+            progress.log('info', 'analyzing archive sizes for anomalies...')
+            z_scores = self._score(archives, progress)
+            anomaly_count = sum(z_score > ANOMALY_Z_SCORE for z_score in z_scores.values())
+
+            progress.log('info', 'Saving archive data to database...')
+            with transaction.atomic():
+                for stats in archives:
+                    VersionArchive.objects.update_or_create(
+                        version=stats.version,
+                        defaults={
+                            'path': stats.path,
+                            'size_bytes': stats.size_bytes,
+                            'size_mb': stats.size_mb,
+                            'file_count': stats.file_count,
+                            'directory_count': stats.directory_count,
+                            'z_score': z_scores.get(stats.dirname, 0),
+                            'is_anomaly': z_scores.get(stats.dirname, 0) > ANOMALY_Z_SCORE,
+                            'status': size_status(stats.size_mb),
+                        }
+                    )
+            progress.log('success', f'Database updated: {len(archives)} archives saved')
+
+            total_size = sum(stats.size_bytes for stats in archives)
+            progress.update(
+                total_size_bytes=total_size,
+                total_size_gb=total_size / (1024 ** 3),
+                average_size_mb=(total_size / (1024 ** 2)) / len(archives) if archives else 0,
+                anomaly_count=anomaly_count,
+                progress_percent=100,
+                is_complete=True,
+                completed_at=timezone.now(),
+                status_message=f"Scan complete: {len(archives)} archives processed"
+            )
+
+        except Exception as e:
+            logger.exception(f"Archive scan {session.id} failed")
+            progress.update(
+                has_errors=True,
+                error_message=str(e),
+                status_message="Scan failed",
+                is_complete=True,
+                completed_at=timezone.now()
+            )
+
+        finally:
+            progress.flush(force=True)
+            connection.close()
+
+    def _score(self, archives: List[ArchiveStats], progress: ScanProgress) -> Dict[str, float]:
+        """archive size z-scores by dirname"""
+        if len(archives) <= 2:
+            return {}
+        sizes = [stats.size_bytes for stats in archives]
+        mean_size = statistics.mean(sizes)
+        stdev_size = statistics.stdev(sizes)
+        progress.log('debug', f'Statistics: Mean={mean_size/(1024*1024):.2f}MB, StdDev={stdev_size/(1024*1024):.2f}MB')
+        if stdev_size == 0:
+            return {}
+
+        z_scores = {}
+        for stats in archives:
+            z_score = abs((stats.size_bytes - mean_size) / stdev_size)
+            z_scores[stats.dirname] = z_score
+            if z_score > ANOMALY_Z_SCORE:
+                progress.anomaly = {'archive': f'v{stats.version}', 'zscore': z_score, 'size_mb': stats.size_mb}
+                progress.log(
+                    'warning',
+                    f'⚠️ Anomaly detected: v{stats.version} (Z-score: {z_score:.2f}, Size: {stats.size_mb:.2f}MB)'
+                )
+        return z_scores
+
+
+# Shared service, so concurrent start requests join the running scan
+_service: Optional[ScanService] = None
+_service_lock = threading.Lock()
+
+
+def get_scan_service() -> ScanService:
+    """Get the shared archive scan service"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ScanService()
+        return _service
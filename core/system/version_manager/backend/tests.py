@@ -1,3 +1,203 @@
-from django.test import TestCase
+"""
+Tests for the version archive scanner
 
-# Create your tests here.
+Archives are built in a temporary directory; ScanProgress writes to a
+stand-in session and the local memory cache.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .models import ScanSession
+from .scanner import ArchiveScanner, ScanProgress, ScanService, measure_tree
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_archive(root: Path, name: str, files: dict) -> Path:
+    path = root / name
+    for rel, content in files.items():
+        (path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (path / rel).write_bytes(content)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class ArchiveScannerTests(SimpleTestCase):
+    """Test archive measurement and the scan index"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.archives = self.tmp / 'archive' / 'versions'
+        self.archives.mkdir(parents=True)
+        self.index = self.tmp / 'index.json'
+
+    def scanner(self):
+        return ArchiveScanner(archive_path=self.archives, index_path=self.index, max_workers=2)
+
+    def test_measure_tree_counts_without_following_symlinks(self):
+        """Test sizes, files and directories; a symlink counts as itself, not its target"""
+        path = make_archive(self.archives, 'unibos_v001', {'a.txt': b'12345', 'sub/deep/b.bin': b'\0' * 10})
+        (path / 'empty').mkdir()
+        os.symlink(self.tmp, path / 'outside')
+
+        size, files, dirs = measure_tree(str(path))
+        self.assertEqual(dirs, 3)
+        self.assertEqual(files, 3)
+        self.assertEqual(size, 15 + os.lstat(path / 'outside').st_size)
+
+    def test_unchanged_archives_are_not_measured_again(self):
+        """Test a rescan reuses indexed results until an archive is replaced"""
+        make_archive(self.archives, 'unibos_v001', {'a.txt': b'1'})
+        make_archive(self.archives, 'unibos_v002', {'a.txt': b'22'})
+        (self.archives / 'notes').mkdir()
+
+        results, measured = self.scanner().scan()
+        self.assertEqual([stats.dirname for stats in results], ['unibos_v001', 'unibos_v002'])
+        self.assertEqual(measured, 2)
+
+        seen = []
+        with patch('core.system.version_manager.backend.scanner.measure_tree') as measure:
+            results, measured = self.scanner().scan(on_result=lambda stats, cached: seen.append(cached))
+        measure.assert_not_called()
+        self.assertEqual((measured, seen), (0, [True, True]))
+        self.assertEqual([stats.size_bytes for stats in results], [1, 2])
+        self.assertEqual(results[0].version, '001')
+
+        # The release pipeline builds under a temporary name and renames into place
+        staged = make_archive(self.tmp, 'staging', {'a.txt': b'333', 'b.txt': b'4444'})
+        shutil.rmtree(self.archives / 'unibos_v002')
+        os.rename(staged, self.archives / 'unibos_v002')
+        shutil.rmtree(self.archives / 'unibos_v001')
+
+        results, measured = self.scanner().scan()
+        self.assertEqual(measured, 1)
+        self.assertEqual([(stats.dirname, stats.size_bytes) for stats in results], [('unibos_v002', 7)])
+        self.assertEqual(list(json.loads(self.index.read_text())['archives']), ['unibos_v002'])
+
+    def test_index_for_another_archive_path_is_ignored(self):
+        """Test an index written for a different archive directory is not trusted"""
+        make_archive(self.archives, 'unibos_v001', {'a.txt': b'1'})
+        self.scanner().scan()
+        data = json.loads(self.index.read_text())
+        data['archive_path'] = str(self.tmp / 'elsewhere')
+        self.index.write_text(json.dumps(data))
+
+        _, measured = self.scanner().scan()
+        self.assertEqual(measured, 1)
+
+    def test_stop_ends_the_scan_early(self):
+        """Test should_stop cancels the archives not yet measured"""
+        for number in range(6):
+            make_archive(self.archives, f'unibos_v{number:03d}', {'a.txt': b'1'})
+
+        scanner = ArchiveScanner(archive_path=self.archives, index_path=self.index, max_workers=1)
+        results, measured = scanner.scan(should_stop=lambda: True)
+        self.assertLess(measured, 6)
+        self.assertEqual(len(results), measured)
+
+        # Only measured archives are indexed; the rest are measured next time
+        _, measured_again = self.scanner().scan()
+        self.assertEqual(measured + measured_again, 6)
+
+    def test_concurrent_saves_do_not_share_a_temporary_file(self):
+        """Test index writes from several threads leave one complete index and no temporaries"""
+        make_archive(self.archives, 'unibos_v001', {'a.txt': b'1'})
+        results = {stats.dirname: stats for stats in self.scanner().scan()[0]}
+        scanner = self.scanner()
+
+        threads = [threading.Thread(target=lambda: [scanner.save_index(results) for _ in range(20)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(list(json.loads(self.index.read_text())['archives']), ['unibos_v001'])
+        self.assertEqual(sorted(path.name for path in self.tmp.iterdir()), ['archive', 'index.json'])
+
+
+@override_settings(CACHES=LOCMEM)
+class ScanProgressTests(SimpleTestCase):
+    """Test progress is written at most once per interval"""
+
+    def setUp(self):
+        cache.clear()
+        self.session = MagicMock(id=7)
+        self.clock = patch('core.system.version_manager.backend.scanner.time.monotonic', return_value=100.0)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def test_updates_are_throttled_until_forced(self):
+        """Test fields collect between flushes and go out in one save"""
+        progress = ScanProgress(self.session, interval=0.5)
+        progress.update(total_archives=3)
+        self.session.save.assert_called_once_with(update_fields=['total_archives'])
+
+        progress.update(progress_percent=33)
+        progress.log('info', 'measuring')
+        self.assertEqual(self.session.save.call_count, 1)
+        self.assertEqual(cache.get('scan_logs_7'), [])
+
+        self.now.return_value = 100.6
+        progress.update(current_archive='unibos_v002')
+        self.session.save.assert_called_with(update_fields=['current_archive', 'progress_percent'])
+        self.assertEqual([entry['message'] for entry in cache.get('scan_logs_7')], ['measuring'])
+
+        progress.log('success', 'done')
+        progress.flush(force=True)
+        self.assertEqual(self.session.save.call_count, 2)
+        self.assertEqual(len(cache.get('scan_logs_7')), 2)
+
+    def test_log_keeps_the_most_recent_entries(self):
+        """Test the cached log is capped while entries keep their running index"""
+        progress = ScanProgress(self.session, interval=0)
+        for number in range(105):
+            progress.log('info', f'entry {number}')
+        logs = cache.get('scan_logs_7')
+        self.assertEqual(len(logs), 100)
+        self.assertEqual((logs[0]['index'], logs[-1]['index']), (5, 104))
+
+
+@override_settings(CACHES=LOCMEM)
+class StartScanViewTests(TransactionTestCase):
+    """Test a scan started from a request reports to a committed session"""
+
+    def setUp(self):
+        cache.clear()
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.service = ScanService(ArchiveScanner(archive_path=tmp / 'versions', index_path=tmp / 'index.json'))
+        service = patch('core.system.version_manager.backend.views.get_scan_service', return_value=self.service)
+        service.start()
+        self.addCleanup(service.stop)
+
+        # As on the hub and nodes
+        atomic = connection.settings_dict['ATOMIC_REQUESTS']
+        connection.settings_dict['ATOMIC_REQUESTS'] = True
+        self.addCleanup(connection.settings_dict.__setitem__, 'ATOMIC_REQUESTS', atomic)
+
+        user = get_user_model().objects.create_user(username='admin', password='testpass123')
+        self.client.force_login(user)
+
+    def test_quick_scan_completes_its_session(self):
+        """Test a scan finishing before the response is sent still records its result"""
+        # Hold the request open until the scan is done, as a slow response would
+        with patch('core.system.version_manager.backend.views.cache.set', side_effect=lambda *args: self.service.wait(10)):
+            response = self.client.post(reverse('version_manager:start_scan'))
+        self.service.wait(10)
+
+        session = ScanSession.objects.get(id=response.json()['session_id'])
+        self.assertTrue(session.is_complete)
+        self.assertEqual(session.status_message, 'No version archives found')
@@ -3,8 +3,6 @@ Version Manager Views
 Handles version archive analysis and git operations with real-time updates
 """
 
-import os
-import glob
 import statistics
 import subprocess
 import json
@@ -23,6 +21,7 @@ from django.db import transaction
 from django.core.cache import cache
 
 from .models import VersionArchive, ScanSession, GitStatus
+from .scanner import ArchiveScanner, get_archive_path, get_scan_service
 from core.system.web_ui.backend.views import BaseUIView
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg, Count
@@ -36,48 +35,22 @@ class VersionManagerView(LoginRequiredMixin, BaseUIView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Perform real-time scan of archive directory
-        import os
-        import glob
-        # Path from: apps/web/backend/apps/version_manager/views.py
-        # Need to go up 6 levels to reach unibos root
-        base_dir = Path(__file__).parent.parent.parent.parent.parent.parent
-        archive_path = base_dir / "archive" / "versions"
-        
-        # Get all version directories and calculate real-time stats
-        version_dirs = sorted(glob.glob(f"{archive_path}/unibos_v*"))
-        total_archives = len(version_dirs)
-        total_size_bytes = 0
-        archives_data = []
-        
-        for version_dir in version_dirs:
-            if os.path.isdir(version_dir):
-                dirname = os.path.basename(version_dir)
-                # Calculate directory size
-                dir_size = 0
-                file_count = 0
-                for dirpath, dirnames, filenames in os.walk(version_dir):
-                    file_count += len(filenames)
-                    for filename in filenames:
-                        filepath = os.path.join(dirpath, filename)
-                        try:
-                            dir_size += os.path.getsize(filepath)
-                        except:
-                            pass
-                
-                total_size_bytes += dir_size
-                
-                # Extract version number
-                parts = dirname.split('_')
-                if len(parts) >= 2:
-                    version_num = parts[1][1:] if parts[1].startswith('v') else parts[1]
-                    archives_data.append({
-                        'version': version_num,
-                        'size_mb': dir_size / (1024 * 1024),
-                        'file_count': file_count,
-                        'dirname': dirname
-                    })
-        
+        # Archive sizes; only archives changed since the last scan are measured
+        scanner = ArchiveScanner()
+        archive_path = scanner.archive_path
+        results, _ = scanner.scan()
+        total_archives = len(results)
+        total_size_bytes = sum(stats.size_bytes for stats in results)
+        archives_data = [
+            {
+                'version': stats.version,
+                'size_mb': stats.size_mb,
+                'file_count': stats.file_count,
+                'dirname': stats.dirname
+            }
+            for stats in results if stats.version
+        ]
+
         # Sort by version number (descending)
         archives_data.sort(key=lambda x: int(x['version']) if x['version'].isdigit() else 0, reverse=True)
         
@@ -177,11 +150,7 @@ class ArchiveAnalyzerView(LoginRequiredMixin, BaseUIView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Calculate dynamic archive path
-        # Path from: apps/web/backend/apps/version_manager/views.py
-        # Need to go up 6 levels to reach unibos root
-        base_dir = Path(__file__).parent.parent.parent.parent.parent.parent
-        archive_path = base_dir / "archive" / "versions"
+        archive_path = get_archive_path()
 
         # Get all archives ordered by version
         archives = VersionArchive.objects.all()
@@ -211,244 +180,39 @@ class ArchiveAnalyzerView(LoginRequiredMixin, BaseUIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+# The scan thread saves the session on its own connection, so it must be committed first
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class StartScanView(LoginRequiredMixin, View):
     """Start archive scanning process"""
     
     def post(self, request):
         """Start a new scan session"""
-        
+        service = get_scan_service()
+
         # Create new scan session
         scan_session = ScanSession.objects.create(
             started_by=request.user,
             status_message="Initializing scan..."
         )
-        
+
+        # Scan in the background; a scan already running is joined instead
+        session_id = service.start(scan_session)
+        if session_id != scan_session.id:
+            scan_session.delete()
+            return JsonResponse({
+                'success': True,
+                'session_id': session_id,
+                'message': 'Scan already running'
+            })
+
         # Store session ID in cache for progress tracking
         cache.set(f'scan_session_{scan_session.id}', scan_session.id, 3600)
-        
-        # Start scanning in background thread
-        import threading
-        scan_thread = threading.Thread(target=self._perform_scan, args=(scan_session,))
-        scan_thread.daemon = True
-        scan_thread.start()
-        
+
         return JsonResponse({
             'success': True,
             'session_id': scan_session.id,
             'message': 'Scan started successfully'
         })
-    
-    def _add_log(self, session_id, log_type, message):
-        """Add a log entry to the cache for real-time display"""
-        logs_key = f'scan_logs_{session_id}'
-        logs = cache.get(logs_key, [])
-        
-        log_entry = {
-            'index': len(logs),
-            'type': log_type,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
-        }
-        logs.append(log_entry)
-        
-        # Keep only last 100 logs
-        if len(logs) > 100:
-            logs = logs[-100:]
-        
-        cache.set(logs_key, logs, 3600)
-        return log_entry
-    
-    def _perform_scan(self, scan_session):
-        """Perform the actual scanning with detailed logging"""
-        # Use correct path to unibos project root
-        import os
-        # Path from: apps/web/backend/apps/version_manager/views.py
-        # Need to go up 6 levels to reach unibos root
-        base_dir = Path(__file__).parent.parent.parent.parent.parent.parent
-        archive_path = base_dir / "archive" / "versions"
-        session_id = scan_session.id
-        
-        try:
-            # Clear previous logs
-            cache.delete(f'scan_logs_{session_id}')
-            cache.delete(f'scan_current_{session_id}')
-            cache.delete(f'scan_anomaly_{session_id}')
-            
-            self._add_log(session_id, 'info', f'Starting scan of archive directory: {archive_path}')
-            
-            # Get all version directories
-            self._add_log(session_id, 'info', 'Searching for version directories...')
-            version_dirs = sorted(glob.glob(f"{archive_path}/unibos_v*"))
-            total_dirs = len(version_dirs)
-            
-            self._add_log(session_id, 'success', f'Found {total_dirs} version directories')
-            
-            if total_dirs == 0:
-                self._add_log(session_id, 'warning', 'No version archives found in the specified path')
-                scan_session.status_message = "No version archives found"
-                scan_session.is_complete = True
-                scan_session.completed_at = timezone.now()
-                scan_session.save()
-                return
-            
-            scan_session.total_archives = total_dirs
-            scan_session.save()
-            
-            archives_data = []
-            total_size = 0
-            
-            for idx, version_dir in enumerate(version_dirs):
-                if os.path.isdir(version_dir):
-                    # Update progress
-                    progress = int((idx + 1) / total_dirs * 100)
-                    dirname = os.path.basename(version_dir)
-                    
-                    scan_session.progress_percent = progress
-                    scan_session.current_archive = dirname
-                    scan_session.status_message = f"Scanning {dirname}..."
-                    scan_session.save()
-                    
-                    self._add_log(session_id, 'info', f'[{idx+1}/{total_dirs}] Scanning: {dirname}')
-                    
-                    # Extract version info
-                    parts = dirname.split('_')
-                    if len(parts) >= 2:
-                        version_num = parts[1][1:] if parts[1].startswith('v') else parts[1]
-                        
-                        # Calculate directory size and file count
-                        dir_size = 0
-                        file_count = 0
-                        dir_count = 0
-                        
-                        self._add_log(session_id, 'debug', f'  analyzing directory structure...')
-                        
-                        for dirpath, dirnames, filenames in os.walk(version_dir):
-                            file_count += len(filenames)
-                            dir_count += len(dirnames)
-                            for filename in filenames:
-                                filepath = os.path.join(dirpath, filename)
-                                try:
-                                    dir_size += os.path.getsize(filepath)
-                                except:
-                                    pass
-                        
-                        # Store current archive details in cache
-                        cache.set(f'scan_current_{session_id}', {
-                            'size': dir_size,
-                            'files': file_count,
-                            'dirs': dir_count
-                        }, 60)
-                        
-                        self._add_log(session_id, 'success', 
-                            f'  → Size: {dir_size / (1024*1024):.2f} MB | Files: {file_count} | Dirs: {dir_count}')
-                        
-                        # Store archive data
-                        archive_data = {
-                            'version': version_num,
-                            'path': version_dir,
-                            'size_bytes': dir_size,
-                            'size_mb': dir_size / (1024 * 1024),
-                            'file_count': file_count,
-                            'directory_count': dir_count,
-                        }
-                        archives_data.append(archive_data)
-                        total_size += dir_size
-            
-            # Calculate statistics for anomaly detection
-            self._add_log(session_id, 'info', 'analyzing archive sizes for anomalies...')
-            
-            if len(archives_data) > 2:
-                sizes = [a['size_bytes'] for a in archives_data]
-                mean_size = statistics.mean(sizes)
-                stdev_size = statistics.stdev(sizes) if len(sizes) > 1 else 0
-                
-                self._add_log(session_id, 'debug', 
-                    f'Statistics: Mean={mean_size/(1024*1024):.2f}MB, StdDev={stdev_size/(1024*1024):.2f}MB')
-                
-                for archive in archives_data:
-                    if stdev_size > 0:
-                        z_score = abs((archive['size_bytes'] - mean_size) / stdev_size)
-                        archive['z_score'] = z_score
-                        # Use threshold of 2.5 to reduce false positives (99% confidence)
-                        archive['is_anomaly'] = z_score > 2.5
-                        
-                        # Determine status based on size (like terminal version)
-                        size_mb = archive['size_mb']
-                        if size_mb < 50:
-                            archive['status'] = 'normal'
-                        elif size_mb < 200:
-                            archive['status'] = 'large'
-                        elif size_mb < 500:
-                            archive['status'] = 'very_large'
-                        else:
-                            archive['status'] = 'huge'
-                        
-                        if archive['is_anomaly']:
-                            self._add_log(session_id, 'warning', 
-                                f'⚠️ Anomaly detected: v{archive["version"]} (Z-score: {z_score:.2f}, Size: {size_mb:.2f}MB)')
-                            
-                            # Store anomaly info in cache
-                            cache.set(f'scan_anomaly_{session_id}', {
-                                'archive': f'v{archive["version"]}',
-                                'zscore': z_score,
-                                'size_mb': size_mb
-                            }, 60)
-                    else:
-                        archive['z_score'] = 0
-                        archive['is_anomaly'] = False
-                        archive['status'] = 'normal'
-            
-            # Save archives to database
-            self._add_log(session_id, 'info', 'Saving archive data to database...')
-            anomaly_count = 0
-            
-            with transaction.atomic():
-                for archive_data in archives_data:
-                    archive, created = VersionArchive.objects.update_or_create(
-                        version=archive_data['version'],
-                        defaults={
-                            'path': archive_data['path'],
-                            'size_bytes': archive_data['size_bytes'],
-                            'size_mb': archive_data['size_mb'],
-                            'file_count': archive_data['file_count'],
-                            'directory_count': archive_data['directory_count'],
-                            'z_score': archive_data.get('z_score', 0),
-                            'is_anomaly': archive_data.get('is_anomaly', False),
-                            'status': archive_data.get('status', 'normal'),
-                        }
-                    )
-                    # Don't call update_status() since we're setting it directly
-                    archive.save()
-                    
-                    if archive.is_anomaly:
-                        anomaly_count += 1
-                        self._add_log(session_id, 'info', 
-                            f'  ✓ v{archive.version}: {archive.size_mb:.2f}MB - anomaly detected')
-                    else:
-                        # Log with color coding based on status
-                        status_icon = '🟢' if archive.status == 'normal' else '🟡' if archive.status == 'large' else '🟠' if archive.status == 'very_large' else '🔴'
-                        self._add_log(session_id, 'success', 
-                            f'  {status_icon} v{archive.version}: {archive.size_mb:.2f}MB - {archive.status}')
-            
-            self._add_log(session_id, 'success', f'Database updated: {len(archives_data)} archives saved')
-            
-            # Update scan session
-            scan_session.total_size_bytes = total_size
-            scan_session.total_size_gb = total_size / (1024**3)
-            scan_session.average_size_mb = (total_size / (1024**2)) / len(archives_data) if archives_data else 0
-            scan_session.anomaly_count = anomaly_count
-            scan_session.is_complete = True
-            scan_session.completed_at = timezone.now()
-            scan_session.status_message = f"Scan complete: {len(archives_data)} archives processed"
-            scan_session.save()
-            
-        except Exception as e:
-            scan_session.has_errors = True
-            scan_session.error_message = str(e)
-            scan_session.status_message = "Scan failed"
-            scan_session.is_complete = True
-            scan_session.completed_at = timezone.now()
-            scan_session.save()
 
 
 class ScanProgressView(LoginRequiredMixin, View):
@@ -527,6 +291,13 @@ class StopScanView(LoginRequiredMixin, View):
     
     def post(self, request, session_id):
         """Stop the scan session"""
+        # A running scan records the stop itself
+        if get_scan_service().stop(session_id):
+            return JsonResponse({
+                'success': True,
+                'message': 'Scan stopping'
+            })
+
         try:
             scan_session = ScanSession.objects.get(id=session_id)
             
@@ -5,5 +5,6 @@ Hub server deployment automation for UNIBOS platform
 
 from deploy.deploy import HubDeployer
 from deploy.config import DeployConfig
+from deploy.remote import RemoteShell
 
-__all__ = ['HubDeployer', 'DeployConfig']
+__all__ = ['HubDeployer', 'DeployConfig', 'RemoteShell']
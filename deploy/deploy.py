@@ -5,11 +5,15 @@ handles complete hub server deployment lifecycle
 
 import subprocess
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, Sequence
 from dataclasses import dataclass, field
 
 from deploy.config import DeployConfig
+from deploy.remote import RemoteShell
 
 
 @dataclass
@@ -43,7 +47,7 @@ class HubDeployer:
     hub deployment automation for unibos
 
     handles:
-    - ssh connection and command execution
+    - ssh connection and command execution (one multiplexed connection)
     - git clone/pull from unibos-hub repo
     - python venv setup and dependencies
     - environment file creation
@@ -74,6 +78,17 @@ class HubDeployer:
         ("health", "health check"),
     ]
 
+    # steps after venv that don't depend on each other, run side by side;
+    # steps within a lane run in order
+    CONCURRENT_LANES = [
+        ["deps", "cli"],
+        ["env", "modules", "data"],
+        ["database"],
+    ]
+
+    # seconds to let the service come up before the health check
+    HEALTH_CHECK_WAIT = 3
+
     def __init__(
         self,
         config: DeployConfig,
@@ -88,6 +103,12 @@ class HubDeployer:
         self.current_step = 0
         self.start_time = None
         self._log_lines: List[str] = []
+        self.log_dir = Path(__file__).parent.parent / "data" / "deploy_logs"
+        self.remote = RemoteShell(config.ssh_target, config.port)
+        self.step_timings: List[tuple] = []
+        self._lock = threading.Lock()
+        # per-thread log buffer and running step, for concurrent lanes
+        self._local = threading.local()
 
     def _default_log(self, message: str) -> None:
         """default logging to stdout"""
@@ -96,41 +117,73 @@ class HubDeployer:
 
     def log(self, message: str) -> None:
         """log a message"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            buffer.append(message)
+            return
         self._log_lines.append(message)
         self.log_callback(message)
 
     def log_step(self, step_id: str) -> None:
-        """log a step header"""
-        self.current_step += 1
+        """log a step header and start timing it"""
+        self._finish_step()
+        with self._lock:
+            self.current_step += 1
+        step_ids = [s[0] for s in self.STEPS]
+        number = step_ids.index(step_id) + 1 if step_id in step_ids else self.current_step
         step_name = next((s[1] for s in self.STEPS if s[0] == step_id), step_id)
         total = len(self.STEPS)
-        self.log(f"\n→ [{self.current_step}/{total}] {step_name}")
+        self.log(f"\n→ [{number}/{total}] {step_name}")
+        self._local.step = (step_id, time.monotonic())
+
+    def _finish_step(self) -> None:
+        """record the duration of this thread's running step"""
+        step = getattr(self._local, 'step', None)
+        if step is None:
+            return
+        self._local.step = None
+        with self._lock:
+            self.step_timings.append((step[0], time.monotonic() - step[1]))
+
+    def _run_lanes(self, lanes: Sequence[Sequence[str]]) -> None:
+        """
+        run lanes of steps concurrently
+        each lane logs to its own buffer, flushed in lane order once all are done
+        """
+        def run_lane(step_ids):
+            self._local.buffer = []
+            try:
+                for step_id in step_ids:
+                    getattr(self, f"_step_{step_id}")()
+                return self._local.buffer, None
+            except Exception as e:
+                return self._local.buffer, e
+            finally:
+                self._finish_step()
+                self._local.buffer = None
+
+        with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+            outcomes = list(executor.map(run_lane, lanes))
+
+        for buffer, _ in outcomes:
+            for message in buffer:
+                self.log(message)
+        for _, error in outcomes:
+            if error is not None:
+                raise error
 
     def ssh_cmd(self, command: str, check: bool = True, quiet: bool = False) -> subprocess.CompletedProcess:
         """execute command on remote server via ssh"""
-        ssh_command = [
-            'ssh',
-            '-o', 'StrictHostKeyChecking=no',
-            '-o', 'BatchMode=yes',
-            f'-p{self.config.port}',
-            self.config.ssh_target,
-            command
-        ]
-
         if self.dry_run:
             self.log(f"  [dry run] ssh: {command[:60]}...")
-            return subprocess.CompletedProcess(ssh_command, 0, '', '')
+            return subprocess.CompletedProcess(command, 0, '', '')
 
         if not quiet:
             # show shortened command
             short_cmd = command[:80] + "..." if len(command) > 80 else command
             self.log(f"  $ {short_cmd}")
 
-        result = subprocess.run(
-            ssh_command,
-            capture_output=True,
-            text=True
-        )
+        result = self.remote.run(command)
 
         if result.stdout and not quiet:
             lines = result.stdout.strip().split('\n')
@@ -149,9 +202,15 @@ class HubDeployer:
 
         return result
 
+    def ssh_probe(self, *commands: str) -> List[subprocess.CompletedProcess]:
+        """run read-only checks on remote server in one round trip"""
+        if self.dry_run:
+            return [subprocess.CompletedProcess(command, 0, '', '') for command in commands]
+        return self.remote.run_batch(commands)
+
     def _save_deploy_log(self, result: DeployResult) -> None:
         """save deployment log to file"""
-        log_dir = Path(__file__).parent.parent / "data" / "deploy_logs"
+        log_dir = self.log_dir
         log_dir.mkdir(parents=True, exist_ok=True)
 
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -164,8 +223,13 @@ class HubDeployer:
             f.write(f"duration: {result.duration:.1f}s\n")
             f.write(f"result: {'success' if result.success else 'failed'}\n")
             f.write(f"steps: {self.current_step}/{len(self.STEPS)}\n")
+            f.write(f"ssh: {self.remote.commands} commands over {self.remote.connections} connections\n")
             f.write("-" * 60 + "\n\n")
             f.write("\n".join(self._log_lines))
+            f.write("\n\n" + "-" * 60 + "\nstep timings:\n")
+            order = [s[0] for s in self.STEPS]
+            timings = sorted(self.step_timings, key=lambda t: order.index(t[0]) if t[0] in order else len(order))
+            f.write("".join(f"  {step_id:<12} {duration:6.1f}s\n" for step_id, duration in timings))
 
         # append to summary log
         summary_file = log_dir / "deploy_history.log"
@@ -190,24 +254,28 @@ class HubDeployer:
         steps:
         1. validate configuration
         2. check ssh connectivity
-        3. prepare deployment directory
-        4. clone repository
-        5. setup python venv
-        6. install dependencies
-        7. install unibos cli
-        8. create .env file
-        9. setup module registry
-        10. setup data directory
-        11. setup postgresql database
-        12. run migrations
-        13. collect static files
-        14. setup systemd service
-        15. start service
-        16. health check
+        3. backup database
+        4. prepare deployment directory
+        5. clone repository
+        6. setup python venv
+        7. install dependencies
+        8. install unibos cli
+        9. create .env file
+        10. setup module registry
+        11. setup data directory
+        12. setup postgresql database
+        13. run migrations
+        14. collect static files
+        15. setup systemd service
+        16. start service
+        17. health check
+
+        all commands share one ssh connection; steps 7-12 run in the
+        concurrent lanes of CONCURRENT_LANES
         """
-        import time
         self.start_time = time.time()
         self.current_step = 0
+        self.step_timings = []
 
         # header
         self.log(f"deploying to {self.config.name}")
@@ -225,8 +293,12 @@ class HubDeployer:
                 return result
             self.log("  ✓ configuration valid")
 
-            # step 2: check ssh
+            # step 2: check ssh, opening the connection every later step shares
             self.log_step("ssh_check")
+            if not self.dry_run:
+                opened = self.remote.open()
+                if opened.returncode != 0:
+                    self.log("  · connection sharing unavailable, one connection per command")
             result = self.ssh_cmd("echo 'ok'", check=False, quiet=True)
             if result.returncode != 0:
                 result = DeployResult(False, "ssh connection failed", result.stderr)
@@ -234,25 +306,27 @@ class HubDeployer:
                 return result
             self.log("  ✓ ssh connection successful")
 
+            # what's already on the server, in one round trip
+            data_dir = self.config.data_dir
+            data_check, db_check = self.ssh_probe(
+                f"[ -d {data_dir} ] && echo 'yes' || echo 'no'",
+                self._database_exists_command()
+            )
+            data_exists = data_check.stdout.strip() == 'yes'
+            db_exists = 'not_exists' not in db_check.stdout
+
             # step 3: backup database before deployment
             self.log_step("backup_db")
-            backup_result = self._backup_database_before_deploy()
+            backup_result = self._backup_database_before_deploy(db_exists)
             if backup_result:
                 self.log(f"  ✓ {backup_result}")
+                # the dump went into the data directory, which must survive the clean below
+                data_exists = data_exists or not self.dry_run
             else:
                 self.log("  · no existing database to backup")
 
-            # step 4: prepare deployment directory
+            # step 4: prepare deployment directory, preserving the data directory
             self.log_step("prepare")
-            data_dir = self.config.data_dir
-
-            # check if data directory exists and preserve it
-            data_exists_result = self.ssh_cmd(
-                f"[ -d {data_dir} ] && echo 'yes' || echo 'no'",
-                check=False, quiet=True
-            )
-            data_exists = data_exists_result.stdout.strip() == 'yes'
-
             if data_exists:
                 self.log(f"  preserving data directory")
                 self.ssh_cmd(f"mv {data_dir} /tmp/unibos_data_backup", quiet=True)
@@ -260,11 +334,13 @@ class HubDeployer:
                 self.log("  no existing data to preserve")
 
             # clean deployment directory
-            self.ssh_cmd(f"sudo rm -rf {self.config.deploy_path}", quiet=True)
-            self.ssh_cmd(f"mkdir -p {self.config.deploy_path}", quiet=True)
+            self.ssh_cmd(
+                f"sudo rm -rf {self.config.deploy_path} && mkdir -p {self.config.deploy_path}",
+                quiet=True
+            )
             self.log("  ✓ directory prepared")
 
-            # step 4: clone repository
+            # step 5: clone repository
             self.log_step("clone")
             self.ssh_cmd(
                 f"git clone -b {self.config.branch} {self.config.repo_url} {self.config.deploy_path}",
@@ -277,53 +353,23 @@ class HubDeployer:
                 self.ssh_cmd(f"mv /tmp/unibos_data_backup {data_dir}", quiet=True)
                 self.log("  ✓ data directory restored")
 
-            # step 5: setup venv
+            # step 6: setup venv
             self.log_step("venv")
             self.ssh_cmd(f"cd {self.config.web_dir} && python3 -m venv venv", quiet=True)
             self.log("  ✓ virtual environment created")
 
-            # step 6: install dependencies
-            self.log_step("deps")
-            self.ssh_cmd(
-                f"cd {self.config.web_dir} && "
-                f"./venv/bin/pip install --upgrade pip -q && "
-                f"./venv/bin/pip install -r requirements.txt -q",
-                quiet=True
-            )
-            self.log("  ✓ dependencies installed")
-
-            # step 7: install unibos cli
-            self.log_step("cli")
-            self.ssh_cmd(
-                f"cd {self.config.deploy_path} && "
-                f"{self.config.venv_path}/bin/pip install -e . -q",
-                quiet=True
-            )
-            self.log("  ✓ unibos-hub cli installed")
-
-            # step 8: create .env file
-            self.log_step("env")
-            self._create_env_file()
-            self.log("  ✓ environment file created")
-
-            # step 9: setup module registry
-            self.log_step("modules")
-            self._setup_modules()
+            # steps 7-12: dependencies, cli, env file, module registry, data
+            # directory and database, in concurrent lanes
+            self._finish_step()
+            self._db_exists = db_exists
+            self._run_lanes(self.CONCURRENT_LANES)
 
-            # step 10: setup data directory
-            self.log_step("data")
-            self._setup_data_directory()
-
-            # step 11: setup postgresql database
-            self.log_step("database")
-            self._setup_database()
-
-            # step 12: run migrations
+            # step 13: run migrations
             self.log_step("migrate")
             self._run_django_command("migrate --noinput")
             self.log("  ✓ migrations applied")
 
-            # step 13: collect static files
+            # step 14: collect static files
             self.log_step("static")
             self._run_django_command("collectstatic --noinput")
             # copy install.sh to staticfiles for https://recaria.org/install.sh
@@ -332,21 +378,25 @@ class HubDeployer:
             self.ssh_cmd(f"cp {install_src} {install_dst} 2>/dev/null || true", quiet=True)
             self.log("  ✓ static files collected")
 
-            # step 14: setup systemd
+            # step 15: setup systemd
             self.log_step("systemd")
             self._setup_systemd()
             self.log("  ✓ systemd service configured")
 
-            # step 15: start service
+            # step 16: start service
             self.log_step("start")
-            self.ssh_cmd(f"sudo systemctl daemon-reload", quiet=True)
-            self.ssh_cmd(f"sudo systemctl enable {self.config.service_name}", quiet=True)
-            self.ssh_cmd(f"sudo systemctl restart {self.config.service_name}", quiet=True)
+            self.ssh_cmd(
+                f"sudo systemctl daemon-reload && "
+                f"sudo systemctl enable {self.config.service_name} && "
+                f"sudo systemctl restart {self.config.service_name}",
+                quiet=True
+            )
             self.log("  ✓ service started")
 
-            # step 16: health check
+            # step 17: health check
             self.log_step("health")
             success = self._health_check()
+            self._finish_step()
 
             duration = time.time() - self.start_time
 
@@ -360,15 +410,57 @@ class HubDeployer:
             return result
 
         except subprocess.CalledProcessError as e:
+            self._finish_step()
             duration = time.time() - self.start_time if self.start_time else 0
             result = DeployResult(False, f"command failed: {e.cmd[:50]}...", e.stderr, duration=duration)
             self._save_deploy_log(result)
             return result
         except Exception as e:
+            self._finish_step()
             duration = time.time() - self.start_time if self.start_time else 0
             result = DeployResult(False, f"deployment error: {str(e)}", duration=duration)
             self._save_deploy_log(result)
             return result
+        finally:
+            self.remote.close()
+
+    # ========== concurrent steps ==========
+
+    def _step_deps(self) -> None:
+        self.log_step("deps")
+        self.ssh_cmd(
+            f"cd {self.config.web_dir} && "
+            f"./venv/bin/pip install --upgrade pip -q && "
+            f"./venv/bin/pip install -r requirements.txt -q",
+            quiet=True
+        )
+        self.log("  ✓ dependencies installed")
+
+    def _step_cli(self) -> None:
+        self.log_step("cli")
+        self.ssh_cmd(
+            f"cd {self.config.deploy_path} && "
+            f"{self.config.venv_path}/bin/pip install -e . -q",
+            quiet=True
+        )
+        self.log("  ✓ unibos-hub cli installed")
+
+    def _step_env(self) -> None:
+        self.log_step("env")
+        self._create_env_file()
+        self.log("  ✓ environment file created")
+
+    def _step_modules(self) -> None:
+        self.log_step("modules")
+        self._setup_modules()
+
+    def _step_data(self) -> None:
+        self.log_step("data")
+        self._setup_data_directory()
+
+    def _step_database(self) -> None:
+        self.log_step("database")
+        self._setup_database(self._db_exists)
 
     def _create_env_file(self) -> None:
         """create .env file on server"""
@@ -396,7 +488,7 @@ class HubDeployer:
             check=False, quiet=True
         )
 
-        enabled_count = 0
+        enabled = []
         if result.returncode == 0 and result.stdout:
             modules = result.stdout.strip().split('\n')
 
@@ -404,13 +496,15 @@ class HubDeployer:
                 if module and module != '__pycache__':
                     # enable all modules or only specified ones
                     if not self.config.enabled_modules or module in self.config.enabled_modules:
-                        self.ssh_cmd(
-                            f"touch {self.config.modules_dir}/{module}/.enabled",
-                            quiet=True
-                        )
-                        enabled_count += 1
+                        enabled.append(module)
 
-        self.log(f"  ✓ {enabled_count} modules enabled")
+        if enabled:
+            self.ssh_cmd(
+                "touch " + " ".join(f"{self.config.modules_dir}/{module}/.enabled" for module in enabled),
+                quiet=True
+            )
+
+        self.log(f"  ✓ {len(enabled)} modules enabled")
 
     def _setup_data_directory(self) -> None:
         """setup data directory structure"""
@@ -419,45 +513,39 @@ class HubDeployer:
         # create data directory and subdirectories
         subdirs = ['logs', 'media', 'cache', 'backups']
 
-        self.ssh_cmd(f"mkdir -p {data_dir}", quiet=True)
-
-        for subdir in subdirs:
-            self.ssh_cmd(f"mkdir -p {data_dir}/{subdir}", quiet=True)
-
-        # set proper ownership
-        self.ssh_cmd(f"chown -R {self.config.user}:{self.config.user} {data_dir}", quiet=True)
+        self.ssh_cmd(
+            f"mkdir -p {' '.join(f'{data_dir}/{subdir}' for subdir in subdirs)} && "
+            f"chown -R {self.config.user}:{self.config.user} {data_dir}",
+            quiet=True
+        )
         self.log(f"  ✓ data directories created ({', '.join(subdirs)})")
 
-    def _backup_database_before_deploy(self) -> Optional[str]:
+    def _database_exists_command(self) -> str:
+        """remote command printing 'exists' or 'not_exists' for the database"""
+        db_name = self.config.env_vars.get('DB_NAME', f'unibos_{self.config.name}')
+        return f"sudo -u postgres psql -lqt | cut -d \\| -f 1 | grep -qw {db_name} && echo 'exists' || echo 'not_exists'"
+
+    def _backup_database_before_deploy(self, db_exists: bool) -> Optional[str]:
         """
         backup database before deployment
         returns backup filename if successful, None if no db exists
         """
         db_name = self.config.env_vars.get('DB_NAME', f'unibos_{self.config.name}')
 
-        # check if database exists
-        check_db = self.ssh_cmd(
-            f"sudo -u postgres psql -lqt | cut -d \\| -f 1 | grep -qw {db_name} && echo 'exists' || echo 'not_exists'",
-            check=False, quiet=True
-        )
-
-        if 'not_exists' in check_db.stdout:
+        if not db_exists:
             return None  # no database to backup
 
         if self.dry_run:
             return f"[dry run] would backup {db_name}"
 
-        # create backups directory if needed
-        backup_dir = f"{self.config.data_dir}/backups"
-        self.ssh_cmd(f"mkdir -p {backup_dir}", check=False, quiet=True)
-
         # create timestamped backup with server name for clarity
+        backup_dir = f"{self.config.data_dir}/backups"
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_file = f"{backup_dir}/{self.config.name}_{db_name}_predeploy_{timestamp}.sql.gz"
 
-        # run pg_dump
+        # run pg_dump, creating the backups directory if needed
         result = self.ssh_cmd(
-            f"sudo -u postgres pg_dump {db_name} | gzip > {backup_file}",
+            f"mkdir -p {backup_dir}; sudo -u postgres pg_dump {db_name} | gzip > {backup_file}",
             check=False, quiet=True
         )
 
@@ -465,34 +553,22 @@ class HubDeployer:
             self.log(f"  ⚠ backup warning: {result.stderr[:100] if result.stderr else 'unknown error'}")
             return None
 
-        # set ownership
-        self.ssh_cmd(
-            f"chown {self.config.user}:{self.config.user} {backup_file}",
-            check=False, quiet=True
-        )
-
-        # get file size
+        # set ownership and get file size
         size_result = self.ssh_cmd(
-            f"ls -lh {backup_file} | awk '{{print $5}}'",
+            f"chown {self.config.user}:{self.config.user} {backup_file}; ls -lh {backup_file} | awk '{{print $5}}'",
             check=False, quiet=True
         )
         size = size_result.stdout.strip() if size_result.stdout else "unknown"
 
         return f"backup saved: {backup_file} ({size})"
 
-    def _setup_database(self) -> None:
+    def _setup_database(self, db_exists: bool) -> None:
         """setup postgresql database for this server"""
         db_name = self.config.env_vars.get('DB_NAME', f'unibos_{self.config.name}')
         db_user = self.config.env_vars.get('DB_USER', 'unibos')
         db_password = self.config.env_vars.get('DB_PASSWORD', 'unibos')
 
-        # check if database exists
-        check_db = self.ssh_cmd(
-            f"sudo -u postgres psql -lqt | cut -d \\| -f 1 | grep -qw {db_name} && echo 'exists' || echo 'not_exists'",
-            check=False, quiet=True
-        )
-
-        if 'not_exists' in check_db.stdout:
+        if not db_exists:
             self.log(f"  creating database: {db_name}")
 
             # create user if not exists
@@ -610,8 +686,6 @@ WantedBy=multi-user.target
 
     def _health_check(self) -> bool:
         """check if service is running and healthy"""
-        import time
-
         # in dry run mode, skip actual health check
         if self.dry_run:
             self.log("  [dry run] skipping health check")
@@ -619,23 +693,17 @@ WantedBy=multi-user.target
 
         # wait a moment for service to start
         self.log("  waiting for service...")
-        time.sleep(3)
+        time.sleep(self.HEALTH_CHECK_WAIT)
 
-        # check systemd status
-        result = self.ssh_cmd(
+        # check systemd status and http response in one round trip
+        result, http_result = self.ssh_probe(
             f"systemctl is-active {self.config.service_name}",
-            check=False, quiet=True
+            f"curl -s -o /dev/null -w '%{{http_code}}' http://127.0.0.1:{self.config.server_port}/api/system-status/health/ || echo 'failed'"
         )
 
         if result.stdout.strip() == 'active':
             self.log("  ✓ service is active")
 
-            # check http response
-            http_result = self.ssh_cmd(
-                f"curl -s -o /dev/null -w '%{{http_code}}' http://127.0.0.1:{self.config.server_port}/api/system-status/health/ || echo 'failed'",
-                check=False, quiet=True
-            )
-
             status_code = http_result.stdout.strip()
             self.log(f"  ✓ http status: {status_code}")
 
@@ -0,0 +1,145 @@
+"""
+UNIBOS Deploy Remote Shell
+Runs deploy commands over one multiplexed ssh connection
+
+open() starts an OpenSSH ControlMaster for the target; every command after
+that is a new session on the same connection instead of a new TCP and ssh
+handshake. The master is closed by close() and, should the deployer die,
+by ControlPersist once it has been idle. Where the master cannot be
+started, commands fall back to one connection each.
+
+Small read-only probes can share a single round trip:
+
+    with RemoteShell('ubuntu@hub', 22) as remote:
+        data_dir, db = remote.run_batch(["[ -d data ] && echo yes", "psql -lqt"])
+"""
+
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+SSH_OPTIONS = ['-o', 'StrictHostKeyChecking=no', '-o', 'BatchMode=yes']
+
+
+class RemoteShell:
+    """ssh command runner sharing one master connection"""
+
+    def __init__(
+        self,
+        target: str,
+        port: int = 22,
+        ssh_binary: str = 'ssh',
+        persist_seconds: int = 600,
+        multiplex: bool = True
+    ):
+        self.target = target
+        self.port = port
+        self.ssh_binary = ssh_binary
+        self.persist_seconds = persist_seconds
+        self.multiplex = multiplex
+        self.control_path: Optional[str] = None
+        self._control_dir: Optional[str] = None
+        self._lock = threading.Lock()
+        # ssh handshakes made: the master, plus every command run without one
+        self.connections = 0
+        self.commands = 0
+
+    def __enter__(self) -> 'RemoteShell':
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _ssh(self, *args: str) -> List[str]:
+        command = [self.ssh_binary, *SSH_OPTIONS, f'-p{self.port}']
+        if self.control_path:
+            command += ['-o', 'ControlMaster=no', '-o', f'ControlPath={self.control_path}']
+        return command + list(args)
+
+    def open(self) -> subprocess.CompletedProcess:
+        """start the master connection; commands run unshared if this fails"""
+        if not self.multiplex or self.control_path:
+            return subprocess.CompletedProcess([], 0, '', '')
+
+        # unix socket paths are short (~104 chars), keep it under /tmp
+        self._control_dir = tempfile.mkdtemp(prefix='unibos-ssh-')
+        control_path = str(Path(self._control_dir) / 'master')
+        command = [
+            self.ssh_binary, *SSH_OPTIONS, f'-p{self.port}',
+            '-o', 'ControlMaster=yes',
+            '-o', f'ControlPath={control_path}',
+            '-o', f'ControlPersist={self.persist_seconds}',
+            '-N', '-f', self.target
+        ]
+        # the backgrounded master keeps its stdio; a pipe here would never close
+        with tempfile.TemporaryFile(mode='w+') as stderr:
+            result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=stderr)
+            stderr.seek(0)
+            result = subprocess.CompletedProcess(command, result.returncode, '', stderr.read())
+        self.connections += 1
+
+        if result.returncode == 0:
+            self.control_path = control_path
+        else:
+            self._remove_control_dir()
+        return result
+
+    def close(self) -> None:
+        """stop the master connection"""
+        if self.control_path:
+            subprocess.run(
+                self._ssh('-O', 'exit', self.target),
+                stdin=subprocess.DEVNULL, capture_output=True, text=True
+            )
+            self.control_path = None
+        self._remove_control_dir()
+
+    def _remove_control_dir(self) -> None:
+        if self._control_dir:
+            shutil.rmtree(self._control_dir, ignore_errors=True)
+            self._control_dir = None
+
+    def run(self, command: str) -> subprocess.CompletedProcess:
+        """run a command on the remote server"""
+        with self._lock:
+            self.commands += 1
+            if not self.control_path:
+                self.connections += 1
+        return subprocess.run(
+            self._ssh(self.target, command),
+            stdin=subprocess.DEVNULL, capture_output=True, text=True
+        )
+
+    def run_batch(self, commands: Sequence[str]) -> List[subprocess.CompletedProcess]:
+        """
+        run read-only probes in one round trip
+        each result has its own stdout and exit code; stderr is discarded
+        """
+        marker = f"__unibos_{uuid.uuid4().hex}"
+        script = "; ".join(
+            f"( {command} ) 2>/dev/null; printf '\\n{marker} %s\\n' $?"
+            for command in commands
+        )
+        result = self.run(script)
+
+        # stdout is out1 \n marker rc1 \n out2 \n marker rc2 \n ...
+        chunks = result.stdout.split(f"\n{marker} ")
+        if len(chunks) != len(commands) + 1:
+            # the session itself failed
+            return [
+                subprocess.CompletedProcess(command, result.returncode or 255, '', result.stderr)
+                for command in commands
+            ]
+
+        results = []
+        stdout = chunks[0]
+        for command, chunk in zip(commands, chunks[1:]):
+            returncode, _, following = chunk.partition("\n")
+            results.append(subprocess.CompletedProcess(command, int(returncode), stdout, ''))
+            stdout = following
+        return results
@@ -0,0 +1,422 @@
+"""
+Earthquake alert pipeline
+
+Saving an earthquake never sends anything itself; it only queues a row:
+
+    save / ingest   -> EarthquakeAlertEvent (same transaction, one INSERT per batch)
+    dispatch task   -> match queued events against a precomputed subscription index
+                    -> coalesce each subscriber's matches into one message (digest)
+                    -> EarthquakeAlertDelivery rows, one per channel
+    delivery        -> push / e-mail with per-channel rate limits, retried with backoff
+
+Ingestion cost is therefore independent of the number of subscribers, and a
+failing channel only ever delays its own deliveries.
+"""
+
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.system.common.backend.ratelimit import SlidingWindowRateLimiter, parse_rate
+from modules.birlikteyiz.backend import spatial
+from modules.birlikteyiz.backend.models import (
+    EarthquakeAlertDelivery,
+    EarthquakeAlertEvent,
+    EarthquakeAlertSubscription,
+)
+from modules.birlikteyiz.backend.notification_service import notification_service
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_KEY = 'birlikteyiz:alert-index-version'
+KICK_KEY = 'birlikteyiz:alert-dispatch-scheduled'
+
+# Geohash precision of the subscription index (~156 x 156 km cells)
+INDEX_PRECISION = 3
+# Regions larger than this are cheaper to check than to bucket
+INDEX_MAX_RADIUS_KM = 1500
+
+DEFAULT_CHANNEL_RATES = {
+    EarthquakeAlertDelivery.CHANNEL_PUSH: '600/minute',
+    EarthquakeAlertDelivery.CHANNEL_EMAIL: '60/minute',
+}
+
+# Max magnitudes listed in a digest body
+DIGEST_LIST_LIMIT = 5
+
+
+def _setting(name, default):
+    return getattr(settings, f'BIRLIKTEYIZ_ALERT_{name}', default)
+
+
+# --- Enqueue -----------------------------------------------------------------
+
+def enqueue(earthquakes):
+    """
+    Queue new earthquakes for alert matching
+
+    Writes the queue rows in the caller's transaction, so a rolled back import
+    queues nothing, and schedules the dispatch task once it commits.
+    """
+    now = timezone.now()
+    max_age = timedelta(seconds=_setting('MAX_EVENT_AGE_SECONDS', 3600))
+    floor = Decimal(str(_setting('MIN_MAGNITUDE', 3.0)))
+
+    events = [
+        EarthquakeAlertEvent(earthquake_id=earthquake.pk, created_at=now)
+        for earthquake in earthquakes
+        # Old events (backfills, --full refetches) and micro quakes never alert
+        if earthquake.occurred_at >= now - max_age and Decimal(str(earthquake.magnitude)) >= floor
+    ]
+    if not events:
+        return 0
+
+    EarthquakeAlertEvent.objects.bulk_create(events)
+    transaction.on_commit(schedule_dispatch)
+    return len(events)
+
+
+def schedule_dispatch():
+    """Ask a worker to dispatch after the coalescing window, at most once per window"""
+    if not _setting('DISPATCH_ON_SAVE', True):
+        return
+    # Eager mode (no broker) would run the dispatch inline in the importer;
+    # the periodic beat entry picks the queue up instead
+    if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        return
+
+    countdown = _setting('COALESCE_SECONDS', 30)
+    if not cache.add(KICK_KEY, 1, timeout=max(1, countdown)):
+        return
+    try:
+        from modules.birlikteyiz.backend.tasks import dispatch_earthquake_alerts
+        dispatch_earthquake_alerts.apply_async(countdown=countdown)
+    except Exception as e:
+        cache.delete(KICK_KEY)
+        logger.warning(f"Could not schedule earthquake alert dispatch: {e}")
+
+
+# --- Subscription index --------------------------------------------------------
+
+class SubscriptionIndex:
+    """
+    Active subscriptions bucketed by geohash cell, each bucket sorted by
+    magnitude threshold
+
+    Matching an earthquake looks at one bucket plus the global list, and only
+    at subscriptions whose threshold the magnitude reaches.
+    """
+
+    def __init__(self, subscriptions, precision=INDEX_PRECISION):
+        self.precision = precision
+        cells = defaultdict(list)
+        global_subscriptions = []
+
+        for subscription in subscriptions:
+            if subscription.radius_km and subscription.center_lat is not None and subscription.center_lon is not None:
+                if subscription.radius_km <= INDEX_MAX_RADIUS_KM:
+                    bbox = spatial.radius_bbox(subscription.center_lat, subscription.center_lon, subscription.radius_km)
+                    for cell in spatial.cover_bbox(*bbox, max_cells=0, precision=precision):
+                        cells[cell].append(subscription)
+                    continue
+            global_subscriptions.append(subscription)
+
+        self.cells = {cell: self._bucket(subscriptions) for cell, subscriptions in cells.items()}
+        self.global_bucket = self._bucket(global_subscriptions)
+        self.size = len(subscriptions)
+
+    @staticmethod
+    def _bucket(subscriptions):
+        subscriptions = sorted(subscriptions, key=lambda subscription: subscription.min_magnitude)
+        return [subscription.min_magnitude for subscription in subscriptions], subscriptions
+
+    @staticmethod
+    def _eligible(bucket, magnitude):
+        thresholds, subscriptions = bucket
+        return subscriptions[:bisect.bisect_right(thresholds, magnitude)]
+
+    def match(self, earthquake):
+        """Subscriptions that should hear about this earthquake"""
+        magnitude = Decimal(str(earthquake.magnitude))
+        cell = (earthquake.geohash or spatial.geohash_encode(earthquake.latitude, earthquake.longitude))[:self.precision]
+
+        matches = []
+        for subscription in self._eligible(self.cells.get(cell, ([], [])), magnitude):
+            distance = spatial.haversine_km(
+                subscription.center_lat, subscription.center_lon, earthquake.latitude, earthquake.longitude
+            )
+            if distance <= subscription.radius_km:
+                matches.append(subscription)
+
+        for subscription in self._eligible(self.global_bucket, magnitude):
+            if subscription.radius_km and subscription.center_lat is not None and subscription.center_lon is not None:
+                distance = spatial.haversine_km(
+                    subscription.center_lat, subscription.center_lon, earthquake.latitude, earthquake.longitude
+                )
+                if distance > subscription.radius_km:
+                    continue
+            matches.append(subscription)
+        return matches
+
+
+_index_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def invalidate_subscription_index():
+    """Make every worker rebuild its index on the next dispatch"""
+    cache.set(INDEX_VERSION_KEY, timezone.now().timestamp(), None)
+
+
+def get_subscription_index():
+    """This process' index, rebuilt when subscriptions changed anywhere"""
+    global _index, _index_version
+
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        invalidate_subscription_index()
+        version = cache.get(INDEX_VERSION_KEY)
+
+    with _index_lock:
+        if _index is None or version != _index_version:
+            subscriptions = list(EarthquakeAlertSubscription.objects.filter(is_active=True).select_related('user'))
+            _index = SubscriptionIndex(subscriptions)
+            _index_version = version
+            logger.debug(f"Rebuilt earthquake alert index: {_index.size} subscriptions")
+        return _index
+
+
+# --- Dispatch ------------------------------------------------------------------
+
+def _earthquake_data(earthquake):
+    return {
+        'id': str(earthquake.id),
+        'magnitude': float(earthquake.magnitude),
+        'depth': float(earthquake.depth),
+        'latitude': float(earthquake.latitude),
+        'longitude': float(earthquake.longitude),
+        'location': earthquake.location,
+        'city': earthquake.city or '',
+        'source': earthquake.source,
+        'occurred_at': earthquake.occurred_at.isoformat(),
+    }
+
+
+def build_message(earthquakes):
+    """Title, body and payload for one earthquake or a digest of several"""
+    if len(earthquakes) == 1:
+        data = _earthquake_data(earthquakes[0])
+        title, body, _, _ = notification_service.format_alert(data)
+        return title, body, {'type': 'earthquake', 'earthquakes': [data]}
+
+    ordered = sorted(earthquakes, key=lambda earthquake: earthquake.magnitude, reverse=True)
+    strongest = ordered[0]
+    title = f"⚠️ {len(earthquakes)} deprem - en büyüğü {strongest.magnitude} {strongest.location}"
+    lines = [
+        f"M{earthquake.magnitude} {earthquake.location} ({earthquake.occurred_at:%H:%M})"
+        for earthquake in ordered[:DIGEST_LIST_LIMIT]
+    ]
+    if len(ordered) > DIGEST_LIST_LIMIT:
+        lines.append(f"+{len(ordered) - DIGEST_LIST_LIMIT} deprem daha")
+    payload = {
+        'type': 'earthquake_digest',
+        'earthquakes': [_earthquake_data(earthquake) for earthquake in ordered],
+    }
+    return title, '\n'.join(lines), payload
+
+
+def _claim_events(now, batch_size):
+    """Queued events that are due, locked against concurrent dispatchers"""
+    pending = EarthquakeAlertEvent.objects.filter(processed_at__isnull=True)
+    if connection.features.has_select_for_update_skip_locked:
+        pending = pending.select_for_update(skip_locked=True, of=('self',))
+    events = list(pending.select_related('earthquake').order_by('created_at')[:batch_size])
+    if not events:
+        return []
+
+    # Hold a burst (aftershock swarm) back until the window has passed, unless
+    # something in it is strong enough to go out right away
+    window_open = events[0].created_at > now - timedelta(seconds=_setting('COALESCE_SECONDS', 30))
+    urgent = Decimal(str(_setting('URGENT_MAGNITUDE', 5.0)))
+    if window_open and not any(event.earthquake.magnitude >= urgent for event in events):
+        return []
+    return events
+
+
+def dispatch_pending(now=None, batch_size=None):
+    """
+    Turn queued earthquakes into deliveries
+
+    Returns the number of deliveries created.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or _setting('DISPATCH_BATCH_SIZE', 1000)
+    index = get_subscription_index()
+
+    with transaction.atomic():
+        events = _claim_events(now, batch_size)
+        if not events:
+            return 0
+
+        matched = defaultdict(list)
+        subscriptions = {}
+        for event in events:
+            for subscription in index.match(event.earthquake):
+                matched[subscription.pk].append(event.earthquake)
+                subscriptions[subscription.pk] = subscription
+
+        deliveries = []
+        for subscription_id, earthquakes in matched.items():
+            subscription = subscriptions[subscription_id]
+            title, body, payload = build_message(earthquakes)
+            for channel in subscription.channels():
+                deliveries.append(EarthquakeAlertDelivery(
+                    subscription=subscription,
+                    channel=channel,
+                    title=title[:200],
+                    body=body,
+                    payload=payload,
+                    earthquake_count=len(earthquakes),
+                    next_attempt_at=now,
+                ))
+
+        EarthquakeAlertDelivery.objects.bulk_create(deliveries, batch_size=500)
+        if matched:
+            EarthquakeAlertSubscription.objects.filter(pk__in=list(matched)).update(last_notified_at=now)
+        EarthquakeAlertEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=now)
+
+    logger.info(
+        f"Dispatched {len(events)} earthquakes to {len(matched)} subscribers ({len(deliveries)} deliveries)"
+    )
+    return len(deliveries)
+
+
+# --- Delivery ------------------------------------------------------------------
+
+def _send_push(delivery):
+    subscription = delivery.subscription
+    earthquakes = delivery.payload.get('earthquakes', [])
+    if delivery.earthquake_count == 1 and earthquakes:
+        result = notification_service.send_earthquake_alert(earthquakes[0], device_tokens=[subscription.device_token])
+    else:
+        result = notification_service.send_message(
+            delivery.title, delivery.body, data=delivery.payload, device_tokens=[subscription.device_token]
+        )
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or result.get('message') or 'push failed')
+
+
+def _send_email(delivery):
+    subscription = delivery.subscription
+    recipient = subscription.email or (subscription.user.email if subscription.user else '')
+    send_mail(
+        delivery.title,
+        delivery.body,
+        getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        [recipient],
+        fail_silently=False,
+    )
+
+
+SENDERS = {
+    EarthquakeAlertDelivery.CHANNEL_PUSH: _send_push,
+    EarthquakeAlertDelivery.CHANNEL_EMAIL: _send_email,
+}
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base ... capped"""
+    base = _setting('RETRY_BASE_SECONDS', 60)
+    return timedelta(seconds=min(base * (2 ** (attempts - 1)), _setting('RETRY_MAX_SECONDS', 3600)))
+
+
+def _claim_deliveries(now, limit):
+    """
+    Due deliveries, leased to this worker
+
+    Claimed rows have next_attempt_at pushed CLAIM_SECONDS ahead before
+    anything is sent, so overlapping runs (beat and the post-import kick)
+    skip them. Each outcome sets next_attempt_at again; a worker that dies
+    mid-batch leaves its rows to be retried once the lease runs out.
+    """
+    with transaction.atomic():
+        due = EarthquakeAlertDelivery.objects.filter(status='pending', next_attempt_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True, of=('self',))
+        deliveries = list(
+            due.select_related('subscription', 'subscription__user').order_by('next_attempt_at')[:limit]
+        )
+        if deliveries:
+            EarthquakeAlertDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).update(
+                next_attempt_at=now + timedelta(seconds=_setting('CLAIM_SECONDS', 300))
+            )
+    return deliveries
+
+
+def deliver_due(now=None, limit=None, limiter=None, senders=None):
+    """
+    Send pending deliveries that are due
+
+    Each channel has its own rate limit; once a channel is exhausted its
+    remaining deliveries wait for the next window instead of failing.
+    Deliveries are claimed first, so concurrent runs never send one twice.
+    Returns counts per outcome.
+    """
+    now = now or timezone.now()
+    limit = limit or _setting('DELIVERY_BATCH_SIZE', 500)
+    limiter = limiter or SlidingWindowRateLimiter()
+    senders = senders or SENDERS
+    rates = {**DEFAULT_CHANNEL_RATES, **_setting('CHANNEL_RATES', {})}
+    max_attempts = _setting('MAX_ATTEMPTS', 5)
+
+    stats = {'sent': 0, 'retry': 0, 'failed': 0, 'deferred': 0}
+    deferred_until = {}
+    for delivery in _claim_deliveries(now, limit):
+        channel = delivery.channel
+        if channel in deferred_until:
+            delivery.next_attempt_at = deferred_until[channel]
+            delivery.save(update_fields=['next_attempt_at'])
+            stats['deferred'] += 1
+            continue
+
+        rate = parse_rate(rates.get(channel))
+        if rate:
+            result = limiter.hit(f'birlikteyiz-alert:{channel}', *rate)
+            if not result.allowed:
+                deferred_until[channel] = now + timedelta(seconds=result.reset)
+                delivery.next_attempt_at = deferred_until[channel]
+                delivery.save(update_fields=['next_attempt_at'])
+                stats['deferred'] += 1
+                continue
+
+        delivery.attempts += 1
+        try:
+            senders[channel](delivery)
+        except Exception as e:
+            delivery.last_error = str(e) or type(e).__name__
+            if delivery.attempts >= max_attempts:
+                delivery.status = 'failed'
+                stats['failed'] += 1
+                logger.error(f"Earthquake alert {delivery.pk} via {channel} failed for good: {e}")
+            else:
+                delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+                stats['retry'] += 1
+                logger.warning(f"Earthquake alert {delivery.pk} via {channel} failed, retrying: {e}")
+        else:
+            delivery.status = 'sent'
+            delivery.sent_at = now
+            delivery.last_error = None
+            stats['sent'] += 1
+        delivery.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    return stats
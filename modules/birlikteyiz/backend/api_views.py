@@ -7,6 +7,7 @@ from datetime import timedelta
 from django.db.models import Q
 
 from .models import Earthquake, EarthquakeDataSource, DisasterZone, MeshNode
+from . import spatial
 from .serializers import (
     EarthquakeSerializer,
     EarthquakeListSerializer,
@@ -25,6 +26,8 @@ class EarthquakeViewSet(viewsets.ReadOnlyModelViewSet):
     retrieve: Get single earthquake detail
     stats: Get earthquake statistics
     recent: Get recent earthquakes
+    nearby: Get the closest earthquakes to a point
+    clusters: Get map clusters for a zoom level
     """
 
     queryset = Earthquake.objects.all().order_by('-occurred_at')
@@ -69,6 +72,23 @@ class EarthquakeViewSet(viewsets.ReadOnlyModelViewSet):
                 Q(city__icontains=city) | Q(location__icontains=city)
             )
 
+        # Filter by bounding box (?bbox=min_lat,min_lon,max_lat,max_lon)
+        bbox = self.request.query_params.get('bbox', None)
+        if bbox:
+            try:
+                queryset = spatial.filter_bbox(queryset, *spatial.parse_bbox(bbox))
+            except ValueError:
+                pass
+
+        # Filter by distance (?lat=..&lon=..&radius_km=..)
+        point = self._parse_point(self.request.query_params)
+        radius_km = self.request.query_params.get('radius_km', None)
+        if point and radius_km:
+            try:
+                queryset = spatial.filter_radius(queryset, *point, float(radius_km))
+            except ValueError:
+                pass
+
         # Limit results for performance
         limit = self.request.query_params.get('limit', 100)
         try:
@@ -78,6 +98,17 @@ class EarthquakeViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset[:limit]
 
+    @staticmethod
+    def _parse_point(params):
+        """(lat, lon) from query params, or None"""
+        try:
+            lat, lon = float(params['lat']), float(params['lon'])
+        except (KeyError, ValueError):
+            return None
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None
+        return lat, lon
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get earthquake statistics"""
@@ -153,7 +184,17 @@ class EarthquakeViewSet(viewsets.ReadOnlyModelViewSet):
         earthquakes = Earthquake.objects.filter(
             occurred_at__gte=timezone.now() - timedelta(days=days),
             magnitude__gte=min_magnitude
-        ).order_by('-occurred_at')[:500]
+        )
+
+        # Restrict to the visible map area
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                earthquakes = spatial.filter_bbox(earthquakes, *spatial.parse_bbox(bbox))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        earthquakes = earthquakes.order_by('-occurred_at')[:500]
 
         # Lightweight data for map
         map_data = []
@@ -175,6 +216,73 @@ class EarthquakeViewSet(viewsets.ReadOnlyModelViewSet):
             'earthquakes': map_data
         })
 
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Get the closest earthquakes to a point, nearest first
+
+        GET /api/earthquakes/nearby/?lat=39.9&lon=32.8&limit=10&max_km=500&days=30
+        """
+        point = self._parse_point(request.query_params)
+        if not point:
+            return Response(
+                {'error': 'lat and lon are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+            max_km = float(request.query_params['max_km']) if request.query_params.get('max_km') else None
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'Invalid limit, max_km or days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Earthquake.objects.filter(occurred_at__gte=timezone.now() - timedelta(days=days))
+        earthquakes = spatial.nearest(queryset, *point, limit=limit, max_radius_km=max_km)
+
+        results = self.get_serializer(earthquakes, many=True).data
+        for item, earthquake in zip(results, earthquakes):
+            item['distance_km'] = round(earthquake.distance_km, 1)
+
+        return Response({
+            'count': len(results),
+            'results': results
+        })
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Get earthquakes clustered for a map zoom level
+
+        GET /api/earthquakes/clusters/?zoom=6&bbox=35,25,43,45&days=7&min_magnitude=2.5
+        """
+        try:
+            zoom = int(request.query_params.get('zoom', 5))
+            days = int(request.query_params.get('days', 7))
+            min_magnitude = float(request.query_params.get('min_magnitude', 0))
+        except ValueError:
+            return Response({'error': 'Invalid zoom, days or min_magnitude'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Earthquake.objects.filter(
+            occurred_at__gte=timezone.now() - timedelta(days=days),
+            magnitude__gte=min_magnitude
+        )
+
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                queryset = spatial.filter_bbox(queryset, *spatial.parse_bbox(bbox))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        clusters = spatial.clusters(queryset, zoom)
+        return Response({
+            'zoom': zoom,
+            'precision': spatial.zoom_precision(zoom),
+            'count': len(clusters),
+            'clusters': clusters
+        })
+
 
 class DataSourceViewSet(viewsets.ReadOnlyModelViewSet):
     """API endpoint for earthquake data sources"""
@@ -0,0 +1,190 @@
+"""
+Benchmark spatial earthquake queries
+Builds a synthetic catalog (clustered along fault zones plus global background
+seismicity), then times bbox, radius, nearest-N and cluster queries through
+the geohash index against the same queries answered by scanning lat/lon
+
+Usage: python manage.py benchmark_earthquake_spatial --events 1000000
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from modules.birlikteyiz.backend.models import Earthquake
+from modules.birlikteyiz.backend import spatial
+
+BENCH_PREFIX = 'BENCH_'
+
+# (lat, lon, spread in degrees, share of events)
+FAULT_ZONES = [
+    (39.5, 35.0, 3.0, 0.30),   # Anatolia
+    (38.0, 23.0, 2.0, 0.10),   # Aegean
+    (36.0, 140.0, 4.0, 0.15),  # Japan
+    (-20.0, -70.0, 6.0, 0.10), # Andes
+    (37.0, -120.0, 3.0, 0.10), # California
+    (55.0, -160.0, 5.0, 0.05), # Aleutians, near the antimeridian
+]
+
+INSERT_COLUMNS = [
+    'unique_id', 'source', 'source_id', 'magnitude', 'depth', 'latitude', 'longitude',
+    'geohash', 'location', 'occurred_at', 'fetched_at', 'is_felt', 'felt_reports',
+]
+
+# Query points: (label, lat, lon)
+QUERY_POINTS = [
+    ('istanbul', 41.01, 28.97),
+    ('tokyo', 35.68, 139.69),
+    ('mid-pacific', 0.0, -150.0),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark geohash-indexed spatial queries over a synthetic earthquake catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1000000, help='Synthetic events (default: 1000000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query, median reported (default: 5)')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic catalog afterwards')
+
+    def handle(self, *args, **options):
+        count = options['events']
+        self.repeat = options['repeat']
+
+        started = time.perf_counter()
+        self._build_catalog(count)
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {count:,} synthetic events in {time.perf_counter() - started:.1f}s'
+        ))
+
+        try:
+            catalog = Earthquake.objects.filter(unique_id__startswith=BENCH_PREFIX)
+            self._report_bbox(catalog)
+            self._report_radius(catalog)
+            self._report_nearest(catalog)
+            self._report_clusters(catalog)
+        finally:
+            if not options['keep']:
+                deleted, _ = Earthquake.objects.filter(unique_id__startswith=BENCH_PREFIX).delete()
+                self.stdout.write(f'Removed {deleted:,} synthetic events')
+
+    def _build_catalog(self, count):
+        rng = random.Random(7)
+        now = timezone.now()
+        rows = []
+        for i in range(count):
+            roll = rng.random()
+            for lat, lon, spread, share in FAULT_ZONES:
+                if roll < share:
+                    lat = max(-89.9, min(89.9, rng.gauss(lat, spread)))
+                    lon = (rng.gauss(lon, spread) + 180) % 360 - 180
+                    break
+                roll -= share
+            else:
+                lat = rng.uniform(-70, 70)
+                lon = rng.uniform(-180, 180)
+
+            rows.append((
+                f'{BENCH_PREFIX}{i}', 'BENCH', str(i),
+                round(min(9.5, 1.0 + rng.expovariate(1.2)), 1),
+                round(rng.uniform(1, 120), 2),
+                round(lat, 6), round(lon, 6),
+                spatial.geohash_encode(lat, lon),
+                'Synthetic', now - timedelta(seconds=rng.randint(0, 365 * 86400)), now, False, 0,
+            ))
+            if len(rows) >= 20000:
+                self._write_rows(rows)
+                rows = []
+                self.stdout.write(f'  {i + 1:,} / {count:,}', ending='\r')
+                self.stdout.flush()
+        if rows:
+            self._write_rows(rows)
+        self.stdout.write('')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Earthquake._meta.db_table}')
+
+    def _write_rows(self, rows):
+        table = Earthquake._meta.db_table
+        columns = ', '.join(INSERT_COLUMNS)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                from psycopg2.extras import execute_values
+                execute_values(cursor.cursor, f'INSERT INTO {table} ({columns}) VALUES %s', rows, page_size=5000)
+            else:
+                placeholders = ', '.join(['%s'] * len(INSERT_COLUMNS))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+    def _time(self, func):
+        samples = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return result, samples[len(samples) // 2]
+
+    def _line(self, label, rows, indexed_ms, scan_ms):
+        self.stdout.write(
+            f'  {label:<32} {rows:>7} rows  geohash {indexed_ms:8.2f}ms  '
+            f'scan {scan_ms:8.2f}ms  ({scan_ms / max(indexed_ms, 0.001):5.1f}x)'
+        )
+
+    def _report_bbox(self, catalog):
+        self.stdout.write('Bounding box:')
+        boxes = [
+            ('marmara 2x3 deg', (40.0, 26.5, 42.0, 29.5)),
+            ('turkiye 8x20 deg', (35.0, 25.0, 43.0, 45.0)),
+            ('aleutians across 180', (50.0, 170.0, 60.0, -170.0)),
+        ]
+        for label, bbox in boxes:
+            rows, indexed_ms = self._time(lambda: spatial.filter_bbox(catalog, *bbox).count())
+            _, scan_ms = self._time(lambda: self._scan_bbox(catalog, *bbox).count())
+            self._line(label, rows, indexed_ms, scan_ms)
+
+    def _scan_bbox(self, catalog, min_lat, min_lon, max_lat, max_lon):
+        queryset = catalog.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+        if min_lon > max_lon:
+            return queryset.filter(longitude__gte=min_lon) | queryset.filter(longitude__lte=max_lon)
+        return queryset.filter(longitude__gte=min_lon, longitude__lte=max_lon)
+
+    def _report_radius(self, catalog):
+        self.stdout.write('Radius 100 km:')
+        for label, lat, lon in QUERY_POINTS:
+            rows, indexed_ms = self._time(lambda: spatial.filter_radius(catalog, lat, lon, 100).count())
+            _, scan_ms = self._time(
+                lambda: catalog.annotate(distance_km=spatial.distance_expression(lat, lon))
+                .filter(distance_km__lte=100).count()
+            )
+            self._line(label, rows, indexed_ms, scan_ms)
+
+    def _report_nearest(self, catalog):
+        self.stdout.write('Nearest 10:')
+        for label, lat, lon in QUERY_POINTS:
+            rows, indexed_ms = self._time(lambda: spatial.nearest(catalog, lat, lon, limit=10))
+            _, scan_ms = self._time(
+                lambda: list(catalog.annotate(distance_km=spatial.distance_expression(lat, lon))
+                             .order_by('distance_km')[:10])
+            )
+            self._line(f'{label} (<= {rows[-1].distance_km:.0f} km)', len(rows), indexed_ms, scan_ms)
+
+    def _report_clusters(self, catalog):
+        self.stdout.write('Clusters (last 30 days):')
+        recent = catalog.filter(occurred_at__gte=timezone.now() - timedelta(days=30))
+        views = [
+            ('zoom 3 world', 3, None),
+            ('zoom 6 turkiye', 6, (35.0, 25.0, 43.0, 45.0)),
+            ('zoom 10 istanbul', 10, (40.8, 28.6, 41.3, 29.4)),
+        ]
+        for label, zoom, bbox in views:
+            queryset = spatial.filter_bbox(recent, *bbox) if bbox else recent
+            result, cluster_ms = self._time(lambda: spatial.clusters(queryset, zoom))
+            events = sum(cluster['count'] for cluster in result)
+            self.stdout.write(
+                f'  {label:<32} {events:>7} events -> {len(result):>5} clusters  {cluster_ms:8.2f}ms'
+            )
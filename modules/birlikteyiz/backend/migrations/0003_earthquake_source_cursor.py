@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('birlikteyiz', '0002_alter_earthquakedatasource_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='earthquakedatasource',
+            name='circuit_open_until',
+            field=models.DateTimeField(blank=True, help_text='Bu zamana kadar kaynak atlanır', null=True),
+        ),
+        migrations.AddField(
+            model_name='earthquakedatasource',
+            name='consecutive_failures',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='earthquakedatasource',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, help_text='Görülen en yeni deprem zamanı', null=True),
+        ),
+        migrations.AddField(
+            model_name='earthquakedatasource',
+            name='timeout_seconds',
+            field=models.IntegerField(default=15, help_text='İstek zaman aşımı (saniye)'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:02
+
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    """Compute the geohash of every existing earthquake"""
+    from modules.birlikteyiz.backend.spatial import geohash_encode
+
+    Earthquake = apps.get_model('birlikteyiz', 'Earthquake')
+    batch = []
+    for earthquake in Earthquake.objects.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        earthquake.geohash = geohash_encode(earthquake.latitude, earthquake.longitude)
+        batch.append(earthquake)
+        if len(batch) >= 2000:
+            Earthquake.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Earthquake.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('birlikteyiz', '0003_earthquake_source_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='earthquake',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('birlikteyiz', '0004_earthquake_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarthquakeAlertSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('center_lat', models.FloatField(blank=True, null=True)),
+                ('center_lon', models.FloatField(blank=True, null=True)),
+                ('radius_km', models.FloatField(blank=True, null=True)),
+                ('min_magnitude', models.DecimalField(decimal_places=1, default=4.0, max_digits=3)),
+                ('notify_push', models.BooleanField(default=True)),
+                ('notify_email', models.BooleanField(default=False)),
+                ('device_token', models.CharField(blank=True, max_length=255)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_notified_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='earthquake_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'birlikteyiz_alert_subscriptions',
+            },
+        ),
+        migrations.CreateModel(
+            name='EarthquakeAlertDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('push', 'Push'), ('email', 'E-posta')], max_length=10)),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('payload', models.JSONField(default=dict)),
+                ('earthquake_count', models.IntegerField(default=1)),
+                ('status', models.CharField(choices=[('pending', 'Bekliyor'), ('sent', 'Gönderildi'), ('failed', 'Başarısız')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='birlikteyiz.earthquakealertsubscription')),
+            ],
+            options={
+                'db_table': 'birlikteyiz_alert_deliveries',
+            },
+        ),
+        migrations.CreateModel(
+            name='EarthquakeAlertEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('earthquake', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_events', to='birlikteyiz.earthquake')),
+            ],
+            options={
+                'db_table': 'birlikteyiz_alert_events',
+                'indexes': [models.Index(fields=['processed_at', 'created_at'], name='birlikteyiz_process_217e0f_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='earthquakealertsubscription',
+            index=models.Index(fields=['is_active'], name='birlikteyiz_is_acti_33d160_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='earthquakealertdelivery',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='birlikteyiz_status_816369_idx'),
+        ),
+    ]
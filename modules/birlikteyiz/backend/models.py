@@ -449,6 +449,8 @@ class Earthquake(models.Model):
     depth = models.DecimalField(max_digits=6, decimal_places=2)  # km
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    # Mekansal indeks (GIS yerine geohash, bkz. spatial.py)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
     
     # Lokasyon
     location = models.CharField(max_length=255)
@@ -483,6 +485,19 @@ class Earthquake(models.Model):
     def __str__(self):
         return f"{self.magnitude} - {self.location} ({self.occurred_at})"
 
+    def update_geohash(self):
+        """Geohash'i koordinatlardan yeniden hesapla (bulk_create save() çağırmaz)"""
+        from .spatial import geohash_encode
+        self.geohash = geohash_encode(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.update_geohash()
+        # update_or_create yalnızca defaults alanlarını kaydeder; koordinatlar değişince geohash da yazılmalı
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
 
 class EarthquakeComment(models.Model):
     """Deprem hakkında kullanıcı yorumları"""
@@ -550,6 +565,12 @@ class EarthquakeDataSource(models.Model):
     # Performance
     avg_response_time = models.FloatField(null=True, blank=True, help_text="Ortalama yanıt süresi (saniye)")
     last_response_time = models.FloatField(null=True, blank=True, help_text="Son yanıt süresi (saniye)")
+    timeout_seconds = models.IntegerField(default=15, help_text="İstek zaman aşımı (saniye)")
+
+    # Incremental fetch cursor and circuit breaker
+    last_event_at = models.DateTimeField(null=True, blank=True, help_text="Görülen en yeni deprem zamanı")
+    consecutive_failures = models.IntegerField(default=0)
+    circuit_open_until = models.DateTimeField(null=True, blank=True, help_text="Bu zamana kadar kaynak atlanır")
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
@@ -580,6 +601,107 @@ class EarthquakeDataSource(models.Model):
         }
 
 
+class EarthquakeAlertSubscription(models.Model):
+    """Deprem bildirimi aboneliği: bölge + büyüklük eşiği + kanallar"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='earthquake_alerts')
+    name = models.CharField(max_length=100, blank=True)
+
+    # Bölge (merkez + yarıçap); yarıçap boşsa tüm dünya
+    center_lat = models.FloatField(null=True, blank=True)
+    center_lon = models.FloatField(null=True, blank=True)
+    radius_km = models.FloatField(null=True, blank=True)
+    min_magnitude = models.DecimalField(max_digits=3, decimal_places=1, default=4.0)
+
+    # Kanallar
+    notify_push = models.BooleanField(default=True)
+    notify_email = models.BooleanField(default=False)
+    device_token = models.CharField(max_length=255, blank=True)
+    email = models.EmailField(blank=True)
+
+    is_active = models.BooleanField(default=True)
+    last_notified_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'birlikteyiz_alert_subscriptions'
+        indexes = [
+            models.Index(fields=['is_active']),
+        ]
+
+    def __str__(self):
+        region = f"{self.radius_km} km" if self.radius_km else 'global'
+        return f"{self.name or self.user} (M{self.min_magnitude}+, {region})"
+
+    def channels(self):
+        """Bu abonelik için teslimat kanalları"""
+        channels = []
+        if self.notify_push and self.device_token:
+            channels.append(EarthquakeAlertDelivery.CHANNEL_PUSH)
+        if self.notify_email and (self.email or (self.user and self.user.email)):
+            channels.append(EarthquakeAlertDelivery.CHANNEL_EMAIL)
+        return channels
+
+
+class EarthquakeAlertEvent(models.Model):
+    """Bildirim kuyruğu: kaydedilen her yeni deprem için hafif bir kayıt"""
+
+    earthquake = models.ForeignKey(Earthquake, on_delete=models.CASCADE, related_name='alert_events')
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'birlikteyiz_alert_events'
+        indexes = [
+            models.Index(fields=['processed_at', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Alert event for {self.earthquake_id}"
+
+
+class EarthquakeAlertDelivery(models.Model):
+    """Bir aboneye bir kanaldan gönderilecek (tekil veya özet) bildirim"""
+
+    CHANNEL_PUSH = 'push'
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_CHOICES = [
+        (CHANNEL_PUSH, 'Push'),
+        (CHANNEL_EMAIL, 'E-posta'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Bekliyor'),
+        ('sent', 'Gönderildi'),
+        ('failed', 'Başarısız'),
+    ]
+
+    subscription = models.ForeignKey(EarthquakeAlertSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    payload = models.JSONField(default=dict)
+    earthquake_count = models.IntegerField(default=1)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'birlikteyiz_alert_deliveries'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.channel}: {self.title} ({self.status})"
+
+
 class CronJob(models.Model):
     """Cron job takibi için genel model"""
     
@@ -30,22 +30,13 @@ class NotificationService:
         except ImportError:
             logger.warning("firebase-admin not installed. Notifications disabled.")
 
-    def send_earthquake_alert(
-        self,
-        earthquake_data: dict,
-        device_tokens: Optional[List[str]] = None
-    ) -> dict:
+    def format_alert(self, earthquake_data: dict) -> tuple:
         """
-        Send earthquake alert to registered devices
-
-        Args:
-            earthquake_data: Dictionary with earthquake details
-            device_tokens: List of FCM device tokens (optional for testing)
+        Build the notification text for one earthquake
 
         Returns:
-            dict with success status and message count
+            (title, body, priority, color)
         """
-
         magnitude = earthquake_data.get('magnitude', 0)
         location = earthquake_data.get('location', 'Bilinmeyen')
         depth = earthquake_data.get('depth', 0)
@@ -69,6 +60,56 @@ class NotificationService:
             color = '#00ff00'  # Green
 
         body = f"{location}\nderinlik: {depth} km"
+        return title, body, priority, color
+
+    def send_message(
+        self,
+        title: str,
+        body: str,
+        data: Optional[dict] = None,
+        device_tokens: Optional[List[str]] = None,
+        priority: str = 'high'
+    ) -> dict:
+        """
+        Send a prepared notification (e.g. an aftershock digest) to devices
+
+        Returns:
+            dict with success status and message count
+        """
+        logger.info(f"Earthquake Notification: {title} - {body}")
+
+        if not self.enabled:
+            return {
+                'success': True,
+                'sent': 0,
+                'failed': 0,
+                'message': 'Demo mode - notification logged but not sent'
+            }
+
+        return {
+            'success': True,
+            'sent': 0,
+            'failed': 0,
+            'message': 'Firebase Admin SDK not configured'
+        }
+
+    def send_earthquake_alert(
+        self,
+        earthquake_data: dict,
+        device_tokens: Optional[List[str]] = None
+    ) -> dict:
+        """
+        Send earthquake alert to registered devices
+
+        Args:
+            earthquake_data: Dictionary with earthquake details
+            device_tokens: List of FCM device tokens (optional for testing)
+
+        Returns:
+            dict with success status and message count
+        """
+
+        title, body, priority, color = self.format_alert(earthquake_data)
 
         # Log the notification (for testing without FCM)
         logger.info(f"Earthquake Alert: {title} - {body}")
@@ -91,9 +132,9 @@ class NotificationService:
                 ),
                 data={
                     'type': 'earthquake',
-                    'magnitude': str(magnitude),
-                    'location': location,
-                    'depth': str(depth),
+                    'magnitude': str(earthquake_data.get('magnitude', 0)),
+                    'location': earthquake_data.get('location', 'Bilinmeyen'),
+                    'depth': str(earthquake_data.get('depth', 0)),
                     'latitude': str(earthquake_data.get('latitude', 0)),
                     'longitude': str(earthquake_data.get('longitude', 0)),
                     'occurred_at': earthquake_data.get('occurred_at', ''),
@@ -0,0 +1,727 @@
+"""
+Earthquake Ingestion Engine
+Fetches every configured provider concurrently and stores new events in one batch
+
+    providers (threads: HTTP + parse) --> in-memory dedup --> bulk_create
+
+Each source keeps a high-water mark (EarthquakeDataSource.last_event_at) so
+only events newer than the last one seen are requested, and a circuit
+breaker so a provider that keeps failing is skipped for a cool-down period
+instead of slowing every run down. Sources that cap their responses are
+asked for the oldest events first and paged from the last event received,
+so a full page never hides the events behind it.
+
+Providers only turn a response body into event dicts; the network call goes
+through a transport callable, so recorded payloads can be replayed offline.
+"""
+
+import bisect
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytz
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.utils import timezone
+
+from modules.birlikteyiz.backend import alerts
+from modules.birlikteyiz.backend.models import Earthquake, EarthquakeDataSource
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+TURKEY_TZ = pytz.timezone('Europe/Istanbul')
+
+# Turkey-only sources are created with a geographic filter
+TURKEY_BOUNDS = {
+    'filter_min_lat': Decimal('35.0'),
+    'filter_max_lat': Decimal('43.0'),
+    'filter_min_lon': Decimal('25.0'),
+    'filter_max_lon': Decimal('45.0'),
+}
+
+
+def http_transport(url, params=None, headers=None, timeout=15, encoding=None):
+    """Default transport: GET the url and return the response body"""
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    if encoding:
+        response.encoding = encoding
+    return response.text
+
+
+class ReplayTransport:
+    """
+    Serve recorded provider payloads from a directory instead of the network
+
+    Files are named after the provider in lower case with any extension,
+    e.g. kandilli.html, afad.json, iris.txt.
+    """
+
+    def __init__(self, directory):
+        self.files = {path.stem.upper(): path for path in Path(directory).iterdir() if path.is_file()}
+        self.requests = []
+
+    def __call__(self, url, params=None, headers=None, timeout=15, encoding=None):
+        name = next((provider.name for provider in PROVIDERS.values() if provider.url == url), None)
+        self.requests.append((name, params))
+        if name not in self.files:
+            raise requests.exceptions.ConnectionError(f'No recorded payload for {name or url}')
+        return self.files[name].read_text(encoding='utf-8')
+
+
+def _decimal(value, default=0):
+    return Decimal(str(value if value not in (None, '') else default))
+
+
+def _parse_utc(value):
+    """Parse an ISO timestamp that is in UTC whether or not it says so"""
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _within_bounds(lat, lon, bounds):
+    if not bounds or not all(value is not None for value in bounds.values()):
+        return True
+    return bounds['min_lat'] <= lat <= bounds['max_lat'] and bounds['min_lon'] <= lon <= bounds['max_lon']
+
+
+# =============================================================================
+# PROVIDERS
+# =============================================================================
+
+class Provider:
+    """
+    One upstream earthquake catalogue
+
+    Subclasses describe the request for events since a point in time and
+    parse the response body into Earthquake field dicts.
+    """
+    name = None
+    url = None
+    description = ''
+    turkey_only = False
+    encoding = None
+    paged = False  # Takes a limit; requests ask for the oldest events first
+
+    def source_defaults(self):
+        """Defaults for the EarthquakeDataSource row created on first use"""
+        defaults = {
+            'url': self.url,
+            'is_active': True,
+            'fetch_interval_minutes': 5,
+            'min_magnitude': Decimal('2.5'),
+            'max_results': 100,
+            'use_geographic_filter': self.turkey_only,
+            'filter_region_name': 'Türkiye' if self.turkey_only else 'Küresel',
+            'description': self.description,
+        }
+        if self.turkey_only:
+            defaults.update(TURKEY_BOUNDS)
+        return defaults
+
+    def page_size(self, source):
+        """Most events one request returns, None when the source takes no limit"""
+        return (source.max_results or 100) if self.paged else None
+
+    def build_request(self, source, since, now):
+        """Return (url, params, headers) for events at or after `since`"""
+        return self.url, None, {'User-Agent': USER_AGENT, 'Connection': 'close'}
+
+    def parse(self, body, source):
+        raise NotImplementedError
+
+
+class KandilliProvider(Provider):
+    """Kandilli publishes a fixed-width text list in a <pre>, no query params"""
+    name = 'KANDILLI'
+    url = 'http://www.koeri.boun.edu.tr/scripts/lst5.asp'
+    description = 'Boğaziçi Üniversitesi Kandilli Rasathanesi ve Deprem Araştırma Enstitüsü - Türkiye deprem verileri'
+    turkey_only = True
+    encoding = 'windows-1254'  # Turkish encoding
+
+    def parse(self, body, source):
+        pre_element = BeautifulSoup(body, 'html.parser').find('pre')
+        if not pre_element:
+            raise ValueError('Could not find PRE element in HTML')
+
+        events = []
+        data_started = False
+        for line in pre_element.text.split('\n'):
+            # Data starts after the separator line
+            if '------' in line and not data_started:
+                data_started = True
+                continue
+            if not data_started or not line.strip():
+                continue
+
+            # Date Time Lat Lon Depth MD ML MW Location...
+            parts = line.split()
+            if len(parts) < 7:
+                continue
+            date_str, time_str, lat, lon, depth = parts[:5]
+
+            # First available of MD, ML, MW
+            magnitude = None
+            for column in parts[5:8]:
+                if column != '-.-':
+                    try:
+                        magnitude = float(column)
+                        break
+                    except ValueError:
+                        continue
+            if not magnitude:
+                continue
+
+            try:
+                occurred_at = TURKEY_TZ.localize(
+                    datetime.strptime(f"{date_str} {time_str}", "%Y.%m.%d %H:%M:%S")
+                )
+                location = ' '.join(parts[8:]) if len(parts) > 8 else 'Unknown'
+                events.append({
+                    'unique_id': f"KANDILLI_{date_str}_{time_str}_{lat}_{lon}",
+                    'source': self.name,
+                    'magnitude': _decimal(magnitude),
+                    'depth': _decimal(depth),
+                    'latitude': _decimal(lat),
+                    'longitude': _decimal(lon),
+                    'location': location.replace('�lk sel', 'İlksel'),  # Fix encoding
+                    'occurred_at': occurred_at,
+                    'raw_data': {'original_line': line},
+                })
+            except (ValueError, ArithmeticError):
+                continue
+        return events
+
+
+class AfadProvider(Provider):
+    name = 'AFAD'
+    url = 'https://servisnet.afad.gov.tr/apigateway/deprem/apiv2/event/filter'
+    description = 'Afet ve Acil Durum Yönetimi Başkanlığı - Türkiye resmi deprem verileri'
+    turkey_only = True
+    paged = True
+
+    def build_request(self, source, since, now):
+        params = {
+            'start': timezone.localtime(since).strftime('%Y-%m-%dT%H:%M:%S'),
+            'end': timezone.localtime(now).strftime('%Y-%m-%dT%H:%M:%S'),
+            'minmag': float(source.min_magnitude) if source.min_magnitude else 2.0,
+            'orderby': 'time',  # Oldest first (the default is timedesc)
+            'limit': self.page_size(source),
+        }
+        headers = {'User-Agent': USER_AGENT, 'Accept': 'application/json', 'Connection': 'close'}
+        return self.url, params, headers
+
+    def parse(self, body, source):
+        data = json.loads(body)
+        # Handle both array and object responses
+        records = data if isinstance(data, list) else data.get('data', [])
+
+        events = []
+        for record in records:
+            event_id = record.get('eventID') or record.get('id')
+            if not event_id:
+                continue
+            date_str = record.get('date') or record.get('eventDate') or record.get('time')
+            if not date_str:
+                continue
+            try:
+                occurred_at = timezone.make_aware(
+                    datetime.fromisoformat(date_str.replace('Z', '').replace('+00:00', ''))
+                )
+                events.append({
+                    'unique_id': f"AFAD_{event_id}",
+                    'source': self.name,
+                    'source_id': str(event_id),
+                    'magnitude': _decimal(record.get('magnitude', record.get('mag'))),
+                    'depth': _decimal(record.get('depth')),
+                    'latitude': _decimal(record.get('latitude', record.get('lat'))),
+                    'longitude': _decimal(record.get('longitude', record.get('lon'))),
+                    'location': record.get('location') or record.get('place') or 'Unknown',
+                    'city': record.get('province', record.get('city')),
+                    'district': record.get('district'),
+                    'occurred_at': occurred_at,
+                    'raw_data': record,
+                })
+            except (ValueError, ArithmeticError) as e:
+                logger.debug(f"Skipping AFAD event {event_id}: {e}")
+        return events
+
+
+class FDSNTextProvider(Provider):
+    """FDSN event web service, pipe-separated text format"""
+    paged = True
+
+    def build_request(self, source, since, now):
+        params = {
+            'format': 'text',
+            'minmag': float(source.min_magnitude) if source.min_magnitude else 3.0,
+            'starttime': since.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+            'orderby': 'time-asc',
+            'limit': self.page_size(source),
+        }
+        bounds = source.get_geographic_bounds()
+        if bounds and all(bounds.values()):
+            params.update({
+                'minlat': bounds['min_lat'],
+                'maxlat': bounds['max_lat'],
+                'minlon': bounds['min_lon'],
+                'maxlon': bounds['max_lon'],
+            })
+        return self.url, params, {'User-Agent': USER_AGENT, 'Connection': 'close'}
+
+    def parse(self, body, source):
+        events = []
+        for line in body.strip().split('\n'):
+            if not line.strip() or line.startswith('#'):
+                continue
+            # EventID|Time|Latitude|Longitude|Depth|Author|Catalog|Contributor|
+            # ContributorID|MagType|Magnitude|MagAuthor|EventLocationName
+            parts = line.split('|')
+            if len(parts) < 13:
+                continue
+            try:
+                event_id = parts[0].strip()
+                events.append({
+                    'unique_id': f"{self.name}_{event_id}",
+                    'source': self.name,
+                    'source_id': event_id,
+                    'magnitude': _decimal(parts[10].strip()),
+                    'depth': _decimal(parts[4].strip()),
+                    'latitude': _decimal(parts[2].strip()),
+                    'longitude': _decimal(parts[3].strip()),
+                    'location': parts[12].strip() or 'Unknown',
+                    'occurred_at': _parse_utc(parts[1]),
+                    'raw_data': {'original_line': line},
+                })
+            except (ValueError, ArithmeticError):
+                continue
+        return events
+
+
+class IrisProvider(FDSNTextProvider):
+    """Incorporated Research Institutions for Seismology - global data"""
+    name = 'IRIS'
+    url = 'http://service.iris.edu/fdsnws/event/1/query'
+    description = 'Incorporated Research Institutions for Seismology - Küresel deprem verileri'
+
+
+class GfzProvider(FDSNTextProvider):
+    """German Research Centre for Geosciences - European data"""
+    name = 'GFZ'
+    url = 'https://geofon.gfz-potsdam.de/fdsnws/event/1/query'
+    description = 'German Research Centre for Geosciences - Avrupa deprem verileri'
+
+
+class UsgsProvider(Provider):
+    """USGS FDSN event service (GeoJSON); same event ids as the summary feeds"""
+    name = 'USGS'
+    url = 'https://earthquake.usgs.gov/fdsnws/event/1/query'
+    description = 'United States Geological Survey - Küresel deprem verileri'
+    paged = True
+
+    def build_request(self, source, since, now):
+        params = {
+            'format': 'geojson',
+            'starttime': since.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+            'minmagnitude': float(source.min_magnitude) if source.min_magnitude else 2.5,
+            'orderby': 'time-asc',
+            'limit': self.page_size(source),
+        }
+        return self.url, params, {'User-Agent': USER_AGENT}
+
+    def parse(self, body, source):
+        bounds = source.get_geographic_bounds()
+        events = []
+        for feature in json.loads(body).get('features', []):
+            try:
+                props = feature['properties']
+                lon, lat, depth = feature['geometry']['coordinates'][:3]
+                if props.get('mag') is None or not _within_bounds(lat, lon, bounds):
+                    continue
+                events.append({
+                    'unique_id': f"USGS_{feature['id']}",
+                    'source': self.name,
+                    'source_id': feature['id'],
+                    'magnitude': _decimal(props['mag']),
+                    'depth': _decimal(depth),
+                    'latitude': _decimal(lat),
+                    'longitude': _decimal(lon),
+                    'location': props.get('place') or 'Unknown',
+                    'occurred_at': datetime.fromtimestamp(props['time'] / 1000, tz=dt_timezone.utc),
+                    'intensity': props.get('mmi'),
+                    'felt_reports': props.get('felt') or 0,  # Handle None values
+                    'raw_data': feature,
+                })
+            except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                logger.debug(f"Skipping USGS event: {e}")
+        return events
+
+
+class EmscProvider(Provider):
+    """
+    EMSC SeismicPortal FDSN service (GeoJSON)
+
+    Catches up on whatever the WebSocket listener missed; unique ids match
+    the listener's, so events it already stored are skipped.
+    """
+    name = 'EMSC'
+    url = 'https://www.seismicportal.eu/fdsnws/event/1/query'
+    description = 'European-Mediterranean Seismological Centre - Gerçek zamanlı küresel deprem verileri (WebSocket)'
+    paged = True
+
+    def build_request(self, source, since, now):
+        params = {
+            'format': 'json',
+            'start': since.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+            'minmag': float(source.min_magnitude) if source.min_magnitude else 2.5,
+            'orderby': 'time-asc',
+            'limit': self.page_size(source),
+        }
+        return self.url, params, {'User-Agent': USER_AGENT}
+
+    def parse(self, body, source):
+        bounds = source.get_geographic_bounds()
+        events = []
+        for feature in json.loads(body).get('features', []):
+            try:
+                props = feature['properties']
+                lon, lat, depth = feature['geometry']['coordinates'][:3]
+                if props.get('mag') is None or not _within_bounds(lat, lon, bounds):
+                    continue
+                unid = props.get('unid') or feature.get('id')
+                events.append({
+                    'unique_id': f"EMSC_{unid}",
+                    'source': self.name,
+                    'source_id': unid,
+                    'magnitude': _decimal(props['mag']),
+                    'depth': _decimal(abs(depth)),
+                    'latitude': _decimal(lat),
+                    'longitude': _decimal(lon),
+                    'location': props.get('flynn_region') or 'Unknown Region',
+                    'occurred_at': _parse_utc(props['time']),
+                    'raw_data': feature,
+                })
+            except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                logger.debug(f"Skipping EMSC event: {e}")
+        return events
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (
+        KandilliProvider(), AfadProvider(), IrisProvider(),
+        UsgsProvider(), GfzProvider(), EmscProvider(),
+    )
+}
+
+
+# =============================================================================
+# DEDUPLICATION
+# =============================================================================
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance (haversine)"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def deduplicate(events, existing=()):
+    """
+    Drop events that are already known or reported by another source
+
+    An event is a cross-source duplicate when another source reports one
+    within BIRLIKTEYIZ_DEDUP_TIME_SECONDS, BIRLIKTEYIZ_DEDUP_DISTANCE_KM and
+    BIRLIKTEYIZ_DEDUP_MAGNITUDE of it. Among duplicates in the batch the
+    source listed first in BIRLIKTEYIZ_SOURCE_PRIORITY wins; `existing`
+    (events already stored) always win.
+
+    Returns (unique events, number of duplicates dropped).
+    """
+    time_tolerance = getattr(settings, 'BIRLIKTEYIZ_DEDUP_TIME_SECONDS', 60)
+    distance_tolerance = getattr(settings, 'BIRLIKTEYIZ_DEDUP_DISTANCE_KM', 50)
+    magnitude_tolerance = getattr(settings, 'BIRLIKTEYIZ_DEDUP_MAGNITUDE', 0.6)
+    priority = getattr(settings, 'BIRLIKTEYIZ_SOURCE_PRIORITY', list(PROVIDERS))
+
+    def rank(source):
+        return priority.index(source) if source in priority else len(priority)
+
+    # Kept events, sorted by origin time: (timestamp, seq, event, is_existing)
+    kept = []
+    seen_ids = set()
+    for seq, event in enumerate(existing):
+        seen_ids.add(event['unique_id'])
+        bisect.insort(kept, (event['occurred_at'].timestamp(), -1 - seq, event, True))
+
+    duplicates = 0
+    ordered = sorted(events, key=lambda event: rank(event['source']))
+    for seq, event in enumerate(ordered):
+        if event['unique_id'] in seen_ids:
+            duplicates += 1
+            continue
+
+        stamp = event['occurred_at'].timestamp()
+        lat, lon, mag = float(event['latitude']), float(event['longitude']), float(event['magnitude'])
+        low = bisect.bisect_left(kept, (stamp - time_tolerance,))
+        high = bisect.bisect_right(kept, (stamp + time_tolerance, float('inf')))
+
+        match = None
+        for _, _, other, is_existing in kept[low:high]:
+            if other['source'] == event['source']:
+                continue
+            if abs(float(other['magnitude']) - mag) > magnitude_tolerance:
+                continue
+            if _distance_km(lat, lon, float(other['latitude']), float(other['longitude'])) > distance_tolerance:
+                continue
+            match = other
+            break
+
+        if match is not None:
+            duplicates += 1
+            # Higher priority sources were placed first, so the kept event wins
+            if isinstance(match.get('raw_data'), dict):
+                match['raw_data'].setdefault('also_reported_by', []).append(event['unique_id'])
+            continue
+
+        seen_ids.add(event['unique_id'])
+        bisect.insort(kept, (stamp, seq, event, False))
+
+    unique = [event for _, _, event, is_existing in kept if not is_existing]
+    return unique, duplicates
+
+
+# =============================================================================
+# INGESTOR
+# =============================================================================
+
+class EarthquakeIngestor:
+    """
+    Fetch providers concurrently and store new events in one bulk insert
+
+    Worker threads only do HTTP and parsing; every database read and write
+    happens on the calling thread.
+    """
+
+    # Extra seconds past the slowest source timeout before giving up on it
+    deadline_grace = 5
+
+    def __init__(self, providers=None, transport=None, clock=None):
+        self.providers = providers or PROVIDERS
+        self.transport = transport or http_transport
+        self.clock = clock or timezone.now
+
+    def run(self, only=None, full=False):
+        """
+        Fetch `only` (a list of source names) or every provider
+
+        With `full` the per-source cursors are ignored and the initial
+        lookback window is fetched again.
+        """
+        now = self.clock()
+        names = [name for name in self.providers if not only or name in only]
+        sources = self._load_sources(names)
+        report = {'sources': {}, 'new': 0, 'duplicates': 0}
+
+        jobs = {}
+        for name in names:
+            source = sources[name]
+            if not source.is_active:
+                report['sources'][name] = {'status': 'inactive'}
+            elif source.circuit_open_until and source.circuit_open_until > now:
+                report['sources'][name] = {'status': 'circuit_open', 'until': source.circuit_open_until}
+            else:
+                jobs[name] = self._cursor(source, now, full)
+
+        results = self._fetch_all(sources, jobs, now)
+
+        fetched = []
+        for name, result in results.items():
+            if result['status'] == 'ok':
+                fetched.extend(result['events'])
+
+        created = self._store(fetched, report) if fetched else {}
+
+        for name, result in results.items():
+            self._update_source(sources[name], result, created.get(name, 0), now)
+            report['sources'][name] = {
+                'status': result['status'],
+                'fetched': len(result.get('events', [])),
+                'new': created.get(name, 0),
+                'elapsed': result['elapsed'],
+                'error': result.get('error'),
+            }
+
+        # Report in provider order rather than completion order
+        report['sources'] = {name: report['sources'][name] for name in names}
+        return report
+
+    def _load_sources(self, names):
+        sources = {source.name: source for source in EarthquakeDataSource.objects.filter(name__in=names)}
+        for name in names:
+            if name not in sources:
+                sources[name] = EarthquakeDataSource.objects.create(
+                    name=name, **self.providers[name].source_defaults()
+                )
+                logger.info(f"Created earthquake data source: {name}")
+        return sources
+
+    def _cursor(self, source, now, full):
+        """Fetch events from here on: the high-water mark minus a small overlap"""
+        if source.last_event_at and not full:
+            overlap = getattr(settings, 'BIRLIKTEYIZ_FETCH_OVERLAP_MINUTES', 15)
+            return source.last_event_at - timedelta(minutes=overlap)
+        lookback = getattr(settings, 'BIRLIKTEYIZ_FETCH_INITIAL_LOOKBACK_DAYS', 7)
+        return now - timedelta(days=lookback)
+
+    def _fetch_one(self, provider, source, since, now):
+        """
+        Events since `since`, paging on while a capped source returns full pages
+
+        Pages come oldest first, so every event up to the newest one returned
+        has been seen even when BIRLIKTEYIZ_FETCH_MAX_PAGES stops the paging;
+        the next run carries on from there.
+        """
+        started = time.monotonic()
+        page_size = provider.page_size(source)
+        events = []
+        for _ in range(getattr(settings, 'BIRLIKTEYIZ_FETCH_MAX_PAGES', 10)):
+            url, params, headers = provider.build_request(source, since, now)
+            body = self.transport(
+                url, params=params, headers=headers,
+                timeout=source.timeout_seconds, encoding=provider.encoding,
+            )
+            parsed = provider.parse(body, source)
+            page = [event for event in parsed if event['occurred_at'] >= since]
+            events.extend(page)
+            if not page_size or len(parsed) < page_size:
+                break
+            newest = max((event['occurred_at'] for event in page), default=since)
+            if newest <= since:
+                break  # A full page within one second; paging can't get past it
+            since = newest
+        else:
+            logger.info(f"Earthquake source {provider.name} still has more events; continuing next run")
+        return events, time.monotonic() - started
+
+    def _fetch_all(self, sources, jobs, now):
+        """Run every job in its own thread; a slow source only times itself out"""
+        if not jobs:
+            return {}
+
+        results = {}
+        # requests' timeout bounds each read; the deadline also bounds slow trickles
+        deadline = max(sources[name].timeout_seconds for name in jobs) + self.deadline_grace
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix='earthquake-fetch')
+        try:
+            futures = {
+                executor.submit(self._fetch_one, self.providers[name], sources[name], since, now): name
+                for name, since in jobs.items()
+            }
+            done, not_done = wait(futures, timeout=deadline)
+
+            for future in done:
+                name = futures[future]
+                try:
+                    events, elapsed = future.result()
+                    results[name] = {'status': 'ok', 'events': events, 'elapsed': elapsed}
+                except Exception as e:
+                    logger.warning(f"Earthquake source {name} failed: {e}")
+                    results[name] = {
+                        'status': 'failed', 'error': str(e) or type(e).__name__,
+                        'elapsed': time.monotonic() - started,
+                    }
+            for future in not_done:
+                name = futures[future]
+                logger.warning(f"Earthquake source {name} timed out after {deadline}s")
+                results[name] = {'status': 'failed', 'error': f'Timed out after {deadline}s', 'elapsed': deadline}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _store(self, events, report):
+        """Deduplicate in memory, then insert everything new in one statement"""
+        time_tolerance = timedelta(seconds=getattr(settings, 'BIRLIKTEYIZ_DEDUP_TIME_SECONDS', 60))
+        window = (
+            min(event['occurred_at'] for event in events) - time_tolerance,
+            max(event['occurred_at'] for event in events) + time_tolerance,
+        )
+        unique_ids = [event['unique_id'] for event in events]
+        existing = Earthquake.objects.filter(occurred_at__range=window) | Earthquake.objects.filter(
+            unique_id__in=unique_ids
+        )
+        existing = list(existing.values('unique_id', 'source', 'occurred_at', 'latitude', 'longitude', 'magnitude'))
+
+        new_events, duplicates = deduplicate(events, existing)
+        report['duplicates'] = duplicates
+        if not new_events:
+            return {}
+
+        # One fetched_at per batch identifies exactly the rows this insert wrote
+        fetched_at = self.clock()
+        earthquakes = [Earthquake(fetched_at=fetched_at, **event) for event in new_events]
+        for earthquake in earthquakes:
+            earthquake.update_geohash()
+        Earthquake.objects.bulk_create(earthquakes, batch_size=500, ignore_conflicts=True)
+        inserted = list(Earthquake.objects.filter(
+            unique_id__in=[event['unique_id'] for event in new_events], fetched_at=fetched_at
+        ))
+
+        # bulk_create skips post_save; queue the whole batch for alerts in one insert
+        alerts.enqueue(inserted)
+
+        created = {}
+        for earthquake in inserted:
+            created[earthquake.source] = created.get(earthquake.source, 0) + 1
+        report['new'] = len(inserted)
+        return created
+
+    def _update_source(self, source, result, new_count, now):
+        """Advance the cursor on success, trip the breaker on repeated failure"""
+        source.last_fetch = now
+        source.fetch_count += 1
+
+        if result['status'] == 'ok':
+            source.last_success = now
+            source.success_count += 1
+            source.total_earthquakes_fetched += new_count
+            source.last_response_time = result['elapsed']
+            if source.avg_response_time:
+                source.avg_response_time = (source.avg_response_time + result['elapsed']) / 2
+            else:
+                source.avg_response_time = result['elapsed']
+            source.last_error = None  # Clear error on success
+            source.consecutive_failures = 0
+            source.circuit_open_until = None
+            if result['events']:
+                newest = min(max(event['occurred_at'] for event in result['events']), now)
+                if not source.last_event_at or newest > source.last_event_at:
+                    source.last_event_at = newest
+        else:
+            source.last_error = result['error']
+            source.last_error_time = now
+            source.error_count += 1
+            source.consecutive_failures += 1
+
+            threshold = getattr(settings, 'BIRLIKTEYIZ_CIRCUIT_FAILURE_THRESHOLD', 3)
+            if source.consecutive_failures >= threshold:
+                cooldown = getattr(settings, 'BIRLIKTEYIZ_CIRCUIT_COOLDOWN_MINUTES', 15)
+                factor = min(2 ** (source.consecutive_failures - threshold), 16)
+                source.circuit_open_until = now + timedelta(minutes=cooldown * factor)
+                logger.warning(
+                    f"Earthquake source {source.name} failed {source.consecutive_failures} times in a row; "
+                    f"skipping until {source.circuit_open_until}"
+                )
+
+        source.save()
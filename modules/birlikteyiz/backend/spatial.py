@@ -0,0 +1,245 @@
+"""
+Spatial queries for Earthquake
+
+GIS fields are disabled in this app (no GDAL), so every earthquake carries a
+geohash in a B-tree indexed column instead. A geohash prefix is a lat/lon
+cell, so spatial filters become a handful of indexed prefix scans:
+
+    bbox     -> cells covering the box    -> exact lat/lon refine
+    radius   -> cells covering its bbox   -> haversine refine
+    nearest  -> radius search, doubling the radius until N are found
+    clusters -> GROUP BY geohash prefix, prefix length chosen by map zoom
+
+Works the same on PostgreSQL and SQLite nodes.
+"""
+
+import math
+
+from django.db.models import Avg, Count, FloatField, Max, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt, Substr
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9  # ~5m cells
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Upper bound on prefix scans per query; coarser cells are used beyond this
+MAX_COVER_CELLS = 32
+
+# Map zoom level -> geohash prefix length used to cluster
+ZOOM_PRECISION = [
+    (2, 1), (4, 2), (7, 3), (10, 4), (12, 5), (15, 6),
+]
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # longitude first
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVER_CELLS, precision=None):
+    """
+    Geohash prefixes whose cells together cover the box
+
+    Picks the finest precision that needs at most `max_cells` cells, unless a
+    fixed `precision` is given. Boxes crossing the antimeridian
+    (min_lon > max_lon) are split in two.
+    """
+    if min_lon > max_lon:
+        return (cover_bbox(min_lat, min_lon, max_lat, 180.0, max_cells // 2, precision)
+                + cover_bbox(min_lat, -180.0, max_lat, max_lon, max_cells // 2, precision))
+
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+
+    for precision in ([precision] if precision else range(GEOHASH_PRECISION, 0, -1)):
+        height, width = cell_size(precision)
+        lat_start = math.floor((min_lat + 90) / height)
+        lat_end = min(math.floor((max_lat + 90) / height), (1 << (5 * precision // 2)) - 1)
+        lon_start = math.floor((min_lon + 180) / width)
+        lon_end = min(math.floor((max_lon + 180) / width), (1 << ((5 * precision + 1) // 2)) - 1)
+        if (lat_end - lat_start + 1) * (lon_end - lon_start + 1) <= max_cells or precision == 1:
+            break
+
+    cells = []
+    for i in range(lat_start, lat_end + 1):
+        for j in range(lon_start, lon_end + 1):
+            cells.append(geohash_encode(-90 + (i + 0.5) * height, -180 + (j + 0.5) * width, precision))
+    return cells
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) of a circle"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        # Circle contains a pole: every longitude
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+
+    lon_delta = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))))
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if lon_delta >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    # Wrap across the antimeridian; cover_bbox splits min_lon > max_lon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def _cells_q(cells):
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__startswith=cell)
+    return condition
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from a point, as a database expression"""
+    lat = Radians(Cast('latitude', FloatField()))
+    lon = Radians(Cast('longitude', FloatField()))
+    origin_lat = math.radians(latitude)
+    origin_lon = math.radians(longitude)
+
+    a = (
+        Power(Sin((lat - Value(origin_lat)) / Value(2.0)), 2)
+        + Value(math.cos(origin_lat)) * Cos(lat)
+        * Power(Sin((lon - Value(origin_lon)) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def filter_bbox(queryset, min_lat, min_lon, max_lat, max_lon):
+    """Earthquakes inside a box; min_lon > max_lon wraps the antimeridian"""
+    condition = _cells_q(cover_bbox(min_lat, min_lon, max_lat, max_lon))
+    queryset = queryset.filter(condition, latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lon > max_lon:
+        return queryset.filter(Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+    return queryset.filter(longitude__gte=min_lon, longitude__lte=max_lon)
+
+
+def filter_radius(queryset, latitude, longitude, radius_km):
+    """Earthquakes within `radius_km`, annotated with distance_km"""
+    condition = _cells_q(cover_bbox(*radius_bbox(latitude, longitude, radius_km)))
+    return (
+        queryset.filter(condition)
+        .annotate(distance_km=distance_expression(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
+
+
+def nearest(queryset, latitude, longitude, limit=10, initial_radius_km=50, max_radius_km=None):
+    """
+    The `limit` closest earthquakes, nearest first, with distance_km
+
+    Searches a small radius first and doubles it until enough events are
+    found, so the common case only touches a few cells.
+    """
+    radius = initial_radius_km
+    limit_radius = max_radius_km or math.pi * EARTH_RADIUS_KM
+    while True:
+        results = list(
+            filter_radius(queryset, latitude, longitude, min(radius, limit_radius))
+            .order_by('distance_km')[:limit]
+        )
+        if len(results) >= limit or radius >= limit_radius:
+            return results
+        radius *= 2
+
+
+def zoom_precision(zoom):
+    """Geohash prefix length to cluster by at a map zoom level"""
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return ZOOM_PRECISION[-1][1] + 1
+
+
+def clusters(queryset, zoom):
+    """
+    Aggregate earthquakes into map clusters, server side
+
+    One GROUP BY over the geohash prefix; each cluster carries its count,
+    centroid, strongest magnitude and latest occurrence.
+    """
+    precision = zoom_precision(zoom)
+    rows = (
+        queryset.order_by()
+        .annotate(cell=Substr('geohash', 1, precision))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            lat=Avg(Cast('latitude', FloatField())),
+            lon=Avg(Cast('longitude', FloatField())),
+            max_magnitude=Max('magnitude'),
+            latest=Max('occurred_at'),
+        )
+        .order_by('-count')
+    )
+    return [
+        {
+            'cell': row['cell'],
+            'count': row['count'],
+            'lat': round(row['lat'], 5),
+            'lon': round(row['lon'], 5),
+            'max_mag': float(row['max_magnitude']),
+            'latest': row['latest'].isoformat(),
+        }
+        for row in rows
+    ]
+
+
+def parse_bbox(value):
+    """Parse 'min_lat,min_lon,max_lat,max_lon'"""
+    try:
+        min_lat, min_lon, max_lat, max_lon = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError('bbox must be min_lat,min_lon,max_lat,max_lon')
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise ValueError('bbox is out of range')
+    return min_lat, min_lon, max_lat, max_lon
@@ -53,3 +53,21 @@ def fetch_earthquakes_task():
             pass
 
         return f"error: {str(e)}"
+
+
+@shared_task
+def dispatch_earthquake_alerts():
+    """
+    Match queued earthquakes against subscriptions and send what is due
+    Scheduled after each import and every minute as a safety net
+    """
+    from .alerts import KICK_KEY, deliver_due, dispatch_pending
+    from django.core.cache import cache
+
+    # Let the next import schedule a fresh dispatch
+    cache.delete(KICK_KEY)
+
+    created = dispatch_pending()
+    stats = deliver_due()
+    logger.info(f"Earthquake alerts: {created} deliveries created, {stats}")
+    return stats
@@ -0,0 +1 @@
+# Birlikteyiz Module Tests
@@ -0,0 +1,278 @@
+"""
+Earthquake Alert Tests
+
+Tests for the queued alert pipeline:
+- Ingestion only queues events, whatever the number of subscribers
+- Subscription index matching by region and magnitude
+- Burst coalescing into digests, urgent events skipping the window
+- Delivery retries with backoff and per-channel rate limits
+"""
+
+import json
+import random
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.system.common.backend.ratelimit import SlidingWindowRateLimiter
+from modules.birlikteyiz.backend import alerts
+from modules.birlikteyiz.backend.models import (
+    Earthquake,
+    EarthquakeAlertDelivery,
+    EarthquakeAlertEvent,
+    EarthquakeAlertSubscription,
+)
+from modules.birlikteyiz.backend.services.earthquake_ingest import PROVIDERS, EarthquakeIngestor
+
+ALERT_SETTINGS = {
+    'BIRLIKTEYIZ_ALERT_DISPATCH_ON_SAVE': False,
+    'BIRLIKTEYIZ_ALERT_MIN_MAGNITUDE': 0,
+    'BIRLIKTEYIZ_ALERT_MAX_EVENT_AGE_SECONDS': 10 ** 9,
+    'BIRLIKTEYIZ_ALERT_COALESCE_SECONDS': 30,
+    'BIRLIKTEYIZ_ALERT_URGENT_MAGNITUDE': 5.0,
+}
+
+
+def make_earthquake(index, lat, lon, magnitude, occurred_at=None):
+    return Earthquake.objects.create(
+        unique_id=f'TEST_{index}',
+        source='AFAD',
+        magnitude=Decimal(str(magnitude)),
+        depth=Decimal('10'),
+        latitude=Decimal(str(lat)),
+        longitude=Decimal(str(lon)),
+        location=f'Test {index}',
+        occurred_at=occurred_at or timezone.now(),
+    )
+
+
+def usgs_batch(prefix, count, now):
+    """A USGS GeoJSON payload of `count` distinct events across Turkey"""
+    rng = random.Random(prefix)
+    features = []
+    for i in range(count):
+        features.append({
+            'id': f'{prefix}{i}',
+            'properties': {
+                'mag': round(rng.uniform(2.5, 6.0), 1),
+                'place': f'Synthetic {i}',
+                'time': int((now - timedelta(minutes=2 * i)).timestamp() * 1000),
+            },
+            'geometry': {'coordinates': [rng.uniform(26, 45), rng.uniform(36, 42), 10.0]},
+        })
+    return json.dumps({'features': features})
+
+
+@override_settings(**ALERT_SETTINGS)
+class TestAlertQueueing(TestCase):
+    """Ingestion writes queue rows only; no matching, no sending"""
+
+    def setUp(self):
+        cache.clear()
+
+    def _import(self, prefix):
+        now = timezone.now()
+        body = usgs_batch(prefix, 1000, now)
+        ingestor = EarthquakeIngestor(
+            providers={'USGS': PROVIDERS['USGS']},
+            transport=lambda url, **kwargs: body,
+            clock=lambda: now,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            report = ingestor.run(full=True)
+        return report, len(queries.captured_queries)
+
+    def _subscribe(self, count):
+        rng = random.Random(count)
+        EarthquakeAlertSubscription.objects.bulk_create([
+            EarthquakeAlertSubscription(
+                name=f'sub {i}',
+                center_lat=rng.uniform(36, 42),
+                center_lon=rng.uniform(26, 45),
+                radius_km=rng.choice([None, 50, 200, 500]),
+                min_magnitude=Decimal('3.0'),
+                device_token=f'token-{i}',
+            )
+            for i in range(count)
+        ])
+
+    def test_import_cost_is_independent_of_subscriber_count(self):
+        with mock.patch.object(alerts.notification_service, 'send_earthquake_alert') as send:
+            self._import('A')  # creates the source row
+
+            report, without_subscribers = self._import('B')
+            self.assertEqual(report['new'], 1000)
+
+            self._subscribe(500)
+            report, with_subscribers = self._import('C')
+            self.assertEqual(report['new'], 1000)
+
+        self.assertEqual(with_subscribers, without_subscribers)
+        self.assertEqual(EarthquakeAlertEvent.objects.count(), 3000)
+        self.assertFalse(EarthquakeAlertDelivery.objects.exists())
+        send.assert_not_called()
+
+    def test_single_save_queues_one_event(self):
+        earthquake = make_earthquake(1, 41.0, 29.0, 4.2)
+        self.assertEqual(list(EarthquakeAlertEvent.objects.values_list('earthquake_id', flat=True)), [earthquake.id])
+
+    @override_settings(BIRLIKTEYIZ_ALERT_MIN_MAGNITUDE=3.0, BIRLIKTEYIZ_ALERT_MAX_EVENT_AGE_SECONDS=3600)
+    def test_old_and_minor_earthquakes_are_not_queued(self):
+        make_earthquake(1, 41.0, 29.0, 2.1)
+        make_earthquake(2, 41.0, 29.0, 4.0, occurred_at=timezone.now() - timedelta(hours=3))
+        self.assertFalse(EarthquakeAlertEvent.objects.exists())
+
+
+@override_settings(**ALERT_SETTINGS)
+class TestSubscriptionIndex(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.istanbul = EarthquakeAlertSubscription.objects.create(
+            name='istanbul', center_lat=41.01, center_lon=28.97, radius_km=100, min_magnitude=Decimal('4.0'),
+        )
+        self.world = EarthquakeAlertSubscription.objects.create(name='world', min_magnitude=Decimal('6.0'))
+
+    def _match(self, lat, lon, magnitude):
+        earthquake = Earthquake(latitude=Decimal(str(lat)), longitude=Decimal(str(lon)), magnitude=Decimal(str(magnitude)))
+        earthquake.update_geohash()
+        return {subscription.name for subscription in alerts.get_subscription_index().match(earthquake)}
+
+    def test_matches_region_and_threshold(self):
+        self.assertEqual(self._match(40.85, 29.3, 4.5), {'istanbul'})
+        self.assertEqual(self._match(40.85, 29.3, 3.9), set())
+        self.assertEqual(self._match(38.0, 27.1, 4.5), set())  # Izmir, outside 100 km
+        self.assertEqual(self._match(38.0, 27.1, 6.4), {'world'})
+        self.assertEqual(self._match(40.85, 29.3, 6.4), {'istanbul', 'world'})
+
+    def test_subscription_changes_rebuild_the_index(self):
+        self.assertEqual(self._match(38.0, 27.1, 4.5), set())
+        EarthquakeAlertSubscription.objects.create(
+            name='izmir', center_lat=38.42, center_lon=27.14, radius_km=80, min_magnitude=Decimal('3.5'),
+        )
+        self.assertEqual(self._match(38.0, 27.1, 4.5), {'izmir'})
+
+        self.istanbul.delete()
+        self.assertEqual(self._match(40.85, 29.3, 4.5), set())
+
+
+@override_settings(**ALERT_SETTINGS)
+class TestDispatch(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.subscription = EarthquakeAlertSubscription.objects.create(
+            name='balikesir', center_lat=39.2, center_lon=28.2, radius_km=150, min_magnitude=Decimal('3.0'),
+            device_token='token', notify_email=True, email='alerts@example.com',
+        )
+
+    def test_swarm_is_held_then_sent_as_one_digest(self):
+        for i, magnitude in enumerate([3.4, 4.1, 3.2, 3.8, 4.6]):
+            make_earthquake(i, 39.2 + i * 0.01, 28.16, magnitude)
+        now = timezone.now()
+
+        # Still inside the coalescing window
+        self.assertEqual(alerts.dispatch_pending(now=now), 0)
+
+        created = alerts.dispatch_pending(now=now + timedelta(seconds=31))
+        self.assertEqual(created, 2)  # push + email, one message each
+        for delivery in EarthquakeAlertDelivery.objects.all():
+            self.assertEqual(delivery.earthquake_count, 5)
+            self.assertIn('5 deprem', delivery.title)
+            self.assertIn('4.6', delivery.title)
+        self.assertFalse(EarthquakeAlertEvent.objects.filter(processed_at__isnull=True).exists())
+
+        # Nothing is dispatched twice
+        self.assertEqual(alerts.dispatch_pending(now=now + timedelta(seconds=90)), 0)
+
+    def test_urgent_earthquake_skips_the_window(self):
+        make_earthquake(1, 39.2, 28.2, 5.6)
+        self.assertEqual(alerts.dispatch_pending(now=timezone.now()), 2)
+        delivery = EarthquakeAlertDelivery.objects.filter(channel='push').get()
+        self.assertEqual(delivery.earthquake_count, 1)
+        self.assertIn('büyük deprem', delivery.title)
+
+
+@override_settings(**ALERT_SETTINGS, BIRLIKTEYIZ_ALERT_RETRY_BASE_SECONDS=60, BIRLIKTEYIZ_ALERT_MAX_ATTEMPTS=3)
+class TestDelivery(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.limiter = SlidingWindowRateLimiter(clock=lambda: 1_000_000.0)
+        subscription = EarthquakeAlertSubscription.objects.create(name='test', device_token='token')
+        self.deliveries = EarthquakeAlertDelivery.objects.bulk_create([
+            EarthquakeAlertDelivery(
+                subscription=subscription, channel='push', title=f'alert {i}', body='', next_attempt_at=self.now,
+            )
+            for i in range(5)
+        ])
+
+    def test_failures_back_off_then_give_up(self):
+        def broken(delivery):
+            raise ConnectionError('fcm unavailable')
+
+        senders = {'push': broken}
+        stats = alerts.deliver_due(now=self.now, limit=1, limiter=self.limiter, senders=senders)
+        self.assertEqual(stats['retry'], 1)
+
+        delivery = EarthquakeAlertDelivery.objects.get(pk=self.deliveries[0].pk)
+        self.assertEqual(delivery.status, 'pending')
+        self.assertEqual(delivery.attempts, 1)
+        self.assertEqual(delivery.next_attempt_at, self.now + timedelta(seconds=60))
+        self.assertEqual(delivery.last_error, 'fcm unavailable')
+
+        EarthquakeAlertDelivery.objects.exclude(pk=delivery.pk).delete()
+        alerts.deliver_due(now=self.now + timedelta(seconds=60), limiter=self.limiter, senders=senders)
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.next_attempt_at, self.now + timedelta(seconds=180))
+
+        alerts.deliver_due(now=self.now + timedelta(seconds=180), limiter=self.limiter, senders=senders)
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, 'failed')
+        self.assertEqual(delivery.attempts, 3)
+
+    @override_settings(BIRLIKTEYIZ_ALERT_CHANNEL_RATES={'push': '2/minute'})
+    def test_channel_rate_limit_defers_instead_of_failing(self):
+        sent = []
+        stats = alerts.deliver_due(now=self.now, limiter=self.limiter, senders={'push': sent.append})
+
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(stats['deferred'], 3)
+        self.assertEqual(len(sent), 2)
+        deferred = EarthquakeAlertDelivery.objects.filter(status='pending')
+        self.assertEqual(deferred.count(), 3)
+        self.assertTrue(all(d.next_attempt_at > self.now and d.attempts == 0 for d in deferred))
+
+    def test_overlapping_runs_send_once(self):
+        sent = []
+
+        def send_and_overlap(delivery):
+            sent.append(delivery.pk)
+            if len(sent) == 1:
+                # Another worker starts while this batch is still sending
+                alerts.deliver_due(now=self.now, limiter=self.limiter, senders={'push': send_and_overlap})
+
+        stats = alerts.deliver_due(now=self.now, limiter=self.limiter, senders={'push': send_and_overlap})
+        self.assertEqual(stats['sent'], 5)
+        self.assertEqual(sorted(sent), sorted(d.pk for d in self.deliveries))
+        self.assertEqual(EarthquakeAlertDelivery.objects.filter(status='sent').count(), 5)
+
+    @override_settings(BIRLIKTEYIZ_ALERT_CLAIM_SECONDS=300)
+    def test_abandoned_claim_is_retried(self):
+        def crash(delivery):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            alerts.deliver_due(now=self.now, limiter=self.limiter, senders={'push': crash})
+        sent = []
+        self.assertEqual(alerts.deliver_due(now=self.now, limiter=self.limiter, senders={'push': sent.append})['sent'], 0)
+
+        later = self.now + timedelta(seconds=300)
+        self.assertEqual(alerts.deliver_due(now=later, limiter=self.limiter, senders={'push': sent.append})['sent'], 5)
@@ -0,0 +1,182 @@
+"""
+Earthquake Ingestion Tests
+
+Replays recorded provider payloads (tests/fixtures/providers) through the
+ingestion engine:
+- Parsing of every provider format
+- Cross-source deduplication and the single bulk insert
+- Incremental cursors, and paging through capped responses
+- Per-source timeouts and the circuit breaker
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from modules.birlikteyiz.backend.models import Earthquake, EarthquakeAlertEvent, EarthquakeDataSource
+from modules.birlikteyiz.backend.services.earthquake_ingest import (
+    PROVIDERS,
+    EarthquakeIngestor,
+    ReplayTransport,
+)
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'providers'
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class TestProviderParsing(TestCase):
+    """Each recorded payload parses into Earthquake field dicts"""
+
+    def test_every_provider_parses_its_fixture(self):
+        transport = ReplayTransport(FIXTURES)
+        expected = {'KANDILLI': 4, 'AFAD': 2, 'IRIS': 2, 'USGS': 2, 'GFZ': 1, 'EMSC': 2}
+
+        for name, provider in PROVIDERS.items():
+            source = EarthquakeDataSource(name=name, url=provider.url, **{
+                key: value for key, value in provider.source_defaults().items() if key != 'url'
+            })
+            body = transport(provider.url)
+            events = provider.parse(body, source)
+            self.assertEqual(len(events), expected[name], name)
+            for event in events:
+                self.assertTrue(event['unique_id'].startswith(f'{name}_'))
+                self.assertIsNotNone(event['occurred_at'].tzinfo)
+
+    def test_kandilli_times_are_turkey_local(self):
+        provider = PROVIDERS['KANDILLI']
+        events = provider.parse((FIXTURES / 'kandilli.html').read_text(encoding='utf-8'), None)
+        self.assertEqual(
+            events[0]['occurred_at'].astimezone(dt_timezone.utc),
+            datetime(2026, 10, 18, 11, 5, 12, tzinfo=dt_timezone.utc),
+        )
+
+
+class TestEarthquakeIngestor(TestCase):
+    """Concurrent fetch, dedup and storage"""
+
+    def setUp(self):
+        self.transport = ReplayTransport(FIXTURES)
+        self.ingestor = EarthquakeIngestor(transport=self.transport, clock=lambda: NOW)
+
+    def test_ingests_all_sources_and_dedups_across_sources(self):
+        report = self.ingestor.run()
+
+        self.assertTrue(all(r['status'] == 'ok' for r in report['sources'].values()))
+        # Kandilli/AFAD, IRIS/USGS and GFZ/EMSC each report one shared event
+        self.assertEqual(report['duplicates'], 3)
+        self.assertEqual(report['new'], 10)
+        self.assertEqual(Earthquake.objects.count(), 10)
+
+        # The higher priority source wins and remembers the other report
+        sindirgi = Earthquake.objects.get(location__icontains='Sındırgı')
+        self.assertEqual(sindirgi.source, 'AFAD')
+        self.assertIn('also_reported_by', sindirgi.raw_data)
+        self.assertFalse(Earthquake.objects.filter(source='IRIS', location__icontains='JAPAN').exists())
+        self.assertFalse(Earthquake.objects.filter(source='GFZ').exists())
+
+    @override_settings(BIRLIKTEYIZ_ALERT_MIN_MAGNITUDE=0, BIRLIKTEYIZ_ALERT_MAX_EVENT_AGE_SECONDS=10 ** 9)
+    def test_new_events_are_queued_for_alerts(self):
+        self.ingestor.run()
+        self.ingestor.run()
+
+        self.assertEqual(EarthquakeAlertEvent.objects.count(), 10)
+        self.assertEqual(EarthquakeAlertEvent.objects.filter(processed_at__isnull=True).count(), 10)
+
+    def test_cursor_limits_next_request_and_nothing_is_reinserted(self):
+        self.ingestor.run(only=['USGS'])
+        source = EarthquakeDataSource.objects.get(name='USGS')
+        self.assertEqual(source.last_event_at, datetime(2026, 10, 18, 9, 14, 33, 120000, tzinfo=dt_timezone.utc))
+
+        report = self.ingestor.run(only=['USGS'])
+        self.assertEqual(report['new'], 0)
+        self.assertEqual(Earthquake.objects.filter(source='USGS').count(), 2)
+
+        _, params = self.transport.requests[-1]
+        self.assertEqual(params['starttime'], '2026-10-18T08:59:33')
+
+    @override_settings(BIRLIKTEYIZ_FETCH_OVERLAP_MINUTES=0)
+    def test_truncated_responses_are_paged_not_skipped(self):
+        quakes = [NOW - timedelta(hours=5) + timedelta(minutes=10 * i) for i in range(7)]
+
+        def capped_usgs(url, params=None, **kwargs):
+            # Oldest first from starttime, at most `limit` events, like the FDSN service
+            self.assertEqual(params['orderby'], 'time-asc')
+            starttime = datetime.fromisoformat(params['starttime']).replace(tzinfo=dt_timezone.utc)
+            due = [at for at in quakes if at >= starttime][:params['limit']]
+            self.transport.requests.append(('USGS', params))
+            return json.dumps({'features': [
+                {
+                    'id': f'us{at:%H%M}',
+                    'properties': {'mag': 4.1, 'place': 'Test', 'time': at.timestamp() * 1000},
+                    'geometry': {'coordinates': [28.0, 39.0, 10.0]},
+                }
+                for at in due
+            ]})
+
+        EarthquakeDataSource.objects.create(name='USGS', **dict(PROVIDERS['USGS'].source_defaults(), max_results=3))
+
+        with override_settings(BIRLIKTEYIZ_FETCH_MAX_PAGES=2):
+            report = EarthquakeIngestor(transport=capped_usgs, clock=lambda: NOW).run(only=['USGS'])
+        # Two full pages; the second starts at the last event of the first
+        self.assertEqual(report['new'], 5)
+        self.assertEqual(EarthquakeDataSource.objects.get(name='USGS').last_event_at, quakes[4])
+
+        report = EarthquakeIngestor(transport=capped_usgs, clock=lambda: NOW).run(only=['USGS'])
+        self.assertEqual(report['new'], 2)
+        self.assertEqual(Earthquake.objects.filter(source='USGS').count(), 7)
+        self.assertEqual(EarthquakeDataSource.objects.get(name='USGS').last_event_at, quakes[6])
+
+    def test_failing_source_trips_circuit_breaker(self):
+        def flaky(url, **kwargs):
+            if url == PROVIDERS['AFAD'].url:
+                raise ConnectionError('connection reset')
+            return self.transport(url, **kwargs)
+
+        ingestor = EarthquakeIngestor(transport=flaky, clock=lambda: NOW)
+        for _ in range(3):
+            report = ingestor.run()
+            self.assertEqual(report['sources']['AFAD']['status'], 'failed')
+            self.assertEqual(report['sources']['USGS']['status'], 'ok')
+
+        afad = EarthquakeDataSource.objects.get(name='AFAD')
+        self.assertEqual(afad.consecutive_failures, 3)
+        self.assertGreater(afad.circuit_open_until, NOW)
+
+        report = ingestor.run()
+        self.assertEqual(report['sources']['AFAD']['status'], 'circuit_open')
+
+        # After the cool-down a successful fetch closes the circuit
+        later = afad.circuit_open_until + timedelta(seconds=1)
+        EarthquakeIngestor(transport=self.transport, clock=lambda: later).run(only=['AFAD'])
+        afad.refresh_from_db()
+        self.assertEqual(afad.consecutive_failures, 0)
+        self.assertIsNone(afad.circuit_open_until)
+
+    def test_slow_source_times_out_without_blocking_others(self):
+        release = threading.Event()
+
+        def slow_gfz(url, **kwargs):
+            if url == PROVIDERS['GFZ'].url:
+                release.wait(10)
+            return self.transport(url, **kwargs)
+
+        self.ingestor.run()
+        EarthquakeDataSource.objects.update(timeout_seconds=1)
+
+        ingestor = EarthquakeIngestor(transport=slow_gfz, clock=lambda: NOW)
+        ingestor.deadline_grace = 0
+        started = time.monotonic()
+        try:
+            report = ingestor.run()
+        finally:
+            release.set()
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(report['sources']['GFZ']['status'], 'failed')
+        self.assertIn('Timed out', report['sources']['GFZ']['error'])
+        self.assertEqual(report['sources']['EMSC']['status'], 'ok')
+        self.assertEqual(EarthquakeDataSource.objects.get(name='GFZ').consecutive_failures, 1)
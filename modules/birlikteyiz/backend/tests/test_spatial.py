@@ -0,0 +1,113 @@
+"""
+Spatial Query Tests
+
+Tests for the geohash spatial layer:
+- Geohash encoding and bbox covers
+- Bounding box, radius and nearest-N queries
+- Map clustering by zoom level
+"""
+
+import random
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from modules.birlikteyiz.backend.models import Earthquake
+from modules.birlikteyiz.backend import spatial
+
+
+def make_earthquake(index, lat, lon, magnitude=3.0):
+    return Earthquake.objects.create(
+        unique_id=f'TEST_{index}',
+        source='USGS',
+        magnitude=Decimal(str(magnitude)),
+        depth=Decimal('10'),
+        latitude=Decimal(str(round(lat, 6))),
+        longitude=Decimal(str(round(lon, 6))),
+        location=f'Test {index}',
+        occurred_at=timezone.now(),
+    )
+
+
+class TestGeohash(TestCase):
+    def test_encode_known_value(self):
+        self.assertEqual(spatial.geohash_encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_save_sets_geohash(self):
+        earthquake = make_earthquake(1, 41.01, 28.97)
+        self.assertEqual(earthquake.geohash, spatial.geohash_encode(41.01, 28.97))
+
+    def test_revised_coordinates_update_geohash(self):
+        make_earthquake(1, 41.01, 28.97)
+        # EMSC revisions go through update_or_create, which saves only the defaults' fields
+        Earthquake.objects.update_or_create(
+            unique_id='TEST_1', defaults={'latitude': Decimal('38.42'), 'longitude': Decimal('27.14')}
+        )
+        self.assertEqual(Earthquake.objects.get(unique_id='TEST_1').geohash, spatial.geohash_encode(38.42, 27.14))
+
+    def test_cover_bbox_contains_every_point_in_box(self):
+        rng = random.Random(1)
+        for bbox in [(40.0, 26.5, 42.0, 29.5), (-10.0, -80.0, 10.0, -60.0), (50.0, 170.0, 60.0, -170.0)]:
+            cells = spatial.cover_bbox(*bbox)
+            self.assertLessEqual(len(cells), spatial.MAX_COVER_CELLS)
+            min_lat, min_lon, max_lat, max_lon = bbox
+            for _ in range(200):
+                lat = rng.uniform(min_lat, max_lat)
+                lon = rng.uniform(min_lon, max_lon + (360 if min_lon > max_lon else 0))
+                lon = (lon + 180) % 360 - 180
+                geohash = spatial.geohash_encode(lat, lon)
+                self.assertTrue(any(geohash.startswith(cell) for cell in cells), (bbox, lat, lon))
+
+
+class TestSpatialQueries(TestCase):
+    """Index-backed results match brute force over the same events"""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.points = []
+        for i in range(300):
+            if i % 3:
+                lat, lon = rng.gauss(39.5, 2.0), rng.gauss(35.0, 3.0)
+            else:
+                lat, lon = rng.uniform(-60, 60), rng.uniform(-180, 180)
+            self.points.append((f'TEST_{i}', lat, lon))
+            make_earthquake(i, lat, lon, magnitude=round(rng.uniform(2, 6), 1))
+
+    def test_bbox_matches_brute_force(self):
+        for bbox in [(38.0, 30.0, 41.0, 36.0), (-60.0, 150.0, 60.0, -150.0)]:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            expected = {
+                uid for uid, lat, lon in self.points
+                if min_lat <= round(lat, 6) <= max_lat and (
+                    (min_lon > max_lon and (round(lon, 6) >= min_lon or round(lon, 6) <= max_lon))
+                    or min_lon <= round(lon, 6) <= max_lon
+                )
+            }
+            found = set(spatial.filter_bbox(Earthquake.objects.all(), *bbox).values_list('unique_id', flat=True))
+            self.assertEqual(found, expected)
+
+    def test_radius_matches_brute_force(self):
+        origin = (39.93, 32.86)  # Ankara
+        expected = {
+            uid for uid, lat, lon in self.points
+            if spatial.haversine_km(*origin, lat, lon) <= 250
+        }
+        found = spatial.filter_radius(Earthquake.objects.all(), *origin, 250)
+        self.assertEqual(set(found.values_list('unique_id', flat=True)), expected)
+
+    def test_nearest_is_ordered_and_exact(self):
+        origin = (41.01, 28.97)
+        expected = sorted(self.points, key=lambda p: spatial.haversine_km(*origin, p[1], p[2]))[:10]
+        found = spatial.nearest(Earthquake.objects.all(), *origin, limit=10, initial_radius_km=10)
+        self.assertEqual([e.unique_id for e in found], [p[0] for p in expected])
+        distances = [e.distance_km for e in found]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_clusters_cover_all_events(self):
+        coarse = spatial.clusters(Earthquake.objects.all(), zoom=2)
+        fine = spatial.clusters(Earthquake.objects.all(), zoom=8)
+        self.assertEqual(sum(c['count'] for c in coarse), 300)
+        self.assertEqual(sum(c['count'] for c in fine), 300)
+        self.assertLess(len(coarse), len(fine))
+        self.assertTrue(all(len(c['cell']) == spatial.zoom_precision(2) for c in coarse))
@@ -0,0 +1,354 @@
+"""
+Camera Hub
+One capture and one JPEG encode per camera, shared by every viewer
+
+    camera --(1 RTSP session)--> CameraWorker thread --(encode once)--> FrameRing
+    FrameRing --> MJPEG responses, websocket consumers, snapshots
+
+Viewers read from the ring at their own pace. A viewer that falls more than
+a ring's worth of frames behind skips to the newest frame, so slow clients
+lose frames instead of holding back the worker or anyone else. A worker
+stops (and releases the RTSP session) once it has had no viewers for
+CCTV_HUB_IDLE_SECONDS.
+
+The hub lives in the serving process; every request and websocket handled
+by that process shares it.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+# Optional imports for video processing
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Frame:
+    seq: int
+    data: bytes
+    timestamp: float
+
+
+def open_capture(source):
+    """Open an RTSP URL (or any source OpenCV reads) with a one-frame buffer"""
+    capture = cv2.VideoCapture(source)
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return capture
+
+
+def encode_jpeg(image, quality=None):
+    quality = quality or getattr(settings, 'CCTV_HUB_JPEG_QUALITY', 80)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError('JPEG encoding failed')
+    return buffer.tobytes()
+
+
+class FrameRing:
+    """Fixed-size ring of encoded frames; publishing never waits for readers"""
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.seq = 0
+        self.closed = False
+        self._frames = [None] * capacity
+        self._cond = threading.Condition()
+        self._listeners = set()
+
+    def publish(self, data, timestamp=None):
+        with self._cond:
+            self.seq += 1
+            self._frames[self.seq % self.capacity] = Frame(self.seq, data, timestamp or time.time())
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def latest(self):
+        with self._cond:
+            return self._frames[self.seq % self.capacity] if self.seq else None
+
+    def read(self, after, timeout=None):
+        """
+        The frame following seq `after`, waiting up to `timeout` for one
+
+        Readers more than `capacity` frames behind get the newest frame.
+        Returns None on timeout or when the ring is closed.
+        """
+        with self._cond:
+            if self.seq <= after and not self.closed and timeout != 0:
+                self._cond.wait_for(lambda: self.seq > after or self.closed, timeout)
+            if self.seq <= after:
+                return None
+            next_seq = after + 1 if self.seq - after <= self.capacity else self.seq
+            return self._frames[next_seq % self.capacity]
+
+    def add_listener(self, callback):
+        with self._cond:
+            self._listeners.add(callback)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            self._listeners.discard(callback)
+
+
+class CameraWorker(threading.Thread):
+    """Pulls one camera, encodes each frame once, publishes to the ring"""
+
+    def __init__(self, hub, key, source):
+        super().__init__(name=f'cctv-hub-{key}', daemon=True)
+        self.hub = hub
+        self.key = key
+        self.source = source
+        self.ring = FrameRing(hub.ring_size)
+        self.viewers = 0
+        self.last_used = time.monotonic()
+        self.frames_captured = 0
+        self.frames_encoded = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def attach(self):
+        with self._lock:
+            self.viewers += 1
+            self.last_used = time.monotonic()
+
+    def detach(self):
+        with self._lock:
+            self.viewers -= 1
+            self.last_used = time.monotonic()
+
+    def touch(self):
+        with self._lock:
+            self.last_used = time.monotonic()
+
+    def idle(self):
+        with self._lock:
+            return self.viewers <= 0 and time.monotonic() - self.last_used >= self.hub.idle_seconds
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        min_interval = 1.0 / self.hub.max_fps if self.hub.max_fps else 0
+        backoff = 1.0
+        try:
+            while not self._stopping.is_set() and not self.idle():
+                capture = self.hub.capture_factory(self.source)
+                if capture is None or not capture.isOpened():
+                    self.error = 'could not open stream'
+                    logger.warning(f"CCTV hub: cannot open camera {self.key}, retrying in {backoff:.0f}s")
+                    if self._stopping.wait(backoff):
+                        break
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+
+                backoff = 1.0
+                self.error = None
+                try:
+                    next_frame_at = time.monotonic()
+                    while not self._stopping.is_set() and not self.idle():
+                        ok, image = capture.read()
+                        if not ok:
+                            break  # Stream ended or dropped: reconnect
+                        self.frames_captured += 1
+                        self.ring.publish(self.hub.encoder(image))
+                        self.frames_encoded += 1
+
+                        if min_interval:
+                            next_frame_at += min_interval
+                            delay = next_frame_at - time.monotonic()
+                            if delay > 0:
+                                self._stopping.wait(delay)
+                            else:
+                                next_frame_at = time.monotonic()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"CCTV hub: camera {self.key} failed: {e}")
+                finally:
+                    capture.release()
+        finally:
+            self.ring.close()
+            self.hub._remove(self)
+
+
+class Viewer:
+    """One viewer's cursor into a camera's ring"""
+
+    def __init__(self, worker):
+        self.worker = worker
+        # Start from the newest frame so the picture appears immediately
+        self.after = max(0, worker.ring.seq - 1)
+        self.frames = 0
+        self.dropped = 0
+        self.closed = False
+        worker.attach()
+
+    def _advance(self, frame):
+        self.dropped += frame.seq - self.after - 1
+        self.after = frame.seq
+        self.frames += 1
+        return frame.data
+
+    def read(self, timeout=None):
+        """Next JPEG for this viewer, or None if nothing arrived in time"""
+        frame = self.worker.ring.read(self.after, timeout)
+        return self._advance(frame) if frame is not None else None
+
+    def __iter__(self):
+        timeout = self.worker.hub.read_timeout
+        try:
+            while not self.closed:
+                data = self.read(timeout)
+                if data is None:
+                    if self.worker.ring.closed or not self.worker.is_alive():
+                        return
+                    continue
+                yield data
+        finally:
+            self.close()
+
+    async def aiter(self):
+        """Async frames for websocket consumers; no thread per viewer"""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def notify():
+            loop.call_soon_threadsafe(ready.set)
+
+        ring = self.worker.ring
+        ring.add_listener(notify)
+        try:
+            while not self.closed:
+                frame = ring.read(self.after, timeout=0)
+                if frame is None:
+                    if ring.closed:
+                        return
+                    ready.clear()
+                    if ring.seq <= self.after and not ring.closed:
+                        try:
+                            await asyncio.wait_for(ready.wait(), self.worker.hub.read_timeout)
+                        except asyncio.TimeoutError:
+                            pass
+                    continue
+                yield self._advance(frame)
+        finally:
+            ring.remove_listener(notify)
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.worker.detach()
+
+
+class CameraHub:
+    """Registry of camera workers for this process"""
+
+    def __init__(self, capture_factory=None, encoder=None, ring_size=None, max_fps=None,
+                 idle_seconds=None, read_timeout=None):
+        self.capture_factory = capture_factory or open_capture
+        self.encoder = encoder or encode_jpeg
+        self.ring_size = ring_size or getattr(settings, 'CCTV_HUB_RING_SIZE', 8)
+        self.max_fps = getattr(settings, 'CCTV_HUB_MAX_FPS', 15) if max_fps is None else max_fps
+        self.idle_seconds = getattr(settings, 'CCTV_HUB_IDLE_SECONDS', 30) if idle_seconds is None else idle_seconds
+        self.read_timeout = read_timeout or getattr(settings, 'CCTV_HUB_READ_TIMEOUT', 10)
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def _worker(self, key, source, attach=False):
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None or worker.source != source or not worker.is_alive():
+                if worker is not None:
+                    worker.stop()
+                worker = CameraWorker(self, key, source)
+                self._workers[key] = worker
+                worker.start()
+            if attach:
+                return Viewer(worker)
+            worker.touch()
+            return worker
+
+    def _remove(self, worker):
+        with self._lock:
+            if self._workers.get(worker.key) is worker:
+                del self._workers[worker.key]
+
+    def subscribe(self, key, source):
+        """A Viewer over the camera's frames; starts the capture if needed"""
+        return self._worker(str(key), source, attach=True)
+
+    def latest(self, key, max_age=None):
+        """Newest frame of a running camera, if fresh enough"""
+        with self._lock:
+            worker = self._workers.get(str(key))
+        if worker is None:
+            return None
+        frame = worker.ring.latest()
+        if frame is None or (max_age is not None and time.time() - frame.timestamp > max_age):
+            return None
+        worker.touch()
+        return frame.data
+
+    def snapshot(self, key, source, max_age=None, timeout=5.0):
+        """
+        Current JPEG of a camera
+
+        Served from the newest shared frame; a camera nobody watches is opened
+        and kept warm for CCTV_HUB_IDLE_SECONDS, so repeated snapshots reuse
+        one RTSP session.
+        """
+        max_age = max_age if max_age is not None else getattr(settings, 'CCTV_SNAPSHOT_MAX_AGE_SECONDS', 2)
+        data = self.latest(key, max_age)
+        if data is not None:
+            return data
+        worker = self._worker(str(key), source)
+        frame = worker.ring.read(worker.ring.seq, timeout)
+        return frame.data if frame is not None else None
+
+    def stats(self):
+        with self._lock:
+            workers = list(self._workers.values())
+        return {
+            worker.key: {
+                'viewers': worker.viewers,
+                'frames_captured': worker.frames_captured,
+                'frames_encoded': worker.frames_encoded,
+                'error': worker.error,
+            }
+            for worker in workers
+        }
+
+    def shutdown(self, timeout=5.0):
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.join(timeout)
+
+
+# Global camera hub for this process
+camera_hub = CameraHub()
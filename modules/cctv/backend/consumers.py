@@ -0,0 +1,55 @@
+"""
+WebSocket consumers for CCTV module
+Live camera frames as binary JPEG messages, from the shared camera hub
+"""
+
+import asyncio
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from .camera_hub import CV2_AVAILABLE, camera_hub
+from .models import Camera
+
+
+class CameraStreamConsumer(AsyncWebsocketConsumer):
+    """Live view of one camera; every viewer shares the camera's single capture"""
+
+    async def connect(self):
+        """Accept WebSocket connection"""
+        self.user = self.scope["user"]
+        self.camera_id = self.scope['url_route']['kwargs']['camera_id']
+        self.viewer = None
+
+        if not self.user.is_authenticated or not CV2_AVAILABLE:
+            await self.close()
+            return
+
+        rtsp_url = await self.get_rtsp_url()
+        if not rtsp_url:
+            await self.close()
+            return
+
+        await self.accept()
+        self.viewer = camera_hub.subscribe(self.camera_id, rtsp_url)
+        self.stream_task = asyncio.create_task(self.stream_frames())
+
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnect"""
+        if hasattr(self, 'stream_task'):
+            self.stream_task.cancel()
+        if self.viewer:
+            self.viewer.close()
+
+    async def stream_frames(self):
+        """Send frames as they arrive; a slow socket just skips frames"""
+        async for frame_bytes in self.viewer.aiter():
+            await self.send(bytes_data=frame_bytes)
+        await self.close()
+
+    @database_sync_to_async
+    def get_rtsp_url(self):
+        """RTSP URL of the user's camera"""
+        try:
+            camera = Camera.objects.get(id=self.camera_id, user=self.user)
+        except (Camera.DoesNotExist, ValueError):
+            return None
+        return camera.get_rtsp_url()
@@ -0,0 +1,10 @@
+"""
+WebSocket routing for CCTV module
+"""
+
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/cctv/stream/(?P<camera_id>[^/]+)/$', consumers.CameraStreamConsumer.as_asgi()),
+]
@@ -0,0 +1,192 @@
+"""
+CCTV Camera Hub Tests
+
+- One capture and one encode per camera, whatever the number of viewers
+- Slow viewers drop frames without holding back the others
+- Snapshots come from the latest shared frame
+- CPU cost of additional viewers, with a local video file as the RTSP source
+"""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from modules.cctv.backend.camera_hub import CV2_AVAILABLE, CameraHub, FrameRing, encode_jpeg, open_capture
+
+
+class FakeCapture:
+    """Endless numbered frames, like an RTSP camera"""
+
+    def __init__(self):
+        self.index = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.index += 1
+        return True, self.index
+
+    def release(self):
+        self.released = True
+
+
+class CountingHub(CameraHub):
+    def __init__(self, **kwargs):
+        self.opened = []
+        self.encoded = 0
+        self._count_lock = threading.Lock()
+        super().__init__(capture_factory=self._open, encoder=self._encode, **kwargs)
+
+    def _open(self, source):
+        capture = FakeCapture()
+        self.opened.append(capture)
+        return capture
+
+    def _encode(self, image):
+        with self._count_lock:
+            self.encoded += 1
+        return str(image).encode()
+
+
+class TestFrameRing(SimpleTestCase):
+
+    def test_lagging_reader_skips_to_newest(self):
+        ring = FrameRing(capacity=4)
+        for i in range(1, 4):
+            ring.publish(str(i).encode())
+        self.assertEqual(ring.read(0).seq, 1)
+
+        for i in range(4, 11):
+            ring.publish(str(i).encode())
+        frame = ring.read(1)
+        self.assertEqual(frame.seq, 10)
+        self.assertIsNone(ring.read(10, timeout=0))
+
+
+class TestCameraHub(SimpleTestCase):
+
+    def setUp(self):
+        self.hub = CountingHub(ring_size=4, max_fps=200, idle_seconds=0.2, read_timeout=2)
+
+    def tearDown(self):
+        self.hub.shutdown()
+
+    def test_viewers_share_one_capture_and_encode(self):
+        viewers = [self.hub.subscribe('cam-1', 'rtsp://camera/1') for _ in range(5)]
+        received = [[] for _ in viewers]
+
+        def watch(viewer, frames):
+            for data in viewer:
+                frames.append(data)
+                if len(frames) == 30:
+                    break
+
+        threads = [threading.Thread(target=watch, args=pair) for pair in zip(viewers, received)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(self.hub.opened), 1)
+        self.assertTrue(all(len(frames) == 30 for frames in received))
+        stats = self.hub.stats()['cam-1']
+        # Each captured frame was encoded exactly once for all five viewers
+        self.assertEqual(self.hub.encoded, stats['frames_captured'])
+        self.assertLess(self.hub.encoded, sum(len(frames) for frames in received))
+
+    def test_slow_viewer_drops_frames_without_blocking_others(self):
+        slow = self.hub.subscribe('cam-1', 'rtsp://camera/1')
+        fast = self.hub.subscribe('cam-1', 'rtsp://camera/1')
+
+        started = time.monotonic()
+        for _ in range(40):
+            self.assertIsNotNone(fast.read(timeout=1))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(fast.dropped, 0)
+
+        # The slow viewer never read; it resumes at the newest frame
+        slow.read(timeout=1)
+        self.assertGreater(slow.dropped, 30)
+        slow.close()
+        fast.close()
+
+    def test_snapshot_reuses_running_capture_then_idles_out(self):
+        viewer = self.hub.subscribe('cam-1', 'rtsp://camera/1')
+        viewer.read(timeout=1)
+        self.assertIsNotNone(self.hub.snapshot('cam-1', 'rtsp://camera/1'))
+        self.assertEqual(len(self.hub.opened), 1)
+
+        viewer.close()
+        deadline = time.monotonic() + 3
+        while self.hub.stats() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.hub.stats(), {})
+        self.assertTrue(self.hub.opened[0].released)
+
+
+@skipUnless(CV2_AVAILABLE, 'opencv is not installed')
+class TestViewerCpuCost(SimpleTestCase):
+    """A local video file stands in for the RTSP camera"""
+
+    FPS = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import cv2
+        import numpy as np
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.video = str(Path(cls.tmp.name) / 'camera.avi')
+        writer = cv2.VideoWriter(cls.video, cv2.VideoWriter_fourcc(*'MJPG'), cls.FPS, (640, 480))
+        rng = np.random.default_rng(1)
+        for i in range(cls.FPS * 4):
+            image = np.full((480, 640, 3), i % 255, dtype=np.uint8)
+            image[::8, ::8] = rng.integers(0, 255, (60, 80, 3), dtype=np.uint8)
+            writer.write(image)
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def _cpu_with_viewers(self, count, seconds=2.0):
+        hub = CameraHub(capture_factory=open_capture, encoder=encode_jpeg, max_fps=self.FPS, idle_seconds=1)
+        viewers = [hub.subscribe('file-cam', self.video) for _ in range(count)]
+        viewers[0].read(timeout=5)  # Warm up: file opened, first frame encoded
+
+        stop = threading.Event()
+
+        def watch(viewer):
+            while not stop.is_set():
+                viewer.read(timeout=0.5)
+
+        threads = [threading.Thread(target=watch, args=(viewer,)) for viewer in viewers]
+        for thread in threads:
+            thread.start()
+        cpu_started = time.process_time()
+        time.sleep(seconds)
+        cpu = time.process_time() - cpu_started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for viewer in viewers:
+            viewer.close()
+        hub.shutdown()
+        return cpu
+
+    def test_additional_viewers_cost_little_cpu(self):
+        one = self._cpu_with_viewers(1)
+        many = self._cpu_with_viewers(9)
+        per_additional_viewer = (many - one) / 8
+        print(f'\nCPU for 2s: 1 viewer {one:.3f}s, 9 viewers {many:.3f}s, '
+              f'+{per_additional_viewer * 1000:.1f}ms per additional viewer')
+        # Without the hub each viewer would decode and encode on its own
+        self.assertLess(per_additional_viewer, one * 0.25)
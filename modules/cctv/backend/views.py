@@ -35,6 +35,7 @@ from .models import (
     Camera, CameraStream, RecordingSession, 
     RecordingSchedule, Alert, CameraGroup, StorageConfiguration
 )
+from .camera_hub import camera_hub
 
 
 class CCTVDashboardView(LoginRequiredMixin, BaseUIView):
@@ -231,7 +232,7 @@ class StreamProxyView(LoginRequiredMixin, View):
         camera = get_object_or_404(Camera, id=camera_id, user=request.user)
         
         def generate():
-            """Generate MJPEG stream"""
+            """Generate MJPEG stream from the camera's shared frames"""
             rtsp_url = camera.get_rtsp_url()
             if not rtsp_url:
                 return
@@ -240,24 +241,15 @@ class StreamProxyView(LoginRequiredMixin, View):
             if not CV2_AVAILABLE:
                 return
             
-            cap = cv2.VideoCapture(rtsp_url)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
+            # One capture/encode per camera, whatever the number of viewers
+            viewer = camera_hub.subscribe(camera.id, rtsp_url)
             try:
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
-                    # Encode frame as JPEG
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    frame_bytes = buffer.tobytes()
-                    
+                for frame_bytes in viewer:
                     # Yield frame in MJPEG format
                     yield (b'--frame\r\n'
                            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
             finally:
-                cap.release()
+                viewer.close()
         
         return StreamingHttpResponse(
             generate(),
@@ -272,6 +264,11 @@ class SnapshotView(LoginRequiredMixin, View):
         """Get current snapshot from camera"""
         camera = get_object_or_404(Camera, id=camera_id, user=request.user)
         
+        # Someone is watching: the latest shared frame is the snapshot
+        frame_bytes = camera_hub.latest(camera.id, max_age=getattr(settings, 'CCTV_SNAPSHOT_MAX_AGE_SECONDS', 2))
+        if frame_bytes:
+            return HttpResponse(frame_bytes, content_type='image/jpeg')
+        
         # Get snapshot URL
         snapshot_url = camera.get_snapshot_url()
         if snapshot_url:
@@ -284,16 +281,12 @@ class SnapshotView(LoginRequiredMixin, View):
             except:
                 pass
         
-        # Fallback: capture frame from stream
+        # Fallback: capture frame from stream (kept warm for further snapshots)
         rtsp_url = camera.get_rtsp_url()
         if rtsp_url and CV2_AVAILABLE:
-            cap = cv2.VideoCapture(rtsp_url)
-            ret, frame = cap.read()
-            cap.release()
-            
-            if ret:
-                _, buffer = cv2.imencode('.jpg', frame)
-                return HttpResponse(buffer.tobytes(), content_type='image/jpeg')
+            frame_bytes = camera_hub.snapshot(camera.id, rtsp_url)
+            if frame_bytes:
+                return HttpResponse(frame_bytes, content_type='image/jpeg')
         
         return HttpResponse(status=404)
 
@@ -26,8 +26,8 @@ class CurrenciesConfig(AppConfig):
         # Initialize UNIBOS module
         self._initialize_module()
 
-        # Import and register signals (if any)
-        # from . import signals  # noqa
+        # Import and register signals
+        from . import signals  # noqa
 
     def _add_sdk_to_path(self):
         """Add UNIBOS SDK to Python path if not already there"""
@@ -13,15 +13,25 @@ from django.core.cache import cache
 from django.utils import timezone
 from .models import Currency, ExchangeRate, Portfolio, CurrencyAlert
 from .serializers import ExchangeRateSerializer, PortfolioSerializer
+from .rate_publisher import PAIR_CACHE_TIMEOUT, pair_cache_key, pair_group, rate_data
 
 
 class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
-    """Real-time currency exchange rates"""
+    """
+    Real-time currency exchange rates
+
+    Clients subscribe to pairs and join the group of each one; new rates are
+    pushed to the groups by rate_publisher when they are written, with only
+    the fields that changed:
+
+        {'type': 'rate_updates', 'data': {'USD/TRY': {'rate': 32.1, ...}}}
+    """
     
     async def connect(self):
         """Accept WebSocket connection"""
         self.user = self.scope["user"]
         self.room_group_name = "currency_rates"
+        self.subscriptions = {}
         
         # Join currency rates group
         await self.channel_layer.group_add(
@@ -33,15 +43,12 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         
         # Send initial rates on connection
         await self.send_initial_rates()
-        
-        # Start periodic rate updates
-        self.update_task = asyncio.create_task(self.periodic_rate_update())
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnect"""
-        # Cancel periodic updates
-        if hasattr(self, 'update_task'):
-            self.update_task.cancel()
+        # Leave pair groups
+        for group in getattr(self, 'subscriptions', {}).values():
+            await self.channel_layer.group_discard(group, self.channel_name)
         
         # Leave room group
         await self.channel_layer.group_discard(
@@ -66,10 +73,14 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         target_currency = data.get('target_currency')
         
         if base_currency and target_currency:
-            # Store subscription in user's session
-            subscriptions = self.scope.get('subscriptions', set())
-            subscriptions.add(f"{base_currency}/{target_currency}")
-            self.scope['subscriptions'] = subscriptions
+            # Currency codes are at most 10 characters
+            if len(str(base_currency)) > 10 or len(str(target_currency)) > 10:
+                return
+            pair = f"{base_currency}/{target_currency}"
+            if pair not in self.subscriptions:
+                group = pair_group(base_currency, target_currency)
+                await self.channel_layer.group_add(group, self.channel_name)
+                self.subscriptions[pair] = group
             
             # Send current rate
             await self.send_currency_pair_rate(base_currency, target_currency)
@@ -80,9 +91,9 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         target_currency = data.get('target_currency')
         
         if base_currency and target_currency:
-            subscriptions = self.scope.get('subscriptions', set())
-            subscriptions.discard(f"{base_currency}/{target_currency}")
-            self.scope['subscriptions'] = subscriptions
+            group = self.subscriptions.pop(f"{base_currency}/{target_currency}", None)
+            if group:
+                await self.channel_layer.group_discard(group, self.channel_name)
     
     async def send_initial_rates(self):
         """Send initial currency rates on connection"""
@@ -126,35 +137,6 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
             'timestamp': timezone.now().isoformat()
         })
     
-    async def periodic_rate_update(self):
-        """Send periodic rate updates"""
-        while True:
-            try:
-                await asyncio.sleep(10)  # Update every 10 seconds
-                
-                # Get subscribed pairs
-                subscriptions = self.scope.get('subscriptions', set())
-                
-                if subscriptions:
-                    updates = {}
-                    for pair in subscriptions:
-                        base, target = pair.split('/')
-                        rate = await self.get_currency_pair_rate(base, target)
-                        if rate:
-                            updates[pair] = rate
-                    
-                    if updates:
-                        await self.send_json({
-                            'type': 'rate_updates',
-                            'data': updates,
-                            'timestamp': timezone.now().isoformat()
-                        })
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in periodic update: {e}")
-                await asyncio.sleep(30)  # Wait longer on error
-    
     # Group message handlers
     async def rate_update(self, event):
         """Handle rate update from group"""
@@ -164,6 +146,14 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
             'timestamp': event['timestamp']
         })
     
+    async def rate_delta(self, event):
+        """Handle changed fields of a subscribed pair from rate_publisher"""
+        await self.send_json({
+            'type': 'rate_updates',
+            'data': {event['pair']: event['data']},
+            'timestamp': event['timestamp']
+        })
+    
     @database_sync_to_async
     def get_latest_rates(self):
         """Get latest currency rates from database"""
@@ -178,8 +168,8 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
             'base_currency', 'target_currency'
         ).filter(
             timestamp__gte=timezone.now() - timezone.timedelta(hours=1)
-        ).order_by('base_currency', 'target_currency', '-timestamp').distinct(
-            'base_currency', 'target_currency'
+        ).order_by('base_currency_id', 'target_currency_id', '-timestamp').distinct(
+            'base_currency_id', 'target_currency_id'
         )
         
         for rate in latest_rates:
@@ -197,7 +187,7 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
     @database_sync_to_async
     def get_currency_pair_rate(self, base_currency, target_currency):
         """Get rate for specific currency pair"""
-        cache_key = f'rate_{base_currency}_{target_currency}'
+        cache_key = pair_cache_key(base_currency, target_currency)
         cached_rate = cache.get(cache_key)
         
         if cached_rate:
@@ -211,17 +201,10 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
                 target_currency__code=target_currency
             ).latest('timestamp')
             
-            rate_data = {
-                'rate': float(rate.rate),
-                'bid': float(rate.bid) if rate.bid else None,
-                'ask': float(rate.ask) if rate.ask else None,
-                'change_24h': float(rate.change_percentage_24h) if rate.change_percentage_24h else 0,
-                'volume_24h': float(rate.volume_24h) if rate.volume_24h else 0,
-                'timestamp': rate.timestamp.isoformat()
-            }
+            data = rate_data(rate)
             
-            cache.set(cache_key, rate_data, 30)
-            return rate_data
+            cache.set(cache_key, data, PAIR_CACHE_TIMEOUT)
+            return data
         except ExchangeRate.DoesNotExist:
             return None
     
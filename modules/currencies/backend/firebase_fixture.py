@@ -0,0 +1,157 @@
+"""
+Firebase fixture server
+Serves a synthetic multi-year `kurlar` dump over local HTTP, answering the
+orderBy="zaman"/startAt queries of the Firebase REST API, so the rate
+importer can be tested and benchmarked offline
+
+The dump lives on disk, one entry per line, and responses are streamed from
+it, so the server holds only an index of entry times and file offsets.
+"""
+
+import bisect
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .firebase_import import CURRENCY_MAPPING
+
+BANKS = [
+    'TCMB', 'Akbank', 'Garanti BBVA', 'Yapı Kredi', 'Ziraat', 'Halkbank',
+    'Vakıfbank', 'İş Bankası', 'ING', 'QNB', 'Denizbank', 'TEB',
+]
+
+BASE_RATES = {
+    'USDTRY': 8.0,
+    'EURTRY': 9.5,
+    'XAUTRY': 450.0,
+    'GBPTRY': 11.0,
+    'CHFTRY': 8.7,
+    'JPYTRY': 0.075,
+}
+
+KEY_PREFIX = 'fx'
+
+
+def write_dump(path, start_ms, count, interval_minutes=60, banks=6, seed=1):
+    """
+    Write `count` entries, `interval_minutes` apart from `start_ms`, as
+    `<zaman>\\t<key>\\t<entry json>` lines
+
+    Returns the zaman of the last entry.
+    """
+    rng = random.Random(seed)
+    rates = {pair: rate for pair, rate in BASE_RATES.items() if pair in CURRENCY_MAPPING}
+    zaman = start_ms
+    with open(path, 'w', encoding='utf-8') as dump:
+        for i in range(count):
+            zaman = start_ms + i * interval_minutes * 60 * 1000
+            for pair in rates:
+                rates[pair] *= 1 + rng.gauss(0.0002, 0.004)
+            entry = {
+                'zaman': zaman,
+                'data': [
+                    {
+                        'banka': bank,
+                        'banka_kuru': [
+                            {
+                                'kur': pair,
+                                'alis': round(rate * (1 - 0.002 * (b + 1)), 4),
+                                'satis': round(rate * (1 + 0.002 * (b + 1)), 4),
+                            }
+                            for pair, rate in rates.items()
+                        ],
+                    }
+                    for b, bank in enumerate(BANKS[:banks])
+                ],
+            }
+            dump.write(f"{zaman}\t{KEY_PREFIX}{zaman:013d}\t{json.dumps(entry, ensure_ascii=False)}\n")
+    return zaman
+
+
+class FirebaseFixtureServer:
+    """
+    Local HTTP server for a dump written by write_dump
+
+    `until` hides entries after that zaman, to simulate data arriving later.
+    Each request is recorded in `requests` with its query and bytes sent.
+
+    Usage:
+        server = FirebaseFixtureServer(path).start()
+        FirebaseRateImporter(url=server.url).run()
+        server.stop()
+    """
+
+    def __init__(self, dump_path, until=None):
+        self.dump_path = dump_path
+        self.until = until
+        self.requests = []
+        self.times = []
+        self.offsets = []
+        offset = 0
+        with open(dump_path, 'rb') as dump:
+            for line in dump:
+                self.times.append(int(line.split(b'\t', 1)[0]))
+                self.offsets.append(offset)
+                offset += len(line)
+        self._httpd = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/kurlar.json'
+
+    def start(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def handle(self, request):
+        query = {key: values[0] for key, values in parse_qs(urlparse(request.path).query).items()}
+        first = 0
+        if 'orderBy' in query:
+            if json.loads(query['orderBy']) != 'zaman':
+                request.send_error(400, 'Index not defined, add ".indexOn"')
+                return
+            if 'startAt' in query:
+                first = bisect.bisect_left(self.times, int(json.loads(query['startAt'])))
+        last = len(self.times) if self.until is None else bisect.bisect_right(self.times, self.until)
+
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.end_headers()
+
+        sent = 0
+        with open(self.dump_path, 'rb') as dump:
+            if first < last:
+                dump.seek(self.offsets[first])
+            parts = [b'{']
+            size = 1
+            for index in range(first, last):
+                _, key, entry = dump.readline().rstrip(b'\n').split(b'\t', 2)
+                parts.append(b'%s"%s":%s' % (b',' if index > first else b'', key, entry))
+                size += len(parts[-1])
+                if size >= 64 * 1024:
+                    request.wfile.write(b''.join(parts))
+                    sent += size
+                    parts, size = [], 0
+            parts.append(b'}')
+            request.wfile.write(b''.join(parts))
+            sent += size + 1
+        self.requests.append({'query': query, 'bytes': sent, 'entries': max(last - first, 0)})
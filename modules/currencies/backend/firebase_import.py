@@ -0,0 +1,285 @@
+"""
+Firebase bank rate import
+Incremental import of bank exchange rates from the Firebase `kurlar` node
+
+Only entries from the stored high-water mark on are requested, with
+Firebase REST query parameters:
+
+    kurlar.json?orderBy="zaman"&startAt=<epoch ms>
+
+(this needs `".indexOn": "zaman"` in the database rules). The response is
+parsed one entry at a time while it downloads, existing rows are looked up
+for the incoming entry IDs of each batch only, and new rows are written with
+bulk_create, so a run costs the same however long the rate history gets.
+"""
+
+import codecs
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+import pytz
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import BankExchangeRate
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_URL = 'https://findmeonphotos-default-rtdb.europe-west1.firebasedatabase.app/kurlar.json'
+
+ISTANBUL_TZ = pytz.timezone('Europe/Istanbul')
+
+# Bank and currency mappings - Firebase to Django model
+BANK_MAPPING = {
+    'TCMB': 'TCMB',
+    'Akbank': 'Akbank',
+    'Garanti': 'Garanti',
+    'Garanti BBVA': 'Garanti',
+    'YKB': 'YKB',
+    'Yapı Kredi': 'YKB',
+    'Ziraat': 'Ziraat',
+    'Halkbank': 'Halkbank',
+    'Vakıfbank': 'Vakıfbank',
+    'İş Bankası': 'İşbank',
+    'ING': 'ING',
+    'QNB': 'QNB',
+    'Denizbank': 'Denizbank',
+    'TEB': 'TEB',
+}
+
+CURRENCY_MAPPING = {
+    'USDTRY': 'USDTRY',
+    'EURTRY': 'EURTRY',
+    'XAUTRY': 'XAUTRY',
+    'GBPTRY': 'GBPTRY',
+    'CHFTRY': 'CHFTRY',
+    'JPYTRY': 'JPYTRY',
+}
+
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_object(chunks):
+    """
+    Yield the (key, value) members of a top-level JSON object, parsing from an
+    iterable of bytes or str chunks one member at a time
+
+    Firebase answers `null` for an empty result, which yields nothing.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer, pos, eof = '', 0, False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            chunk = text.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            chunk = text.decode(chunk)
+        # Drop what has been parsed already
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            read_more()
+
+    def expect(allowed):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] not in allowed:
+            found = buffer[pos] if pos < len(buffer) else 'end of data'
+            raise ValueError(f"Expected one of {allowed!r} in JSON object, found {found!r}")
+        pos += 1
+        return buffer[pos - 1]
+
+    def value():
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                result, end = decoder.raw_decode(buffer, pos)
+                # A value ending exactly at the buffer end may continue (e.g. a number)
+                if end < len(buffer) or eof:
+                    pos = end
+                    return result
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            read_more()
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        return
+    if buffer[pos] != '{':
+        if value() is None:
+            return
+        raise ValueError('Expected a JSON object')
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == '}':
+        return
+    while True:
+        key = value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key in JSON object, found {key!r}")
+        expect(':')
+        yield key, value()
+        if expect(',}') == '}':
+            return
+
+
+class FirebaseRateImporter:
+    """
+    Streams Firebase rate entries newer than the high-water mark into BankExchangeRate
+
+    Usage:
+        stats = FirebaseRateImporter().run()
+    """
+
+    def __init__(self, url=None, batch_size=None, overlap_minutes=None, timeout=60):
+        self.url = url or FIREBASE_URL
+        self.batch_size = batch_size or getattr(settings, 'CURRENCIES_FIREBASE_IMPORT_BATCH_SIZE', 2000)
+        self.overlap = timedelta(
+            minutes=getattr(settings, 'CURRENCIES_FIREBASE_OVERLAP_MINUTES', 10)
+            if overlap_minutes is None else overlap_minutes
+        )
+        self.timeout = timeout
+        self.stats = {'entries': 0, 'total': 0, 'new': 0, 'updated': 0, 'failed': 0, 'skipped': 0}
+        # (bank, currency_pair) -> (timestamp, buy_rate, sell_rate) of the latest rate seen
+        self._latest = {}
+
+    def high_water_mark(self):
+        """Timestamp of the newest stored rate"""
+        return BankExchangeRate.objects.aggregate(latest=Max('timestamp'))['latest']
+
+    def fetch(self, since=None):
+        """(entry_id, entry) pairs from Firebase, from `since` on, parsed as they download"""
+        params = {}
+        if since is not None:
+            params = {'orderBy': '"zaman"', 'startAt': int(since.timestamp() * 1000)}
+        response = requests.get(self.url, params=params, timeout=self.timeout, stream=True)
+        response.raise_for_status()
+        with response:
+            yield from iter_json_object(response.iter_content(chunk_size=64 * 1024))
+
+    def run(self, since=None, full=False):
+        """
+        Import new entries and return the stats
+
+        Without `since`, starts `overlap` before the high-water mark, so
+        entries written late are picked up; `full` imports the whole node.
+        """
+        if since is None and not full:
+            latest = self.high_water_mark()
+            since = latest - self.overlap if latest else None
+
+        logger.info(f"Importing Firebase rates since {since or 'the beginning'}")
+        batch = []
+        for entry_id, entry in self.fetch(since):
+            self.stats['entries'] += 1
+            try:
+                batch.extend(self.parse_entry(entry_id, entry))
+            except Exception as e:
+                logger.error(f'Error processing entry {entry_id}: {str(e)}')
+                self.stats['failed'] += 1
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.stats
+
+    def parse_entry(self, entry_id, entry):
+        """Unsaved BankExchangeRate rows of one Firebase entry"""
+        if not isinstance(entry, dict) or 'zaman' not in entry or not isinstance(entry.get('data'), list):
+            self.stats['skipped'] += 1
+            return []
+
+        timestamp = datetime.fromtimestamp(entry['zaman'] / 1000, tz=ISTANBUL_TZ)
+        rows = []
+        for bank_data in entry['data']:
+            if not isinstance(bank_data, dict):
+                continue
+            bank = BANK_MAPPING.get(bank_data.get('banka', ''))
+            if not bank:
+                continue
+
+            for rate_data in bank_data.get('banka_kuru', []):
+                if not isinstance(rate_data, dict):
+                    continue
+                currency_pair = CURRENCY_MAPPING.get(rate_data.get('kur', ''))
+                if not currency_pair:
+                    continue
+
+                try:
+                    buy_rate = Decimal(str(rate_data.get('alis', 0)))
+                    sell_rate = Decimal(str(rate_data.get('satis', 0)))
+                except (ValueError, TypeError, InvalidOperation):
+                    self.stats['failed'] += 1
+                    continue
+                if buy_rate <= 0 or sell_rate <= 0:
+                    self.stats['skipped'] += 1
+                    continue
+
+                previous = self._previous(bank, currency_pair, timestamp, buy_rate, sell_rate)
+                row = BankExchangeRate(
+                    entry_id=f"{entry_id}_{bank}_{currency_pair}",
+                    bank=bank,
+                    currency_pair=currency_pair,
+                    buy_rate=buy_rate,
+                    sell_rate=sell_rate,
+                    date=timestamp.date(),
+                    timestamp=timestamp,
+                    previous_buy_rate=previous[1] if previous else None,
+                    previous_sell_rate=previous[2] if previous else None,
+                )
+                row.calculate_derived_fields()
+                rows.append(row)
+        return rows
+
+    def _previous(self, bank, currency_pair, timestamp, buy_rate, sell_rate):
+        """
+        Latest earlier (timestamp, buy, sell) for the pair
+
+        Entries mostly arrive in time order, so after the first lookup per
+        pair this is answered from the entries already streamed.
+        """
+        key = (bank, currency_pair)
+        latest = self._latest.get(key)
+        if latest and latest[0] < timestamp:
+            previous = latest
+        else:
+            previous = BankExchangeRate.objects.filter(
+                bank=bank, currency_pair=currency_pair, timestamp__lt=timestamp
+            ).order_by('-timestamp').values_list('timestamp', 'buy_rate', 'sell_rate').first()
+        if not latest or latest[0] < timestamp:
+            self._latest[key] = (timestamp, buy_rate, sell_rate)
+        return previous
+
+    def _flush(self, batch):
+        """Insert the rows of `batch` that are not stored yet"""
+        existing = set(
+            BankExchangeRate.objects.filter(
+                entry_id__in=[row.entry_id for row in batch]
+            ).values_list('entry_id', flat=True)
+        )
+        new_rows = [row for row in batch if row.entry_id not in existing]
+        self.stats['skipped'] += len(batch) - len(new_rows)
+        if new_rows:
+            with transaction.atomic():
+                BankExchangeRate.objects.bulk_create(new_rows, batch_size=self.batch_size, ignore_conflicts=True)
+            self.stats['new'] += len(new_rows)
+            self.stats['total'] += len(new_rows)
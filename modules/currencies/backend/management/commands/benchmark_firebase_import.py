@@ -0,0 +1,119 @@
+"""
+Benchmark the incremental Firebase rate import offline
+Writes a synthetic multi-year `kurlar` dump, serves it from a local fixture
+server and backfills it, then times the scheduled import of the newest hour
+with the streaming importer against the previous approach (whole-node
+download, .json() and a set of every stored entry_id), with peak Python
+memory and bytes downloaded for each
+
+Usage: python manage.py benchmark_firebase_import --years 3
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from modules.currencies.backend.firebase_fixture import KEY_PREFIX, FirebaseFixtureServer, write_dump
+from modules.currencies.backend.firebase_import import BANK_MAPPING, ISTANBUL_TZ, FirebaseRateImporter
+from modules.currencies.backend.models import BankExchangeRate
+
+# Far enough back not to collide with real rates
+DUMP_START = datetime(2001, 1, 1, tzinfo=ISTANBUL_TZ)
+
+
+def legacy_import_scan(url):
+    """The previous task up to its per-row work: download everything, index every stored id"""
+    data = requests.get(url, timeout=300).json()
+    existing_ids = set(BankExchangeRate.objects.values_list('entry_id', flat=True))
+    latest = BankExchangeRate.objects.order_by('-timestamp').first()
+    candidates = 0
+    for entry_id, entry in data.items():
+        timestamp = datetime.fromtimestamp(entry['zaman'] / 1000, tz=ISTANBUL_TZ)
+        if latest and (latest.timestamp - timestamp).days > 7:
+            continue
+        candidates += sum(
+            f"{entry_id}_{BANK_MAPPING[bank['banka']]}_{rate['kur']}" not in existing_ids
+            for bank in entry['data'] for rate in bank['banka_kuru']
+        )
+    return candidates
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming incremental Firebase rate import against a local multi-year fixture'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=float, default=3, help='Years of history in the dump (default: 3)')
+        parser.add_argument('--interval-minutes', type=int, default=60,
+                            help='Minutes between Firebase entries (default: 60)')
+        parser.add_argument('--banks', type=int, default=6, help='Banks per entry, up to 12 (default: 6)')
+        parser.add_argument('--new-entries', type=int, default=12,
+                            help='Entries arriving after the backfill (default: 12)')
+        parser.add_argument('--keep', action='store_true', help='Keep the imported synthetic rates')
+
+    def handle(self, *args, **options):
+        interval = options['interval_minutes']
+        count = int(options['years'] * 365 * 24 * 60 / interval)
+        new_entries = options['new_entries']
+        start_ms = int(DUMP_START.timestamp() * 1000)
+        rows = BankExchangeRate.objects.filter(entry_id__startswith=KEY_PREFIX)
+
+        with tempfile.TemporaryDirectory() as directory:
+            dump_path = os.path.join(directory, 'kurlar.jsonl')
+            last_ms = write_dump(dump_path, start_ms, count, interval, options['banks'])
+            self.stdout.write(
+                f'Dump: {count:,} entries over {options["years"]} years, '
+                f'{os.path.getsize(dump_path) / 1024 / 1024:.0f} MB'
+            )
+
+            server = FirebaseFixtureServer(dump_path, until=last_ms - new_entries * interval * 60 * 1000).start()
+            try:
+                started = time.perf_counter()
+                stats = FirebaseRateImporter(url=server.url).run(full=True)
+                self.stdout.write(
+                    f"Backfill: {stats['new']:,} rates from {stats['entries']:,} entries "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+
+                server.until = None
+                high_water = rows.aggregate(latest=Max('timestamp'))['latest']
+                self.stdout.write(f"\n{'scheduled import':<28} {'seconds':>8} {'peak MB':>8} {'download MB':>12} {'new':>6}")
+
+                def streaming():
+                    importer = FirebaseRateImporter(url=server.url)
+                    return importer.run(since=high_water - importer.overlap)['new']
+
+                # The previous approach is measured read-only, so it runs first and both see the same new entries
+                for label, run in (
+                    ('whole download + id set', lambda: legacy_import_scan(server.url)),
+                    ('streaming since high water', streaming),
+                ):
+                    self._measure(label, run, server)
+            finally:
+                server.stop()
+                if not options['keep']:
+                    deleted, _ = rows.delete()
+                    self.stdout.write(f'\nRemoved {deleted:,} synthetic rates')
+
+    def _measure(self, label, run, server):
+        """Times a run, then repeats it under tracemalloc for peak memory (tracing slows it down)"""
+        requests_before = len(server.requests)
+        started = time.perf_counter()
+        new = run()
+        seconds = time.perf_counter() - started
+        downloaded = sum(r['bytes'] for r in server.requests[requests_before:])
+
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.stdout.write(
+            f"{label:<28} {seconds:>8.2f} {peak / 1024 / 1024:>8.1f} {downloaded / 1024 / 1024:>12.2f} {new:>6,}"
+        )
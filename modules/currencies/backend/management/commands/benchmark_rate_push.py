@@ -0,0 +1,150 @@
+"""
+Load test the currency rate push hub with the in-memory channel layer
+Connects N websocket clients to CurrencyRatesConsumer, spread over the
+synthetic pairs, writes a tick of new rates and waits until every client has
+its update, counting database queries per tick. The previous design is
+measured alongside: every connection polled each of its pairs every 10
+seconds through the per-pair cache, whether anything changed or not.
+
+Usage: python manage.py benchmark_rate_push --connections 10,100,1000
+"""
+
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from modules.currencies.backend.consumers import CurrencyRatesConsumer
+from modules.currencies.backend.models import Currency, ExchangeRate
+from modules.currencies.backend.rate_publisher import pair_cache_key
+
+BENCH_PREFIX = 'QB'
+TARGET = f'{BENCH_PREFIX}T'
+
+
+class QueryCounter:
+    """execute_wrapper counting SELECT statements"""
+
+    def __init__(self):
+        self.selects = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            self.selects += 1
+        return execute(sql, params, many, context)
+
+
+async def connect_client(base):
+    """A client of CurrencyRatesConsumer, driven like an ASGI server would, subscribed to base/TARGET"""
+    client = ApplicationCommunicator(CurrencyRatesConsumer.as_asgi(), {
+        'type': 'websocket', 'path': '/ws/currencies/rates/', 'headers': [],
+        'subprotocols': [], 'user': AnonymousUser(),
+    })
+    await client.send_input({'type': 'websocket.connect'})
+    await client.receive_output(timeout=30)  # accept
+    await client.receive_output(timeout=30)  # initial_rates
+    await client.send_input({'type': 'websocket.receive', 'text': json.dumps({
+        'type': 'subscribe_pair', 'data': {'base_currency': base, 'target_currency': TARGET}
+    })})
+    await client.receive_output(timeout=30)  # current rate, sent once subscribed
+    return client
+
+
+class Command(BaseCommand):
+    help = 'Load test rate pushes: database queries and latency per tick against connection count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', default='10,100,1000',
+                            help='Comma-separated connection counts (default: 10,100,1000)')
+        parser.add_argument('--pairs', type=int, default=6, help='Currency pairs, up to 10 (default: 6)')
+        parser.add_argument('--ticks', type=int, default=5, help='Rate updates per run (default: 5)')
+
+    def handle(self, *args, **options):
+        pairs = [f'{BENCH_PREFIX}{i}' for i in range(min(options['pairs'], 10))]
+        for code in pairs + [TARGET]:
+            Currency.objects.get_or_create(
+                code=code, defaults={'name': f'Benchmark {code}', 'symbol': code, 'currency_type': 'fiat'}
+            )
+        self.rates = {base: Decimal('10') for base in pairs}
+        self.started = timezone.now()
+        self.tick_count = 0
+
+        counter = QueryCounter()
+        try:
+            with override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}):
+                with connection.execute_wrapper(counter):
+                    self.write_tick(pairs)
+                    self.stdout.write(
+                        f"{'connections':>11} {'design':<22} {'queries/tick':>12} "
+                        f"{'cache reads/tick':>16} {'messages/tick':>13} {'delivered ms':>12}"
+                    )
+                    for count in [int(n) for n in options['connections'].split(',')]:
+                        # Consumers run their database calls on this thread, so the counter sees them
+                        async_to_sync(self.run)(count, pairs, options['ticks'], counter)
+        finally:
+            deleted, _ = Currency.objects.filter(code__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(f'\nRemoved {deleted:,} synthetic currencies and rates')
+
+    def write_tick(self, pairs):
+        """One update: a new rate for every pair, written in one transaction like the rate services"""
+        self.tick_count += 1
+        timestamp = self.started + timezone.timedelta(seconds=self.tick_count)
+        with transaction.atomic():
+            for base in pairs:
+                self.rates[base] *= Decimal(str(1 + random.gauss(0, 0.002)))
+                ExchangeRate.objects.create(
+                    base_currency_id=base,
+                    target_currency_id=TARGET,
+                    rate=self.rates[base].quantize(Decimal('0.0000000001')),
+                    source='BENCH',
+                    timestamp=timestamp
+                )
+
+    async def run(self, count, pairs, ticks, counter):
+        clients = [await connect_client(pairs[i % len(pairs)]) for i in range(count)]
+        try:
+            # Push: one write per tick, fanned out by the channel layer
+            selects = elapsed = messages = 0
+            for _ in range(ticks):
+                before = counter.selects
+                started = time.perf_counter()
+                await database_sync_to_async(self.write_tick)(pairs)
+                # Until every client has its update
+                await asyncio.gather(*(client.receive_output(timeout=30) for client in clients))
+                elapsed += time.perf_counter() - started
+                selects += counter.selects - before
+                messages += count
+            self.report(count, 'push on write', selects / ticks, 0, messages / ticks, elapsed / ticks)
+
+            # Polling: each connection looked up its pair every 10s; worst case, the 30s pair cache expired
+            poller = CurrencyRatesConsumer()
+            selects = 0
+            for _ in range(ticks):
+                cache.delete_many([pair_cache_key(base, TARGET) for base in pairs])
+                before = counter.selects
+                for i in range(count):
+                    await poller.get_currency_pair_rate(pairs[i % len(pairs)], TARGET)
+                selects += counter.selects - before
+            self.report(count, 'per-connection polling', selects / ticks, count, count, None)
+        finally:
+            for client in clients:
+                await client.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await client.wait()
+
+    def report(self, count, design, selects, cache_reads, messages, seconds):
+        # Polling sent on a timer, so it has no write-to-delivery latency
+        delivered = f'{seconds * 1000:.1f}' if seconds is not None else '-'
+        self.stdout.write(
+            f"{count:>11,} {design:<22} {selects:>12.1f} {cache_reads:>16,} {messages:>13,.0f} {delivered:>12}"
+        )
@@ -802,6 +802,11 @@ class BankExchangeRate(models.Model):
     
     def save(self, *args, **kwargs):
         """Calculate spread and change values before saving"""
+        self.calculate_derived_fields()
+        super().save(*args, **kwargs)
+    
+    def calculate_derived_fields(self):
+        """Spread and change values; bulk_create skips save(), so importers call this"""
         # Calculate spread
         if self.buy_rate and self.sell_rate:
             self.spread = self.sell_rate - self.buy_rate
@@ -818,8 +823,6 @@ class BankExchangeRate(models.Model):
             self.sell_change = self.sell_rate - self.previous_sell_rate
             if self.previous_sell_rate > 0:
                 self.sell_change_percentage = (self.sell_change / self.previous_sell_rate) * 100
-        
-        super().save(*args, **kwargs)
     
     @classmethod
     def get_latest_rates(cls, bank=None, currency_pair=None):
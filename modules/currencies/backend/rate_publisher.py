@@ -0,0 +1,157 @@
+"""
+Currency rate push hub
+Publishes new exchange rates to the websocket clients subscribed to each pair
+
+Every ExchangeRate write marks its pair as changed (see signals.py). When the
+writing transaction commits, the latest rates of the changed pairs are read
+with one query and compared with the last published values, and only the
+fields that changed are sent to the channel-layer group of each pair:
+
+    currency_rate.USD.TRY  ->  {'type': 'rate_delta', 'pair': 'USD/TRY', 'data': {...}}
+
+CurrencyRatesConsumer joins the group of each pair a client subscribes to, so
+the cost of an update depends on the pairs written, not on connection count.
+"""
+
+import logging
+import re
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+# Seconds the full per-pair rate stays in the cache read by the consumers
+PAIR_CACHE_TIMEOUT = 30
+
+_local = threading.local()
+
+
+def pair_group(base_code, target_code):
+    """Channel-layer group of a currency pair (group names allow [a-zA-Z0-9_.-] only)"""
+    return 'currency_rate.' + '.'.join(re.sub(r'[^A-Za-z0-9_-]', '_', code) for code in (base_code, target_code))
+
+
+def pair_cache_key(base_code, target_code):
+    """Cache key of the full latest rate of a pair"""
+    return f'rate_{base_code}_{target_code}'
+
+
+def _snapshot_key(pair):
+    return f'currency_rate_published_{pair}'
+
+
+def rate_data(rate):
+    """Client representation of an ExchangeRate"""
+    return {
+        'rate': float(rate.rate),
+        'bid': float(rate.bid) if rate.bid else None,
+        'ask': float(rate.ask) if rate.ask else None,
+        'change_24h': float(rate.change_percentage_24h) if rate.change_percentage_24h else 0,
+        'volume_24h': float(rate.volume_24h) if rate.volume_24h else 0,
+        'timestamp': rate.timestamp.isoformat()
+    }
+
+
+def _publish_pending():
+    """Commit hook: publish every pair written since the last publish of this thread"""
+    pairs = getattr(_local, 'pairs', None)
+    _local.pairs = set()
+    if pairs:
+        publish(pairs)
+
+
+def rate_written(rate):
+    """
+    Mark the pair of a saved ExchangeRate as changed
+
+    Within a transaction the pair is published once it commits, together
+    with every other pair written in it; in autocommit mode right away.
+    Each write registers the commit hook (Django has no public rollback
+    hook, so a single registration could be lost with a rolled back
+    transaction unnoticed); the first hook to run publishes the batch and
+    the others find it empty. Pairs left over from a rollback only make
+    the next publish re-read their committed rate, which sends nothing new.
+    """
+    pair = (rate.base_currency_id, rate.target_currency_id)
+    if not connection.in_atomic_block:
+        publish([pair])
+        return
+
+    pairs = getattr(_local, 'pairs', None)
+    if pairs is None:
+        pairs = _local.pairs = set()
+    pairs.add(pair)
+    transaction.on_commit(_publish_pending)
+
+
+def latest_rates(pairs):
+    """Latest ExchangeRate of each (base code, target code) pair, in one query"""
+    condition = Q()
+    for base_id, target_id in pairs:
+        condition |= Q(base_currency_id=base_id, target_currency_id=target_id)
+    return list(
+        ExchangeRate.objects.filter(condition).order_by(
+            'base_currency_id', 'target_currency_id', '-timestamp'
+        ).distinct('base_currency_id', 'target_currency_id')
+    )
+
+
+def publish(pairs, channel_layer=None):
+    """
+    Send the changed fields of the latest rates of `pairs` to their groups
+
+    Returns the number of pairs published. Runs after the rates are
+    committed, so failures are logged rather than raised.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    channel_layer = channel_layer or get_channel_layer()
+
+    try:
+        rates = {}
+        for rate in latest_rates(pairs):
+            rates[f"{rate.base_currency_id}/{rate.target_currency_id}"] = rate
+
+        current = {pair: rate_data(rate) for pair, rate in rates.items()}
+        published = cache.get_many([_snapshot_key(pair) for pair in current])
+        cache.set_many({
+            pair_cache_key(rate.base_currency_id, rate.target_currency_id): current[pair]
+            for pair, rate in rates.items()
+        }, PAIR_CACHE_TIMEOUT)
+        cache.set_many({_snapshot_key(pair): data for pair, data in current.items()}, None)
+        cache.delete('latest_currency_rates')
+
+        if channel_layer is None:
+            return 0
+
+        sent = 0
+        now = timezone.now().isoformat()
+        for pair, data in current.items():
+            previous = published.get(_snapshot_key(pair)) or {}
+            changed = {field: value for field, value in data.items() if previous.get(field) != value}
+            if not changed:
+                continue
+            rate = rates[pair]
+            async_to_sync(channel_layer.group_send)(
+                pair_group(rate.base_currency_id, rate.target_currency_id),
+                {
+                    'type': 'rate_delta',
+                    'pair': pair,
+                    'data': changed,
+                    'timestamp': now,
+                }
+            )
+            sent += 1
+        return sent
+    except Exception as e:
+        logger.error(f"Error publishing currency rates: {str(e)}")
+        return 0
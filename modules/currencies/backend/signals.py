@@ -0,0 +1,22 @@
+"""
+Django Signals for Currencies
+Push new exchange rates to websocket subscribers; see rate_publisher.py
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ExchangeRate
+from . import rate_publisher
+
+
+@receiver(post_save, sender=ExchangeRate)
+def exchange_rate_created(sender, instance, created, **kwargs):
+    """
+    Signal handler for new exchange rates
+    Marks the pair as changed; it is published when the write commits
+    """
+    if not created or kwargs.get('raw'):
+        return
+
+    rate_publisher.rate_written(instance)
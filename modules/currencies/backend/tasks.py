@@ -352,188 +352,23 @@ def import_firebase_rates_incremental(self):
     """
     Import new bank exchange rates from Firebase
     Runs every 5 minutes to check for new data
-    Only imports records that don't exist in database
+    Only requests entries from the latest stored rate on (see firebase_import.py)
     """
-    import requests
-    from datetime import datetime
-    from decimal import Decimal, InvalidOperation
-    from django.db import transaction
-    import pytz
-    from .models import BankExchangeRate, BankRateImportLog
+    from .firebase_import import FirebaseRateImporter
+    from .models import BankRateImportLog
     
-    FIREBASE_URL = 'https://findmeonphotos-default-rtdb.europe-west1.firebasedatabase.app/kurlar.json'
-    
-    # Bank and currency mappings
-    BANK_MAPPING = {
-        'TCMB': 'TCMB',
-        'Akbank': 'Akbank',
-        'Garanti': 'Garanti',
-        'Garanti BBVA': 'Garanti',
-        'YKB': 'YKB',
-        'Yapı Kredi': 'YKB',
-        'Ziraat': 'Ziraat',
-        'Halkbank': 'Halkbank',
-        'Vakıfbank': 'Vakıfbank',
-        'İş Bankası': 'İşbank',
-        'ING': 'ING',
-        'QNB': 'QNB',
-        'Denizbank': 'Denizbank',
-        'TEB': 'TEB',
-    }
-    
-    CURRENCY_MAPPING = {
-        'USDTRY': 'USDTRY',
-        'EURTRY': 'EURTRY',
-        'XAUTRY': 'XAUTRY',
-        'GBPTRY': 'GBPTRY',
-        'CHFTRY': 'CHFTRY',
-        'JPYTRY': 'JPYTRY',
-    }
+    importer = FirebaseRateImporter()
     
     # Create import log
     import_log = BankRateImportLog.objects.create(
         import_type='scheduled',
-        source_url=FIREBASE_URL,
+        source_url=importer.url,
         status='in_progress'
     )
     
     try:
         logger.info("Starting incremental Firebase rates import")
-        
-        # Fetch data from Firebase
-        response = requests.get(FIREBASE_URL, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data:
-            raise ValueError('No data received from Firebase')
-        
-        # Get all existing entry IDs in a single query for performance
-        existing_ids = set(BankExchangeRate.objects.values_list('entry_id', flat=True))
-        logger.info(f"Found {len(existing_ids)} existing entries in database")
-        
-        # Get latest timestamp for reference
-        latest_entry = BankExchangeRate.objects.order_by('-timestamp').first()
-        latest_timestamp = latest_entry.timestamp if latest_entry else None
-        
-        stats = {
-            'total': 0,
-            'new': 0,
-            'updated': 0,
-            'failed': 0,
-            'skipped': 0
-        }
-        
-        # Batch for bulk insert
-        batch = []
-        batch_size = 100
-        istanbul_tz = pytz.timezone('Europe/Istanbul')
-        
-        # Process entries
-        for entry_id, entry_data in data.items():
-            try:
-                # Validate entry
-                if not isinstance(entry_data, dict) or 'zaman' not in entry_data:
-                    stats['skipped'] += 1
-                    continue
-                
-                # Parse timestamp
-                timestamp_ms = entry_data['zaman']
-                timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=istanbul_tz)
-                
-                # Skip very old entries for performance (only check last 7 days in scheduled task)
-                if latest_timestamp and (latest_timestamp - timestamp).days > 7:
-                    stats['skipped'] += 1
-                    continue
-                
-                date = timestamp.date()
-                
-                # Process bank data
-                if 'data' not in entry_data or not isinstance(entry_data['data'], list):
-                    stats['skipped'] += 1
-                    continue
-                
-                for bank_data in entry_data['data']:
-                    if not isinstance(bank_data, dict):
-                        continue
-                    
-                    bank_name_raw = bank_data.get('banka', '')
-                    bank_name = BANK_MAPPING.get(bank_name_raw)
-                    
-                    if not bank_name:
-                        continue
-                    
-                    # Process each currency rate
-                    for rate_data in bank_data.get('banka_kuru', []):
-                        if not isinstance(rate_data, dict):
-                            continue
-                        
-                        currency_pair_raw = rate_data.get('kur', '')
-                        currency_pair = CURRENCY_MAPPING.get(currency_pair_raw)
-                        
-                        if not currency_pair:
-                            continue
-                        
-                        # Parse rates
-                        try:
-                            buy_rate = Decimal(str(rate_data.get('alis', 0)))
-                            sell_rate = Decimal(str(rate_data.get('satis', 0)))
-                            
-                            # Skip invalid rates
-                            if buy_rate <= 0 or sell_rate <= 0:
-                                stats['skipped'] += 1
-                                continue
-                            
-                        except (ValueError, TypeError, InvalidOperation):
-                            stats['failed'] += 1
-                            continue
-                        
-                        # Create unique entry ID
-                        unique_entry_id = f"{entry_id}_{bank_name}_{currency_pair}"
-                        
-                        # Skip if already exists
-                        if unique_entry_id in existing_ids:
-                            stats['skipped'] += 1
-                            continue
-                        
-                        # Get previous rates for change calculation
-                        previous = BankExchangeRate.objects.filter(
-                            bank=bank_name,
-                            currency_pair=currency_pair,
-                            timestamp__lt=timestamp
-                        ).order_by('-timestamp').first()
-                        
-                        # Create new entry
-                        new_entry = BankExchangeRate(
-                            entry_id=unique_entry_id,
-                            bank=bank_name,
-                            currency_pair=currency_pair,
-                            buy_rate=buy_rate,
-                            sell_rate=sell_rate,
-                            date=date,
-                            timestamp=timestamp,
-                            previous_buy_rate=previous.buy_rate if previous else None,
-                            previous_sell_rate=previous.sell_rate if previous else None
-                        )
-                        
-                        batch.append(new_entry)
-                        stats['new'] += 1
-                        stats['total'] += 1
-                        
-                        # Save batch if reached batch size
-                        if len(batch) >= batch_size:
-                            with transaction.atomic():
-                                BankExchangeRate.objects.bulk_create(batch, batch_size=50)
-                            batch = []
-                
-            except Exception as e:
-                logger.error(f'Error processing entry {entry_id}: {str(e)}')
-                stats['failed'] += 1
-        
-        # Save remaining batch
-        if batch:
-            with transaction.atomic():
-                BankExchangeRate.objects.bulk_create(batch, batch_size=50)
+        stats = importer.run()
         
         # Update import log
         import_log.total_entries = stats['total']
@@ -549,7 +384,7 @@ def import_firebase_rates_incremental(self):
         import_log.save()
         
         logger.info(
-            f"Firebase incremental import completed: {stats['new']} new, "
+            f"Firebase incremental import completed: {stats['entries']} entries read, {stats['new']} new, "
             f"{stats['skipped']} skipped, {stats['failed']} failed"
         )
         
@@ -11,15 +11,32 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
+import contextlib
 import json
+import os
+import shutil
+import tempfile
 from datetime import timedelta
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 
 from .models import (
     Currency, ExchangeRate, CurrencyAlert,
     Portfolio, PortfolioHolding, Transaction,
-    MarketData
+    MarketData, BankExchangeRate
 )
 from .services import CurrencyService, TCMBService, CoinGeckoService
+from .firebase_fixture import FirebaseFixtureServer, write_dump
+from .firebase_import import FirebaseRateImporter, iter_json_object
+from .consumers import CurrencyRatesConsumer
+from .rate_publisher import pair_group
 
 User = get_user_model()
 
@@ -638,4 +655,221 @@ class SecurityTests(APITestCase):
             # Check that script tags are escaped
             portfolio = Portfolio.objects.get(id=response.data['id'])
             self.assertNotIn('<script>', portfolio.name)
-            self.assertNotIn('onerror=', portfolio.description)
\ No newline at end of file
+            self.assertNotIn('onerror=', portfolio.description)
+
+class FirebaseStreamParserTests(TestCase):
+    """Test the streaming JSON object parser used by the Firebase import"""
+    
+    def test_any_chunking_gives_the_same_members(self):
+        """Test members parse identically however the body is split"""
+        data = {'a': {'zaman': 1, 'x': [1.5, 'İş Bankası']}, 'b': 12345, 'c': None}
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        for size in (1, 2, 3, 7, len(body)):
+            chunks = [body[i:i + size] for i in range(0, len(body), size)]
+            self.assertEqual(dict(iter_json_object(chunks)), data)
+    
+    def test_empty_results(self):
+        """Test Firebase's null and empty bodies yield nothing"""
+        self.assertEqual(list(iter_json_object([b'null'])), [])
+        self.assertEqual(list(iter_json_object([b' { } '])), [])
+    
+    def test_truncated_body_raises(self):
+        """Test a cut-off download is not silently accepted"""
+        with self.assertRaises(ValueError):
+            list(iter_json_object([b'{"a": {"zaman": 1}, "b": {"za']))
+
+
+class FirebaseIncrementalImportTests(TestCase):
+    """Test the incremental Firebase import against the local fixture server"""
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.dump_path = os.path.join(directory, 'kurlar.jsonl')
+        self.start_ms = 1_700_000_000_000
+        self.last_ms = write_dump(self.dump_path, self.start_ms, count=30, interval_minutes=60, banks=2)
+        self.server = FirebaseFixtureServer(self.dump_path, until=self.start_ms + 19 * 3600 * 1000).start()
+        self.addCleanup(self.server.stop)
+    
+    def test_backfill_then_incremental(self):
+        """Test later runs request and insert only entries after the high-water mark"""
+        stats = FirebaseRateImporter(url=self.server.url, batch_size=50).run(full=True)
+        self.assertEqual(stats['new'], 20 * 2 * 6)
+        self.assertNotIn('orderBy', self.server.requests[-1]['query'])
+        
+        self.server.until = None
+        stats = FirebaseRateImporter(url=self.server.url, overlap_minutes=0).run()
+        
+        query = self.server.requests[-1]['query']
+        self.assertEqual(json.loads(query['orderBy']), 'zaman')
+        self.assertEqual(int(query['startAt']), self.start_ms + 19 * 3600 * 1000)
+        # The entry at the high-water mark comes back and is skipped
+        self.assertEqual(self.server.requests[-1]['entries'], 11)
+        self.assertEqual(stats['new'], 10 * 2 * 6)
+        self.assertEqual(stats['skipped'], 2 * 6)
+        self.assertEqual(BankExchangeRate.objects.count(), 30 * 2 * 6)
+    
+    def test_previous_rates_chain_across_runs(self):
+        """Test change values are computed from the preceding rate, also across runs"""
+        FirebaseRateImporter(url=self.server.url).run(full=True)
+        self.server.until = None
+        FirebaseRateImporter(url=self.server.url).run()
+        
+        rates = list(
+            BankExchangeRate.objects.filter(bank='TCMB', currency_pair='USDTRY').order_by('timestamp')
+        )
+        self.assertEqual(len(rates), 30)
+        self.assertIsNone(rates[0].previous_buy_rate)
+        for previous, rate in zip(rates, rates[1:]):
+            self.assertEqual(rate.previous_buy_rate, previous.buy_rate)
+            self.assertEqual(rate.buy_change, rate.buy_rate - previous.buy_rate)
+        self.assertEqual(rates[5].spread, rates[5].sell_rate - rates[5].buy_rate)
+    
+    def test_existence_checks_do_not_scale_with_history(self):
+        """Test a run looks up only the incoming entry IDs, not every stored one"""
+        FirebaseRateImporter(url=self.server.url).run(full=True)
+        self.server.until = None
+        
+        with CaptureQueriesContext(connection) as queries:
+            FirebaseRateImporter(url=self.server.url).run()
+        self.assertFalse([
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and 'entry_id' in q['sql'] and 'WHERE' not in q['sql']
+        ])
+
+
+class RatesClient(ApplicationCommunicator):
+    """
+    Websocket client of CurrencyRatesConsumer with an anonymous user
+    (channels.testing needs daphne, which is not installed)
+    """
+    
+    def __init__(self):
+        super().__init__(CurrencyRatesConsumer.as_asgi(), {
+            'type': 'websocket', 'path': '/ws/currencies/rates/', 'headers': [],
+            'subprotocols': [], 'user': AnonymousUser(),
+        })
+    
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return (await self.receive_output())['type'] == 'websocket.accept'
+    
+    async def send_json_to(self, data):
+        await self.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+    
+    async def receive_json_from(self):
+        return json.loads((await self.receive_output())['text'])
+    
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait()
+
+
+class RateWritesMixin:
+    """Currencies and a helper writing rates the way the rate services do"""
+    
+    def setUp(self):
+        cache.clear()
+        for code in ('USD', 'EUR', 'TRY'):
+            Currency.objects.create(code=code, name=code, symbol=code, currency_type='fiat')
+        self.now = timezone.now()
+    
+    def write_rates(self, rates, minutes=0):
+        """Write {(base, target): rate} in one transaction and run its commit hooks"""
+        # TestCase never commits, so its captured hooks are run by hand
+        capture = getattr(self, 'captureOnCommitCallbacks', None)
+        with capture(execute=True) if capture else contextlib.nullcontext():
+            with transaction.atomic():
+                for (base, target), rate in rates.items():
+                    ExchangeRate.objects.create(
+                        base_currency_id=base,
+                        target_currency_id=target,
+                        rate=Decimal(rate),
+                        source='TCMB',
+                        timestamp=self.now + timedelta(minutes=minutes)
+                    )
+
+
+# latest_rates() uses DISTINCT ON (PostgreSQL)
+@skipUnlessDBFeature('can_distinct_on_fields')
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RatePushTests(RateWritesMixin, TestCase):
+    """Test new rates are pushed once per write to the subscribed pair groups"""
+    
+    def test_one_query_and_changed_fields_per_commit(self):
+        """Test a commit publishes each written pair once, with only the fields that changed"""
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(pair_group('USD', 'TRY'), channel)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.write_rates({('USD', 'TRY'): '32.50', ('EUR', 'TRY'): '35.10'})
+        selects = [q for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['pair'], 'USD/TRY')
+        self.assertEqual(message['data']['rate'], 32.5)
+        
+        # Same rate a minute later: only the timestamp changed
+        self.write_rates({('USD', 'TRY'): '32.50'}, minutes=1)
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(list(message['data']), ['timestamp'])
+        self.assertEqual(cache.get('rate_USD_TRY')['rate'], 32.5)
+    
+    def test_rolled_back_writes_are_not_published(self):
+        """Test rates of a rolled back transaction are never published"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    ExchangeRate.objects.create(
+                        base_currency_id='EUR', target_currency_id='TRY',
+                        rate=Decimal('35'), source='TCMB', timestamp=self.now
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.write_rates({('USD', 'TRY'): '32.50', ('EUR', 'USD'): '1.08'})
+        self.assertEqual(len(callbacks), 2)
+        self.assertIsNone(cache.get('rate_EUR_TRY'))
+        self.assertEqual(cache.get('rate_EUR_USD')['rate'], 1.08)
+
+
+# The consumer's database_sync_to_async closes connections inside TestCase transactions
+@skipUnlessDBFeature('can_distinct_on_fields')
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RatePushConsumerTests(RateWritesMixin, TransactionTestCase):
+    """Test websocket clients get pushes for the pairs they subscribed to"""
+    
+    async def test_clients_receive_only_subscribed_pairs(self):
+        """Test pushes reach the clients of the pair, with a constant query count per write"""
+        await database_sync_to_async(self.write_rates)({('USD', 'TRY'): '32.50', ('EUR', 'TRY'): '35.10'})
+        clients = {'USD/TRY': [], 'EUR/TRY': []}
+        for pair, communicators in clients.items():
+            base, target = pair.split('/')
+            for _ in range(5):
+                communicator = RatesClient()
+                self.assertTrue(await communicator.connect())
+                self.assertEqual((await communicator.receive_json_from())['type'], 'initial_rates')
+                await communicator.send_json_to({
+                    'type': 'subscribe_pair', 'data': {'base_currency': base, 'target_currency': target}
+                })
+                # The current rate is the reply, sent once the client has joined the group
+                self.assertEqual((await communicator.receive_json_from())['type'], 'rate_update')
+                communicators.append(communicator)
+        
+        def tick():
+            with CaptureQueriesContext(connection) as queries:
+                self.write_rates({('USD', 'TRY'): '32.75'}, minutes=2)
+            return len([q for q in queries.captured_queries if q['sql'].startswith('SELECT')])
+        
+        self.assertEqual(await database_sync_to_async(tick)(), 1)
+        for communicator in clients['USD/TRY']:
+            update = await communicator.receive_json_from()
+            self.assertEqual(update['type'], 'rate_updates')
+            self.assertEqual(update['data']['USD/TRY']['rate'], 32.75)
+        for communicator in clients['EUR/TRY']:
+            self.assertTrue(await communicator.receive_nothing())
+        
+        for communicator in clients['USD/TRY'] + clients['EUR/TRY']:
+            await communicator.disconnect()
@@ -66,6 +66,9 @@ class MessengerConsumer(AsyncJsonWebsocketConsumer):
             'conversations_joined': len(conversation_ids)
         })
 
+        # Replay messages queued while offline
+        await self.deliver_pending()
+
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         # Leave all groups
@@ -189,7 +192,7 @@ class MessengerConsumer(AsyncJsonWebsocketConsumer):
             return
 
         # Update database
-        await self.mark_message_read(message_id)
+        await self.mark_message_read(conversation_id, message_id)
 
         # Broadcast to conversation
         group_name = f"messenger_conversation_{conversation_id}"
@@ -277,6 +280,7 @@ class MessengerConsumer(AsyncJsonWebsocketConsumer):
             'message_type': event.get('message_type'),
             'created_at': event.get('created_at'),
         })
+        await self.mark_message_delivered(event.get('message_id'))
 
     async def message_edited(self, event):
         """Message edited notification"""
@@ -420,27 +424,45 @@ class MessengerConsumer(AsyncJsonWebsocketConsumer):
         ).exists()
 
     @database_sync_to_async
-    def mark_message_read(self, message_id):
+    def mark_message_read(self, conversation_id, message_id):
         """Mark a message as read in database"""
-        from .models import Message, MessageReadReceipt, Participant
+        from .delivery import mark_read
+        from django.core.exceptions import ValidationError
 
         try:
-            message = Message.objects.get(id=message_id)
-            MessageReadReceipt.objects.get_or_create(
-                message=message,
-                user=self.user
-            )
-            # Update participant's read status
-            Participant.objects.filter(
-                conversation=message.conversation,
-                user=self.user
-            ).update(
-                last_read_at=timezone.now(),
-                last_read_message_id=message_id
-            )
-        except Message.DoesNotExist:
+            mark_read(self.user, conversation_id, [message_id])
+        except ValidationError:
+            pass
+
+    @database_sync_to_async
+    def mark_message_delivered(self, message_id):
+        """Mark a message sent live as delivered, so reconnects don't replay it"""
+        from .delivery import mark_delivered
+        from django.core.exceptions import ValidationError
+
+        try:
+            mark_delivered(self.user, [message_id])
+        except ValidationError:
             pass
 
+    async def deliver_pending(self):
+        """Send queued messages in batches; each batch is marked delivered once sent"""
+        from .delivery import drain_pending
+
+        batches = drain_pending(self.user)
+        next_batch = database_sync_to_async(lambda: next(batches, None))
+        delivered = 0
+        while True:
+            batch = await next_batch()
+            if batch is None:
+                break
+            for payload in batch:
+                await self.send_json({'type': 'message.new', **payload})
+            delivered += len(batch)
+
+        if delivered:
+            logger.info(f"Delivered {delivered} queued messages to {self.user.username}")
+
     async def broadcast_presence(self, is_online: bool):
         """Broadcast user's presence to their conversations"""
         for group_name in self.conversation_groups:
@@ -0,0 +1,201 @@
+"""
+Messenger Delivery
+
+Set-based fan-out, read receipts and offline queue draining. Every
+operation costs a fixed number of queries, whatever the group size:
+
+    fan_out       -> message lock + recipient ids + queued ids + bulk INSERT + unread UPDATE
+    mark_read     -> participant lock + valid ids + existing receipts + bulk INSERT + UPDATEs
+    drain_pending -> expire UPDATE, then per batch: SELECT + delivered UPDATE
+
+Unread counters are adjusted in SQL (F() expressions), never read-modify-
+written in Python, so concurrent senders and readers do not lose updates.
+They only move for rows a call actually inserted: fan_out holds the
+message row and mark_read the reader's participant row while they check
+what exists, so repeated or concurrent calls count each message once.
+
+Every recipient is queued, online or not; the consumer marks the entry
+delivered once the live `message.new` event went out (mark_delivered), so
+reconnects only replay what was missed.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Message, MessageDeliveryQueue, MessageReadReceipt, Participant
+
+logger = logging.getLogger('messenger')
+
+
+def fan_out(message, batch_size=None):
+    """
+    Bump unread counts and queue a new message for every other active member
+
+    Members it was already queued for are left alone, so calling it again
+    for the same message changes nothing. Returns the number of recipients.
+    """
+    batch_size = batch_size or getattr(settings, 'MESSENGER_DELIVERY_BATCH_SIZE', 500)
+    recipients = Participant.objects.filter(
+        conversation_id=message.conversation_id,
+        is_active=True
+    ).exclude(user_id=message.sender_id)
+
+    with transaction.atomic():
+        # Serializes fan-outs of the same message, so queued ids can't change under us
+        list(Message.objects.select_for_update().filter(pk=message.pk).values_list('pk', flat=True))
+
+        recipient_ids = list(recipients.values_list('user_id', flat=True))
+        if not recipient_ids:
+            return 0
+
+        queued = set(
+            MessageDeliveryQueue.objects.filter(
+                message=message,
+                recipient_id__in=recipient_ids
+            ).values_list('recipient_id', flat=True)
+        )
+        new_ids = [user_id for user_id in recipient_ids if user_id not in queued]
+        if new_ids:
+            ttl_days = getattr(settings, 'MESSENGER_DELIVERY_TTL_DAYS', 30)
+            expires_at = message.expires_at or (timezone.now() + timedelta(days=ttl_days))
+            MessageDeliveryQueue.objects.bulk_create(
+                [
+                    MessageDeliveryQueue(message=message, recipient_id=user_id, expires_at=expires_at)
+                    for user_id in new_ids
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            recipients.filter(user_id__in=new_ids).update(unread_count=F('unread_count') + 1)
+    return len(recipient_ids)
+
+
+def mark_read(user, conversation_id, message_ids, device_id=''):
+    """
+    Record read receipts for a set of messages in one pass
+
+    Only receipts that did not exist yet count towards the unread delta,
+    which is applied in SQL and floored at zero. Queue entries of the read
+    messages are marked delivered, so they are not replayed on reconnect.
+    Returns (read_count, read_at).
+    """
+    read_at = timezone.now()
+    with transaction.atomic():
+        # Held until commit, so concurrent reads of the same messages count once
+        participant = Participant.objects.filter(
+            conversation_id=conversation_id,
+            user=user
+        )
+        list(participant.select_for_update().values_list('pk', flat=True))
+
+        messages = dict(
+            Message.objects.filter(
+                id__in=message_ids,
+                conversation_id=conversation_id,
+                is_deleted=False
+            ).values_list('id', 'created_at')
+        )
+        if not messages:
+            return 0, read_at
+
+        already_read = set(
+            MessageReadReceipt.objects.filter(
+                user=user,
+                message_id__in=messages.keys()
+            ).values_list('message_id', flat=True)
+        )
+        new_ids = [message_id for message_id in messages if message_id not in already_read]
+        if not new_ids:
+            return 0, read_at
+
+        MessageReadReceipt.objects.bulk_create(
+            [MessageReadReceipt(message_id=message_id, user=user, device_id=device_id) for message_id in new_ids],
+            ignore_conflicts=True,
+        )
+
+        last_message_id = max(new_ids, key=lambda message_id: messages[message_id])
+        participant.update(
+            last_read_at=read_at,
+            last_read_message_id=last_message_id,
+            unread_count=Greatest(F('unread_count') - len(new_ids), 0)
+        )
+
+        mark_delivered(user, new_ids, read_at)
+
+    return len(new_ids), read_at
+
+
+def mark_delivered(user, message_ids, delivered_at=None):
+    """Mark a user's pending queue entries of these messages delivered; returns how many"""
+    return MessageDeliveryQueue.objects.filter(
+        recipient=user,
+        message_id__in=message_ids,
+        status='pending'
+    ).update(status='delivered', delivered_at=delivered_at or timezone.now())
+
+
+def drain_pending(user, batch_size=None):
+    """
+    Yield a user's queued messages, oldest first, in batches
+
+    Each batch is a list of payloads in the shape of the `message.new`
+    websocket event. A batch is marked delivered when the caller asks for
+    the next one (or the generator finishes), so an interrupted drain
+    leaves the unsent batch pending for the next reconnect.
+    """
+    batch_size = batch_size or getattr(settings, 'MESSENGER_DRAIN_BATCH_SIZE', 200)
+    now = timezone.now()
+
+    # Deleted messages are never replayed
+    expired = MessageDeliveryQueue.objects.filter(
+        Q(expires_at__lte=now) | Q(message__is_deleted=True),
+        recipient=user,
+        status='pending'
+    ).update(status='expired')
+    if expired:
+        logger.info(f"Expired {expired} queued messages for {user.username}")
+
+    pending = MessageDeliveryQueue.objects.filter(
+        recipient=user,
+        status='pending',
+        expires_at__gt=now,
+        message__is_deleted=False
+    ).order_by('queued_at', 'id')
+
+    while True:
+        rows = list(pending.values(
+            'id',
+            'message_id',
+            'message__conversation_id',
+            'message__sender_id',
+            'message__sender__username',
+            'message__message_type',
+            'message__created_at',
+        )[:batch_size])
+        if not rows:
+            return
+
+        yield [
+            {
+                'message_id': str(row['message_id']),
+                'conversation_id': str(row['message__conversation_id']),
+                'sender_id': str(row['message__sender_id']) if row['message__sender_id'] else None,
+                'sender_username': row['message__sender__username'],
+                'message_type': row['message__message_type'],
+                'created_at': row['message__created_at'].isoformat(),
+            }
+            for row in rows
+        ]
+
+        MessageDeliveryQueue.objects.filter(
+            id__in=[row['id'] for row in rows]
+        ).update(status='delivered', delivered_at=timezone.now())
+
+        if len(rows) < batch_size:
+            return
@@ -19,6 +19,7 @@ Security Properties:
 """
 
 import os
+import time
 import hashlib
 import logging
 from typing import Optional, Tuple, Dict, Any, List
@@ -38,7 +39,9 @@ logger = logging.getLogger('messenger.double_ratchet')
 # Constants
 # ============================================================================
 
-MAX_SKIP = 1000  # Maximum number of message keys to skip/store
+MAX_SKIP = 1000  # Maximum number of message keys to skip in one step
+MAX_SKIPPED_KEYS = 2000  # Maximum stored skipped keys per session; oldest are dropped first
+SKIPPED_KEY_MAX_AGE_HOURS = 72  # Default age after which cleanup_old_keys drops skipped keys
 KEY_SIZE = 32    # AES-256 key size
 NONCE_SIZE = 12  # AES-GCM nonce size
 CHAIN_KEY_INFO = b'UnibosChainKey'
@@ -100,6 +103,7 @@ class RatchetState:
 
     # Skipped message keys (for out-of-order handling)
     skipped_message_keys: Dict[Tuple[bytes, int], bytes] = field(default_factory=dict)
+    skipped_key_times: Dict[Tuple[bytes, int], float] = field(default_factory=dict)  # Unix time stored
 
     # Session metadata
     session_id: str = ""
@@ -457,9 +461,29 @@ class DoubleRatchet:
             # Store with (public_key, message_number) as key
             key_tuple = (dh_public_key, self.state.receive_message_number)
             self.state.skipped_message_keys[key_tuple] = message_key
+            self.state.skipped_key_times[key_tuple] = time.time()
 
             self.state.receive_message_number += 1
 
+        self._trim_skipped_keys()
+
+    def _trim_skipped_keys(self, limit: int = MAX_SKIPPED_KEYS) -> int:
+        """
+        Drop the oldest skipped keys beyond `limit`.
+
+        Dicts keep insertion order, so the first keys are the oldest.
+
+        Returns:
+            Number of keys removed
+        """
+        excess = len(self.state.skipped_message_keys) - limit
+        if excess <= 0:
+            return 0
+        for key_tuple in list(self.state.skipped_message_keys)[:excess]:
+            del self.state.skipped_message_keys[key_tuple]
+            self.state.skipped_key_times.pop(key_tuple, None)
+        return excess
+
     def _try_skipped_message_keys(
         self,
         message: EncryptedRatchetMessage
@@ -477,6 +501,7 @@ class DoubleRatchet:
 
         if key_tuple in self.state.skipped_message_keys:
             message_key = self.state.skipped_message_keys.pop(key_tuple)
+            self.state.skipped_key_times.pop(key_tuple, None)
             return message_key
 
         return None
@@ -519,8 +544,11 @@ class DoubleRatchet:
             return base64.b64encode(data).decode('ascii') if data else None
 
         skipped = {}
+        skipped_times = {}
         for (pk, num), key in self.state.skipped_message_keys.items():
             skipped[f"{to_b64(pk)}:{num}"] = to_b64(key)
+            if (pk, num) in self.state.skipped_key_times:
+                skipped_times[f"{to_b64(pk)}:{num}"] = self.state.skipped_key_times[(pk, num)]
 
         return {
             'dh_sending_private': to_b64(self.state.dh_sending_keypair[0]),
@@ -533,6 +561,7 @@ class DoubleRatchet:
             'receive_message_number': self.state.receive_message_number,
             'previous_sending_chain_length': self.state.previous_sending_chain_length,
             'skipped_message_keys': skipped,
+            'skipped_key_times': skipped_times,
             'session_id': self.state.session_id,
             'peer_id': self.state.peer_id,
             'created_at': self.state.created_at.isoformat(),
@@ -556,11 +585,16 @@ class DoubleRatchet:
             return base64.b64decode(data.encode('ascii')) if data else None
 
         skipped = {}
+        skipped_times = {}
+        stored_times = data.get('skipped_key_times', {})
+        loaded_at = time.time()
         for key_str, value in data.get('skipped_message_keys', {}).items():
             pk_b64, num_str = key_str.rsplit(':', 1)
             pk = from_b64(pk_b64)
             num = int(num_str)
             skipped[(pk, num)] = from_b64(value)
+            # States saved before key ages were tracked start aging now
+            skipped_times[(pk, num)] = stored_times.get(key_str, loaded_at)
 
         state = RatchetState(
             dh_sending_keypair=(
@@ -575,6 +609,7 @@ class DoubleRatchet:
             receive_message_number=data.get('receive_message_number', 0),
             previous_sending_chain_length=data.get('previous_sending_chain_length', 0),
             skipped_message_keys=skipped,
+            skipped_key_times=skipped_times,
             session_id=data.get('session_id', ''),
             peer_id=data.get('peer_id', ''),
             created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.now(timezone.utc),
@@ -583,19 +618,38 @@ class DoubleRatchet:
 
         return cls(state)
 
-    def cleanup_old_keys(self, max_age_hours: int = 24) -> int:
+    def cleanup_old_keys(
+        self,
+        max_age_hours: float = SKIPPED_KEY_MAX_AGE_HOURS,
+        max_keys: int = MAX_SKIPPED_KEYS
+    ) -> int:
         """
-        Remove old skipped message keys.
+        Remove skipped message keys older than `max_age_hours`, then the
+        oldest keys beyond `max_keys`.
+
+        Messages whose keys are removed can no longer be decrypted.
 
         Args:
             max_age_hours: Maximum age of keys to keep
+            max_keys: Maximum number of keys to keep
 
         Returns:
             Number of keys removed
         """
-        # Since we don't track individual key ages in the simplified version,
-        # this is a placeholder for future enhancement
-        return 0
+        now = time.time()
+        cutoff = now - max_age_hours * 3600
+        expired = [
+            key_tuple for key_tuple in self.state.skipped_message_keys
+            if self.state.skipped_key_times.get(key_tuple, now) < cutoff
+        ]
+        for key_tuple in expired:
+            del self.state.skipped_message_keys[key_tuple]
+            self.state.skipped_key_times.pop(key_tuple, None)
+
+        removed = len(expired) + self._trim_skipped_keys(max_keys)
+        if removed:
+            logger.debug(f"Removed {removed} skipped message keys from session {self.state.session_id}")
+        return removed
 
 
 # ============================================================================
@@ -622,10 +676,18 @@ class RatchetSessionManager:
 
         # Decrypt message
         plaintext = manager.decrypt("user-123", encrypted)
+
+    With a store (ratchet_store.RatchetSessionStore) and the owning user's
+    id, sessions are persisted and shared between workers instead of
+    living in `self.sessions`.
     """
 
-    def __init__(self):
+    def __init__(self, store=None, owner_id=None):
         self.sessions: Dict[str, DoubleRatchet] = {}
+        self.store = store
+        self.owner_id = owner_id
+        if store is not None and owner_id is None:
+            raise ValueError("owner_id required with a session store")
 
     def create_session(
         self,
@@ -669,19 +731,26 @@ class RatchetSessionManager:
                 peer_id=peer_id
             )
 
-        self.sessions[peer_id] = ratchet
+        if self.store is not None:
+            self.store.save(self.owner_id, peer_id, ratchet)
+        else:
+            self.sessions[peer_id] = ratchet
         return ratchet
 
     def get_session(self, peer_id: str) -> Optional[DoubleRatchet]:
-        """Get session for peer."""
+        """Get session for peer (in-memory sessions only)."""
         return self.sessions.get(peer_id)
 
     def has_session(self, peer_id: str) -> bool:
         """Check if session exists for peer."""
+        if self.store is not None:
+            return self.store.exists(self.owner_id, peer_id)
         return peer_id in self.sessions
 
     def remove_session(self, peer_id: str) -> bool:
         """Remove session for peer."""
+        if self.store is not None:
+            return self.store.delete(self.owner_id, peer_id)
         if peer_id in self.sessions:
             del self.sessions[peer_id]
             return True
@@ -689,6 +758,9 @@ class RatchetSessionManager:
 
     def encrypt(self, peer_id: str, plaintext: str) -> EncryptedRatchetMessage:
         """Encrypt message for peer."""
+        if self.store is not None:
+            with self.store.session(self.owner_id, peer_id) as session:
+                return session.encrypt(plaintext)
         session = self.sessions.get(peer_id)
         if session is None:
             raise ValueError(f"No session for peer: {peer_id}")
@@ -696,6 +768,9 @@ class RatchetSessionManager:
 
     def decrypt(self, peer_id: str, message: EncryptedRatchetMessage) -> str:
         """Decrypt message from peer."""
+        if self.store is not None:
+            with self.store.session(self.owner_id, peer_id) as session:
+                return session.decrypt(message)
         session = self.sessions.get(peer_id)
         if session is None:
             raise ValueError(f"No session for peer: {peer_id}")
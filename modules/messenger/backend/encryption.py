@@ -12,12 +12,17 @@ Security Properties:
 - Perfect Forward Secrecy (session keys)
 - Message authentication (signatures)
 - Replay attack prevention (nonces)
+
+Attachments use a chunked STREAM construction (see StreamEncryptor) so files
+of any size are encrypted and decrypted in constant memory.
 """
 
+import io
 import os
 import base64
 import hashlib
 import logging
+import struct
 from typing import Tuple, Optional, Dict, Any
 from dataclasses import dataclass
 
@@ -27,7 +32,7 @@ from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey,
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.backends import default_backend
-from cryptography.exceptions import InvalidSignature
+from cryptography.exceptions import InvalidSignature, InvalidTag
 
 logger = logging.getLogger('messenger.encryption')
 
@@ -50,6 +55,213 @@ class EncryptedMessage:
     encryption_version: int = 1
 
 
+# ========== Streaming File Encryption ==========
+#
+# STREAM construction (Hoang, Reyhanitabar, Rogaway, Vizar 2015) over AES-256-GCM:
+#
+#     header = MAGIC(4) | version(1) | chunk_size(4, BE) | nonce_prefix(7)
+#     chunk i = AES-GCM(key, nonce_prefix | i (4, BE) | last (1), plaintext_i, aad=header)
+#
+# Every chunk but the last holds exactly chunk_size plaintext bytes. The
+# counter in the nonce rejects reordered or dropped chunks; the last-chunk
+# flag rejects truncation at a chunk boundary and appended data.
+
+STREAM_MAGIC = b'UMSE'
+STREAM_VERSION = 2
+STREAM_HEADER = struct.Struct('>4sBI7s')
+STREAM_HEADER_SIZE = STREAM_HEADER.size  # 16 bytes
+STREAM_TAG_SIZE = 16
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_MIN_CHUNK_SIZE = 1024
+STREAM_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+STREAM_MAX_CHUNKS = 2 ** 32
+
+
+def _stream_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    if counter >= STREAM_MAX_CHUNKS:
+        raise ValueError("Stream too long for its chunk size")
+    return prefix + counter.to_bytes(4, 'big') + (b'\x01' if last else b'\x00')
+
+
+def parse_stream_header(header: bytes) -> Optional[Tuple[int, bytes]]:
+    """
+    Parse a chunked stream header.
+
+    Returns:
+        (chunk_size, nonce_prefix), or None if the data is not a chunked stream
+    """
+    if len(header) < STREAM_HEADER_SIZE:
+        return None
+    magic, version, chunk_size, prefix = STREAM_HEADER.unpack(header[:STREAM_HEADER_SIZE])
+    if magic != STREAM_MAGIC or version != STREAM_VERSION:
+        return None
+    if not STREAM_MIN_CHUNK_SIZE <= chunk_size <= STREAM_MAX_CHUNK_SIZE:
+        return None
+    return chunk_size, prefix
+
+
+def stream_plaintext_size(encrypted_size: int, chunk_size: int) -> Optional[int]:
+    """
+    Plaintext size of a chunked stream from its encrypted size.
+
+    Returns None when no sequence of whole chunks has that size, which is
+    how the server spots a stream cut off mid-chunk without the key.
+    """
+    body = encrypted_size - STREAM_HEADER_SIZE
+    if body < STREAM_TAG_SIZE:
+        return None
+    full_chunks, remainder = divmod(body, chunk_size + STREAM_TAG_SIZE)
+    if remainder == 0:
+        return full_chunks * chunk_size
+    if remainder < STREAM_TAG_SIZE:
+        return None
+    return full_chunks * chunk_size + remainder - STREAM_TAG_SIZE
+
+
+class StreamEncryptor(io.RawIOBase):
+    """
+    File-like writer: plaintext in, chunked ciphertext out to `fileobj`.
+
+    Holds at most one chunk of plaintext. close() writes the final chunk
+    and must be called (or use a with block) for the stream to be valid.
+
+    Usage:
+        with StreamEncryptor(output, file_key) as writer:
+            shutil.copyfileobj(source, writer)
+    """
+
+    def __init__(self, fileobj, key: bytes, chunk_size: int = STREAM_CHUNK_SIZE):
+        if not STREAM_MIN_CHUNK_SIZE <= chunk_size <= STREAM_MAX_CHUNK_SIZE:
+            raise ValueError(f"Chunk size must be {STREAM_MIN_CHUNK_SIZE}-{STREAM_MAX_CHUNK_SIZE} bytes")
+        super().__init__()
+        self._fileobj = fileobj
+        self._aesgcm = AESGCM(key)
+        self._chunk_size = chunk_size
+        self._prefix = os.urandom(7)
+        self._header = STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, chunk_size, self._prefix)
+        self._counter = 0
+        self._buffer = bytearray()
+        self._fileobj.write(self._header)
+
+    def writable(self) -> bool:
+        return True
+
+    def _emit(self, chunk, last: bool):
+        nonce = _stream_nonce(self._prefix, self._counter, last)
+        self._fileobj.write(self._aesgcm.encrypt(nonce, bytes(chunk), self._header))
+        self._counter += 1
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed stream")
+        self._buffer += data
+        size = self._chunk_size
+        # Keep the tail back: only close() knows which chunk is the last
+        if len(self._buffer) > size:
+            full = (len(self._buffer) - 1) // size
+            with memoryview(self._buffer) as view:
+                for i in range(full):
+                    self._emit(view[i * size:(i + 1) * size], last=False)
+                remainder = bytearray(view[full * size:])
+            self._buffer = remainder
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._emit(self._buffer, last=True)
+                self._buffer = bytearray()
+            finally:
+                super().close()
+
+
+class StreamDecryptor(io.RawIOBase):
+    """
+    File-like reader: chunked ciphertext from `fileobj` in, plaintext out.
+
+    Each chunk is authenticated before any of its plaintext is returned.
+    Raises InvalidTag on tampering, reordering, truncation or appended
+    data, and ValueError if `fileobj` is not a chunked stream.
+    """
+
+    def __init__(self, fileobj, key: bytes):
+        super().__init__()
+        self._fileobj = fileobj
+        self._aesgcm = AESGCM(key)
+        self._header = self._read_exact(STREAM_HEADER_SIZE)
+        parsed = parse_stream_header(self._header)
+        if parsed is None:
+            raise ValueError("Not a chunked encrypted stream")
+        self._chunk_size, self._prefix = parsed
+        self._counter = 0
+        self._lookahead = b''
+        self._plain = b''
+        self._offset = 0
+        self._done = False
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    def readable(self) -> bool:
+        return True
+
+    def _read_exact(self, size: int) -> bytes:
+        parts = []
+        while size > 0:
+            data = self._fileobj.read(size)
+            if not data:
+                break
+            parts.append(data)
+            size -= len(data)
+        return b''.join(parts)
+
+    def _next_chunk(self):
+        encrypted = self._lookahead + self._read_exact(
+            self._chunk_size + STREAM_TAG_SIZE - len(self._lookahead)
+        )
+        # One byte of lookahead tells whether this chunk must be the last
+        self._lookahead = self._read_exact(1)
+        last = not self._lookahead
+        if len(encrypted) < STREAM_TAG_SIZE:
+            raise InvalidTag()
+        nonce = _stream_nonce(self._prefix, self._counter, last)
+        self._plain = self._aesgcm.decrypt(nonce, encrypted, self._header)
+        self._offset = 0
+        self._counter += 1
+        self._done = last
+
+    def readinto(self, buffer) -> int:
+        while self._offset >= len(self._plain):
+            if self._done:
+                return 0
+            self._next_chunk()
+        size = min(len(buffer), len(self._plain) - self._offset)
+        buffer[:size] = self._plain[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+
+def inspect_encrypted_upload(chunks) -> Tuple[str, Optional[int]]:
+    """
+    Hash an encrypted upload and read its stream header in one pass.
+
+    Args:
+        chunks: Iterable of bytes, e.g. UploadedFile.chunks()
+
+    Returns:
+        (sha256 hex digest, chunk size or None for single-shot uploads)
+    """
+    digest = hashlib.sha256()
+    head = b''
+    for chunk in chunks:
+        if len(head) < STREAM_HEADER_SIZE:
+            head += chunk[:STREAM_HEADER_SIZE - len(head)]
+        digest.update(chunk)
+    parsed = parse_stream_header(head)
+    return digest.hexdigest(), parsed[0] if parsed else None
+
+
 class EncryptionService:
     """
     End-to-End Encryption Service for Messenger
@@ -466,6 +678,56 @@ class EncryptionService:
         aesgcm = AESGCM(file_key)
         return aesgcm.decrypt(nonce, encrypted_data, None)
 
+    def encrypt_file_stream(
+        self,
+        source,
+        destination,
+        file_key: Optional[bytes] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> bytes:
+        """
+        Encrypt a file object into another, in constant memory.
+
+        Args:
+            source: Readable binary file object (plaintext)
+            destination: Writable binary file object (chunked ciphertext)
+            file_key: Optional encryption key (generated if not provided)
+            chunk_size: Plaintext bytes per authenticated chunk
+
+        Returns:
+            File encryption key
+        """
+        if file_key is None:
+            file_key = os.urandom(self.KEY_SIZE)
+
+        with StreamEncryptor(destination, file_key, chunk_size) as writer:
+            while True:
+                data = source.read(chunk_size)
+                if not data:
+                    break
+                writer.write(data)
+
+        return file_key
+
+    def decrypt_file_stream(self, source, destination, file_key: bytes) -> int:
+        """
+        Decrypt a chunked file object into another, in constant memory.
+
+        Plaintext is written as each chunk authenticates; on InvalidTag the
+        destination holds a verified prefix and must be discarded.
+
+        Returns:
+            Number of plaintext bytes written
+        """
+        reader = StreamDecryptor(source, file_key)
+        written = 0
+        while True:
+            data = reader.read(reader.chunk_size)
+            if not data:
+                return written
+            destination.write(data)
+            written += len(data)
+
     # ========== Utility Functions ==========
 
     def hash_content(self, content: bytes) -> str:
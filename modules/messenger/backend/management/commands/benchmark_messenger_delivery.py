@@ -0,0 +1,152 @@
+"""
+Benchmark message fan-out and batch read receipts
+Sends messages into synthetic conversations of several sizes and marks them
+read, timing the per-row path the views used before against the set-based
+delivery layer, with the query count of each
+
+Usage: python manage.py benchmark_messenger_delivery --sizes 2 50 500
+"""
+
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from modules.messenger.backend import delivery
+from modules.messenger.backend.models import (
+    Conversation,
+    Message,
+    MessageDeliveryQueue,
+    MessageReadReceipt,
+    Participant,
+)
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_msg_'
+
+
+def per_row_fan_out(message):
+    """The send path before the delivery layer: one INSERT per recipient"""
+    Participant.objects.filter(
+        conversation_id=message.conversation_id, is_active=True
+    ).exclude(user_id=message.sender_id).update(unread_count=F('unread_count') + 1)
+    for participant in Participant.objects.filter(
+        conversation_id=message.conversation_id, is_active=True
+    ).exclude(user_id=message.sender_id).select_related('user'):
+        MessageDeliveryQueue.objects.create(
+            message=message,
+            recipient=participant.user,
+            expires_at=message.expires_at or (timezone.now() + timezone.timedelta(days=30))
+        )
+
+
+def per_row_mark_read(user, conversation_id, message_ids):
+    """The batch read path before the delivery layer: get_or_create per message"""
+    participant = Participant.objects.get(conversation_id=conversation_id, user=user)
+    read_count = 0
+    last_message = None
+    for message in Message.objects.filter(id__in=message_ids, conversation_id=conversation_id, is_deleted=False):
+        _, created = MessageReadReceipt.objects.get_or_create(message=message, user=user)
+        if created:
+            read_count += 1
+            if not last_message or message.created_at > last_message.created_at:
+                last_message = message
+    if last_message:
+        participant.last_read_at = timezone.now()
+        participant.last_read_message_id = last_message.id
+        participant.unread_count = max(0, participant.unread_count - read_count)
+        participant.save(update_fields=['last_read_at', 'last_read_message_id', 'unread_count'])
+
+
+class QueryCounter:
+    """Counts statements without the debug cursor's logging overhead"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row vs set-based message fan-out and read receipts by group size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[2, 50, 500],
+                            help='Conversation sizes (default: 2 50 500)')
+        parser.add_argument('--messages', type=int, default=20, help='Messages sent per run (default: 20)')
+
+    def handle(self, *args, **options):
+        self.messages = options['messages']
+        try:
+            users = self._users(max(options['sizes']))
+            self.stdout.write(
+                f"{'size':>6} {'path':>9} {'send ms':>9} {'queries':>8} {'read ms':>9} {'queries':>8}"
+            )
+            for size in options['sizes']:
+                for label, send, read in (
+                    ('per-row', per_row_fan_out, per_row_mark_read),
+                    ('bulk', delivery.fan_out, delivery.mark_read),
+                ):
+                    result = self._run(users[:size], send, read)
+                    self.stdout.write(
+                        f"{size:>6} {label:>9} {result['send_ms']:>9.2f} {result['send_queries']:>8} "
+                        f"{result['read_ms']:>9.2f} {result['read_queries']:>8}"
+                    )
+        finally:
+            deleted, _ = User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(f'Removed {deleted:,} synthetic rows')
+
+    def _users(self, count):
+        existing = {u.username: u for u in User.objects.filter(username__startswith=BENCH_PREFIX)}
+        missing = [
+            User(username=f'{BENCH_PREFIX}{i}', email=f'{BENCH_PREFIX}{i}@example.com')
+            for i in range(count) if f'{BENCH_PREFIX}{i}' not in existing
+        ]
+        User.objects.bulk_create(missing, batch_size=1000)
+        return list(User.objects.filter(username__startswith=BENCH_PREFIX).order_by('id')[:count])
+
+    def _run(self, users, send, read):
+        sender, reader = users[0], users[-1]
+        conversation = Conversation.objects.create(conversation_type='group', created_by=sender)
+        Participant.objects.bulk_create(
+            [Participant(conversation=conversation, user=user) for user in users],
+            batch_size=1000,
+        )
+
+        send_times, message_ids = [], []
+        send_queries = QueryCounter()
+        for _ in range(self.messages):
+            with transaction.atomic():
+                message = Message.objects.create(
+                    conversation=conversation, sender=sender, message_type='text',
+                    encrypted_content='x', content_nonce='n', signature='s', sender_key_id=uuid.uuid4(),
+                )
+                send_queries.count = 0
+                with connection.execute_wrapper(send_queries):
+                    started = time.perf_counter()
+                    send(message)
+                    send_times.append((time.perf_counter() - started) * 1000)
+            message_ids.append(message.id)
+
+        read_queries = QueryCounter()
+        with connection.execute_wrapper(read_queries):
+            started = time.perf_counter()
+            with transaction.atomic():
+                read(reader, conversation.id, message_ids)
+            read_ms = (time.perf_counter() - started) * 1000
+
+        conversation.delete()
+        return {
+            'send_ms': statistics.median(send_times),
+            'send_queries': send_queries.count,
+            'read_ms': read_ms,
+            'read_queries': read_queries.count,
+        }
@@ -0,0 +1,117 @@
+"""
+Benchmark messenger attachment encryption
+Encrypts and decrypts synthetic files through the chunked stream format,
+reporting throughput and peak RSS per size, against single-shot
+encrypt_file/decrypt_file for the sizes that fit in memory. Each run happens
+in a forked process so peak RSS is per run, not per benchmark
+
+Usage: python manage.py benchmark_messenger_file_encryption --sizes 10 100 1000 2000
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from modules.messenger.backend.encryption import STREAM_CHUNK_SIZE, EncryptionService
+
+MB = 1024 * 1024
+
+
+class SyntheticFile:
+    """Readable file of `size` bytes repeating one random block, never held whole"""
+
+    def __init__(self, size):
+        self.remaining = size
+        self.block = os.urandom(MB)
+
+    def read(self, size=-1):
+        if size < 0:
+            size = self.remaining
+        size = min(size, self.remaining)
+        self.remaining -= size
+        return (self.block * (size // MB + 1))[:size] if size > MB else self.block[:size]
+
+
+class NullWriter:
+    def write(self, data):
+        return len(data)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def stream_run(size, chunk_size, directory, results):
+    service = EncryptionService()
+    with tempfile.NamedTemporaryFile(dir=directory) as encrypted:
+        started = time.perf_counter()
+        key = service.encrypt_file_stream(SyntheticFile(size), encrypted, chunk_size=chunk_size)
+        encrypted.flush()
+        encrypt_s = time.perf_counter() - started
+
+        encrypted.seek(0)
+        started = time.perf_counter()
+        service.decrypt_file_stream(encrypted, NullWriter(), key)
+        decrypt_s = time.perf_counter() - started
+    results.put((encrypt_s, decrypt_s, peak_rss_mb()))
+
+
+def single_shot_run(size, chunk_size, directory, results):
+    service = EncryptionService()
+    data = SyntheticFile(size).read()
+    started = time.perf_counter()
+    encrypted, nonce, key = service.encrypt_file(data)
+    encrypt_s = time.perf_counter() - started
+    del data
+
+    started = time.perf_counter()
+    service.decrypt_file(encrypted, nonce, key)
+    decrypt_s = time.perf_counter() - started
+    results.put((encrypt_s, decrypt_s, peak_rss_mb()))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark chunked vs single-shot attachment encryption: MB/s and peak RSS by file size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 2000],
+                            help='File sizes in MB (default: 10 100 1000 2000)')
+        parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE,
+                            help=f'Stream chunk size in bytes (default: {STREAM_CHUNK_SIZE})')
+        parser.add_argument('--single-shot-max', type=int, default=500,
+                            help='Largest size in MB also run single-shot (default: 500)')
+        parser.add_argument('--tmpdir', default=None, help='Directory for the encrypted files')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        baseline = self._run(context, lambda *a: a[-1].put((0, 0, peak_rss_mb())), 0, options)[2]
+        self.stdout.write(f'Baseline process RSS: {baseline:.0f} MB')
+        self.stdout.write(
+            f"{'size MB':>8} {'format':>7} {'enc MB/s':>9} {'dec MB/s':>9} {'peak RSS MB':>12}"
+        )
+
+        for size_mb in options['sizes']:
+            runs = [('stream', stream_run)]
+            if size_mb <= options['single_shot_max']:
+                runs.append(('single', single_shot_run))
+            for label, target in runs:
+                encrypt_s, decrypt_s, peak = self._run(context, target, size_mb * MB, options)
+                self.stdout.write(
+                    f"{size_mb:>8,} {label:>7} {size_mb / encrypt_s:>9.0f} {size_mb / decrypt_s:>9.0f} "
+                    f"{peak:>12.0f}"
+                )
+
+    def _run(self, context, target, size, options):
+        results = context.Queue()
+        process = context.Process(target=target, args=(size, options['chunk_size'], options['tmpdir'], results))
+        process.start()
+        result = results.get()
+        process.join()
+        return result
@@ -0,0 +1,153 @@
+"""
+Benchmark messenger search paging
+Fills one conversation with synthetic messages, then pages through all of
+them with keyset cursors, reporting per-page latency by depth, against the
+old offset pagination sampled at the same depths
+
+Usage: python manage.py benchmark_messenger_search --messages 1000000
+"""
+
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from modules.messenger.backend import search
+from modules.messenger.backend.models import Conversation, Message, Participant
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_search_user'
+
+INSERT_COLUMNS = [
+    'id', 'conversation_id', 'sender_id', 'message_type', 'encrypted_content', 'content_nonce',
+    'signature', 'encryption_version', 'sender_key_id', 'is_edited', 'original_content_hash',
+    'is_delivered', 'is_deleted', 'deleted_for_everyone', 'delivered_via', 'created_at', 'client_message_id',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark keyset vs offset paging of messenger search over a large conversation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000000, help='Synthetic messages (default: 1000000)')
+        parser.add_argument('--limit', type=int, default=100, help='Page size (default: 100)')
+        parser.add_argument('--offset-samples', type=int, default=8,
+                            help='Depths at which offset paging is timed (default: 8)')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic conversation afterwards')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        limit = options['limit']
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'email': f'{BENCH_USERNAME}@example.com'})
+        conversation = Conversation.objects.create(conversation_type='group', name='Search benchmark', created_by=user)
+        Participant.objects.create(conversation=conversation, user=user)
+
+        try:
+            started = time.perf_counter()
+            self._fill(conversation, user, count)
+            self.stdout.write(self.style.SUCCESS(
+                f'Inserted {count:,} synthetic messages in {time.perf_counter() - started:.1f}s'
+            ))
+
+            filters = {'conversation_id': conversation.id}
+            keyset = self._walk(user, filters, limit)
+            pages = len(keyset)
+            self._report_keyset(keyset, pages)
+            self._report_offset(user, filters, limit, pages, options['offset_samples'])
+
+            started = time.perf_counter()
+            total, exact = search.approximate_total(user, filters, search.search_queryset(user, filters))
+            self.stdout.write(
+                f"Total: {total:,}{'' if exact else '+'} in {(time.perf_counter() - started) * 1000:.1f}ms "
+                f"(then cached while paging)"
+            )
+        finally:
+            if not options['keep']:
+                # Inserted directly, so deleted directly: nothing else references these rows
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {Message._meta.db_table} WHERE conversation_id = %s', [str(conversation.id)]
+                    )
+                conversation.delete()
+                User.objects.filter(username=BENCH_USERNAME).delete()
+                self.stdout.write('Removed the synthetic conversation')
+
+    def _fill(self, conversation, user, count):
+        start = timezone.now() - timedelta(seconds=count)
+        rows = []
+        for i in range(count):
+            rows.append((
+                str(uuid.uuid4()), str(conversation.id), user.id, 'text', 'x' * 64, 'nonce', 'sig', 1,
+                str(uuid.uuid4()), False, '', True, False, False, 'hub',
+                # Every fourth message shares the previous timestamp, so ties are exercised
+                start + timedelta(seconds=i - (i % 4 == 3)), '',
+            ))
+            if len(rows) >= 20000:
+                self._write_rows(rows)
+                rows = []
+                self.stdout.write(f'  {i + 1:,} / {count:,}', ending='\r')
+                self.stdout.flush()
+        if rows:
+            self._write_rows(rows)
+        self.stdout.write('')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Message._meta.db_table}')
+
+    def _write_rows(self, rows):
+        table = Message._meta.db_table
+        columns = ', '.join(INSERT_COLUMNS)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                from psycopg2.extras import execute_values
+                execute_values(cursor.cursor, f'INSERT INTO {table} ({columns}) VALUES %s', rows, page_size=5000)
+            else:
+                placeholders = ', '.join(['%s'] * len(INSERT_COLUMNS))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+    def _walk(self, user, filters, limit):
+        """Latency of every keyset page, first to last"""
+        queryset = search.search_queryset(user, filters)
+        timings = []
+        cursor = None
+        while True:
+            started = time.perf_counter()
+            messages, cursor = search.page(queryset, cursor, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+            if cursor is None:
+                return timings
+            if len(timings) % 500 == 0:
+                self.stdout.write(f'  page {len(timings):,}', ending='\r')
+                self.stdout.flush()
+
+    def _report_keyset(self, timings, pages):
+        self.stdout.write(f'Keyset pages ({pages:,} pages), latency by depth:')
+        buckets = 10
+        for bucket in range(buckets):
+            chunk = timings[bucket * pages // buckets:(bucket + 1) * pages // buckets]
+            if not chunk:
+                continue
+            chunk = sorted(chunk)
+            self.stdout.write(
+                f'  pages {bucket * pages // buckets + 1:>7,}+  median {statistics.median(chunk):7.2f}ms  '
+                f'p99 {chunk[min(len(chunk) - 1, int(len(chunk) * 0.99))]:7.2f}ms'
+            )
+
+    def _report_offset(self, user, filters, limit, pages, samples):
+        self.stdout.write('Offset pages (previous implementation), sampled:')
+        queryset = search.search_queryset(user, filters).order_by('-created_at', '-id')
+        for sample in range(samples):
+            page_number = max(1, (pages - 1) * sample // max(samples - 1, 1))
+            offset = (page_number - 1) * limit
+            started = time.perf_counter()
+            list(queryset[offset:offset + limit])
+            offset_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'  page {page_number:>7,}  {offset_ms:9.2f}ms')
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='messagedeliveryqueue',
+            constraint=models.UniqueConstraint(fields=('message', 'recipient'), name='messenger_delivery_unique_recipient'),
+        ),
+    ]
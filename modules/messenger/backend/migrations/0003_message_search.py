@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0002_delivery_queue_unique_recipient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageSearchToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'messenger_search_tokens',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='messenger_m_convers_6e6b5e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='messenger_m_convers_11f1da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['created_at', 'id'], name='messenger_m_created_8eca82_idx'),
+        ),
+        migrations.AddField(
+            model_name='messagesearchtoken',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='messenger.conversation'),
+        ),
+        migrations.AddField(
+            model_name='messagesearchtoken',
+            name='message',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='messenger.message'),
+        ),
+        migrations.AddIndex(
+            model_name='messagesearchtoken',
+            index=models.Index(fields=['token', 'conversation', 'created_at'], name='messenger_s_token_1ad377_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='messagesearchtoken',
+            unique_together={('message', 'token')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0003_message_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatchetSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peer_id', models.CharField(max_length=255)),
+                ('encrypted_state', models.BinaryField()),
+                ('revision', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratchet_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'messenger_ratchet_sessions',
+                'indexes': [models.Index(fields=['updated_at'], name='messenger_r_updated_0d5150_idx')],
+                'unique_together': {('owner', 'peer_id')},
+            },
+        ),
+    ]
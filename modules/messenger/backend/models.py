@@ -349,7 +349,9 @@ class Message(models.Model):
         app_label = 'messenger'
         db_table = 'messenger_messages'
         indexes = [
-            models.Index(fields=['conversation', 'created_at']),
+            # (created_at, id) keyset pagination, per conversation and across them
+            models.Index(fields=['conversation', 'created_at', 'id']),
+            models.Index(fields=['created_at', 'id']),
             models.Index(fields=['sender', 'created_at']),
             models.Index(fields=['reply_to']),
             models.Index(fields=['client_message_id']),
@@ -505,6 +507,42 @@ class MessageReadReceipt(models.Model):
         return f"{self.user.username} read @ {self.read_at}"
 
 
+class MessageSearchToken(models.Model):
+    """
+    Blind search index for messages.
+
+    Clients derive tokens from the plaintext with a conversation key the
+    server never sees (e.g. HMAC of each normalized word), so the server can
+    match tokens without learning the words. Indexing is opt-in per message.
+    """
+    id = models.BigAutoField(primary_key=True)
+
+    message = models.ForeignKey(
+        Message,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    # Denormalized so token lookups stay within the index
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    token = models.CharField(max_length=64)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        app_label = 'messenger'
+        db_table = 'messenger_search_tokens'
+        unique_together = ['message', 'token']
+        indexes = [
+            models.Index(fields=['token', 'conversation', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.token[:8]}... -> {self.message_id}"
+
+
 class P2PSession(models.Model):
     """
     P2P connection sessions between users.
@@ -587,6 +625,39 @@ class P2PSession(models.Model):
         self.save(update_fields=['status', 'disconnected_at'])
 
 
+class RatchetSession(models.Model):
+    """
+    Persisted Double Ratchet session state.
+
+    State is encrypted at rest (see ratchet_store.py). `revision` is a new
+    random value on every save, so a worker can tell whether its cached copy
+    is current, even after another worker's save was rolled back.
+    """
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='ratchet_sessions'
+    )
+    peer_id = models.CharField(max_length=255)
+
+    encrypted_state = models.BinaryField()
+    revision = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'messenger'
+        db_table = 'messenger_ratchet_sessions'
+        unique_together = [['owner', 'peer_id']]
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Ratchet: {self.owner_id} -> {self.peer_id}"
+
+
 class MessageDeliveryQueue(models.Model):
     """
     Queue for offline message delivery.
@@ -637,6 +708,10 @@ class MessageDeliveryQueue(models.Model):
             models.Index(fields=['status', 'next_retry_at']),
             models.Index(fields=['expires_at']),
         ]
+        constraints = [
+            # One queue entry per recipient, so fan-out can bulk insert with ignore_conflicts
+            models.UniqueConstraint(fields=['message', 'recipient'], name='messenger_delivery_unique_recipient'),
+        ]
         ordering = ['queued_at']
 
     def __str__(self):
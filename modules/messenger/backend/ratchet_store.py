@@ -0,0 +1,179 @@
+"""
+Ratchet Session Store
+
+Persists Double Ratchet sessions in RatchetSession rows, so ratchet state
+survives worker restarts. State is serialized with get_state_dict() and
+encrypted at rest with Fernet under MESSENGER_RATCHET_STORE_KEY (derived
+from SECRET_KEY when unset).
+
+Each worker keeps decoded sessions in an LRU cache. Every use of a session
+locks its row (SELECT ... FOR UPDATE) and compares the row's revision with
+the cached one, so two workers never advance the same ratchet at once and a
+session advanced elsewhere is reloaded instead of reused:
+
+    store = get_ratchet_store()
+    with store.session(user.id, peer_id) as ratchet:
+        encrypted = ratchet.encrypt(plaintext)
+
+The store is synchronous; ASGI consumers call it through
+database_sync_to_async.
+"""
+
+import base64
+import json
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.db import transaction
+
+from .double_ratchet import (
+    MAX_SKIPPED_KEYS,
+    SKIPPED_KEY_MAX_AGE_HOURS,
+    DoubleRatchet,
+    hkdf_derive,
+)
+from .models import RatchetSession
+
+logger = logging.getLogger('messenger.ratchet_store')
+
+
+class SessionNotFound(ValueError):
+    """No stored ratchet session for this owner and peer"""
+
+
+def _store_cipher() -> Fernet:
+    key = getattr(settings, 'MESSENGER_RATCHET_STORE_KEY', '')
+    if not key:
+        key = base64.urlsafe_b64encode(hkdf_derive(settings.SECRET_KEY.encode(), b'UnibosRatchetStore'))
+    return Fernet(key)
+
+
+class RatchetSessionStore:
+    """
+    Encrypted-at-rest ratchet sessions with a per-worker LRU cache.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache_size = cache_size or getattr(settings, 'MESSENGER_RATCHET_CACHE_SIZE', 1024)
+        self.max_skipped_keys = getattr(settings, 'MESSENGER_RATCHET_MAX_SKIPPED_KEYS', MAX_SKIPPED_KEYS)
+        self.max_key_age_hours = getattr(
+            settings, 'MESSENGER_RATCHET_SKIPPED_KEY_MAX_AGE_HOURS', SKIPPED_KEY_MAX_AGE_HOURS
+        )
+        self._cipher = _store_cipher()
+        self._cache = OrderedDict()  # (owner_id, peer_id) -> (revision, DoubleRatchet)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ========== Cache ==========
+
+    def _cache_get(self, key, revision) -> Optional[DoubleRatchet]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != revision:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _cache_put(self, key, revision, ratchet):
+        with self._lock:
+            self._cache[key] = (revision, ratchet)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_pop(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ========== Serialization ==========
+
+    def _encode(self, owner_id, peer_id, ratchet: DoubleRatchet) -> bytes:
+        payload = {'owner': owner_id, 'peer': peer_id, 'state': ratchet.get_state_dict()}
+        return self._cipher.encrypt(json.dumps(payload).encode())
+
+    def _decode(self, owner_id, peer_id, encrypted_state) -> DoubleRatchet:
+        payload = json.loads(self._cipher.decrypt(bytes(encrypted_state)))
+        # Rows copied between owners or peers must not load
+        if payload['owner'] != owner_id or payload['peer'] != peer_id:
+            raise ValueError(f"Stored ratchet state does not belong to session {owner_id}/{peer_id}")
+        return DoubleRatchet.from_state_dict(payload['state'])
+
+    # ========== Sessions ==========
+
+    def save(self, owner_id, peer_id: str, ratchet: DoubleRatchet) -> None:
+        """Store a new session, replacing any existing one for this peer."""
+        key = (str(owner_id), peer_id)
+        revision = secrets.randbits(62)
+        with transaction.atomic():
+            RatchetSession.objects.update_or_create(
+                owner_id=owner_id,
+                peer_id=peer_id,
+                defaults={'encrypted_state': self._encode(*key, ratchet), 'revision': revision},
+            )
+        self._cache_put(key, revision, ratchet)
+
+    @contextmanager
+    def session(self, owner_id, peer_id: str):
+        """
+        Lock, load and yield a session, then save it when the block exits.
+
+        Raises SessionNotFound if there is no stored session. If the block
+        raises, nothing is saved and the cached copy, which may be
+        half-advanced, is dropped.
+        """
+        key = (str(owner_id), peer_id)
+        rows = RatchetSession.objects.filter(owner_id=owner_id, peer_id=peer_id)
+
+        with transaction.atomic():
+            revision = rows.select_for_update().values_list('revision', flat=True).first()
+            if revision is None:
+                self._cache_pop(key)
+                raise SessionNotFound(f"No session for peer: {peer_id}")
+
+            ratchet = self._cache_get(key, revision)
+            if ratchet is None:
+                ratchet = self._decode(*key, rows.values_list('encrypted_state', flat=True).get())
+
+            try:
+                yield ratchet
+            except BaseException:
+                self._cache_pop(key)
+                raise
+
+            ratchet.cleanup_old_keys(self.max_key_age_hours, self.max_skipped_keys)
+            revision = secrets.randbits(62)
+            rows.update(encrypted_state=self._encode(*key, ratchet), revision=revision)
+            self._cache_put(key, revision, ratchet)
+
+    def exists(self, owner_id, peer_id: str) -> bool:
+        return RatchetSession.objects.filter(owner_id=owner_id, peer_id=peer_id).exists()
+
+    def delete(self, owner_id, peer_id: str) -> bool:
+        self._cache_pop((str(owner_id), peer_id))
+        deleted, _ = RatchetSession.objects.filter(owner_id=owner_id, peer_id=peer_id).delete()
+        return deleted > 0
+
+
+# Singleton instance
+_ratchet_store: Optional[RatchetSessionStore] = None
+
+
+def get_ratchet_store() -> RatchetSessionStore:
+    """Get the worker's ratchet session store."""
+    global _ratchet_store
+    if _ratchet_store is None:
+        _ratchet_store = RatchetSessionStore()
+    return _ratchet_store
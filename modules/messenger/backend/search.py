@@ -0,0 +1,168 @@
+"""
+Messenger Search
+
+Keyset-paginated message search. Pages are ordered by (created_at, id),
+newest first, and a page continues from an opaque cursor instead of an
+offset, so page 10,000 costs the same index range scan as page 1:
+
+    WHERE created_at <= :t AND (created_at < :t OR id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT :limit + 1
+
+Totals are counted once per search (capped at MESSENGER_SEARCH_COUNT_LIMIT)
+and cached, instead of a full COUNT(*) on every page.
+
+Message content is end-to-end encrypted, so full-text matching uses blind
+tokens (MessageSearchToken): clients index a message by sending keyed hashes
+of its words and search by hashing their query the same way.
+"""
+
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Message, MessageAttachment, MessageReaction, MessageSearchToken, Participant
+
+
+# Columns MessageListSerializer reads; skips signatures and the wide user row
+LIST_FIELDS = [
+    'id', 'conversation_id', 'message_type', 'encrypted_content', 'content_nonce',
+    'is_edited', 'is_deleted', 'created_at',
+    'sender__id', 'sender__username', 'sender__first_name', 'sender__last_name',
+]
+
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded"""
+
+
+def encode_cursor(message):
+    raw = f"{message.created_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of the last message of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def index_tokens(message, tokens):
+    """Replace a message's search tokens"""
+    if not getattr(settings, 'MESSENGER_SEARCH_TOKENS_ENABLED', True):
+        return 0
+    MessageSearchToken.objects.filter(message=message).delete()
+    MessageSearchToken.objects.bulk_create(
+        [
+            MessageSearchToken(
+                message=message,
+                conversation_id=message.conversation_id,
+                token=token,
+                created_at=message.created_at,
+            )
+            for token in set(tokens)
+        ],
+        ignore_conflicts=True,
+    )
+    return len(set(tokens))
+
+
+def search_queryset(user, filters):
+    """Messages of the user's conversations matching the search filters"""
+    conversations = Participant.objects.filter(user=user, is_active=True).values('conversation_id')
+    queryset = Message.objects.filter(conversation_id__in=conversations, is_deleted=False)
+
+    if filters.get('conversation_id'):
+        queryset = queryset.filter(conversation_id=filters['conversation_id'])
+
+    if filters.get('before'):
+        queryset = queryset.filter(created_at__lt=filters['before'])
+
+    if filters.get('after'):
+        queryset = queryset.filter(created_at__gt=filters['after'])
+
+    if filters.get('sender_id'):
+        queryset = queryset.filter(sender_id=filters['sender_id'])
+
+    if filters.get('message_type'):
+        queryset = queryset.filter(message_type=filters['message_type'])
+
+    if filters.get('has_attachments'):
+        # EXISTS instead of a join + DISTINCT, which would defeat the index order
+        queryset = queryset.filter(Exists(MessageAttachment.objects.filter(message=OuterRef('pk'))))
+
+    tokens = set(filters.get('tokens') or ())
+    if tokens:
+        matches = MessageSearchToken.objects.filter(token__in=tokens, conversation_id__in=conversations)
+        if filters.get('conversation_id'):
+            matches = matches.filter(conversation_id=filters['conversation_id'])
+        if len(tokens) > 1:
+            # Every token must match
+            matches = matches.values('message_id').annotate(found=Count('token')).filter(found=len(tokens))
+        queryset = queryset.filter(id__in=matches.values('message_id'))
+
+    return queryset
+
+
+def page(queryset, cursor=None, limit=50, offset=0):
+    """
+    One page of messages, newest first, and the cursor of the next page
+
+    `offset` is only honoured without a cursor, for older clients.
+    """
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        # The redundant lower bound lets the index scan start at the cursor
+        queryset = queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(id__lt=message_id)
+        )
+        offset = 0
+
+    queryset = queryset.order_by('-created_at', '-id').select_related('sender').only(
+        *LIST_FIELDS
+    ).annotate(
+        attachment_exists=Exists(MessageAttachment.objects.filter(message=OuterRef('pk'))),
+        reaction_total=Coalesce(
+            Subquery(
+                MessageReaction.objects.filter(message=OuterRef('pk'))
+                .order_by().values('message').annotate(n=Count('id')).values('n')[:1]
+            ),
+            0,
+        ),
+    )
+    messages = list(queryset[offset:offset + limit + 1])
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return messages, encode_cursor(messages[-1]) if has_more else None
+
+
+def approximate_total(user, filters, queryset):
+    """
+    (total, exact) for a search, cached for MESSENGER_SEARCH_COUNT_CACHE_SECONDS
+
+    Counts stop at MESSENGER_SEARCH_COUNT_LIMIT; beyond it the total is
+    reported as the limit with exact=False.
+    """
+    cap = getattr(settings, 'MESSENGER_SEARCH_COUNT_LIMIT', 1000)
+    normalized = {key: sorted(value) if isinstance(value, list) else value for key, value in filters.items()}
+    key_source = json.dumps({'user': str(user.pk), **normalized}, sort_keys=True, default=str)
+    cache_key = f"messenger:search-total:{hashlib.sha1(key_source.encode()).hexdigest()}"
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return tuple(cached)
+
+    count = queryset.order_by()[:cap + 1].count()
+    result = (min(count, cap), count <= cap)
+    cache.set(cache_key, result, getattr(settings, 'MESSENGER_SEARCH_COUNT_CACHE_SECONDS', 60))
+    return result
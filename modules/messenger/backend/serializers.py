@@ -224,6 +224,12 @@ class MessageCreateSerializer(serializers.Serializer):
         choices=['hub', 'p2p'],
         default='hub'
     )
+    search_tokens = serializers.ListField(
+        child=serializers.RegexField(r'^[0-9a-f]{16,64}$'),
+        required=False,
+        max_length=200,
+        help_text="Blind search tokens (keyed hashes computed client-side)"
+    )
 
 
 class MessageEditSerializer(serializers.Serializer):
@@ -231,6 +237,12 @@ class MessageEditSerializer(serializers.Serializer):
     encrypted_content = serializers.CharField()
     content_nonce = serializers.CharField(max_length=50)
     signature = serializers.CharField()
+    search_tokens = serializers.ListField(
+        child=serializers.RegexField(r'^[0-9a-f]{16,64}$'),
+        required=False,
+        max_length=200,
+        help_text="Blind search tokens (keyed hashes computed client-side)"
+    )
 
 
 class MessageListSerializer(serializers.ModelSerializer):
@@ -249,9 +261,13 @@ class MessageListSerializer(serializers.ModelSerializer):
         ]
 
     def get_has_attachments(self, obj):
+        if hasattr(obj, 'attachment_exists'):
+            return obj.attachment_exists
         return obj.attachments.exists()
 
     def get_reaction_count(self, obj):
+        if hasattr(obj, 'reaction_total'):
+            return obj.reaction_total
         return obj.reactions.count()
 
 
@@ -461,5 +477,15 @@ class MessageSearchSerializer(serializers.Serializer):
         required=False
     )
     has_attachments = serializers.BooleanField(required=False)
+    tokens = serializers.ListField(
+        child=serializers.RegexField(r'^[0-9a-f]{16,64}$'),
+        required=False,
+        max_length=20,
+        help_text="Blind search tokens; messages must match all of them"
+    )
     limit = serializers.IntegerField(default=50, min_value=1, max_value=100)
-    offset = serializers.IntegerField(default=0, min_value=0)
+    cursor = serializers.CharField(required=False, allow_blank=True, help_text="next_cursor of the previous page")
+    offset = serializers.IntegerField(
+        default=0, min_value=0, max_value=1000,
+        help_text="Deprecated: use cursor for deeper pages"
+    )
@@ -0,0 +1,209 @@
+"""
+Messenger Bulk Delivery Tests
+
+Tests for the set-based delivery layer:
+- Fan-out costs the same queries for a direct chat and a large group
+- Read receipts adjust unread counts in SQL, never below zero
+- Reconnect drains the offline queue in batches, skipping live-delivered and deleted messages
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from modules.messenger.backend import delivery
+from modules.messenger.backend.models import (
+    Conversation,
+    Message,
+    MessageDeliveryQueue,
+    MessageReadReceipt,
+    Participant,
+)
+
+User = get_user_model()
+
+
+class BulkDeliveryTestCase(TestCase):
+
+    def make_group(self, size, name='group'):
+        users = [
+            User.objects.create_user(username=f'{name}{i}', email=f'{name}{i}@test.com', password='testpass123')
+            for i in range(size)
+        ]
+        conversation = Conversation.objects.create(conversation_type='group', created_by=users[0])
+        Participant.objects.bulk_create([
+            Participant(conversation=conversation, user=user, role='owner' if i == 0 else 'member')
+            for i, user in enumerate(users)
+        ])
+        return conversation, users
+
+    def send(self, conversation, sender, **kwargs):
+        return Message.objects.create(
+            conversation=conversation,
+            sender=sender,
+            message_type='text',
+            encrypted_content='content',
+            content_nonce='nonce',
+            signature='sig',
+            sender_key_id=uuid.uuid4(),
+            **kwargs
+        )
+
+
+class TestFanOut(BulkDeliveryTestCase):
+
+    def test_query_count_does_not_grow_with_group_size(self):
+        small, small_users = self.make_group(2, 'small')
+        large, large_users = self.make_group(60, 'large')
+        small_message = self.send(small, small_users[0])
+        large_message = self.send(large, large_users[0])
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.assertEqual(delivery.fan_out(small_message), 1)
+        with CaptureQueriesContext(connection) as large_queries:
+            self.assertEqual(delivery.fan_out(large_message, batch_size=100), 59)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(MessageDeliveryQueue.objects.filter(message=large_message).count(), 59)
+        self.assertFalse(MessageDeliveryQueue.objects.filter(recipient=large_users[0]).exists())
+
+    def test_unread_counts_and_repeated_fan_out(self):
+        conversation, users = self.make_group(4)
+        message = self.send(conversation, users[0])
+        Participant.objects.filter(user=users[3]).update(is_active=False)
+
+        delivery.fan_out(message)
+        delivery.fan_out(message)
+
+        unread = dict(Participant.objects.values_list('user__username', 'unread_count'))
+        self.assertEqual(unread, {'group0': 0, 'group1': 1, 'group2': 1, 'group3': 0})
+        # The queue keeps one entry per recipient
+        self.assertEqual(MessageDeliveryQueue.objects.filter(message=message).count(), 2)
+
+        # A member who joins later is queued and counted without touching the others
+        Participant.objects.filter(user=users[3]).update(is_active=True)
+        delivery.fan_out(message)
+        unread = dict(Participant.objects.values_list('user__username', 'unread_count'))
+        self.assertEqual(unread, {'group0': 0, 'group1': 1, 'group2': 1, 'group3': 1})
+
+
+class TestMarkRead(BulkDeliveryTestCase):
+
+    def setUp(self):
+        self.conversation, self.users = self.make_group(3)
+        self.sender, self.reader = self.users[0], self.users[1]
+        self.messages = []
+        for _ in range(5):
+            message = self.send(self.conversation, self.sender)
+            delivery.fan_out(message)
+            self.messages.append(message)
+
+    def participant(self):
+        return Participant.objects.get(conversation=self.conversation, user=self.reader)
+
+    def test_marks_new_receipts_once(self):
+        first = [m.id for m in self.messages[:3]]
+        read_count, _ = delivery.mark_read(self.reader, self.conversation.id, first, 'phone')
+        self.assertEqual(read_count, 3)
+        self.assertEqual(self.participant().unread_count, 2)
+        self.assertEqual(self.participant().last_read_message_id, self.messages[2].id)
+
+        # Re-reading does not count twice
+        read_count, _ = delivery.mark_read(self.reader, self.conversation.id, [m.id for m in self.messages], 'laptop')
+        self.assertEqual(read_count, 2)
+        self.assertEqual(self.participant().unread_count, 0)
+        self.assertEqual(MessageReadReceipt.objects.filter(user=self.reader).count(), 5)
+        self.assertEqual(
+            MessageReadReceipt.objects.get(user=self.reader, message=self.messages[0]).device_id, 'phone'
+        )
+
+    def test_unread_count_never_goes_negative(self):
+        Participant.objects.filter(user=self.reader).update(unread_count=1)
+        delivery.mark_read(self.reader, self.conversation.id, [m.id for m in self.messages])
+        self.assertEqual(self.participant().unread_count, 0)
+
+    def test_repeated_read_counts_once(self):
+        ids = [m.id for m in self.messages[:2]]
+        delivery.mark_read(self.reader, self.conversation.id, ids, 'phone')
+        self.assertEqual(delivery.mark_read(self.reader, self.conversation.id, ids, 'laptop')[0], 0)
+        self.assertEqual(self.participant().unread_count, 3)
+
+    def test_read_messages_leave_the_queue(self):
+        delivery.mark_read(self.reader, self.conversation.id, [self.messages[0].id])
+        statuses = dict(
+            MessageDeliveryQueue.objects.filter(recipient=self.reader).values_list('message_id', 'status')
+        )
+        self.assertEqual(statuses[self.messages[0].id], 'delivered')
+        self.assertEqual(statuses[self.messages[1].id], 'pending')
+
+    def test_ignores_messages_of_other_conversations(self):
+        other, other_users = self.make_group(2, 'other')
+        foreign = self.send(other, other_users[0])
+        read_count, _ = delivery.mark_read(self.reader, self.conversation.id, [foreign.id])
+        self.assertEqual(read_count, 0)
+        self.assertFalse(MessageReadReceipt.objects.filter(message=foreign).exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        for _ in range(45):
+            delivery.fan_out(self.send(self.conversation, self.sender))
+        ids = list(Message.objects.filter(conversation=self.conversation).values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as few:
+            delivery.mark_read(self.reader, self.conversation.id, ids[:2])
+        with CaptureQueriesContext(connection) as many:
+            delivery.mark_read(self.reader, self.conversation.id, ids[2:])
+        self.assertEqual(len(few), len(many))
+
+
+class TestDrainPending(BulkDeliveryTestCase):
+
+    def setUp(self):
+        self.conversation, (self.sender, self.recipient) = self.make_group(2)
+
+    def test_drains_in_batches_oldest_first(self):
+        sent = []
+        for _ in range(7):
+            message = self.send(self.conversation, self.sender)
+            delivery.fan_out(message)
+            sent.append(str(message.id))
+        expired = self.send(self.conversation, self.sender, expires_at=timezone.now() - timedelta(minutes=1))
+        delivery.fan_out(expired)
+
+        batches = list(delivery.drain_pending(self.recipient, batch_size=3))
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual([payload['message_id'] for batch in batches for payload in batch], sent)
+        self.assertEqual(batches[0][0]['sender_username'], self.sender.username)
+        statuses = dict(MessageDeliveryQueue.objects.values_list('message_id', 'status'))
+        self.assertEqual(statuses.pop(expired.id), 'expired')
+        self.assertEqual(set(statuses.values()), {'delivered'})
+
+    def test_skips_live_delivered_and_deleted_messages(self):
+        live, deleted, missed = (self.send(self.conversation, self.sender) for _ in range(3))
+        for message in (live, deleted, missed):
+            delivery.fan_out(message)
+        self.assertEqual(delivery.mark_delivered(self.recipient, [live.id]), 1)
+        deleted.soft_delete(for_everyone=True)
+
+        batches = list(delivery.drain_pending(self.recipient))
+        self.assertEqual([payload['message_id'] for batch in batches for payload in batch], [str(missed.id)])
+        statuses = dict(MessageDeliveryQueue.objects.values_list('message_id', 'status'))
+        self.assertEqual(statuses, {live.id: 'delivered', deleted.id: 'expired', missed.id: 'delivered'})
+
+    def test_interrupted_drain_keeps_unsent_batch(self):
+        for _ in range(4):
+            delivery.fan_out(self.send(self.conversation, self.sender))
+
+        batches = delivery.drain_pending(self.recipient, batch_size=2)
+        next(batches)
+        next(batches)
+        batches.close()  # Connection dropped while sending the second batch
+
+        pending = MessageDeliveryQueue.objects.filter(recipient=self.recipient, status='pending')
+        self.assertEqual(pending.count(), 2)
+        self.assertEqual(len(list(delivery.drain_pending(self.recipient))[0]), 2)
@@ -571,7 +571,9 @@ class TestQueueCleanup(TestCase):
         Participant.objects.create(conversation=self.conversation, user=self.alice, role='owner')
         Participant.objects.create(conversation=self.conversation, user=self.bob, role='member')
 
-        self.message = Message.objects.create(
+    def _message(self):
+        """A new message; the queue holds one entry per message and recipient"""
+        return Message.objects.create(
             conversation=self.conversation,
             sender=self.alice,
             message_type='text',
@@ -586,7 +588,7 @@ class TestQueueCleanup(TestCase):
         # Create expired entries
         for i in range(3):
             MessageDeliveryQueue.objects.create(
-                message=self.message,
+                message=self._message(),
                 recipient=self.bob,
                 status='pending',
                 expires_at=timezone.now() - timedelta(days=i+1)
@@ -594,7 +596,7 @@ class TestQueueCleanup(TestCase):
 
         # Create valid entry
         MessageDeliveryQueue.objects.create(
-            message=self.message,
+            message=self._message(),
             recipient=self.bob,
             status='pending',
             expires_at=timezone.now() + timedelta(days=30)
@@ -611,7 +613,7 @@ class TestQueueCleanup(TestCase):
         # Create old delivered entries
         for i in range(5):
             entry = MessageDeliveryQueue.objects.create(
-                message=self.message,
+                message=self._message(),
                 recipient=self.bob,
                 status='delivered',
                 expires_at=timezone.now() + timedelta(days=30)
@@ -0,0 +1,156 @@
+"""
+Messenger Ratchet Store Tests
+
+Tests for persisted Double Ratchet sessions:
+- Sessions survive a worker restart and are encrypted at rest
+- Hot sessions are served from an LRU cache, stale copies are reloaded
+- Skipped message keys are bounded by count and expire by age
+"""
+
+import os
+import time
+
+from cryptography.exceptions import InvalidTag
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from modules.messenger.backend.double_ratchet import RatchetSessionManager, generate_dh_keypair
+from modules.messenger.backend.models import RatchetSession
+from modules.messenger.backend.ratchet_store import RatchetSessionStore, SessionNotFound
+
+User = get_user_model()
+
+
+def paired_managers(alice_store, bob_store, alice, bob):
+    """Alice and Bob managers with an established session"""
+    secret = os.urandom(32)
+    bob_keypair = generate_dh_keypair()
+    alice_manager = RatchetSessionManager(store=alice_store, owner_id=alice.id)
+    bob_manager = RatchetSessionManager(store=bob_store, owner_id=bob.id)
+    alice_manager.create_session('bob', secret, peer_public_key=bob_keypair[1], is_initiator=True)
+    bob_manager.create_session('alice', secret, keypair=bob_keypair, is_initiator=False)
+    return alice_manager, bob_manager
+
+
+class TestRatchetStore(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', email='bob@test.com', password='testpass123')
+        self.store = RatchetSessionStore()
+        self.alice_manager, self.bob_manager = paired_managers(self.store, self.store, self.alice, self.bob)
+
+    def test_sessions_survive_restart(self):
+        first = self.alice_manager.encrypt('bob', 'before restart')
+        self.assertEqual(self.bob_manager.decrypt('alice', first), 'before restart')
+
+        # A fresh store has an empty cache, as after a worker restart
+        restarted = RatchetSessionStore()
+        bob = RatchetSessionManager(store=restarted, owner_id=self.bob.id)
+        alice = RatchetSessionManager(store=restarted, owner_id=self.alice.id)
+        self.assertEqual(bob.decrypt('alice', alice.encrypt('bob', 'after restart')), 'after restart')
+        self.assertEqual(alice.decrypt('bob', bob.encrypt('alice', 'reply')), 'reply')
+        # Each session is decoded from the database once, then served warm
+        self.assertEqual((restarted.misses, restarted.hits), (2, 2))
+
+    def test_state_is_encrypted_at_rest(self):
+        with self.store.session(self.alice.id, 'bob') as ratchet:
+            root_key = ratchet.state.root_key
+        stored = bytes(RatchetSession.objects.get(owner=self.alice, peer_id='bob').encrypted_state)
+        self.assertNotIn(b'root_key', stored)
+        self.assertNotIn(root_key, stored)
+
+    def test_rows_cannot_be_moved_between_sessions(self):
+        stored = RatchetSession.objects.get(owner=self.alice, peer_id='bob').encrypted_state
+        RatchetSession.objects.create(owner=self.bob, peer_id='bob', encrypted_state=stored, revision=1)
+        with self.assertRaises(ValueError):
+            with RatchetSessionStore().session(self.bob.id, 'bob'):
+                pass
+
+    def test_warm_sessions_skip_decoding(self):
+        for _ in range(3):
+            self.alice_manager.encrypt('bob', 'hello')
+        self.assertEqual(self.store.hits, 3)
+        self.assertEqual(self.store.misses, 0)
+
+    def test_stale_cache_is_reloaded(self):
+        # Two workers serving Alice, each with its own cache
+        other_worker = RatchetSessionStore()
+        other_alice = RatchetSessionManager(store=other_worker, owner_id=self.alice.id)
+
+        messages = [
+            self.alice_manager.encrypt('bob', 'one'),
+            other_alice.encrypt('bob', 'two'),
+            self.alice_manager.encrypt('bob', 'three'),
+        ]
+        self.assertEqual(
+            [message.header.message_number for message in messages], [0, 1, 2]
+        )
+        self.assertEqual([self.bob_manager.decrypt('alice', m) for m in messages], ['one', 'two', 'three'])
+        self.assertEqual(self.store.misses, 1)
+
+    def test_failed_decrypt_does_not_advance_state(self):
+        message = self.alice_manager.encrypt('bob', 'hello')
+        forged = type(message)(header=message.header, ciphertext=os.urandom(len(message.ciphertext)), nonce=message.nonce)
+
+        with self.assertRaises(InvalidTag):
+            self.bob_manager.decrypt('alice', forged)
+        self.assertEqual(self.bob_manager.decrypt('alice', message), 'hello')
+
+    def test_lru_eviction(self):
+        store = RatchetSessionStore(cache_size=2)
+        for peer in ['p1', 'p2', 'p3']:
+            RatchetSessionManager(store=store, owner_id=self.alice.id).create_session(
+                peer, os.urandom(32), peer_public_key=generate_dh_keypair()[1]
+            )
+        self.assertEqual([key[1] for key in store._cache], ['p2', 'p3'])
+
+        with store.session(self.alice.id, 'p2'):
+            pass
+        with store.session(self.alice.id, 'p1'):
+            pass
+        self.assertEqual([key[1] for key in store._cache], ['p2', 'p1'])
+
+    def test_missing_session(self):
+        self.assertTrue(self.alice_manager.remove_session('bob'))
+        self.assertFalse(self.alice_manager.has_session('bob'))
+        with self.assertRaises(SessionNotFound):
+            self.alice_manager.encrypt('bob', 'hello')
+
+
+class TestSkippedKeyLimits(SimpleTestCase):
+
+    def setUp(self):
+        manager = RatchetSessionManager()
+        bob_keypair = generate_dh_keypair()
+        secret = os.urandom(32)
+        self.alice = manager.create_session('bob', secret, peer_public_key=bob_keypair[1])
+        self.bob = RatchetSessionManager().create_session('alice', secret, keypair=bob_keypair, is_initiator=False)
+
+    def skip(self, count):
+        messages = [self.alice.encrypt(f'm{i}') for i in range(count + 1)]
+        self.bob.decrypt(messages[-1])
+        return messages[:-1]
+
+    def test_cleanup_expires_old_keys(self):
+        old = self.skip(3)
+        for key_tuple in list(self.bob.state.skipped_key_times)[:2]:
+            self.bob.state.skipped_key_times[key_tuple] = time.time() - 5 * 3600
+
+        self.assertEqual(self.bob.cleanup_old_keys(max_age_hours=4), 2)
+        self.assertEqual(self.bob.decrypt(old[2]), 'm2')
+        with self.assertRaises(InvalidTag):
+            self.bob.decrypt(old[0])
+
+    def test_count_is_bounded(self):
+        self.skip(10)
+        self.assertEqual(self.bob.cleanup_old_keys(max_keys=4), 6)
+        self.assertEqual([num for _, num in self.bob.state.skipped_message_keys], [6, 7, 8, 9])
+
+    def test_key_ages_survive_serialization(self):
+        self.skip(2)
+        key_tuple = next(iter(self.bob.state.skipped_key_times))
+        self.bob.state.skipped_key_times[key_tuple] = 1000.0
+        restored = type(self.bob).from_state_dict(self.bob.get_state_dict())
+        self.assertEqual(restored.state.skipped_key_times[key_tuple], 1000.0)
+        self.assertEqual(restored.cleanup_old_keys(), 1)
@@ -233,8 +233,16 @@ class TestReadReceiptPerformance:
         with open(views_path, 'r') as f:
             source = f.read()
 
-        # Should use max(0, ...) to prevent negative counts
-        assert 'max(0,' in source
+        delivery_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'delivery.py'
+        )
+
+        with open(delivery_path, 'r') as f:
+            source += f.read()
+
+        # Should floor at zero in SQL (Greatest) to prevent negative counts
+        assert "Greatest(F('unread_count')" in source
 
 
 class TestMessageReadStatus:
@@ -0,0 +1,190 @@
+"""
+Messenger Search Tests
+
+Tests for keyset-paginated search:
+- Cursor pages walk every message once, including created_at ties
+- Blind token matching stays within the user's conversations
+- Totals are capped, cached, and not recounted per page
+- Page cost does not depend on depth or page size
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from modules.messenger.backend import search
+from modules.messenger.backend.models import (
+    Conversation,
+    Message,
+    MessageAttachment,
+    MessageReaction,
+    Participant,
+)
+from modules.messenger.backend.views import MessageSearchView
+
+User = get_user_model()
+
+TOKEN_HELLO = 'aa' * 16
+TOKEN_WORLD = 'bb' * 16
+
+
+class SearchTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', email='bob@test.com', password='testpass123')
+        self.eve = User.objects.create_user(username='eve', email='eve@test.com', password='testpass123')
+        self.conversation = self.make_conversation(self.alice, self.bob)
+        self.other = self.make_conversation(self.eve)
+
+    def make_conversation(self, *users):
+        conversation = Conversation.objects.create(conversation_type='group', created_by=users[0])
+        for user in users:
+            Participant.objects.create(conversation=conversation, user=user)
+        return conversation
+
+    def send(self, conversation, sender, tokens=(), created_at=None):
+        message = Message.objects.create(
+            conversation=conversation,
+            sender=sender,
+            message_type='text',
+            encrypted_content='content',
+            content_nonce='nonce',
+            signature='sig',
+            sender_key_id=uuid.uuid4(),
+        )
+        if created_at:
+            Message.objects.filter(pk=message.pk).update(created_at=created_at)
+            message.created_at = created_at
+        if tokens:
+            search.index_tokens(message, tokens)
+        return message
+
+    def post(self, user, **data):
+        request = APIRequestFactory().post('/messenger/search/', data, format='json')
+        force_authenticate(request, user=user)
+        return MessageSearchView.as_view()(request)
+
+
+class TestKeysetPagination(SearchTestCase):
+
+    def test_cursor_walks_every_message_once_newest_first(self):
+        base = timezone.now() - timedelta(days=1)
+        expected = []
+        for i in range(23):
+            # Groups of three share a timestamp, so the id breaks ties
+            message = self.send(self.conversation, self.alice, created_at=base + timedelta(seconds=i // 3))
+            expected.append(message)
+        expected.sort(key=lambda m: (m.created_at, m.id), reverse=True)
+        self.send(self.other, self.eve)
+
+        seen, cursor = [], None
+        while True:
+            response = self.post(self.bob, limit=5, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(response.status_code, 200)
+            seen.extend(m['id'] for m in response.data['messages'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [str(m.id) for m in expected])
+
+    def test_filters_apply_across_pages(self):
+        for i in range(6):
+            self.send(self.conversation, self.alice if i % 2 else self.bob)
+
+        first = self.post(self.bob, sender_id=str(self.alice.id), limit=2)
+        second = self.post(self.bob, sender_id=str(self.alice.id), limit=2, cursor=first.data['next_cursor'])
+
+        self.assertEqual(len(first.data['messages']) + len(second.data['messages']), 3)
+        self.assertIsNone(second.data['next_cursor'])
+        self.assertEqual(first.data['total'], 3)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.post(self.bob, cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_legacy_offset_still_pages(self):
+        messages = [self.send(self.conversation, self.alice) for _ in range(4)]
+        response = self.post(self.bob, limit=2, offset=2)
+        self.assertEqual(
+            [m['id'] for m in response.data['messages']],
+            [str(m.id) for m in sorted(messages, key=lambda m: (m.created_at, m.id), reverse=True)[2:]]
+        )
+
+
+class TestTokenSearch(SearchTestCase):
+
+    def test_all_tokens_must_match(self):
+        both = self.send(self.conversation, self.alice, tokens=[TOKEN_HELLO, TOKEN_WORLD])
+        hello = self.send(self.conversation, self.alice, tokens=[TOKEN_HELLO])
+        self.send(self.conversation, self.alice)
+
+        response = self.post(self.bob, tokens=[TOKEN_HELLO])
+        self.assertEqual({m['id'] for m in response.data['messages']}, {str(both.id), str(hello.id)})
+
+        response = self.post(self.bob, tokens=[TOKEN_WORLD, TOKEN_HELLO])
+        self.assertEqual([m['id'] for m in response.data['messages']], [str(both.id)])
+
+    def test_tokens_never_match_other_conversations(self):
+        self.send(self.other, self.eve, tokens=[TOKEN_HELLO])
+        response = self.post(self.bob, tokens=[TOKEN_HELLO])
+        self.assertEqual(response.data['messages'], [])
+
+    def test_reindexing_replaces_tokens(self):
+        message = self.send(self.conversation, self.alice, tokens=[TOKEN_HELLO])
+        search.index_tokens(message, [TOKEN_WORLD])
+        self.assertEqual(self.post(self.bob, tokens=[TOKEN_HELLO]).data['messages'], [])
+        self.assertEqual(len(self.post(self.bob, tokens=[TOKEN_WORLD]).data['messages']), 1)
+
+    def test_malformed_tokens_are_rejected(self):
+        self.assertEqual(self.post(self.bob, tokens=['hello']).status_code, 400)
+
+
+class TestTotalsAndCost(SearchTestCase):
+
+    @override_settings(MESSENGER_SEARCH_COUNT_LIMIT=5)
+    def test_total_is_capped_and_counted_once(self):
+        for _ in range(8):
+            self.send(self.conversation, self.alice)
+
+        first = self.post(self.bob, limit=3)
+        self.assertEqual(first.data['total'], 5)
+        self.assertTrue(first.data['total_is_estimate'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.post(self.bob, limit=3, cursor=first.data['next_cursor'])
+        self.assertEqual(second.data['total'], 5)
+        self.assertFalse(any(q['sql'].startswith('SELECT COUNT(*)') for q in queries.captured_queries))
+
+    def test_page_queries_do_not_grow_with_page_size(self):
+        with_attachments = set()
+        for i in range(30):
+            message = self.send(self.conversation, self.alice)
+            MessageReaction.objects.create(message=message, user=self.bob, emoji='+1')
+            if i % 3 == 0:
+                with_attachments.add(str(message.id))
+                MessageAttachment.objects.create(
+                    message=message, file='messenger/attachments/x.bin', original_filename='x.bin',
+                    file_type='application/octet-stream', file_size=1, encrypted_file_key='key',
+                    file_nonce='nonce', file_hash='0' * 64,
+                )
+
+        first = self.post(self.bob, limit=2)
+        with CaptureQueriesContext(connection) as small:
+            self.post(self.bob, limit=2, cursor=first.data['next_cursor'])
+        with CaptureQueriesContext(connection) as large:
+            response = self.post(self.bob, limit=20, cursor=first.data['next_cursor'])
+
+        self.assertEqual(len(small), len(large))
+        self.assertTrue(all(m['reaction_count'] == 1 for m in response.data['messages']))
+        for message in response.data['messages']:
+            self.assertEqual(message['has_attachments'], message['id'] in with_attachments)
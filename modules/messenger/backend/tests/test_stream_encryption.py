@@ -0,0 +1,173 @@
+"""
+Messenger Stream Encryption Tests
+
+Tests for chunked (STREAM) attachment encryption:
+- Round trips at chunk boundaries, including empty files
+- Truncation, reordering, appended data and wrong keys are rejected
+- Uploads are hashed and checked for truncation without buffering
+"""
+
+import hashlib
+import io
+import os
+import uuid
+
+from cryptography.exceptions import InvalidTag
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from modules.messenger.backend.encryption import (
+    STREAM_HEADER_SIZE,
+    STREAM_TAG_SIZE,
+    EncryptionService,
+    StreamDecryptor,
+    StreamEncryptor,
+    inspect_encrypted_upload,
+    stream_plaintext_size,
+)
+from modules.messenger.backend.models import Conversation, Message, MessageAttachment, Participant
+from modules.messenger.backend.views import AttachmentUploadView
+
+User = get_user_model()
+
+CHUNK = 1024
+SEALED = CHUNK + STREAM_TAG_SIZE
+
+
+def encrypt(data, key=None, chunk_size=CHUNK):
+    out = io.BytesIO()
+    key = EncryptionService().encrypt_file_stream(io.BytesIO(data), out, key, chunk_size)
+    return out.getvalue(), key
+
+
+def decrypt(encrypted, key):
+    out = io.BytesIO()
+    EncryptionService().decrypt_file_stream(io.BytesIO(encrypted), out, key)
+    return out.getvalue()
+
+
+class TestStreamRoundTrip(SimpleTestCase):
+
+    def test_sizes_around_chunk_boundaries(self):
+        for size in [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 3 * CHUNK, 5 * CHUNK + 7]:
+            data = os.urandom(size)
+            encrypted, key = encrypt(data)
+            self.assertEqual(decrypt(encrypted, key), data, size)
+            self.assertEqual(stream_plaintext_size(len(encrypted), CHUNK), size)
+
+    def test_writes_of_any_size_give_the_same_chunking(self):
+        data = os.urandom(4 * CHUNK + 100)
+        key = os.urandom(32)
+        out = io.BytesIO()
+        with StreamEncryptor(out, key, CHUNK) as writer:
+            for start in range(0, len(data), 333):
+                writer.write(data[start:start + 333])
+        self.assertEqual(len(out.getvalue()), STREAM_HEADER_SIZE + 4 * SEALED + 100 + STREAM_TAG_SIZE)
+
+        reader = StreamDecryptor(io.BytesIO(out.getvalue()), key)
+        self.assertEqual(b''.join(iter(lambda: reader.read(500), b'')), data)
+
+    def test_chunk_size_is_bounded(self):
+        with self.assertRaises(ValueError):
+            StreamEncryptor(io.BytesIO(), os.urandom(32), chunk_size=16)
+
+
+class TestStreamAttacks(SimpleTestCase):
+
+    def setUp(self):
+        self.data = os.urandom(3 * CHUNK)
+        self.encrypted, self.key = encrypt(self.data)
+        self.header = self.encrypted[:STREAM_HEADER_SIZE]
+        body = self.encrypted[STREAM_HEADER_SIZE:]
+        self.chunks = [body[i:i + SEALED] for i in range(0, len(body), SEALED)]
+
+    def test_truncation_at_chunk_boundary(self):
+        # The remaining chunks are intact, but none carries the last-chunk flag
+        with self.assertRaises(InvalidTag):
+            decrypt(self.header + b''.join(self.chunks[:2]), self.key)
+
+    def test_truncation_mid_chunk(self):
+        with self.assertRaises(InvalidTag):
+            decrypt(self.encrypted[:-100], self.key)
+        self.assertIsNone(stream_plaintext_size(len(self.encrypted) - SEALED + 5, CHUNK))
+
+    def test_reordered_chunks(self):
+        swapped = [self.chunks[1], self.chunks[0], self.chunks[2]]
+        with self.assertRaises(InvalidTag):
+            decrypt(self.header + b''.join(swapped), self.key)
+
+    def test_appended_data(self):
+        extra, _ = encrypt(os.urandom(CHUNK), self.key)
+        with self.assertRaises(InvalidTag):
+            decrypt(self.encrypted + extra[STREAM_HEADER_SIZE:], self.key)
+
+    def test_chunks_from_another_stream(self):
+        other, _ = encrypt(os.urandom(3 * CHUNK), self.key)
+        spliced = other[STREAM_HEADER_SIZE:STREAM_HEADER_SIZE + SEALED]
+        with self.assertRaises(InvalidTag):
+            decrypt(self.header + spliced + b''.join(self.chunks[1:]), self.key)
+
+    def test_wrong_key(self):
+        with self.assertRaises(InvalidTag):
+            decrypt(self.encrypted, os.urandom(32))
+
+    def test_not_a_stream(self):
+        with self.assertRaises(ValueError):
+            StreamDecryptor(io.BytesIO(b'\x00' * 64), self.key)
+
+
+@override_settings(MEDIA_ROOT='/tmp/unibos-test-media')
+class TestAttachmentUpload(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+        conversation = Conversation.objects.create(conversation_type='direct', created_by=self.alice)
+        Participant.objects.create(conversation=conversation, user=self.alice)
+        self.message = Message.objects.create(
+            conversation=conversation, sender=self.alice, message_type='file',
+            encrypted_content='content', content_nonce='nonce', signature='sig', sender_key_id=uuid.uuid4(),
+        )
+
+    def upload(self, encrypted, file_hash):
+        request = APIRequestFactory().post('/messenger/attachments/', {
+            'file': SimpleUploadedFile('photo.jpg', encrypted, content_type='image/jpeg'),
+            'encrypted_file_key': 'key',
+            'file_nonce': 'nonce',
+            'file_hash': file_hash,
+        }, format='multipart')
+        force_authenticate(request, user=self.alice)
+        return AttachmentUploadView.as_view()(
+            request, conversation_id=self.message.conversation_id, message_id=self.message.id
+        )
+
+    def test_inspect_reads_header_across_chunks(self):
+        encrypted, _ = encrypt(os.urandom(2 * CHUNK))
+        pieces = [encrypted[:5], encrypted[5:11], encrypted[11:]]
+        self.assertEqual(
+            inspect_encrypted_upload(pieces), (hashlib.sha256(encrypted).hexdigest(), CHUNK)
+        )
+
+    def test_accepts_matching_hash(self):
+        encrypted, _ = encrypt(os.urandom(2 * CHUNK + 10))
+        response = self.upload(encrypted, hashlib.sha256(encrypted).hexdigest().upper())
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(MessageAttachment.objects.filter(message=self.message).exists())
+
+    def test_rejects_hash_mismatch(self):
+        encrypted, _ = encrypt(os.urandom(100))
+        response = self.upload(encrypted, '0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MessageAttachment.objects.exists())
+
+    def test_rejects_truncated_stream(self):
+        encrypted, _ = encrypt(os.urandom(2 * CHUNK))
+        truncated = encrypted[:STREAM_HEADER_SIZE + SEALED + 8]
+        response = self.upload(truncated, hashlib.sha256(truncated).hexdigest())
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_shot_uploads_still_accepted(self):
+        encrypted = os.urandom(12) + os.urandom(300)
+        response = self.upload(encrypted, hashlib.sha256(encrypted).hexdigest())
+        self.assertEqual(response.status_code, 201)
@@ -7,7 +7,7 @@ All messages are encrypted end-to-end.
 
 import logging
 from django.db import transaction
-from django.db.models import Q, F
+from django.db.models import Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from rest_framework import status, generics
@@ -27,7 +27,6 @@ from .models import (
     MessageReadReceipt,
     UserEncryptionKey,
     P2PSession,
-    MessageDeliveryQueue,
 )
 from .serializers import (
     ConversationSerializer,
@@ -53,7 +52,15 @@ from .serializers import (
     TypingIndicatorSerializer,
     MessageSearchSerializer,
 )
-from .encryption import get_encryption_service
+from .encryption import (
+    STREAM_HEADER_SIZE,
+    get_encryption_service,
+    inspect_encrypted_upload,
+    parse_stream_header,
+    stream_plaintext_size,
+)
+from .delivery import fan_out, mark_read
+from . import search
 
 logger = logging.getLogger('messenger')
 
@@ -470,28 +477,17 @@ class MessageViewSet(ViewSet):
         conversation.last_message_at = message.created_at
         conversation.save(update_fields=['last_message_at'])
 
-        # Update unread counts for other participants
-        Participant.objects.filter(
-            conversation=conversation,
-            is_active=True
-        ).exclude(
-            user=request.user
-        ).update(
-            unread_count=F('unread_count') + 1
-        )
+        if data.get('search_tokens'):
+            search.index_tokens(message, data['search_tokens'])
 
-        # Queue for offline delivery
-        for participant in conversation.participants.filter(is_active=True).exclude(user=request.user):
-            MessageDeliveryQueue.objects.create(
-                message=message,
-                recipient=participant.user,
-                expires_at=message.expires_at or (timezone.now() + timezone.timedelta(days=30))
-            )
+        # Update unread counts and queue for offline delivery, in bulk
+        recipient_count = fan_out(message)
 
-        logger.info(f"Message sent: {message.id} in {conversation.id}")
+        logger.info(f"Message sent: {message.id} in {conversation.id} to {recipient_count} recipients")
 
-        # Trigger WebSocket notification (will be handled by consumer)
-        self._notify_new_message(conversation, message)
+        # Trigger WebSocket notification (will be handled by consumer) once the
+        # queue entries are committed, so live delivery can mark them delivered
+        transaction.on_commit(lambda: self._notify_new_message(conversation, message))
 
         return Response(
             MessageSerializer(message).data,
@@ -534,6 +530,9 @@ class MessageViewSet(ViewSet):
         message.edited_at = timezone.now()
         message.save()
 
+        if 'search_tokens' in serializer.validated_data:
+            search.index_tokens(message, serializer.validated_data['search_tokens'])
+
         return Response(MessageSerializer(message).data)
 
     def destroy(self, request, conversation_id=None, pk=None):
@@ -655,6 +654,19 @@ class AttachmentUploadView(APIView):
 
         uploaded_file = serializer.validated_data['file']
 
+        # Verified chunk by chunk: never holds the file in memory
+        file_hash, chunk_size = inspect_encrypted_upload(uploaded_file.chunks())
+        if file_hash != serializer.validated_data['file_hash'].lower():
+            return Response(
+                {'detail': 'File hash does not match the uploaded data.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if chunk_size and stream_plaintext_size(uploaded_file.size, chunk_size) is None:
+            return Response(
+                {'detail': 'Encrypted stream is truncated.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         attachment = MessageAttachment.objects.create(
             message=message,
             file=uploaded_file,
@@ -699,17 +711,23 @@ class AttachmentDownloadView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Stream the encrypted file
-        response = FileResponse(
-            attachment.file.open('rb'),
-            content_type='application/octet-stream'
-        )
+        # Stream the encrypted file; chunked uploads can be decrypted as they download
+        stored = attachment.file.open('rb')
+        stream_header = parse_stream_header(stored.read(STREAM_HEADER_SIZE))
+        stored.seek(0)
+        response = FileResponse(stored, content_type='application/octet-stream')
         response['Content-Disposition'] = f'attachment; filename="{attachment.original_filename}.enc"'
         response['X-File-Hash'] = attachment.file_hash
         response['X-File-Size'] = str(attachment.file_size)
         response['X-Original-Filename'] = attachment.original_filename
         response['X-File-Type'] = attachment.file_type
 
+        if stream_header:
+            response['X-Encryption-Format'] = 'stream'
+            response['X-Encryption-Chunk-Size'] = str(stream_header[0])
+        else:
+            response['X-Encryption-Format'] = 'single'
+
         return response
 
 
@@ -956,45 +974,34 @@ class MessageSearchView(APIView):
         serializer.is_valid(raise_exception=True)
 
         data = serializer.validated_data
+        filters = {
+            key: data[key] for key in (
+                'conversation_id', 'before', 'after', 'sender_id',
+                'message_type', 'has_attachments', 'tokens',
+            ) if data.get(key)
+        }
 
-        # Base queryset - user's conversations only
-        queryset = Message.objects.filter(
-            conversation__participants__user=request.user,
-            conversation__participants__is_active=True,
-            is_deleted=False
-        )
-
-        # Filters
-        if data.get('conversation_id'):
-            queryset = queryset.filter(conversation_id=data['conversation_id'])
-
-        if data.get('before'):
-            queryset = queryset.filter(created_at__lt=data['before'])
-
-        if data.get('after'):
-            queryset = queryset.filter(created_at__gt=data['after'])
-
-        if data.get('sender_id'):
-            queryset = queryset.filter(sender_id=data['sender_id'])
+        # User's conversations only
+        queryset = search.search_queryset(request.user, filters)
 
-        if data.get('message_type'):
-            queryset = queryset.filter(message_type=data['message_type'])
-
-        if data.get('has_attachments'):
-            queryset = queryset.filter(attachments__isnull=False).distinct()
-
-        # Pagination
+        # Keyset pagination on (created_at, id)
         offset = data.get('offset', 0)
         limit = data.get('limit', 50)
+        try:
+            messages, next_cursor = search.page(queryset, data.get('cursor'), limit, offset)
+        except search.InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        messages = queryset.order_by('-created_at')[offset:offset + limit]
+        total, total_exact = search.approximate_total(request.user, filters, queryset)
         serializer = MessageListSerializer(messages, many=True)
 
         return Response({
             'messages': serializer.data,
+            'next_cursor': next_cursor,
             'offset': offset,
             'limit': limit,
-            'total': queryset.count()
+            'total': total,
+            'total_is_estimate': not total_exact,
         })
 
 
@@ -1065,40 +1072,15 @@ class BatchReadView(APIView):
             is_active=True
         )
 
-        # Get valid messages
-        messages = Message.objects.filter(
-            id__in=message_ids,
-            conversation_id=conversation_id,
-            is_deleted=False
-        )
-
-        # Create read receipts
-        read_count = 0
-        last_message = None
-        for message in messages:
-            receipt, created = MessageReadReceipt.objects.get_or_create(
-                message=message,
-                user=request.user,
-                defaults={'device_id': device_id}
-            )
-            if created:
-                read_count += 1
-                if not last_message or message.created_at > last_message.created_at:
-                    last_message = message
-
-        # Update participant's last read
-        if last_message:
-            participant.last_read_at = timezone.now()
-            participant.last_read_message_id = last_message.id
-            participant.unread_count = max(0, participant.unread_count - read_count)
-            participant.save(update_fields=['last_read_at', 'last_read_message_id', 'unread_count'])
+        # Create read receipts and update participant's last read in bulk
+        read_count, read_at = mark_read(request.user, participant.conversation_id, message_ids, device_id)
 
         # Notify sender via WebSocket
         self._notify_read_receipts(conversation_id, message_ids, request.user)
 
         return Response({
             'marked_count': read_count,
-            'read_at': timezone.now().isoformat()
+            'read_at': read_at.isoformat()
         })
 
     def _notify_read_receipts(self, conversation_id, message_ids, reader):
@@ -0,0 +1,136 @@
+"""
+Benchmark OMDB response cache lookups
+Fills OMDBCache with synthetic detail responses and replays a skewed stream
+of cache hits through each design, counting lookups/sec and the database
+statements they cost per 10k hits:
+
+  row per hit       the previous get_cache: SELECT, then save() the whole row
+                    to bump hit_count
+  table only        SELECT per hit, hit counts batched into F() updates
+  LRU + table       per-worker LRU in front of the table, batched hit counts
+
+The OMDBCache table is created for the run if this database has none.
+
+Usage: python manage.py benchmark_omdb_cache --entries 500 --lookups 10000
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from modules.movies.backend.omdb_cache import OMDBResponseCache
+from modules.movies.backend.omdb_models import OMDBCache
+
+BENCH_PREFIX = 'bench-omdb-'
+
+
+class StatementCounter:
+    """execute_wrapper counting SELECTs and writes"""
+
+    def __init__(self):
+        self.selects = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        verb = sql.lstrip().split(None, 1)[0].upper()
+        if verb == 'SELECT':
+            self.selects += 1
+        elif verb in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+def row_per_hit_lookup(cache_key, cache_type):
+    """OMDBCache.get_cache as it was: every hit rewrites the row"""
+    try:
+        entry = OMDBCache.objects.get(cache_key=cache_key, cache_type=cache_type, expires_at__gt=timezone.now())
+        entry.hit_count += 1
+        entry.save()
+        return entry.response_data
+    except OMDBCache.DoesNotExist:
+        return None
+
+
+def synthetic_response(i):
+    """An OMDB detail response of typical size (~2 KB)"""
+    return {
+        'Title': f'Benchmark Movie {i}', 'Year': str(1950 + i % 70), 'Rated': 'PG-13',
+        'Released': '01 Jan 2000', 'Runtime': f'{90 + i % 60} min', 'Genre': 'Drama, Thriller',
+        'Director': 'Jane Doe', 'Writer': 'John Roe, Richard Moe', 'Actors': 'A. Actor, B. Actor, C. Actor',
+        'Plot': 'A long plot summary. ' * 40, 'Language': 'English', 'Country': 'United States',
+        'Awards': 'Nominated for 2 Oscars.', 'Poster': f'https://example.com/poster/{i}.jpg',
+        'Ratings': [{'Source': 'Internet Movie Database', 'Value': '7.1/10'}], 'Metascore': '64',
+        'imdbRating': '7.1', 'imdbVotes': '123,456', 'imdbID': f'tt{i:07d}', 'Type': 'movie',
+        'Response': 'True',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OMDB cache lookups: lookups/sec and database statements per 10k hits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=500, help='Cached responses (default: 500)')
+        parser.add_argument('--lookups', type=int, default=10000, help='Cache hits replayed per design (default: 10000)')
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of key popularity (default: 1.1)')
+
+    def handle(self, *args, **options):
+        created_table = OMDBCache._meta.db_table not in connection.introspection.table_names()
+        if created_table:
+            with connection.schema_editor() as editor:
+                editor.create_model(OMDBCache)
+        try:
+            keys = self.populate(options['entries'])
+            # Popular titles get most of the traffic
+            weights = [1 / (rank + 1) ** options['skew'] for rank in range(len(keys))]
+            stream = random.Random(42).choices(keys, weights=weights, k=options['lookups'])
+
+            self.stdout.write(
+                f"{options['entries']:,} entries, {options['lookups']:,} hits\n"
+                f"{'design':<14} {'lookups/s':>10} {'SELECTs/10k':>12} {'writes/10k':>11} {'hit_count ok':>13}"
+            )
+            self.run('row per hit', stream, row_per_hit_lookup, None)
+            table_only = OMDBResponseCache(size=0, flush_seconds=60)
+            self.run('table only', stream, table_only.get, table_only)
+            two_tier = OMDBResponseCache(size=1024, flush_seconds=60)
+            self.run('LRU + table', stream, two_tier.get, two_tier)
+        finally:
+            if created_table:
+                with connection.schema_editor() as editor:
+                    editor.delete_model(OMDBCache)
+            else:
+                OMDBCache.objects.filter(cache_key__startswith=BENCH_PREFIX).delete()
+
+    def populate(self, count):
+        OMDBCache.objects.filter(cache_key__startswith=BENCH_PREFIX).delete()
+        expires_at = timezone.now() + timedelta(days=7)
+        OMDBCache.objects.bulk_create([
+            OMDBCache(
+                cache_key=f'{BENCH_PREFIX}{i}', cache_type='detail', query_params={'i': f'tt{i:07d}'},
+                response_data=synthetic_response(i), expires_at=expires_at
+            )
+            for i in range(count)
+        ], batch_size=500)
+        return [f'{BENCH_PREFIX}{i}' for i in range(count)]
+
+    def run(self, design, stream, lookup, response_cache):
+        OMDBCache.objects.filter(cache_key__startswith=BENCH_PREFIX).update(hit_count=0)
+        counter = StatementCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            for cache_key in stream:
+                if lookup(cache_key, 'detail') is None:
+                    raise RuntimeError(f'{design}: cache miss for {cache_key}')
+            if response_cache is not None:
+                response_cache.flush_hits()
+            elapsed = time.perf_counter() - started
+
+        total_hits = sum(OMDBCache.objects.filter(cache_key__startswith=BENCH_PREFIX).values_list('hit_count', flat=True))
+        per_10k = 10000 / len(stream)
+        self.stdout.write(
+            f"{design:<14} {len(stream) / elapsed:>10,.0f} {counter.selects * per_10k:>12,.0f} "
+            f"{counter.writes * per_10k:>11,.0f} {'yes' if total_hits == len(stream) else total_hits:>13}"
+        )
@@ -0,0 +1,231 @@
+"""
+OMDB Response Cache
+
+Two tiers in front of the OMDB API: OMDBCache rows shared by every worker,
+and a per-worker LRU of recently read rows in front of them.
+
+Reads never write. A hit only counts itself in memory; the counts are added
+to OMDBCache.hit_count with one F() update per distinct count every
+OMDB_CACHE_HIT_FLUSH_SECONDS (and when the worker exits). Rows are rewritten
+only when a response is fetched from the API.
+
+Entries past expires_at are still served for OMDB_CACHE_STALE_SECONDS while
+a Celery task fetches a fresh copy (stale-while-revalidate), so a popular
+entry expiring never makes a user wait on the API. The task is sent after
+the request's transaction commits, without publish retries, and at most
+once per entry every REFRESH_LOCK_SECONDS even when sending fails, so an
+unreachable broker costs a lookup one failed connect at most. Rows past that
+window are deleted by the prune_omdb_cache task:
+
+    response_cache = get_response_cache()
+    data = response_cache.get(cache_key, 'detail')
+
+Responses are kept as JSON text in the LRU, so every caller gets its own
+copy to annotate.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .omdb_models import OMDBCache
+
+logger = logging.getLogger(__name__)
+
+# A refresh of the same entry is scheduled at most this often
+REFRESH_LOCK_SECONDS = 300
+
+
+class OMDBResponseCache:
+    """
+    OMDBCache rows behind a per-worker LRU, with batched hit counts and
+    stale-while-revalidate refreshes.
+    """
+
+    def __init__(self, size: Optional[int] = None, local_seconds: Optional[int] = None,
+                 stale_seconds: Optional[int] = None, flush_seconds: Optional[int] = None):
+        self.size = size if size is not None else getattr(settings, 'OMDB_CACHE_LOCAL_SIZE', 1024)
+        self.local_seconds = (
+            local_seconds if local_seconds is not None else getattr(settings, 'OMDB_CACHE_LOCAL_SECONDS', 300)
+        )
+        self.stale_seconds = (
+            stale_seconds if stale_seconds is not None else getattr(settings, 'OMDB_CACHE_STALE_SECONDS', 21600)
+        )
+        self.flush_seconds = (
+            flush_seconds if flush_seconds is not None else getattr(settings, 'OMDB_CACHE_HIT_FLUSH_SECONDS', 60)
+        )
+        self._entries = OrderedDict()  # cache_key -> (cache_type, response JSON, expires_at, loaded_at)
+        self._hits = Counter()  # cache_key -> hits not yet written
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.local_hits = 0
+        self.table_hits = 0
+        self.misses = 0
+
+    # ========== Lookups ==========
+
+    def get(self, cache_key: str, cache_type: str = 'search') -> Optional[Dict]:
+        """Cached response, possibly stale (a refresh is then scheduled), or None"""
+        now = timezone.now()
+        entry = self._local_get(cache_key, cache_type, now)
+        if entry is None:
+            row = OMDBCache.objects.filter(
+                cache_key=cache_key,
+                cache_type=cache_type,
+                expires_at__gt=now - timedelta(seconds=self.stale_seconds)
+            ).values_list('response_data', 'expires_at').first()
+            if row is None:
+                self.misses += 1
+                self._maybe_flush()
+                return None
+            entry = (cache_type, json.dumps(row[0]), row[1], time.monotonic())
+            self._local_put(cache_key, entry)
+            self.table_hits += 1
+        else:
+            self.local_hits += 1
+
+        if entry[2] <= now:
+            self._schedule_refresh(cache_key, cache_type)
+        self._count_hit(cache_key)
+        self._maybe_flush()
+        return json.loads(entry[1])
+
+    def put(self, cache_key: str, cache_type: str, response_data: Dict, expires_at):
+        """Keep a response just written to OMDBCache in this worker's LRU"""
+        self._local_put(cache_key, (cache_type, json.dumps(response_data), expires_at, time.monotonic()))
+
+    def _local_get(self, cache_key, cache_type, now):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if (
+                entry[0] != cache_type
+                or time.monotonic() - entry[3] > self.local_seconds
+                or entry[2] <= now - timedelta(seconds=self.stale_seconds)
+            ):
+                # Re-read the row: another worker may have refreshed or pruned it
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry
+
+    def _local_put(self, cache_key, entry):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear_local(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ========== Hit counts ==========
+
+    def _count_hit(self, cache_key):
+        with self._lock:
+            self._hits[cache_key] += 1
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush_hits()
+
+    def flush_hits(self) -> int:
+        """Add the hits counted in memory to OMDBCache.hit_count; returns the hits written"""
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            self._last_flush = time.monotonic()
+        if not hits:
+            return 0
+
+        # One UPDATE per distinct count, not per entry
+        by_count = defaultdict(list)
+        for cache_key, count in hits.items():
+            by_count[count].append(cache_key)
+        try:
+            for count, cache_keys in by_count.items():
+                OMDBCache.objects.filter(cache_key__in=cache_keys).update(hit_count=F('hit_count') + count)
+        except DatabaseError as e:
+            # Hit counts are statistics; a failed flush must not fail the lookup
+            logger.warning(f"Could not flush OMDB cache hit counts: {e}")
+            return 0
+        return sum(hits.values())
+
+    # ========== Refresh and pruning ==========
+
+    def _schedule_refresh(self, cache_key, cache_type):
+        # Eager mode (no broker) would fetch from the API inside the lookup;
+        # the entry is fetched again once it is pruned instead
+        if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+            return
+        try:
+            if not cache.add(f'omdb_cache:refresh:{cache_key}', 1, timeout=REFRESH_LOCK_SECONDS):
+                return
+        except Exception as e:
+            logger.warning(f"Could not schedule OMDB cache refresh: {e}")
+            return
+        transaction.on_commit(lambda: _send_refresh(cache_key, cache_type))
+
+    def prune(self, batch_size: int = 1000) -> int:
+        """Delete rows expired for longer than the stale window, in batches; returns rows deleted"""
+        cutoff = timezone.now() - timedelta(seconds=self.stale_seconds)
+        deleted = 0
+        while True:
+            pks = list(
+                OMDBCache.objects.filter(expires_at__lte=cutoff).order_by().values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return deleted
+            deleted += OMDBCache.objects.filter(pk__in=pks).delete()[0]
+
+
+def _send_refresh(cache_key: str, cache_type: str):
+    # The lock is kept when this fails, so a broker outage isn't retried on every lookup
+    try:
+        from .tasks import refresh_omdb_cache_entry
+        refresh_omdb_cache_entry.apply_async((cache_key, cache_type), retry=False)
+    except Exception as e:
+        logger.warning(f"Could not schedule OMDB cache refresh: {e}")
+
+
+def refresh_entry(cache_key: str, cache_type: str) -> bool:
+    """Fetch a fresh copy of an expired entry from the API, keeping its lifetime"""
+    from .omdb_service import OMDBService
+
+    row = OMDBCache.objects.filter(cache_key=cache_key, cache_type=cache_type).values(
+        'query_params', 'expires_at', 'updated_at'
+    ).first()
+    if row is None or row['expires_at'] > timezone.now():
+        # Pruned, or already refreshed by another worker
+        return False
+
+    hours = max((row['expires_at'] - row['updated_at']).total_seconds() / 3600, 1)
+    data, _ = OMDBService()._make_request(dict(row['query_params']), cache_type, cache_hours=hours, refresh=True)
+    return 'error' not in data
+
+
+# Singleton instance
+_response_cache: Optional[OMDBResponseCache] = None
+
+
+def get_response_cache() -> OMDBResponseCache:
+    """Get the worker's OMDB response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = OMDBResponseCache()
+        atexit.register(_response_cache.flush_hits)
+    return _response_cache
@@ -145,22 +145,17 @@ class OMDBCache(models.Model):
     
     @classmethod
     def get_cache(cls, cache_key, cache_type='search'):
-        """Get cached response if valid"""
-        try:
-            cache = cls.objects.get(
-                cache_key=cache_key,
-                cache_type=cache_type,
-                expires_at__gt=timezone.now()
-            )
-            cache.hit_count += 1
-            cache.save()
-            return cache.response_data
-        except cls.DoesNotExist:
-            return None
+        """
+        Get cached response if valid, or stale within OMDB_CACHE_STALE_SECONDS
+        (see omdb_cache.py); hits are counted without writing the row
+        """
+        from .omdb_cache import get_response_cache
+        return get_response_cache().get(cache_key, cache_type)
     
     @classmethod
     def set_cache(cls, cache_key, query_params, response_data, cache_type='search', hours=24):
         """Set or update cache entry"""
+        from .omdb_cache import get_response_cache
         expires_at = timezone.now() + timedelta(hours=hours)
         
         cache, created = cls.objects.update_or_create(
@@ -172,12 +167,14 @@ class OMDBCache(models.Model):
                 'expires_at': expires_at,
             }
         )
+        get_response_cache().put(cache_key, cache_type, response_data, expires_at)
         return cache
     
     @classmethod
     def clear_expired(cls):
-        """Remove expired cache entries"""
-        return cls.objects.filter(expires_at__lt=timezone.now()).delete()
+        """Remove entries expired for longer than they may be served stale"""
+        from .omdb_cache import get_response_cache
+        return get_response_cache().prune()
     
     def __str__(self):
         return f"{self.cache_type}: {self.cache_key} (hits: {self.hit_count})"
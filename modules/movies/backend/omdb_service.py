@@ -17,6 +17,7 @@ import os
 
 from .models import Movie, Genre
 from .omdb_models import APIKeyManager, OMDBCache, APIUsageLog, MovieImportQueue
+from .omdb_cache import get_response_cache
 
 
 class OMDBService:
@@ -44,14 +45,14 @@ class OMDBService:
         return hashlib.md5(sorted_params.encode()).hexdigest()
     
     def _make_request(self, params: Dict, cache_type: str = 'search', 
-                     cache_hours: int = 24) -> Tuple[Dict, bool]:
-        """Make API request with caching and rate limiting"""
+                     cache_hours: int = 24, refresh: bool = False) -> Tuple[Dict, bool]:
+        """Make API request with caching and rate limiting (refresh skips the cache lookup)"""
         
         start_time = time.time()
         
         # Check cache first
         cache_key = self._generate_cache_key(params)
-        cached_data = OMDBCache.get_cache(cache_key, cache_type)
+        cached_data = None if refresh else OMDBCache.get_cache(cache_key, cache_type)
         
         if cached_data:
             # Log cached response
@@ -444,6 +445,9 @@ class OMDBService:
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
+        # Include the hits this worker has not written yet
+        get_response_cache().flush_hits()
+        
         total_cached = OMDBCache.objects.count()
         expired = OMDBCache.objects.filter(expires_at__lt=timezone.now()).count()
         
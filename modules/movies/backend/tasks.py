@@ -0,0 +1,36 @@
+"""
+Celery tasks for movies app
+"""
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def refresh_omdb_cache_entry(cache_key, cache_type):
+    """
+    Fetch a fresh copy of an expired OMDB cache entry
+    Scheduled by lookups that served the entry stale
+    """
+    from .omdb_cache import refresh_entry
+
+    try:
+        return refresh_entry(cache_key, cache_type)
+    except Exception as e:
+        logger.error(f"Error refreshing OMDB cache entry {cache_key}: {str(e)}")
+        return False
+
+
+@shared_task
+def prune_omdb_cache():
+    """Delete OMDB cache entries expired for longer than they may be served stale"""
+    from .omdb_cache import get_response_cache
+
+    try:
+        deleted = get_response_cache().prune()
+    except Exception as e:
+        logger.error(f"Error pruning OMDB cache: {str(e)}")
+        return 0
+    logger.info(f"OMDB cache pruned: {deleted} expired entries deleted")
+    return deleted
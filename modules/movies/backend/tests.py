@@ -0,0 +1,129 @@
+"""
+Tests for the OMDB response cache
+
+OMDBCache is mocked: the LRU, the hit counting and the refresh scheduling
+are checked by the queries they do (or don't) make.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from .omdb_cache import OMDBResponseCache
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+RESPONSE = {'Title': 'Yol', 'Year': '1982', 'imdbID': 'tt0084934'}
+
+
+@override_settings(CACHES=LOCMEM, CELERY_TASK_ALWAYS_EAGER=False)
+class OMDBResponseCacheTests(SimpleTestCase):
+    """Test lookups against a mocked OMDBCache table"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch('modules.movies.backend.omdb_cache.OMDBCache')
+        self.table = patcher.start().objects
+        self.addCleanup(patcher.stop)
+        # Outside a transaction on_commit runs the callback right away
+        on_commit = patch('modules.movies.backend.omdb_cache.transaction.on_commit', side_effect=lambda func: func())
+        self.on_commit = on_commit.start()
+        self.addCleanup(on_commit.stop)
+        self.rows = self.table.filter.return_value
+        self.rows.values_list.return_value.first.return_value = None
+        self.cache = OMDBResponseCache(size=2, local_seconds=300, stale_seconds=3600, flush_seconds=3600)
+        self.fresh = timezone.now() + timedelta(hours=1)
+
+    def schedule(self):
+        return patch('modules.movies.backend.tasks.refresh_omdb_cache_entry.apply_async')
+
+    def test_lru_is_bounded_and_hits_make_no_queries(self):
+        """Test the LRU keeps the most recent entries and serves them without the table"""
+        for key in ('a', 'b', 'c'):
+            self.cache.put(key, 'detail', dict(RESPONSE, key=key), self.fresh)
+        self.assertEqual(list(self.cache._entries), ['b', 'c'])
+
+        self.assertEqual(self.cache.get('b', 'detail')['key'], 'b')
+        self.table.filter.assert_not_called()
+
+        # Evicted: read from the table, which no longer has it either
+        self.assertIsNone(self.cache.get('a', 'detail'))
+        self.assertEqual((self.cache.local_hits, self.cache.misses), (1, 1))
+
+    def test_table_row_is_kept_locally(self):
+        """Test a row read from the table is served from the LRU afterwards, as a copy"""
+        self.rows.values_list.return_value.first.return_value = (RESPONSE, self.fresh)
+        first = self.cache.get('yol', 'detail')
+        first['annotated'] = True
+        self.assertEqual(self.cache.get('yol', 'detail'), RESPONSE)
+        self.assertEqual(self.table.filter.call_count, 1)
+        self.assertEqual((self.cache.table_hits, self.cache.local_hits), (1, 1))
+
+    def test_hits_are_flushed_in_one_update_per_count(self):
+        """Test reads never write; hits go out grouped by count"""
+        for key in ('a', 'b'):
+            self.cache.put(key, 'detail', RESPONSE, self.fresh)
+        for key in ('a', 'a', 'a', 'b'):
+            self.cache.get(key, 'detail')
+        self.table.filter.assert_not_called()
+
+        self.assertEqual(self.cache.flush_hits(), 4)
+        keys = sorted(call.kwargs['cache_key__in'] for call in self.table.filter.call_args_list)
+        self.assertEqual(keys, [['a'], ['b']])
+        self.assertEqual(self.rows.update.call_count, 2)
+        self.assertEqual(self.cache.flush_hits(), 0)
+
+    def test_failed_flush_does_not_fail_lookups(self):
+        """Test a database error while flushing only drops the counts"""
+        self.cache.put('a', 'detail', RESPONSE, self.fresh)
+        self.cache.flush_seconds = 0
+        self.rows.update.side_effect = DatabaseError('read-only')
+        self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+
+    def test_stale_entry_is_served_while_one_refresh_is_scheduled(self):
+        """Test stale-while-revalidate schedules a single refresh per entry"""
+        self.cache.put('a', 'detail', RESPONSE, timezone.now() - timedelta(minutes=5))
+        with self.schedule() as apply_async:
+            self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+            self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+        apply_async.assert_called_once_with(('a', 'detail'), retry=False)
+        self.assertEqual(self.on_commit.call_count, 1)
+
+    def test_unreachable_broker_is_not_retried_on_every_lookup(self):
+        """Test a failed send is logged and keeps the entry's refresh lock"""
+        self.cache.put('a', 'detail', RESPONSE, timezone.now() - timedelta(minutes=5))
+        with self.schedule() as apply_async:
+            apply_async.side_effect = ConnectionError('broker down')
+            self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+            self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+        self.assertEqual(apply_async.call_count, 1)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    def test_eager_mode_never_refreshes_inline(self):
+        """Test lookups don't run the refresh task in the request without a broker"""
+        self.cache.put('a', 'detail', RESPONSE, timezone.now() - timedelta(minutes=5))
+        with self.schedule() as apply_async:
+            self.assertEqual(self.cache.get('a', 'detail'), RESPONSE)
+        apply_async.assert_not_called()
+
+    def test_entry_past_the_stale_window_is_read_again(self):
+        """Test an entry too old to serve is dropped from the LRU and looked up"""
+        self.cache.put('a', 'detail', RESPONSE, timezone.now() - timedelta(seconds=3601))
+        self.assertIsNone(self.cache.get('a', 'detail'))
+        self.assertNotIn('a', self.cache._entries)
+        self.assertEqual(self.table.filter.call_count, 1)
+
+    def test_prune_deletes_in_batches(self):
+        """Test rows past the stale window are deleted a batch at a time"""
+        pks = self.rows.order_by.return_value.values_list.return_value
+        pks.__getitem__.side_effect = [[1, 2], [3], []]
+        self.rows.delete.side_effect = [(2, {}), (1, {})]
+
+        self.assertEqual(self.cache.prune(batch_size=2), 3)
+        cutoff = self.table.filter.call_args_list[0].kwargs['expires_at__lte']
+        self.assertLess(cutoff, timezone.now() - timedelta(seconds=3599))
+        self.assertEqual(self.rows.delete.call_count, 2)
+
@@ -0,0 +1,210 @@
+"""
+Personal inflation engine
+Set-based basket price indices over a series of dates
+
+The as-of price of every basket product on every requested date (its latest
+PriceRecord up to the end of that day) is fetched in one query. On
+PostgreSQL each (date, product) pair is an index probe on
+(product, recorded_at) through a LATERAL join; other databases rank the
+records with a window function. The basket index of each date is then the
+quantity-weighted cost against the first date:
+
+    index_t = 100 * sum(q * p_t) / sum(q * p_0)
+
+over the items priced on both dates, as PersonalBasket.calculate_inflation
+has always counted them.
+
+Series are cached per basket, basket version and price data version. A
+basket's version changes on every save or delete of one of its items, and
+of a PriceRecord for a product it holds, once the write commits (see
+signals.py). Writes that skip signals (bulk_create, update()) should call
+bump_price_version(), which invalidates every basket.
+"""
+
+import calendar
+import hashlib
+import uuid
+from datetime import date as date_type, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .models import BasketItem, PriceRecord
+
+PRICE_VERSION_KEY = 'personal_inflation:price_version'
+
+
+def _version(key):
+    # Versions are random tokens, so an evicted version can never bring back stale series
+    return cache.get_or_set(key, lambda: uuid.uuid4().hex, None)
+
+
+def _basket_version_key(basket_id):
+    return f'personal_inflation:basket_version:{basket_id}'
+
+
+def bump_price_version():
+    """Invalidate every cached series after price records change"""
+    cache.set(PRICE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def bump_basket_version(basket_id):
+    """Invalidate the cached series of a basket after its items change"""
+    cache.set(_basket_version_key(basket_id), uuid.uuid4().hex, None)
+
+
+def bump_product_version(product_id):
+    """Invalidate the cached series of the baskets holding a product after its prices change"""
+    basket_ids = BasketItem.objects.filter(product_id=product_id).values_list('basket_id', flat=True).distinct()
+    cache.set_many({_basket_version_key(basket_id): uuid.uuid4().hex for basket_id in basket_ids}, None)
+
+
+def as_date(value):
+    """The calendar date of a date or datetime, as the __date lookup would see it"""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _day_end(day):
+    """Start of the following day in the current time zone"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def monthly_dates(months=12, end=None):
+    """`months` + 1 dates a month apart, ending at `end` (default: today), oldest first"""
+    end = as_date(end or timezone.now())
+    dates = []
+    for offset in range(months, -1, -1):
+        year, month = divmod(end.year * 12 + end.month - 1 - offset, 12)
+        # The same day of the month, or the month's last day
+        dates.append(date_type(year, month + 1, min(end.day, calendar.monthrange(year, month + 1)[1])))
+    return dates
+
+
+AS_OF_POSTGRES_SQL = f"""
+    SELECT d.position, p.product_id, pr.price
+    FROM unnest(%s::timestamptz[]) WITH ORDINALITY AS d(day_end, position)
+    CROSS JOIN unnest(%s::uuid[]) AS p(product_id)
+    CROSS JOIN LATERAL (
+        SELECT price FROM {PriceRecord._meta.db_table}
+        WHERE product_id = p.product_id AND recorded_at < d.day_end
+        ORDER BY recorded_at DESC
+        LIMIT 1
+    ) pr
+"""
+
+
+def as_of_prices(product_ids, dates):
+    """
+    {date: {product_id: price}} with the latest price of each product up to
+    the end of each date, in one query; products without a price by then
+    are missing from that date
+    """
+    days = sorted({as_date(value) for value in dates})
+    product_ids = list(product_ids)
+    prices = {day: {} for day in days}
+    if not days or not product_ids:
+        return prices
+
+    day_ends = [_day_end(day) for day in days]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(AS_OF_POSTGRES_SQL, [day_ends, product_ids])
+            rows = [(days[position - 1], product_id, price) for position, product_id, price in cursor.fetchall()]
+        else:
+            rows = _as_of_window(cursor, days, day_ends, product_ids)
+
+    for day, product_id, price in rows:
+        prices[day][product_id] = price
+    return prices
+
+
+def _as_of_window(cursor, days, day_ends, product_ids):
+    """as_of_prices for databases without LATERAL: rank each product's records per date"""
+    table = PriceRecord._meta.db_table
+    product_field = PriceRecord._meta.get_field('product')
+    recorded_field = PriceRecord._meta.get_field('recorded_at')
+    bounds = ' UNION ALL '.join(['SELECT %s AS position, %s AS day_end'] * len(days))
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    sql = f"""
+        SELECT position, product_id, price FROM (
+            SELECT b.position, pr.product_id, pr.price, ROW_NUMBER() OVER (
+                PARTITION BY b.position, pr.product_id ORDER BY pr.recorded_at DESC
+            ) AS row_rank
+            FROM ({bounds}) AS b
+            JOIN {table} pr ON pr.recorded_at < b.day_end
+            WHERE pr.product_id IN ({placeholders})
+        ) ranked
+        WHERE row_rank = 1
+    """
+    params = []
+    for position, day_end in enumerate(day_ends):
+        params += [position, recorded_field.get_db_prep_value(day_end, connection)]
+    params += [product_field.get_db_prep_value(product_id, connection) for product_id in product_ids]
+    cursor.execute(sql, params)
+    field = PriceRecord._meta.get_field('price')
+    return [
+        (days[position], product_field.to_python(product_id), field.to_python(price))
+        for position, product_id, price in cursor.fetchall()
+    ]
+
+
+def _cache_key(basket_id, days):
+    digest = hashlib.md5(','.join(day.isoformat() for day in days).encode()).hexdigest()
+    return (
+        f'personal_inflation:series:{basket_id}:{_version(_basket_version_key(basket_id))}:'
+        f'{_version(PRICE_VERSION_KEY)}:{digest}'
+    )
+
+
+def basket_index_series(basket, dates):
+    """
+    Basket cost and index on each of `dates`, against the first one
+
+    Returns a list of {'date', 'base_cost', 'cost', 'items', 'index',
+    'inflation_rate'} in the order of `dates`; 'items' counts the basket
+    items priced on both the first date and this one, and only those are
+    costed.
+    """
+    days = list(dict.fromkeys(as_date(value) for value in dates))
+    key = _cache_key(basket.pk, days)
+    series = cache.get(key)
+    if series is not None:
+        return series
+
+    items = list(basket.items.filter(is_active=True).values_list('product_id', 'quantity'))
+    prices = as_of_prices({product_id for product_id, _ in items}, days)
+
+    series = []
+    base_prices = prices[days[0]] if days else {}
+    for day in days:
+        day_prices = prices[day]
+        base_cost = cost = Decimal('0')
+        priced = 0
+        for product_id, quantity in items:
+            if base_prices.get(product_id) and day_prices.get(product_id):
+                base_cost += base_prices[product_id] * quantity
+                cost += day_prices[product_id] * quantity
+                priced += 1
+        if base_cost > 0:
+            index = round(cost / base_cost * 100, 2)
+            inflation_rate = round((cost - base_cost) / base_cost * 100, 2)
+        else:
+            index, inflation_rate = Decimal('0'), Decimal('0')
+        series.append({
+            'date': day,
+            'base_cost': base_cost,
+            'cost': cost,
+            'items': priced,
+            'index': index,
+            'inflation_rate': inflation_rate,
+        })
+
+    cache.set(key, series, getattr(settings, 'PERSONAL_INFLATION_SERIES_CACHE_SECONDS', 86400))
+    return series
@@ -0,0 +1 @@
+# Management commands for personal_inflation app
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Benchmark basket inflation series
+Builds a synthetic basket with weekly price history and computes a monthly
+index series the previous way (two as-of price queries per item per point)
+and with the set-based engine, cold and cached, counting queries
+
+Usage: python manage.py benchmark_basket_inflation --items 200 --months 12
+"""
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from modules.personal_inflation.backend.inflation import basket_index_series, bump_price_version, monthly_dates
+from modules.personal_inflation.backend.models import (
+    BasketItem, PersonalBasket, PriceRecord, Product, ProductCategory
+)
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_inflation_'
+
+
+def legacy_price_at_date(product_id, date):
+    """The previous BasketItem.get_price_at_date"""
+    price_record = PriceRecord.objects.filter(
+        product_id=product_id,
+        recorded_at__date__lte=date
+    ).order_by('-recorded_at').first()
+    return price_record.price if price_record else None
+
+
+def legacy_series(basket, dates):
+    """The previous calculate_inflation, once per point against the first date"""
+    rates = []
+    for end_date in dates:
+        total_start = Decimal('0')
+        total_end = Decimal('0')
+        for item in basket.items.filter(is_active=True):
+            start_price = legacy_price_at_date(item.product_id, dates[0])
+            end_price = legacy_price_at_date(item.product_id, end_date)
+            if start_price and end_price:
+                total_start += start_price * item.quantity
+                total_end += end_price * item.quantity
+        rates.append(round((total_end - total_start) / total_start * 100, 2) if total_start > 0 else Decimal('0'))
+    return rates
+
+
+class QueryCounter:
+    """execute_wrapper counting statements"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark monthly basket inflation series: per-item queries against the set-based engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200, help='Basket items (default: 200)')
+        parser.add_argument('--months', type=int, default=12, help='Months in the series (default: 12)')
+        parser.add_argument('--prices-per-week', type=int, default=1,
+                            help='Price records per product per week (default: 1)')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(
+            username=f'{BENCH_PREFIX}user', defaults={'email': f'{BENCH_PREFIX}user@example.com'}
+        )
+        category = ProductCategory.objects.create(name=f'{BENCH_PREFIX}category')
+        try:
+            basket = self._build(user, category, options)
+            dates = monthly_dates(options['months'])
+            self.stdout.write(f"{'series':<20} {'queries':>8} {'ms':>9}")
+
+            legacy = self._measure('per-item queries', lambda: legacy_series(basket, dates))
+            cold = self._measure('set-based, cold', lambda: basket_index_series(basket, dates))
+            self._measure('set-based, cached', lambda: basket_index_series(basket, dates))
+            if legacy != [point['inflation_rate'] for point in cold]:
+                self.stderr.write('Series differ!')
+        finally:
+            user.delete()
+            category.delete()
+
+    def _build(self, user, category, options):
+        rng = random.Random(1)
+        now = timezone.now()
+        weeks = options['months'] * 53 // 12 + 2
+        products = Product.objects.bulk_create([
+            Product(name=f'{BENCH_PREFIX}{i}', category=category, unit='adet') for i in range(options['items'])
+        ])
+        records = []
+        for product in products:
+            price = Decimal(rng.uniform(5, 500)).quantize(Decimal('0.01'))
+            for step in range(weeks * options['prices_per_week'], 0, -1):
+                price = (price * Decimal(str(1 + rng.gauss(0.008, 0.02)))).quantize(Decimal('0.01'))
+                records.append(PriceRecord(
+                    product=product, price=price,
+                    recorded_at=now - timedelta(days=7 * step / options['prices_per_week'])
+                ))
+        PriceRecord.objects.bulk_create(records, batch_size=5000)
+        # bulk_create sends no signals
+        bump_price_version()
+
+        basket = PersonalBasket.objects.create(user=user, name=f'{BENCH_PREFIX}basket')
+        BasketItem.objects.bulk_create([
+            BasketItem(basket=basket, product=product, quantity=Decimal(rng.randint(1, 5))) for product in products
+        ])
+        self.stdout.write(f'Basket: {len(products)} items, {len(records):,} price records')
+        return basket
+
+    def _measure(self, label, run):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            result = run()
+        self.stdout.write(f"{label:<20} {counter.count:>8,} {(time.perf_counter() - started) * 1000:>9.1f}")
+        return result
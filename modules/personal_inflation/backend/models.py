@@ -6,7 +6,6 @@ Tracks individual inflation rates based on personal consumption
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from decimal import Decimal
 from pathlib import Path
 import uuid
 import json
@@ -207,27 +206,21 @@ class PersonalBasket(models.Model):
     
     def calculate_inflation(self, start_date=None, end_date=None):
         """Calculate inflation rate for this basket"""
+        from .inflation import basket_index_series
+        
         if not start_date:
             start_date = timezone.now() - timezone.timedelta(days=30)
         if not end_date:
             end_date = timezone.now()
         
-        total_start = Decimal('0')
-        total_end = Decimal('0')
-        
-        for item in self.items.filter(is_active=True):
-            # Get prices for start and end dates
-            start_price = item.get_price_at_date(start_date)
-            end_price = item.get_price_at_date(end_date)
-            
-            if start_price and end_price:
-                total_start += start_price * item.quantity
-                total_end += end_price * item.quantity
+        # Two-point series: both prices of every item come from one query
+        return basket_index_series(self, [start_date, end_date])[-1]['inflation_rate']
+    
+    def inflation_series(self, months=12, end_date=None):
+        """Monthly index series for charts; see inflation.basket_index_series"""
+        from .inflation import basket_index_series, monthly_dates
         
-        if total_start > 0:
-            inflation_rate = ((total_end - total_start) / total_start) * 100
-            return round(inflation_rate, 2)
-        return Decimal('0')
+        return basket_index_series(self, monthly_dates(months, end_date))
 
 
 class BasketItem(models.Model):
@@ -275,14 +268,9 @@ class BasketItem(models.Model):
     
     def get_price_at_date(self, date):
         """Get product price at specific date"""
-        try:
-            price_record = PriceRecord.objects.filter(
-                product=self.product,
-                recorded_at__date__lte=date
-            ).order_by('-recorded_at').first()
-            return price_record.price if price_record else None
-        except PriceRecord.DoesNotExist:
-            return None
+        from .inflation import as_date, as_of_prices
+        
+        return as_of_prices([self.product_id], [date])[as_date(date)].get(self.product_id)
 
 
 class PriceRecord(models.Model):
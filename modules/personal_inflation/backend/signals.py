@@ -0,0 +1,30 @@
+"""
+Django Signals for Personal Inflation
+Invalidate cached basket index series when their inputs change; see inflation.py
+
+Versions are bumped once the write commits, so a series computed from the
+old rows in the meantime is never cached under the new version.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BasketItem, PriceRecord
+from . import inflation
+
+
+@receiver(post_save, sender=PriceRecord)
+@receiver(post_delete, sender=PriceRecord)
+def price_record_changed(sender, instance, **kwargs):
+    """Price changes only affect the baskets holding the product"""
+    product_id = instance.product_id
+    transaction.on_commit(lambda: inflation.bump_product_version(product_id))
+
+
+@receiver(post_save, sender=BasketItem)
+@receiver(post_delete, sender=BasketItem)
+def basket_item_changed(sender, instance, **kwargs):
+    """Item changes only affect their own basket"""
+    basket_id = instance.basket_id
+    transaction.on_commit(lambda: inflation.bump_basket_version(basket_id))
@@ -0,0 +1,119 @@
+"""
+Tests for the Personal Inflation basket engine
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from .inflation import _as_of_window, _day_end, as_of_prices, monthly_dates
+from .models import BasketItem, PersonalBasket, PriceRecord, Product, ProductCategory
+
+User = get_user_model()
+
+
+class BasketInflationTests(TestCase):
+    """Test set-based basket indices against the per-item definition"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='shopper', email='shopper@test.com', password='testpass123')
+        category = ProductCategory.objects.create(name='Gıda')
+        self.bread, self.milk, self.cheese = [
+            Product.objects.create(name=name, category=category, unit='adet')
+            for name in ('Ekmek', 'Süt', 'Peynir')
+        ]
+        self.now = timezone.now()
+        for product, days_ago, price in [
+            (self.bread, 40, '10'), (self.bread, 10, '12'),
+            (self.milk, 40, '5'), (self.milk, 20, '5.50'), (self.milk, 5, '6'),
+            # No price at the start of the period, so left out of the comparison
+            (self.cheese, 2, '100'),
+        ]:
+            self.price(product, price, self.now - timedelta(days=days_ago))
+
+        self.basket = PersonalBasket.objects.create(user=self.user)
+        for product, quantity in [(self.bread, '2'), (self.milk, '1'), (self.cheese, '1')]:
+            BasketItem.objects.create(basket=self.basket, product=product, quantity=Decimal(quantity))
+
+    def price(self, product, price, recorded_at):
+        return PriceRecord.objects.create(product=product, price=Decimal(price), recorded_at=recorded_at)
+
+    def test_calculate_inflation(self):
+        """Test the rate counts only items priced on both dates"""
+        # (2 * 12 + 6) / (2 * 10 + 5)
+        self.assertEqual(self.basket.calculate_inflation(), Decimal('20.00'))
+
+    def test_series_costs_two_queries_then_none(self):
+        """Test a monthly series reads items and prices once, then comes from the cache"""
+        with self.assertNumQueries(2):
+            series = self.basket.inflation_series(months=12)
+        self.assertEqual(len(series), 13)
+        self.assertEqual(series[-1]['date'], timezone.localdate())
+        # No prices a year ago
+        self.assertEqual(series[-1]['items'], 0)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.basket.inflation_series(months=12), series)
+
+    def test_changes_invalidate_cached_series(self):
+        """Test new prices and basket items are reflected once they commit"""
+        self.assertEqual(self.basket.calculate_inflation(), Decimal('20.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.price(self.bread, '15', self.now)
+            # Uncommitted rows don't invalidate anything yet
+            self.assertEqual(self.basket.calculate_inflation(), Decimal('20.00'))
+        self.assertEqual(self.basket.calculate_inflation(), Decimal('44.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basket.items.get(product=self.milk).delete()
+        self.assertEqual(self.basket.calculate_inflation(), Decimal('50.00'))
+
+    def test_price_change_keeps_other_baskets_cached(self):
+        """Test a new price only invalidates the baskets holding that product"""
+        other = PersonalBasket.objects.create(user=self.user, name='Kahvaltı')
+        BasketItem.objects.create(basket=other, product=self.cheese, quantity=Decimal('1'))
+        self.basket.inflation_series(months=2)
+        series = other.inflation_series(months=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.price(self.bread, '15', self.now)
+        with self.assertNumQueries(0):
+            self.assertEqual(other.inflation_series(months=2), series)
+        with self.assertNumQueries(2):
+            self.basket.inflation_series(months=2)
+
+    def test_as_of_price_counts_the_whole_day(self):
+        """Test a price recorded late in the day is that day's price"""
+        day = timezone.localdate() - timedelta(days=60)
+        self.price(self.bread, '7', timezone.make_aware(datetime.combine(day, time(23, 30))))
+
+        prices = as_of_prices([self.bread.id], [day - timedelta(days=1), day])
+        self.assertNotIn(self.bread.id, prices[day - timedelta(days=1)])
+        self.assertEqual(prices[day][self.bread.id], Decimal('7'))
+        self.assertEqual(BasketItem.objects.get(product=self.bread).get_price_at_date(day), Decimal('7'))
+
+    def test_window_query_matches(self):
+        """Test the window-function query used off PostgreSQL gives the same prices"""
+        days = monthly_dates(2)
+        products = [self.bread.id, self.milk.id, self.cheese.id]
+        with connection.cursor() as cursor:
+            rows = _as_of_window(cursor, days, [_day_end(day) for day in days], products)
+        expected = as_of_prices(products, days)
+        self.assertEqual(
+            sorted(rows), sorted((day, p, price) for day, prices in expected.items() for p, price in prices.items())
+        )
+
+    def test_monthly_dates_clamp_to_month_end(self):
+        """Test month steps keep the day of the month where it exists"""
+        self.assertEqual(
+            monthly_dates(3, timezone.make_aware(datetime(2025, 5, 31, 12))),
+            [datetime(2025, 2, 28).date(), datetime(2025, 3, 31).date(),
+             datetime(2025, 4, 30).date(), datetime(2025, 5, 31).date()]
+        )
@@ -13,8 +13,9 @@ from django.core.cache import cache
 from django.utils import timezone
 from .models import (
     Character, Realm, ConsciousnessNode, MeditationSession,
-    Creature, CreatureSpawn, CombatLog, Guild, Quest, Item
+    Creature, CombatLog, Guild, Quest, Item
 )
+from .world_state import world
 
 
 class GameConsumer(AsyncJsonWebsocketConsumer):
@@ -50,17 +51,29 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         # Send initial game state
         await self.send_game_state()
         
-        # Start periodic updates
-        self.update_task = asyncio.create_task(self.periodic_updates())
+        # Register in the live world state; its realm tick replaces a
+        # periodic loop per connection
+        if self.character.current_realm_id:
+            await world.join(
+                self.character_id,
+                self.character.name,
+                self.character.current_realm_id,
+                self.character.x_coordinate,
+                self.character.y_coordinate,
+                self.character.z_coordinate,
+                consumer=self,
+            )
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnect"""
-        # Cancel periodic updates
-        if hasattr(self, 'update_task'):
-            self.update_task.cancel()
+        if not hasattr(self, 'character_id'):
+            return
         
-        # Mark character as offline
-        await self.set_character_online(False)
+        # Leave the world state (writes the last position once the last
+        # connection of the character is gone)
+        if await world.leave(self.character_id, consumer=self):
+            # Mark character as offline
+            await self.set_character_online(False)
         
         # Leave room group
         await self.channel_layer.group_discard(
@@ -127,7 +140,12 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         await self.broadcast_movement(new_x, new_y, new_z)
         
         # Check for encounters
-        await self.check_encounters(new_x, new_y, new_z)
+        encounter = await self.check_encounters(new_x, new_y, new_z)
+        if encounter['encounter']:
+            await self.send_json({
+                'type': 'encounter',
+                'data': encounter['creature']
+            })
     
     async def handle_skill_use(self, data):
         """Handle skill usage"""
@@ -241,26 +259,13 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             'data': skills
         })
     
-    async def periodic_updates(self):
-        """Send periodic updates to client"""
-        while True:
-            try:
-                await asyncio.sleep(5)  # Update every 5 seconds
-                
-                # Update character stats (regen, etc.)
-                await self.update_character_stats()
-                
-                # Send nearby entities
-                await self.send_nearby_entities()
-                
-                # Check for timed events
-                await self.check_timed_events()
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in periodic updates: {e}")
-                await asyncio.sleep(10)
+    async def realm_tick(self, nearby):
+        """Called by the realm tick (see world_state.py) with this player's surroundings"""
+        await self.send_json({
+            'type': 'nearby_entities',
+            'data': nearby,
+            'server_time': timezone.now().isoformat()
+        })
     
     async def broadcast_movement(self, x, y, z):
         """Broadcast character movement to nearby players"""
@@ -445,47 +450,34 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         # Simplified for now
         return True
     
+    async def update_character_position(self, x, y, z):
+        """Update character position (written to the database in batches)"""
+        if world.move(self.character_id, x, y, z) is None:
+            await self.save_character_position(x, y, z)
+    
     @database_sync_to_async
-    def update_character_position(self, x, y, z):
-        """Update character position"""
+    def save_character_position(self, x, y, z):
+        """Write position directly (character not in the world state)"""
         Character.objects.filter(user=self.user).update(
             x_coordinate=x,
             y_coordinate=y,
             z_coordinate=z
         )
     
-    @database_sync_to_async
-    def check_encounters(self, x, y, z):
-        """Check for creature encounters"""
-        char = Character.objects.get(user=self.user)
-        
-        # Find nearby creature spawns
-        nearby_spawns = CreatureSpawn.objects.filter(
-            realm=char.current_realm,
-            is_active=True,
-            x_coordinate__range=(x - 50, x + 50),
-            y_coordinate__range=(y - 50, y + 50)
-        ).select_related('creature')
-        
-        for spawn in nearby_spawns:
-            # Random encounter chance
-            if random.random() < 0.1:  # 10% chance
-                # Trigger encounter
-                return {
-                    'encounter': True,
-                    'creature': {
-                        'id': spawn.creature.id,
-                        'name': spawn.creature.name,
-                        'level': spawn.creature.level,
-                        'type': spawn.creature.creature_type,
-                    }
-                }
-        
-        return {'encounter': False}
+    async def check_encounters(self, x, y, z):
+        """Check for creature encounters (spawns in neighbouring grid cells)"""
+        return world.check_encounter(self.character_id, x, y)
     
-    @database_sync_to_async
-    def get_character_realm(self):
+    async def get_character_realm(self):
         """Get character's current realm ID"""
+        realm_id = world.realm_of(self.character_id)
+        if realm_id is None:
+            realm_id = await self.load_character_realm()
+        return realm_id
+    
+    @database_sync_to_async
+    def load_character_realm(self):
+        """Get character's current realm ID from the database"""
         char = Character.objects.get(user=self.user)
         return str(char.current_realm_id) if char.current_realm_id else None
     
@@ -0,0 +1 @@
+# Management commands for recaria app
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Simulate Recaria players against the live world state
+Bots random-walk through a realm full of creature spawns; every move goes
+through the same world state calls as GameConsumer.handle_move, with the
+realm tick and position flusher running alongside
+
+Usage: python manage.py simulate_recaria_world --bots 2000 --seconds 10
+"""
+
+import asyncio
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from modules.recaria.backend.world_state import WorldState, write_positions
+
+REALM_ID = 'simulation'
+
+
+class Bot:
+    """Stands in for a GameConsumer: moves, and receives realm ticks"""
+
+    def __init__(self, character_id, x, y):
+        self.character_id = character_id
+        self.x, self.y = x, y
+        self.ticks = 0
+        self.seen = 0
+
+    async def realm_tick(self, nearby):
+        self.ticks += 1
+        self.seen += len(nearby['characters']) + len(nearby['creatures'])
+
+
+class Command(BaseCommand):
+    help = 'Simulate bots in the Recaria world state and report moves/sec and encounter-check latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bots', type=int, default=2000, help='Simulated players (default: 2000)')
+        parser.add_argument('--seconds', type=float, default=10, help='Simulation length (default: 10)')
+        parser.add_argument('--spawns', type=int, default=1000, help='Creature spawns in the realm (default: 1000)')
+        parser.add_argument('--size', type=int, default=10000, help='Realm width/height in world units (default: 10000)')
+        parser.add_argument('--step', type=int, default=15, help='Max distance of one move (default: 15)')
+        parser.add_argument('--tick', type=float, default=1.0, help='Realm tick interval in seconds (default: 1)')
+        parser.add_argument('--db', action='store_true',
+                            help='Flush positions to recaria_characters (needs characters with these ids)')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.simulate(options))
+
+    async def simulate(self, options):
+        rng = random.Random(11)
+        size = options['size']
+
+        spawns = [
+            {
+                'id': f'spawn-{i}',
+                'x_coordinate': rng.randrange(size), 'y_coordinate': rng.randrange(size), 'z_coordinate': 0,
+                'creature__id': i, 'creature__name': f'Creature {i}',
+                'creature__level': rng.randint(1, 50), 'creature__creature_type': 'shadow',
+            }
+            for i in range(options['spawns'])
+        ]
+        world = WorldState(
+            spawn_loader=lambda realm_id: spawns,
+            writer=write_positions if options['db'] else (lambda batch: None),
+        )
+
+        bots = [Bot(i, rng.randrange(size), rng.randrange(size)) for i in range(options['bots'])]
+        for bot in bots:
+            await world.join(bot.character_id, f'bot{bot.character_id}', REALM_ID, bot.x, bot.y, consumer=bot)
+
+        # Fast ticks so a short run sees several of them
+        tick_times = []
+        world.realms[REALM_ID].tick_task.cancel()
+        world.realms[REALM_ID].tick_task = asyncio.create_task(self.run_ticks(world, options['tick'], tick_times))
+
+        self.stdout.write(
+            f"Simulating {len(bots):,} bots, {len(spawns):,} spawns, {size}x{size} realm "
+            f"for {options['seconds']:.0f}s..."
+        )
+        encounter_ns = []
+        encounters = 0
+        moves = 0
+        step = options['step']
+        started = time.perf_counter()
+        deadline = started + options['seconds']
+
+        while time.perf_counter() < deadline:
+            for bot in bots:
+                bot.x = min(size - 1, max(0, bot.x + rng.randint(-step, step)))
+                bot.y = min(size - 1, max(0, bot.y + rng.randint(-step, step)))
+                world.move(bot.character_id, bot.x, bot.y, 0)
+
+                check_started = time.perf_counter_ns()
+                result = world.check_encounter(bot.character_id, bot.x, bot.y, rng=rng)
+                encounter_ns.append(time.perf_counter_ns() - check_started)
+                encounters += result['encounter']
+                moves += 1
+            # Let the tick and flusher run, as the event loop would between messages
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+
+        await world.flush()
+        for bot in bots:
+            await world.leave(bot.character_id, consumer=bot)
+        world.flush_task.cancel()
+        await asyncio.gather(world.flush_task, return_exceptions=True)
+
+        encounter_ns.sort()
+        pct = lambda p: encounter_ns[min(len(encounter_ns) - 1, int(len(encounter_ns) * p))] / 1000
+
+        self.stdout.write(self.style.SUCCESS(f'Moves: {moves:,} in {elapsed:.1f}s = {moves / elapsed:,.0f} moves/sec'))
+        self.stdout.write(
+            f'Encounter check: p50 {pct(0.5):.1f}us  p95 {pct(0.95):.1f}us  p99 {pct(0.99):.1f}us  '
+            f'({encounters:,} encounters)'
+        )
+        if tick_times:
+            tick_times.sort()
+            self.stdout.write(
+                f'Realm tick ({len(bots):,} players): {len(tick_times)} ticks, '
+                f'median {tick_times[len(tick_times) // 2]:.1f}ms, max {tick_times[-1]:.1f}ms'
+            )
+        self.stdout.write(
+            f"Position flushes: {world.stats['flushes']} batches, {world.stats['flushed_rows']:,} rows "
+            f"(vs {moves:,} per-move UPDATEs before)"
+        )
+
+    async def run_ticks(self, world, interval, tick_times):
+        while True:
+            await asyncio.sleep(interval)
+            started = time.perf_counter()
+            await world.tick(REALM_ID)
+            tick_times.append((time.perf_counter() - started) * 1000)
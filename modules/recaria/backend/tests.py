@@ -0,0 +1,142 @@
+"""
+Recaria World State Tests
+
+Tests for the in-memory world state:
+- Spatial grid moves and range queries
+- Encounter checks against spawns in neighbouring cells
+- Batched position flushes
+- Characters connected more than once (reconnects, tabs)
+"""
+
+import asyncio
+import random
+
+from django.test import SimpleTestCase
+
+from modules.recaria.backend.world_state import SpatialGrid, WorldState
+
+
+def spawn(spawn_id, x, y):
+    return {
+        'id': spawn_id, 'x_coordinate': x, 'y_coordinate': y, 'z_coordinate': 0,
+        'creature__id': 1, 'creature__name': 'Shade', 'creature__level': 3, 'creature__creature_type': 'shadow',
+    }
+
+
+class TestSpatialGrid(SimpleTestCase):
+
+    def test_within_matches_brute_force(self):
+        rng = random.Random(3)
+        grid = SpatialGrid(cell_size=50)
+        points = {}
+        for key in range(2000):
+            points[key] = (rng.randint(-1000, 1000), rng.randint(-1000, 1000), 0)
+            grid.move(key, *points[key])
+        # Move some across cells
+        for key in range(0, 2000, 7):
+            points[key] = (rng.randint(-1000, 1000), rng.randint(-1000, 1000), 0)
+            grid.move(key, *points[key])
+
+        for x, y, radius in [(0, 0, 50), (-999, 400, 120), (333, -333, 75)]:
+            expected = {k for k, (px, py, _) in points.items() if abs(px - x) <= radius and abs(py - y) <= radius}
+            self.assertEqual({key for key, _ in grid.within(x, y, radius)}, expected)
+
+    def test_remove_drops_empty_cells(self):
+        grid = SpatialGrid(cell_size=50)
+        grid.move('a', 10, 10)
+        self.assertTrue(grid.move('a', 60, 10))
+        self.assertFalse(grid.move('a', 70, 10))
+        grid.remove('a')
+        self.assertEqual(grid.cells, {})
+        self.assertNotIn('a', grid)
+
+
+class TestWorldState(SimpleTestCase):
+
+    def setUp(self):
+        self.written = []
+        self.world = WorldState(
+            cell_size=50,
+            spawn_loader=lambda realm_id: [spawn('near', 130, 100), spawn('far', 900, 900)],
+            writer=self.written.append,
+        )
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_encounters_only_consider_nearby_spawns(self):
+        async def scenario():
+            await self.world.join('7', 'hero', 'realm-1', 100, 100)
+            near = self.world.check_encounter('7', 100, 100, chance=1.0)
+            away = self.world.check_encounter('7', 500, 500, chance=1.0)
+            await self.world.leave('7')
+            return near, away
+
+        near, away = self.run_async(scenario())
+        self.assertEqual(near['creature']['name'], 'Shade')
+        self.assertFalse(away['encounter'])
+
+    def test_moves_are_flushed_in_one_batch(self):
+        async def scenario():
+            await self.world.join('1', 'a', 'realm-1', 0, 0)
+            await self.world.join('2', 'b', 'realm-1', 0, 0)
+            for step in range(100):
+                self.world.move('1', step, 0, 0)
+                self.world.move('2', 0, step, 0)
+            await self.world.flush()
+            self.world.move('1', 5, 5, 0)
+            await self.world.leave('1')
+            await self.world.leave('2')
+            self.world.flush_task.cancel()
+
+        self.run_async(scenario())
+        self.assertEqual(self.written[0], {'1': (99, 0, 0), '2': (0, 99, 0)})
+        # Leaving writes the last unflushed position right away
+        self.assertEqual(self.written[1], {'1': (5, 5, 0)})
+        self.assertEqual(len(self.written), 2)
+
+    def test_nearby_lists_other_characters_and_spawns(self):
+        async def scenario():
+            await self.world.join('1', 'a', 'realm-1', 100, 100)
+            await self.world.join('2', 'b', 'realm-1', 250, 100)
+            await self.world.join('3', 'c', 'realm-1', 2000, 2000)
+            nearby = self.world.nearby('1', radius=200)
+            self.world.flush_task.cancel()
+            return nearby
+
+        nearby = self.run_async(scenario())
+        self.assertEqual([c['name'] for c in nearby['characters']], ['b'])
+        self.assertEqual([c['x'] for c in nearby['creatures']], [130])
+
+    def test_character_stays_until_its_last_connection_leaves(self):
+        class Tab:
+            def __init__(self):
+                self.ticks = []
+
+            async def realm_tick(self, nearby):
+                self.ticks.append(nearby)
+
+        async def scenario():
+            old_tab, new_tab = Tab(), Tab()
+            await self.world.join('1', 'a', 'realm-1', 0, 0, consumer=old_tab)
+            self.world.move('1', 40, 0, 0)
+            # Reconnect: the database still has the old position
+            await self.world.join('1', 'a', 'realm-1', 0, 0, consumer=new_tab)
+            self.assertEqual(self.world.position('1'), (40, 0, 0))
+
+            self.assertFalse(await self.world.leave('1', consumer=old_tab))
+            self.assertEqual(self.world.move('1', 45, 0, 0), 'realm-1')
+            await self.world.tick('realm-1')
+            state = self.world.realms['realm-1']
+            self.assertIsNotNone(state.tick_task)
+            self.assertEqual(self.written, [])
+
+            self.assertTrue(await self.world.leave('1', consumer=new_tab))
+            self.assertIsNone(self.world.realm_of('1'))
+            self.assertIsNone(state.tick_task)
+            self.world.flush_task.cancel()
+            return old_tab, new_tab
+
+        old_tab, new_tab = self.run_async(scenario())
+        self.assertEqual((len(old_tab.ticks), len(new_tab.ticks)), (0, 1))
+        self.assertEqual(self.written, [{'1': (45, 0, 0)}])
@@ -0,0 +1,391 @@
+"""
+Live world state for Recaria
+
+Positions of connected characters live in memory, in a uniform grid per
+realm, instead of being written to and queried from the database on every
+move:
+
+    move       -> grid update + dirty mark          (no query)
+    encounters -> spawns in the neighbouring cells  (no query)
+    realm id   -> in-memory lookup                  (no query)
+    flusher    -> dirty positions -> one bulk_update every few seconds
+    realm tick -> one loop per realm pushes nearby entities to its players
+
+State is per process (the ASGI worker that holds the websockets); the
+database stays the source of truth through the periodic flush. A character
+can be connected more than once (reconnects, several tabs); it stays in the
+world until its last connection leaves.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialGrid:
+    """
+    Uniform grid spatial hash: key -> (x, y, z), bucketed by (x, y) cell
+
+    Range queries are square (|dx| <= r and |dy| <= r), matching the
+    coordinate range filters they replace.
+    """
+
+    def __init__(self, cell_size=50):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def position(self, key):
+        return self.positions.get(key)
+
+    def move(self, key, x, y, z=0):
+        """Insert or move a key; returns True when it changed cell"""
+        cell = self._cell(x, y)
+        previous = self.positions.get(key)
+        self.positions[key] = (x, y, z)
+        if previous is not None:
+            old_cell = self._cell(previous[0], previous[1])
+            if old_cell == cell:
+                return False
+            bucket = self.cells[old_cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[old_cell]
+        self.cells.setdefault(cell, set()).add(key)
+        return True
+
+    def remove(self, key):
+        previous = self.positions.pop(key, None)
+        if previous is None:
+            return
+        cell = self._cell(previous[0], previous[1])
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def within(self, x, y, radius):
+        """(key, (x, y, z)) for everything within the square range"""
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    px, py, pz = self.positions[key]
+                    if abs(px - x) <= radius and abs(py - y) <= radius:
+                        yield key, (px, py, pz)
+
+
+class RealmState:
+    """Characters, creature spawns and tick subscribers of one realm"""
+
+    def __init__(self, realm_id, cell_size):
+        self.realm_id = realm_id
+        self.characters = SpatialGrid(cell_size)
+        self.names = {}
+        self.spawns = SpatialGrid(cell_size)
+        self.creatures = {}
+        self.spawns_loaded_at = None
+        self.consumers = {}  # character id -> set of its connected consumers
+        self.tick_task = None
+
+
+def load_spawns(realm_id):
+    """Active creature spawns of a realm, as plain dicts"""
+    from .models import CreatureSpawn
+
+    return list(
+        CreatureSpawn.objects.filter(realm_id=realm_id, is_active=True).values(
+            'id', 'x_coordinate', 'y_coordinate', 'z_coordinate',
+            'creature__id', 'creature__name', 'creature__level', 'creature__creature_type',
+        )
+    )
+
+
+def write_positions(batch):
+    """Persist {character_id: (x, y, z)} in one bulk update"""
+    from .models import Character
+
+    Character.objects.bulk_update(
+        [
+            Character(pk=character_id, x_coordinate=x, y_coordinate=y, z_coordinate=z)
+            for character_id, (x, y, z) in batch.items()
+        ],
+        ['x_coordinate', 'y_coordinate', 'z_coordinate'],
+        batch_size=500,
+    )
+
+
+class WorldState:
+    """
+    In-memory positions for every connected character of this process
+
+    `spawn_loader(realm_id)` and `writer(batch)` default to the database and
+    are swapped out by the simulation harness.
+    """
+
+    def __init__(self, cell_size=None, spawn_loader=None, writer=None, clock=time.monotonic):
+        self.cell_size = cell_size or getattr(settings, 'RECARIA_GRID_CELL_SIZE', 50)
+        self.spawn_loader = spawn_loader or load_spawns
+        self.writer = writer or write_positions
+        self.clock = clock
+        self.realms = {}
+        self.character_realm = {}
+        self.connections = {}
+        self.dirty = {}
+        self.flush_task = None
+        self.stats = {'moves': 0, 'flushes': 0, 'flushed_rows': 0}
+
+    # --- Membership ---
+
+    def realm(self, realm_id):
+        state = self.realms.get(realm_id)
+        if state is None:
+            state = self.realms[realm_id] = RealmState(realm_id, self.cell_size)
+        return state
+
+    async def join(self, character_id, name, realm_id, x, y, z=0, consumer=None):
+        """
+        Register a connection of a character; starts the realm tick and flusher
+
+        A character that is already connected keeps its live position, which
+        may be newer than the one the database gave the new connection.
+        """
+        realm_id = str(realm_id)
+        state = self.realm(realm_id)
+        if state.spawns_loaded_at is None:
+            await self.reload_spawns(realm_id)
+
+        previous_realm = self.character_realm.get(character_id)
+        if previous_realm != realm_id:
+            if previous_realm is not None:
+                self._move_realm(character_id, previous_realm, realm_id)
+            else:
+                state.characters.move(character_id, x, y, z)
+            self.character_realm[character_id] = realm_id
+        state.names[character_id] = name
+        self.connections[character_id] = self.connections.get(character_id, 0) + 1
+        if consumer is not None:
+            state.consumers.setdefault(character_id, set()).add(consumer)
+            if state.tick_task is None or state.tick_task.done():
+                state.tick_task = asyncio.create_task(self.run_realm_ticks(realm_id))
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.run_flusher())
+
+    def _move_realm(self, character_id, old_realm_id, realm_id):
+        old, new = self.realms[old_realm_id], self.realms[realm_id]
+        new.characters.move(character_id, *old.characters.position(character_id))
+        old.characters.remove(character_id)
+        old.names.pop(character_id, None)
+        consumers = old.consumers.pop(character_id, None)
+        if consumers:
+            new.consumers[character_id] = consumers
+        self._stop_idle_tick(old)
+
+    def _stop_idle_tick(self, state):
+        if not state.consumers and state.tick_task is not None:
+            state.tick_task.cancel()
+            state.tick_task = None
+
+    async def leave(self, character_id, consumer=None):
+        """
+        Unregister a connection of a character
+
+        The character leaves the world, with its last position written right
+        away, only when this was its last connection. Returns True then (or
+        when it wasn't connected at all).
+        """
+        realm_id = self.character_realm.get(character_id)
+        if realm_id is None:
+            return True
+        state = self.realms[realm_id]
+        if consumer is not None:
+            consumers = state.consumers.get(character_id)
+            if consumers is not None:
+                consumers.discard(consumer)
+                if not consumers:
+                    del state.consumers[character_id]
+
+        self.connections[character_id] -= 1
+        if self.connections[character_id] > 0:
+            self._stop_idle_tick(state)
+            return False
+
+        del self.connections[character_id]
+        del self.character_realm[character_id]
+        state.characters.remove(character_id)
+        state.names.pop(character_id, None)
+        state.consumers.pop(character_id, None)
+        self._stop_idle_tick(state)
+
+        position = self.dirty.pop(character_id, None)
+        if position is not None:
+            await self._write({character_id: position})
+        return True
+
+    def realm_of(self, character_id):
+        return self.character_realm.get(character_id)
+
+    # --- Movement and queries ---
+
+    def move(self, character_id, x, y, z=0):
+        """Record a move; the database sees it with the next flush"""
+        realm_id = self.character_realm.get(character_id)
+        if realm_id is None:
+            return None
+        self.realms[realm_id].characters.move(character_id, x, y, z)
+        self.dirty[character_id] = (x, y, z)
+        self.stats['moves'] += 1
+        return realm_id
+
+    def position(self, character_id):
+        realm_id = self.character_realm.get(character_id)
+        if realm_id is None:
+            return None
+        return self.realms[realm_id].characters.position(character_id)
+
+    def check_encounter(self, character_id, x, y, encounter_range=None, chance=None, rng=random):
+        """Roll for an encounter with the spawns around a position"""
+        realm_id = self.character_realm.get(character_id)
+        if realm_id is None:
+            return {'encounter': False}
+        encounter_range = encounter_range or getattr(settings, 'RECARIA_ENCOUNTER_RANGE', 50)
+        chance = getattr(settings, 'RECARIA_ENCOUNTER_CHANCE', 0.1) if chance is None else chance
+
+        state = self.realms[realm_id]
+        for spawn_id, _ in state.spawns.within(x, y, encounter_range):
+            if rng.random() < chance:
+                return {'encounter': True, 'creature': state.creatures[spawn_id]}
+        return {'encounter': False}
+
+    def nearby(self, character_id, radius=None):
+        """Other characters and creature spawns around a character"""
+        realm_id = self.character_realm.get(character_id)
+        if realm_id is None:
+            return {'characters': [], 'creatures': []}
+        radius = radius or getattr(settings, 'RECARIA_NEARBY_RANGE', 200)
+        state = self.realms[realm_id]
+        x, y, _ = state.characters.position(character_id)
+
+        characters = [
+            {'id': other_id, 'name': state.names.get(other_id), 'x': px, 'y': py, 'z': pz}
+            for other_id, (px, py, pz) in state.characters.within(x, y, radius)
+            if other_id != character_id
+        ]
+        creatures = [
+            {**state.creatures[spawn_id], 'x': px, 'y': py, 'z': pz}
+            for spawn_id, (px, py, pz) in state.spawns.within(x, y, radius)
+        ]
+        return {'characters': characters, 'creatures': creatures}
+
+    # --- Spawns ---
+
+    async def reload_spawns(self, realm_id):
+        rows = await sync_to_async(self.spawn_loader)(realm_id)
+        state = self.realm(realm_id)
+        state.spawns = SpatialGrid(self.cell_size)
+        state.creatures = {}
+        for row in rows:
+            spawn_id = str(row['id'])
+            state.spawns.move(spawn_id, row['x_coordinate'], row['y_coordinate'], row['z_coordinate'])
+            state.creatures[spawn_id] = {
+                'id': row['creature__id'],
+                'name': row['creature__name'],
+                'level': row['creature__level'],
+                'type': row['creature__creature_type'],
+            }
+        state.spawns_loaded_at = self.clock()
+
+    # --- Persistence ---
+
+    def take_dirty(self):
+        batch, self.dirty = self.dirty, {}
+        return batch
+
+    async def _write(self, batch):
+        try:
+            await sync_to_async(self.writer)(batch)
+        except Exception as e:
+            # Keep the positions for the next flush unless the character moved since
+            for character_id, position in batch.items():
+                self.dirty.setdefault(character_id, position)
+            logger.error(f"Recaria position flush failed ({len(batch)} characters): {e}")
+            return 0
+        self.stats['flushes'] += 1
+        self.stats['flushed_rows'] += len(batch)
+        return len(batch)
+
+    async def flush(self):
+        """Write every position changed since the last flush"""
+        batch = self.take_dirty()
+        if not batch:
+            return 0
+        return await self._write(batch)
+
+    async def run_flusher(self):
+        interval = getattr(settings, 'RECARIA_POSITION_FLUSH_SECONDS', 2)
+        try:
+            while self.character_realm or self.dirty:
+                await asyncio.sleep(interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    # --- Realm tick ---
+
+    async def tick(self, realm_id):
+        """Push each player of the realm its surroundings"""
+        state = self.realms.get(realm_id)
+        if state is None or not state.consumers:
+            return 0
+        consumers = [
+            (character_id, consumer)
+            for character_id, connected in state.consumers.items()
+            for consumer in connected
+        ]
+        nearby = {character_id: self.nearby(character_id) for character_id in state.consumers}
+        results = await asyncio.gather(
+            *(consumer.realm_tick(nearby[character_id]) for character_id, consumer in consumers),
+            return_exceptions=True,
+        )
+        for (character_id, _), result in zip(consumers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Recaria tick failed for {character_id}: {result}")
+        return len(consumers)
+
+    async def run_realm_ticks(self, realm_id):
+        interval = getattr(settings, 'RECARIA_TICK_SECONDS', 5)
+        spawn_refresh = getattr(settings, 'RECARIA_SPAWN_REFRESH_SECONDS', 300)
+        state = self.realms[realm_id]
+        while state.consumers:
+            await asyncio.sleep(interval)
+            try:
+                if self.clock() - state.spawns_loaded_at >= spawn_refresh:
+                    await self.reload_spawns(realm_id)
+                await self.tick(realm_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Recaria tick error in realm {realm_id}: {e}")
+
+
+# Global world state for this process
+world = WorldState()
@@ -0,0 +1,315 @@
+"""
+Benchmark Sentos sync against a local fake Sentos server
+Serves a synthetic shop (default 50k products, 100k orders) over HTTP on
+localhost with a simulated round-trip latency, then measures:
+
+  previous client   serial page walk, a new connection per request
+                    (fetch only, as sync_orders/sync_products did)
+  full sync         pooled, concurrent page fetches, upserted into the store tables
+  incremental sync  the same after 1% of the records changed
+  inventory push    local stock changes sent per product vs in bulk batches
+
+Usage: python manage.py benchmark_sentos_sync --products 50000 --orders 100000 --latency 0.02
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from modules.store.backend.models import Marketplace, Product
+from modules.store.backend.sentos_api import SentosAPI
+from modules.store.backend.sentos_sync import SentosSync
+
+User = get_user_model()
+
+BENCH_USERNAME = 'sentos-benchmark'
+
+
+class FakeSentos:
+    """
+    A synthetic Sentos shop served over HTTP on localhost
+
+    Records are generated from their index on request. Each kind is spread
+    evenly over the five days after `base`: record i was placed and last
+    updated i * spacing after it. touch() marks some as changed now, which
+    is what updated_since filters on. `failures` holds
+    (status, Retry-After) replies to give, one per request, before serving
+    normally.
+    """
+
+    def __init__(self, products=0, orders=0, latency=0.0, items_inline=True, report_last_page=True):
+        self.product_count = products
+        self.order_count = orders
+        self.latency = latency
+        self.items_inline = items_inline
+        self.report_last_page = report_last_page
+        self.base = timezone.now() - timedelta(days=5)
+        self.spacing = {kind: timedelta(days=5) / max(count, 1) for kind, count in
+                        [('products', products), ('orders', orders)]}
+        self.touched = {'products': {}, 'orders': {}}
+        self.stock_overrides = {}
+        self.failures = deque()
+        self.inventory_batches = []
+        self.requests = Counter()
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._index_cache = {}
+        self._server = None
+
+    # ========== Shop data ==========
+
+    def updated_at(self, kind, i):
+        return self.touched[kind].get(i, self.base + i * self.spacing[kind])
+
+    def product(self, i):
+        updated_at = self.updated_at('products', i)
+        return {
+            'id': i + 1, 'sku': f'SKU-{i:06d}', 'barcode': f'869{i:010d}', 'name': f'Product {i}',
+            'description': 'Handmade product', 'brand': 'Atölye', 'category': {'name': f'Category {i % 20}'},
+            'price': f'{100 + i % 900}.90', 'sale_price': None, 'currency': 'TRY',
+            'stock': self.stock_overrides.get(f'SKU-{i:06d}', i % 50), 'status': 'active',
+            'images': [f'https://cdn.example.com/p/{i}.jpg'], 'updated_at': updated_at.isoformat(),
+        }
+
+    def order_items(self, i):
+        return [
+            {'product_id': str((i * 7 + n) % max(self.product_count, 1) + 1), 'name': f'Product {(i * 7 + n)}',
+             'sku': f'SKU-{(i * 7 + n) % max(self.product_count, 1):06d}', 'quantity': 1 + n, 'price': '149.90'}
+            for n in range(2)
+        ]
+
+    def order(self, i):
+        updated_at = self.updated_at('orders', i)
+        status = 'shipped' if i in self.touched['orders'] else 'processing'
+        order = {
+            'id': 100000 + i, 'order_number': f'SN{100000 + i}', 'status': status, 'payment_status': 'paid',
+            'customer': {'name': f'Customer {i}', 'email': f'customer{i}@example.com', 'phone': '+90 555 000 0000'},
+            'shipping_address': {'address': 'Atatürk Cd. 1', 'city': 'İstanbul', 'country': 'TR', 'postal_code': '34000'},
+            'currency': 'TRY', 'subtotal': '449.60', 'shipping_cost': '29.90', 'total': '479.50',
+            'order_date': (self.base + i * self.spacing['orders']).isoformat(), 'updated_at': updated_at.isoformat(),
+        }
+        if self.items_inline:
+            order['items'] = self.order_items(i)
+        return order
+
+    def touch(self, kind, indices):
+        now = timezone.now()
+        with self._lock:
+            for i in indices:
+                self.touched[kind][i] = now
+            self._index_cache.clear()
+
+    def _offset(self, kind, moment):
+        """First index placed at or after `moment`"""
+        return max(0, math.ceil((moment - self.base) / self.spacing[kind]))
+
+    def _indices(self, kind, count, params):
+        key = (kind, params.get('updated_since'), params.get('start_date'))
+        with self._lock:
+            indices = self._index_cache.get(key)
+        if indices is not None:
+            return indices
+
+        since = parse_datetime(params['updated_since']) if params.get('updated_since') else None
+        start = parse_datetime(params['start_date']) if params.get('start_date') and kind == 'orders' else None
+        since_first = self._offset(kind, since) if since else 0
+        touched = self.touched[kind]
+        indices = [
+            i for i in range(self._offset(kind, start) if start else 0, count)
+            if (touched[i] >= since if i in touched and since else i >= since_first)
+        ]
+        with self._lock:
+            self._index_cache[key] = indices
+        return indices
+
+    def listing(self, kind, params):
+        count, make = (self.product_count, self.product) if kind == 'products' else (self.order_count, self.order)
+        indices = self._indices(kind, count, params)
+        page, limit = int(params.get('page', 1)), int(params.get('limit', 50))
+        last_page = max(1, -(-len(indices) // limit))
+        body = {
+            'data': [make(i) for i in indices[(page - 1) * limit:page * limit]],
+            'has_next': page < last_page,
+            'current_page': page,
+        }
+        if self.report_last_page:
+            body.update({'last_page': last_page, 'total': len(indices)})
+        return body
+
+    # ========== HTTP ==========
+
+    def handle(self, method, path, params, body):
+        """(status, headers, body) of a request to the fake API"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failure = self.failures.popleft() if self.failures else None
+        if failure:
+            status, retry_after = failure
+            return status, {'Retry-After': retry_after} if retry_after is not None else {}, {'error': 'unavailable'}
+
+        route = path.removeprefix('/api/v1/')
+        with self._lock:
+            self.requests[re.sub(r'\d+', ':id', f'{method} {route}')] += 1
+        if method == 'GET' and route in ('products', 'orders'):
+            return 200, {}, self.listing(route, params)
+        if method == 'GET' and (match := re.fullmatch(r'orders/(\d+)/items', route)):
+            return 200, {}, self.order_items(int(match.group(1)) - 100000)
+        if method == 'POST' and route == 'inventory/bulk-update':
+            updates = body.get('updates', [])
+            with self._lock:
+                self.inventory_batches.append(updates)
+                self.stock_overrides.update({update['sku']: update['quantity'] for update in updates})
+            return 200, {}, {'updated': len(updates)}
+        if method == 'PUT' and re.fullmatch(r'products/\d+/stock', route):
+            return 200, {}, {'updated': 1}
+        if method == 'GET' and route == 'shop':
+            return 200, {}, {'name': 'Fake Sentos shop'}
+        return 404, {}, {'error': 'not found'}
+
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def _serve(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, headers, payload = fake.handle(self.command, url.path, params, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}/api/v1'
+
+
+def previous_walk(base_url, endpoint, params):
+    """The previous sync loop: one page at a time through module-level requests.request"""
+    total, page = 0, 1
+    while True:
+        response = requests.request('GET', f'{base_url}/{endpoint}', params=dict(params, page=page, limit=100),
+                                    headers={'Authorization': 'Bearer bench'}, timeout=30).json()
+        records = response.get('data', [])
+        total += len(records)
+        if not records or not response.get('has_next', False):
+            return total
+        page += 1
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Sentos sync (fetch, write, incremental, inventory push) against a local fake server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000, help='Products in the fake shop (default: 50000)')
+        parser.add_argument('--orders', type=int, default=100000, help='Orders in the fake shop (default: 100000)')
+        parser.add_argument('--latency', type=float, default=0.02, help='Simulated seconds per request (default: 0.02)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Pages in flight (default: 4)')
+        parser.add_argument('--stock-changes', type=int, default=2000,
+                            help='Local stock changes pushed (default: 2000)')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'email': 'sentos-bench@example.com'})
+        marketplace = Marketplace.objects.create(
+            user=user, platform='sentos', shop_name=f'Benchmark {timezone.now():%H%M%S}', sentos_api_key='bench'
+        )
+        fake = FakeSentos(products=options['products'], orders=options['orders'], latency=options['latency'])
+        try:
+            with fake, override_settings(STORE_SENTOS_CONCURRENCY=options['concurrency'], STORE_SENTOS_PAGE_SIZE=100):
+                self.run(fake, marketplace, options)
+        finally:
+            # Orders and products go with the marketplace
+            marketplace.delete()
+            user.delete()
+
+    def timed(self, label, fn):
+        before_requests, before_connections = sum(self.fake.requests.values()), self.fake.connections
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<40} {elapsed:>8.1f}s {sum(self.fake.requests.values()) - before_requests:>9,} "
+            f"{self.fake.connections - before_connections:>12,}"
+        )
+        return result
+
+    def run(self, fake, marketplace, options):
+        self.fake = fake
+        start_date = fake.base - timedelta(minutes=1)
+        self.stdout.write(
+            f"{options['products']:,} products, {options['orders']:,} orders, "
+            f"{options['latency'] * 1000:.0f} ms per request, {options['concurrency']} pages in flight\n"
+            f"{'':<40} {'time':>9} {'requests':>9} {'connections':>12}"
+        )
+
+        self.timed('previous client: products (fetch only)', lambda: previous_walk(fake.url, 'products', {}))
+        self.timed('previous client: orders (fetch only)', lambda: previous_walk(
+            fake.url, 'orders', {'start_date': start_date.isoformat()}))
+
+        with SentosAPI('bench', base_url=fake.url) as api:
+            self.timed('pooled client: products (fetch only)', lambda: sum(map(len, api.iter_products())))
+            self.timed('pooled client: orders (fetch only)', lambda: sum(map(len, api.iter_orders(start_date=start_date))))
+
+            sync = SentosSync(marketplace, api)
+            products = self.timed('full sync: products (fetch + write)', sync.sync_products)
+            orders = self.timed('full sync: orders (fetch + write)', lambda: sync.sync_orders(since_date=start_date))
+            self.stdout.write(f"  synced {products['total']:,} products, {orders['total']:,} orders, "
+                              f"{len(products['errors']) + len(orders['errors'])} errors")
+
+            fake.touch('products', range(0, options['products'], 100))
+            fake.touch('orders', range(0, options['orders'], 100))
+            products = self.timed('incremental sync: products (1% changed)', sync.sync_products)
+            orders = self.timed('incremental sync: orders (1% changed)', sync.sync_orders)
+            self.stdout.write(f"  pulled {products['total']:,} products, {orders['total']:,} orders")
+
+            changed = list(Product.objects.filter(marketplace=marketplace).order_by('pk').values_list(
+                'pk', 'platform_product_id', flat=False)[:options['stock_changes']])
+            Product.objects.filter(pk__in=[pk for pk, _ in changed]).update(stock_quantity=F('stock_quantity') + 1)
+            self.timed(f"inventory push: {len(changed):,} changes per product", lambda: [
+                api.update_product_stock(platform_id, 0) for _, platform_id in changed])
+            pushed = self.timed(f"inventory push: {len(changed):,} changes in bulk", sync.push_inventory)
+            self.stdout.write(f"  pushed {pushed['pushed']:,} in {pushed['batches']} batches")
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketplace',
+            name='orders_synced_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketplace',
+            name='products_synced_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='synced_stock_quantity',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -48,6 +48,9 @@ class Marketplace(models.Model):
     last_sync = models.DateTimeField(null=True, blank=True)
     sync_interval_minutes = models.IntegerField(default=30)
     auto_sync = models.BooleanField(default=True)
+    # Incremental sync cursors: newest change seen by the last complete sync
+    orders_synced_until = models.DateTimeField(null=True, blank=True)
+    products_synced_until = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -223,6 +226,8 @@ class Product(models.Model):
     
     # Stock
     stock_quantity = models.IntegerField(default=0)
+    # Quantity the marketplace last reported; local edits differ until pushed
+    synced_stock_quantity = models.IntegerField(null=True, blank=True)
     low_stock_threshold = models.IntegerField(default=5)
     
     # Images
@@ -1,63 +1,213 @@
 """
 Sentos API Integration
 Documentation: https://api.sentos.com.tr/docs
+
+Requests go through one pooled session per client. Connection errors and
+429/5xx responses are retried with exponential backoff; a 429 pauses every
+thread of the client for its Retry-After, so concurrent page fetches back off
+together. Paginated listings are fetched up to STORE_SENTOS_CONCURRENCY pages
+at a time (iter_pages) and still yielded in page order.
 """
 
 import requests
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Any
 from django.utils import timezone
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying; only 429 is retried for non-idempotent methods
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+# Longest single wait, whatever Retry-After asks for
+MAX_RETRY_DELAY = 60
+
+
+class _Throttle:
+    """Shared pause for all threads of a client after the API signals a rate limit"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+    
+    def pause(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+    
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - timezone.now()).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
 
 class SentosAPI:
     """Sentos API client for marketplace integration"""
     
-    def __init__(self, api_key: str, shop_url: str = None):
+    def __init__(self, api_key: str, shop_url: str = None, base_url: str = None):
         self.api_key = api_key
         self.shop_url = shop_url or "https://berkinatolyesi.sentos.com.tr"
-        self.base_url = "https://api.sentos.com.tr/api/v1"
+        self.base_url = base_url or getattr(settings, 'STORE_SENTOS_API_URL', "https://api.sentos.com.tr/api/v1")
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        self.concurrency = max(1, getattr(settings, 'STORE_SENTOS_CONCURRENCY', 4))
+        self.page_size = getattr(settings, 'STORE_SENTOS_PAGE_SIZE', 100)
+        self.max_retries = getattr(settings, 'STORE_SENTOS_MAX_RETRIES', 4)
+        self.backoff_seconds = getattr(settings, 'STORE_SENTOS_BACKOFF_SECONDS', 0.5)
+        self.timeout = getattr(settings, 'STORE_SENTOS_TIMEOUT_SECONDS', 30)
+        
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        pool_size = max(self.concurrency, getattr(settings, 'STORE_SENTOS_POOL_SIZE', 8))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._throttle = _Throttle()
+    
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter for the given retry attempt (0-based)"""
+        return min(self.backoff_seconds * (2 ** attempt), MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
     
     def _make_request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> Dict:
-        """Make API request with error handling"""
+        """Make API request with error handling, retries and rate-limit backoff"""
         url = f"{self.base_url}/{endpoint}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
         
-        try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                json=data,
-                params=params,
-                timeout=30
-            )
+        for attempt in range(self.max_retries + 1):
+            self._throttle.wait()
+            try:
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    json=data,
+                    params=params,
+                    timeout=self.timeout
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if idempotent and attempt < self.max_retries:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Sentos API {method} {endpoint} failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                if isinstance(e, requests.exceptions.Timeout):
+                    logger.error(f"Sentos API timeout: {endpoint}")
+                    raise Exception("API request timed out")
+                logger.error(f"Sentos API error: {str(e)}")
+                raise Exception(f"API request failed: {str(e)}")
             
             # Log the request for debugging
             logger.info(f"Sentos API {method} {endpoint}: {response.status_code}")
             
-            if response.status_code == 401:
-                raise Exception("Invalid API key or authentication failed")
-            
+            status = response.status_code
+            if status in RETRY_STATUSES and attempt < self.max_retries and (idempotent or status == 429):
+                delay = _retry_after(response)
+                delay = min(delay, MAX_RETRY_DELAY) if delay is not None else self._backoff(attempt)
+                if status == 429:
+                    # Every thread of this client waits, not just this one
+                    self._throttle.pause(delay)
+                logger.warning(f"Sentos API {method} {endpoint}: {status}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            break
+        
+        if response.status_code == 401:
+            raise Exception("Invalid API key or authentication failed")
+        
+        try:
             response.raise_for_status()
-            
-            return response.json() if response.text else {}
-            
-        except requests.exceptions.Timeout:
-            logger.error(f"Sentos API timeout: {endpoint}")
-            raise Exception("API request timed out")
-            
         except requests.exceptions.RequestException as e:
             logger.error(f"Sentos API error: {str(e)}")
             raise Exception(f"API request failed: {str(e)}")
+        
+        return response.json() if response.text else {}
+    
+    def iter_pages(self, endpoint: str, params: Dict = None, limit: int = None) -> Iterator[List[Dict]]:
+        """
+        Records of each page of a paginated listing, in page order
+        
+        Page 1 is fetched alone; when it reports last_page (or total_pages)
+        exactly the remaining pages are fetched, otherwise pages are fetched
+        ahead until one has no records or no has_next. Up to `concurrency`
+        requests are in flight at once.
+        """
+        params = dict(params or {}, limit=limit or self.page_size)
+        
+        def fetch(page):
+            return self._make_request("GET", endpoint, params=dict(params, page=page))
+        
+        first = fetch(1)
+        records = first.get("data", [])
+        if records:
+            yield records
+        if not records or not first.get("has_next", False):
+            return
+        
+        last_page = first.get("last_page") or first.get("total_pages")
+        next_page = 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                while len(pending) < self.concurrency and (last_page is None or next_page <= last_page):
+                    pending.append(pool.submit(fetch, next_page))
+                    next_page += 1
+                if not pending:
+                    return
+                response = pending.popleft().result()
+                records = response.get("data", [])
+                if records:
+                    yield records
+                if not records or not response.get("has_next", False):
+                    # Pages fetched ahead past the end are dropped
+                    for future in pending:
+                        future.cancel()
+                    return
+    
+    def map_concurrently(self, fn, items: List) -> List:
+        """fn applied to each item with up to `concurrency` requests in flight, results in order"""
+        if len(items) <= 1 or self.concurrency == 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(fn, items))
     
     # Shop Information
     def get_shop_info(self) -> Dict:
@@ -75,7 +225,8 @@ class SentosAPI:
                    end_date: datetime = None,
                    marketplace: str = None,
                    page: int = 1,
-                   limit: int = 50) -> Dict:
+                   limit: int = 50,
+                   updated_since: datetime = None) -> Dict:
         """
         Get orders from Sentos
         
@@ -86,11 +237,18 @@ class SentosAPI:
             marketplace: Filter by marketplace (amazon, etsy, etc.)
             page: Page number for pagination
             limit: Number of items per page
+            updated_since: Only orders changed at or after this time
         """
-        params = {
+        params = self._order_filters(status, start_date, end_date, marketplace, updated_since)
+        params.update({
             "page": page,
             "limit": limit
-        }
+        })
+        return self._make_request("GET", "orders", params=params)
+    
+    def _order_filters(self, status=None, start_date=None, end_date=None, marketplace=None,
+                       updated_since=None) -> Dict:
+        params = {}
         
         if status:
             params["status"] = status
@@ -104,7 +262,15 @@ class SentosAPI:
         if marketplace:
             params["marketplace"] = marketplace
         
-        return self._make_request("GET", "orders", params=params)
+        if updated_since:
+            params["updated_since"] = updated_since.isoformat()
+        
+        return params
+    
+    def iter_orders(self, start_date: datetime = None, updated_since: datetime = None,
+                    status: str = None, marketplace: str = None) -> Iterator[List[Dict]]:
+        """Pages of orders matching the filters, fetched concurrently (see iter_pages)"""
+        return self.iter_pages("orders", self._order_filters(status, start_date, None, marketplace, updated_since))
     
     def get_order(self, order_id: str) -> Dict:
         """Get single order details"""
@@ -134,12 +300,18 @@ class SentosAPI:
         """Get order items"""
         return self._make_request("GET", f"orders/{order_id}/items")
     
+    def get_order_items_many(self, order_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Items of several orders, fetched concurrently: {order_id: items}"""
+        order_ids = list(order_ids)
+        return dict(zip(order_ids, self.map_concurrently(self.get_order_items, order_ids)))
+    
     # Products Management
     def get_products(self,
                      marketplace: str = None,
                      status: str = None,
                      page: int = 1,
-                     limit: int = 50) -> Dict:
+                     limit: int = 50,
+                     updated_since: datetime = None) -> Dict:
         """
         Get products from Sentos
         
@@ -148,11 +320,17 @@ class SentosAPI:
             status: Product status (active, inactive, out_of_stock)
             page: Page number
             limit: Items per page
+            updated_since: Only products changed at or after this time
         """
-        params = {
+        params = self._product_filters(marketplace, status, updated_since)
+        params.update({
             "page": page,
             "limit": limit
-        }
+        })
+        return self._make_request("GET", "products", params=params)
+    
+    def _product_filters(self, marketplace=None, status=None, updated_since=None) -> Dict:
+        params = {}
         
         if marketplace:
             params["marketplace"] = marketplace
@@ -160,7 +338,15 @@ class SentosAPI:
         if status:
             params["status"] = status
         
-        return self._make_request("GET", "products", params=params)
+        if updated_since:
+            params["updated_since"] = updated_since.isoformat()
+        
+        return params
+    
+    def iter_products(self, updated_since: datetime = None, marketplace: str = None,
+                      status: str = None) -> Iterator[List[Dict]]:
+        """Pages of products matching the filters, fetched concurrently (see iter_pages)"""
+        return self.iter_pages("products", self._product_filters(marketplace, status, updated_since))
     
     def get_product(self, product_id: str) -> Dict:
         """Get single product details"""
@@ -267,93 +453,3 @@ class SentosAPI:
         except Exception as e:
             logger.error(f"Sentos API connection test failed: {str(e)}")
             return False
-    
-    def sync_orders(self, since_date: datetime = None) -> Dict:
-        """
-        Sync all orders since a given date
-        
-        Args:
-            since_date: Sync orders from this date (default: last 7 days)
-        """
-        if not since_date:
-            since_date = timezone.now() - timedelta(days=7)
-        
-        results = {
-            "total": 0,
-            "created": 0,
-            "updated": 0,
-            "failed": 0,
-            "errors": []
-        }
-        
-        try:
-            page = 1
-            while True:
-                response = self.get_orders(
-                    start_date=since_date,
-                    page=page,
-                    limit=100
-                )
-                
-                orders = response.get("data", [])
-                if not orders:
-                    break
-                
-                for order_data in orders:
-                    try:
-                        # Process each order (to be implemented in views)
-                        results["total"] += 1
-                    except Exception as e:
-                        results["failed"] += 1
-                        results["errors"].append(str(e))
-                
-                # Check if there are more pages
-                if not response.get("has_next", False):
-                    break
-                
-                page += 1
-        
-        except Exception as e:
-            logger.error(f"Order sync failed: {str(e)}")
-            results["errors"].append(str(e))
-        
-        return results
-    
-    def sync_products(self) -> Dict:
-        """Sync all products"""
-        results = {
-            "total": 0,
-            "created": 0,
-            "updated": 0,
-            "failed": 0,
-            "errors": []
-        }
-        
-        try:
-            page = 1
-            while True:
-                response = self.get_products(page=page, limit=100)
-                
-                products = response.get("data", [])
-                if not products:
-                    break
-                
-                for product_data in products:
-                    try:
-                        # Process each product (to be implemented in views)
-                        results["total"] += 1
-                    except Exception as e:
-                        results["failed"] += 1
-                        results["errors"].append(str(e))
-                
-                # Check if there are more pages
-                if not response.get("has_next", False):
-                    break
-                
-                page += 1
-        
-        except Exception as e:
-            logger.error(f"Product sync failed: {str(e)}")
-            results["errors"].append(str(e))
-        
-        return results
\ No newline at end of file
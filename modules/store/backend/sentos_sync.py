@@ -0,0 +1,356 @@
+"""
+Sentos Marketplace Sync
+Pulls orders and products from Sentos into the store tables and pushes
+local stock changes back
+
+Pulls are incremental. Each marketplace keeps the newest change seen by its
+last complete sync (orders_synced_until, products_synced_until) and the next
+sync asks only for records updated since then, less
+STORE_SENTOS_CURSOR_OVERLAP_MINUTES for late writes. A sync that fails part
+way leaves its cursor where it was. Pages are fetched concurrently by
+SentosAPI.iter_pages and each page is written with bulk upserts.
+Order ids are unique across marketplaces; one already held by another
+marketplace is skipped and reported as failed rather than taken over.
+
+Stock edited locally differs from Product.synced_stock_quantity (what
+Sentos last reported) until push_inventory sends it, in batches of
+STORE_SENTOS_INVENTORY_BATCH_SIZE, through bulk_update_inventory. Pulls keep
+such pending quantities rather than overwrite them.
+
+    with SentosAPI(marketplace.sentos_api_key, marketplace.sentos_shop_url) as api:
+        sync = SentosSync(marketplace, api)
+        sync.push_inventory()
+        results = sync.sync_orders()
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Marketplace, Order, OrderItem, Product
+from .sentos_api import SentosAPI
+
+logger = logging.getLogger(__name__)
+
+ORDER_UPDATE_FIELDS = [
+    'order_number', 'customer_name', 'customer_email', 'customer_phone', 'shipping_address',
+    'shipping_city', 'shipping_state', 'shipping_country', 'shipping_postal_code', 'status',
+    'payment_status', 'payment_method', 'currency', 'subtotal', 'shipping_cost', 'tax_amount',
+    'discount_amount', 'total_amount', 'tracking_number', 'tracking_company', 'customer_note',
+    'order_date', 'platform_data', 'updated_at',
+]
+PRODUCT_UPDATE_FIELDS = [
+    'sku', 'barcode', 'title', 'description', 'brand', 'category', 'price', 'sale_price', 'currency',
+    'stock_quantity', 'synced_stock_quantity', 'main_image_url', 'additional_images', 'status',
+    'platform_data', 'last_sync', 'updated_at',
+]
+
+
+# ========== Payload mapping ==========
+
+def _decimal(value, default=Decimal('0')) -> Optional[Decimal]:
+    if value in (None, ''):
+        return default
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return default
+
+
+def _datetime(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value if isinstance(value, datetime) else None
+
+
+def _choice(value, choices, default):
+    return value if value in dict(choices) else default
+
+
+def _text(value, max_length=None) -> str:
+    value = '' if value is None else str(value)
+    return value[:max_length] if max_length else value
+
+
+def order_fields(data: Dict) -> Dict:
+    """Order model fields of a Sentos order payload"""
+    customer = data.get('customer') or {}
+    address = data.get('shipping_address') or {}
+    if isinstance(address, str):
+        address = {'address': address}
+    total = _decimal(data.get('total_amount', data.get('total')))
+    return {
+        'platform_order_id': _text(data['id'], 200),
+        'order_number': _text(data.get('order_number') or data['id'], 100),
+        'customer_name': _text(customer.get('name') or data.get('customer_name'), 200),
+        'customer_email': _text(customer.get('email') or data.get('customer_email'), 254),
+        'customer_phone': _text(customer.get('phone') or data.get('customer_phone'), 50),
+        'shipping_address': _text(address.get('address')),
+        'shipping_city': _text(address.get('city'), 100),
+        'shipping_state': _text(address.get('state') or address.get('district'), 100),
+        'shipping_country': _text(address.get('country'), 100),
+        'shipping_postal_code': _text(address.get('postal_code'), 20),
+        'status': _choice(data.get('status'), Order.STATUS_CHOICES, 'pending'),
+        'payment_status': _choice(data.get('payment_status'), Order.PAYMENT_STATUS_CHOICES, 'pending'),
+        'payment_method': _text(data.get('payment_method'), 100),
+        'currency': _text(data.get('currency') or 'TRY', 3),
+        'subtotal': _decimal(data.get('subtotal'), total),
+        'shipping_cost': _decimal(data.get('shipping_cost')),
+        'tax_amount': _decimal(data.get('tax_amount')),
+        'discount_amount': _decimal(data.get('discount_amount')),
+        'total_amount': total,
+        'tracking_number': _text(data.get('tracking_number'), 200),
+        'tracking_company': _text(data.get('tracking_company'), 100),
+        'customer_note': _text(data.get('customer_note') or data.get('note')),
+        'order_date': _datetime(data.get('order_date') or data.get('created_at')) or timezone.now(),
+        'platform_data': {key: value for key, value in data.items() if key != 'items'},
+    }
+
+
+def order_item_fields(data: Dict) -> Dict:
+    """OrderItem model fields of a Sentos order item payload"""
+    quantity = int(data.get('quantity') or 1)
+    unit_price = _decimal(data.get('unit_price', data.get('price')))
+    return {
+        'product_id': _text(data.get('product_id'), 200),
+        'product_name': _text(data.get('product_name') or data.get('name'), 500),
+        'product_sku': _text(data.get('sku'), 100),
+        'product_barcode': _text(data.get('barcode'), 100),
+        'variant_id': _text(data.get('variant_id'), 200),
+        'variant_title': _text(data.get('variant_title'), 200),
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'discount_amount': _decimal(data.get('discount_amount')),
+        'tax_amount': _decimal(data.get('tax_amount')),
+        'total_price': _decimal(data.get('total_price', data.get('total')), unit_price * quantity),
+        'metadata': data,
+    }
+
+
+def product_fields(data: Dict) -> Dict:
+    """Product model fields of a Sentos product payload"""
+    images = [image for image in data.get('images') or [] if image]
+    category = data.get('category')
+    if isinstance(category, dict):
+        category = category.get('name')
+    stock = int(data.get('stock_quantity', data.get('stock')) or 0)
+    return {
+        'platform_product_id': _text(data['id'], 200),
+        'sku': _text(data.get('sku'), 100),
+        'barcode': _text(data.get('barcode'), 100),
+        'title': _text(data.get('title') or data.get('name'), 500),
+        'description': _text(data.get('description')),
+        'brand': _text(data.get('brand'), 200),
+        'category': _text(category, 200),
+        'price': _decimal(data.get('price')),
+        'sale_price': _decimal(data.get('sale_price'), None),
+        'currency': _text(data.get('currency') or 'TRY', 3),
+        'stock_quantity': stock,
+        'synced_stock_quantity': stock,
+        'main_image_url': _text(data.get('image') or (images[0] if images else ''), 200),
+        'additional_images': images[1:],
+        'status': _choice(data.get('status'), Product.STATUS_CHOICES, 'active'),
+        'platform_data': data,
+    }
+
+
+def _changed_at(data: Dict) -> Optional[datetime]:
+    return _datetime(data.get('updated_at') or data.get('order_date') or data.get('created_at'))
+
+
+def _empty_results() -> Dict:
+    return {
+        "total": 0,
+        "created": 0,
+        "updated": 0,
+        "failed": 0,
+        "errors": []
+    }
+
+
+# ========== Sync ==========
+
+class SentosSync:
+    """Incremental order and product sync, and batched stock pushes, for one marketplace"""
+
+    def __init__(self, marketplace: Marketplace, api: Optional[SentosAPI] = None):
+        self.marketplace = marketplace
+        self.api = api or SentosAPI(marketplace.sentos_api_key, marketplace.sentos_shop_url)
+        self.overlap = timedelta(minutes=getattr(settings, 'STORE_SENTOS_CURSOR_OVERLAP_MINUTES', 10))
+        self.inventory_batch_size = getattr(settings, 'STORE_SENTOS_INVENTORY_BATCH_SIZE', 500)
+
+    def _since(self, cursor: Optional[datetime]) -> Optional[datetime]:
+        return cursor - self.overlap if cursor else None
+
+    def _advance_cursor(self, field: str, newest: Optional[datetime]):
+        if newest and (getattr(self.marketplace, field) is None or newest > getattr(self.marketplace, field)):
+            setattr(self.marketplace, field, newest)
+            Marketplace.objects.filter(pk=self.marketplace.pk).update(**{field: newest})
+
+    def _sync(self, kind: str, pages, save_page, cursor_field: str) -> Dict:
+        results = _empty_results()
+        newest = None
+        try:
+            for records in pages:
+                newest = max(filter(None, [newest] + [_changed_at(record) for record in records]), default=None)
+                save_page(records, results)
+        except Exception as e:
+            logger.error(f"Sentos {kind} sync failed for {self.marketplace}: {str(e)}")
+            results["errors"].append(str(e))
+            return results
+        self._advance_cursor(cursor_field, newest)
+        return results
+
+    def sync_orders(self, since_date: datetime = None) -> Dict:
+        """
+        Pull orders changed since the last complete sync
+
+        Args:
+            since_date: Pull orders placed since this date instead (default
+                for a first sync: the last STORE_SENTOS_INITIAL_ORDER_DAYS days)
+        """
+        updated_since = None if since_date else self._since(self.marketplace.orders_synced_until)
+        if not since_date and not updated_since:
+            since_date = timezone.now() - timedelta(days=getattr(settings, 'STORE_SENTOS_INITIAL_ORDER_DAYS', 7))
+        pages = self.api.iter_orders(start_date=since_date, updated_since=updated_since)
+        return self._sync('order', pages, self._save_orders, 'orders_synced_until')
+
+    def sync_products(self) -> Dict:
+        """Pull products changed since the last complete sync (all of them the first time)"""
+        pages = self.api.iter_products(updated_since=self._since(self.marketplace.products_synced_until))
+        return self._sync('product', pages, self._save_products, 'products_synced_until')
+
+    def _mapped(self, records: List[Dict], mapper, key: str, results: Dict) -> Dict[str, tuple]:
+        """(fields, record) by platform id; unusable records are counted as failed"""
+        mapped = {}
+        for record in records:
+            results["total"] += 1
+            try:
+                fields = mapper(record)
+            except (KeyError, TypeError, ValueError) as e:
+                results["failed"] += 1
+                results["errors"].append(f"Invalid record {record.get('id', '?')}: {e}")
+                continue
+            mapped[fields[key]] = (fields, record)
+        return mapped
+
+    def _save_orders(self, records: List[Dict], results: Dict):
+        mapped = self._mapped(records, order_fields, 'platform_order_id', results)
+        if not mapped:
+            return
+
+        # Listings normally embed items; fetch the rest concurrently
+        missing = [order_id for order_id, (_, record) in mapped.items() if 'items' not in record]
+        fetched = self.api.get_order_items_many(missing) if missing else {}
+
+        with transaction.atomic():
+            # platform_order_id is unique across marketplaces: never upsert over another one's order
+            owners = dict(
+                Order.objects.select_for_update().filter(platform_order_id__in=mapped)
+                .values_list('platform_order_id', 'marketplace_id')
+            )
+            existing = {order_id for order_id, owner in owners.items() if owner == self.marketplace.pk}
+            new = [order_id for order_id in mapped if order_id not in owners]
+            Order.objects.bulk_create(
+                [
+                    Order(user_id=self.marketplace.user_id, marketplace=self.marketplace, **mapped[order_id][0])
+                    for order_id in existing
+                ],
+                update_conflicts=True,
+                unique_fields=['platform_order_id'],
+                update_fields=ORDER_UPDATE_FIELDS,
+            )
+            # Inserted without update, so one created meanwhile elsewhere is left alone
+            Order.objects.bulk_create(
+                [
+                    Order(user_id=self.marketplace.user_id, marketplace=self.marketplace, **mapped[order_id][0])
+                    for order_id in new
+                ],
+                ignore_conflicts=True,
+            )
+            order_pks = dict(
+                Order.objects.filter(marketplace=self.marketplace, platform_order_id__in=mapped)
+                .values_list('platform_order_id', 'pk')
+            )
+            OrderItem.objects.filter(order_id__in=order_pks.values()).delete()
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order_pks[order_id], **order_item_fields(item))
+                for order_id, (_, record) in mapped.items() if order_id in order_pks
+                for item in (record['items'] if 'items' in record else fetched.get(order_id)) or []
+            ])
+
+        for order_id in mapped:
+            if order_id not in order_pks:
+                results["failed"] += 1
+                results["errors"].append(f"Order {order_id} belongs to another marketplace")
+        results["created"] += len(order_pks) - len(existing)
+        results["updated"] += len(existing)
+
+    def _save_products(self, records: List[Dict], results: Dict):
+        mapped = self._mapped(records, product_fields, 'platform_product_id', results)
+        if not mapped:
+            return
+
+        with transaction.atomic():
+            # Locked, so a local stock edit cannot slip in between the read and the upsert
+            existing = {
+                platform_id: (stock, synced)
+                for platform_id, stock, synced in Product.objects.select_for_update().filter(
+                    marketplace=self.marketplace, platform_product_id__in=mapped
+                ).values_list('platform_product_id', 'stock_quantity', 'synced_stock_quantity')
+            }
+            products = []
+            for platform_id, (fields, _) in mapped.items():
+                stock, synced = existing.get(platform_id, (None, None))
+                if synced is not None and stock != synced:
+                    # Not pushed yet: keep the local quantity
+                    fields = dict(fields, stock_quantity=stock)
+                products.append(Product(user_id=self.marketplace.user_id, marketplace=self.marketplace, **fields))
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['marketplace', 'platform_product_id'],
+                update_fields=PRODUCT_UPDATE_FIELDS,
+            )
+
+        results["created"] += len(mapped) - len(existing)
+        results["updated"] += len(existing)
+
+    def push_inventory(self) -> Dict:
+        """Send local stock changes through bulk_update_inventory, a batch at a time"""
+        results = {"pushed": 0, "batches": 0, "errors": []}
+        pending = Product.objects.filter(
+            marketplace=self.marketplace, synced_stock_quantity__isnull=False
+        ).exclude(sku='').exclude(stock_quantity=F('synced_stock_quantity')).order_by('pk')
+
+        last_pk = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk).values_list('pk', 'sku', 'stock_quantity')[:self.inventory_batch_size])
+            if not batch:
+                return results
+            last_pk = batch[-1][0]
+            try:
+                self.api.bulk_update_inventory([{"sku": sku, "quantity": quantity} for _, sku, quantity in batch])
+            except Exception as e:
+                logger.error(f"Sentos inventory push failed for {self.marketplace}: {str(e)}")
+                results["errors"].append(str(e))
+                return results
+
+            # Mark as synced only the quantities that were sent, one UPDATE per distinct quantity
+            by_quantity = defaultdict(list)
+            for pk, _, quantity in batch:
+                by_quantity[quantity].append(pk)
+            for quantity, pks in by_quantity.items():
+                Product.objects.filter(pk__in=pks, stock_quantity=quantity).update(synced_stock_quantity=quantity)
+            results["pushed"] += len(batch)
+            results["batches"] += 1
@@ -1,3 +1,131 @@
-from django.test import TestCase
+"""
+Tests for the Sentos client and marketplace sync
+"""
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from .management.commands.benchmark_sentos_sync import FakeSentos
+from .models import Marketplace, Order, OrderItem, Product
+from .sentos_api import SentosAPI
+from .sentos_sync import SentosSync
+
+User = get_user_model()
+
+
+@override_settings(STORE_SENTOS_PAGE_SIZE=50, STORE_SENTOS_CONCURRENCY=3, STORE_SENTOS_BACKOFF_SECONDS=0)
+class SentosSyncTests(TestCase):
+    """Test sync against a local fake Sentos server"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', email='seller@test.com', password='testpass123')
+        self.marketplace = Marketplace.objects.create(
+            user=self.user, platform='sentos', shop_name='Atölye', sentos_api_key='test'
+        )
+
+    def serve(self, **kwargs):
+        fake = FakeSentos(**kwargs)
+        self.enterContext(fake)
+        api = SentosAPI('test', base_url=fake.url)
+        self.addCleanup(api.close)
+        return fake, SentosSync(self.marketplace, api)
+
+    @override_settings(STORE_SENTOS_CURSOR_OVERLAP_MINUTES=0)
+    def test_full_then_incremental_sync(self):
+        """Test a second sync pulls only what changed, over reused connections"""
+        fake, sync = self.serve(products=120, orders=130)
+
+        products = sync.sync_products()
+        orders = sync.sync_orders(since_date=fake.base)
+        self.assertEqual((products['total'], products['created'], products['errors']), (120, 120, []))
+        self.assertEqual((orders['total'], orders['created'], orders['errors']), (130, 130, []))
+        self.assertEqual(OrderItem.objects.filter(order__marketplace=self.marketplace).count(), 260)
+        self.assertEqual(fake.requests['GET orders'], 3)
+        self.assertNotIn('GET orders/:id/items', fake.requests)
+        self.assertLessEqual(fake.connections, 3)
+
+        fake.touch('orders', [5, 6, 7])
+        fake.touch('products', [0])
+        orders = sync.sync_orders()
+        products = sync.sync_products()
+        # The changed records, and the newest one before, at the cursor itself
+        self.assertEqual((orders['total'], orders['created'], orders['updated']), (4, 0, 4))
+        self.assertEqual((products['total'], products['updated']), (2, 2))
+        self.assertEqual(fake.requests['GET orders'], 4)
+        self.assertEqual(Order.objects.get(platform_order_id='100005').status, 'shipped')
+        self.assertEqual(OrderItem.objects.filter(order__platform_order_id='100005').count(), 2)
+        self.marketplace.refresh_from_db()
+        self.assertEqual(self.marketplace.orders_synced_until, fake.touched['orders'][7])
+
+    def test_items_fetched_when_not_embedded(self):
+        """Test items are looked up per order when the listing leaves them out, without page counts"""
+        fake, sync = self.serve(orders=70, items_inline=False, report_last_page=False)
+
+        results = sync.sync_orders(since_date=fake.base)
+        self.assertEqual((results['total'], results['errors']), (70, []))
+        self.assertEqual(fake.requests['GET orders/:id/items'], 70)
+        self.assertEqual(OrderItem.objects.count(), 140)
+
+    def test_order_ids_owned_by_another_marketplace(self):
+        """Test a shared order id is skipped and reported, leaving the other marketplace's order intact"""
+        other_user = User.objects.create_user(username='other', email='other@test.com', password='testpass123')
+        other = Marketplace.objects.create(user=other_user, platform='sentos', shop_name='Dükkan', sentos_api_key='test')
+        fake, sync = self.serve(orders=5)
+        SentosSync(other, sync.api).sync_orders(since_date=fake.base)
+        Order.objects.filter(marketplace=other).update(customer_name='Other customer')
+        Order.objects.filter(marketplace=other, platform_order_id__in=['100003', '100004']).delete()
+
+        results = sync.sync_orders(since_date=fake.base)
+        self.assertEqual((results['total'], results['created'], results['failed']), (5, 2, 3))
+        self.assertEqual(len(results['errors']), 3)
+        self.assertEqual(
+            sorted(Order.objects.filter(marketplace=self.marketplace).values_list('platform_order_id', flat=True)),
+            ['100003', '100004']
+        )
+        self.assertEqual(set(Order.objects.filter(marketplace=other).values_list('customer_name', flat=True)), {'Other customer'})
+        self.assertEqual(OrderItem.objects.filter(order__marketplace=other).count(), 6)
+
+    def test_retries_rate_limits_and_server_errors(self):
+        """Test 429 and 5xx are retried for reads, and only 429 for writes"""
+        fake, sync = self.serve(products=10)
+        fake.failures.extend([(429, '0'), (503, None), (502, None)])
+        self.assertEqual(sync.sync_products()['total'], 10)
+
+        fake.failures.extend([(429, '0'), (503, None)])
+        with self.assertRaises(Exception):
+            sync.api.bulk_update_inventory([{'sku': 'SKU-000001', 'quantity': 1}])
+        self.assertEqual(fake.inventory_batches, [])
+
+        cursor = self.marketplace.products_synced_until
+        fake.touch('products', [3])
+        fake.failures.extend([(503, None)] * 5)
+        results = sync.sync_products()
+        self.assertEqual(len(results['errors']), 1)
+        self.assertEqual(self.marketplace.products_synced_until, cursor)
+
+    @override_settings(STORE_SENTOS_INVENTORY_BATCH_SIZE=2)
+    def test_push_inventory_in_batches(self):
+        """Test local stock changes survive a pull and go out in bulk batches"""
+        fake, sync = self.serve(products=20)
+        sync.sync_products()
+        changed = list(Product.objects.order_by('sku')[:3])
+        for product in changed:
+            product.stock_quantity += 10
+            product.save()
+
+        fake.touch('products', range(20))
+        sync.sync_products()
+        self.assertEqual(
+            [p.stock_quantity for p in Product.objects.order_by('sku')[:3]], [p.stock_quantity for p in changed]
+        )
+
+        results = sync.push_inventory()
+        self.assertEqual((results['pushed'], results['batches']), (3, 2))
+        self.assertEqual(
+            sorted(update['sku'] for batch in fake.inventory_batches for update in batch),
+            [p.sku for p in changed]
+        )
+        self.assertNotIn('PUT products/:id/stock', fake.requests)
+        self.assertFalse(Product.objects.exclude(stock_quantity=F('synced_stock_quantity')).exists())
+        self.assertEqual(sync.push_inventory()['pushed'], 0)
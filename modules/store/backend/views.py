@@ -11,6 +11,7 @@ from decimal import Decimal
 
 from .models import Marketplace, Order, OrderItem, Product, SyncLog
 from .sentos_api import SentosAPI
+from .sentos_sync import SentosSync
 import json
 
 
@@ -286,13 +287,17 @@ def marketplace_sync(request, pk):
     )
     
     try:
-        api = SentosAPI(marketplace.sentos_api_key, marketplace.sentos_shop_url)
-        
-        # Sync orders
-        order_results = api.sync_orders()
-        
-        # Sync products
-        product_results = api.sync_products()
+        with SentosAPI(marketplace.sentos_api_key, marketplace.sentos_shop_url) as api:
+            sync = SentosSync(marketplace, api)
+            
+            # Push local stock changes first, so the pull does not bring back old quantities
+            sync.push_inventory()
+            
+            # Sync orders
+            order_results = sync.sync_orders()
+            
+            # Sync products
+            product_results = sync.sync_products()
         
         # Update marketplace statistics
         marketplace.last_sync = timezone.now()
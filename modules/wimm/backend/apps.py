@@ -12,6 +12,7 @@ class WimmConfig(AppConfig):
     def ready(self):
         self._add_sdk_to_path()
         self._initialize_module()
+        from . import signals  # noqa
     
     def _add_sdk_to_path(self):
         try:
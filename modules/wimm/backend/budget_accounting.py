@@ -0,0 +1,76 @@
+"""
+WIMM budget accounting
+Keeps Budget.spent_total current as expense transactions change
+
+Each transaction save or delete moves its amount out of the budgets its
+previous state counted toward and into the budgets of its new state, with
+one UPDATE ... SET spent_total = spent_total + delta per side (see
+signals.py), so concurrent writers never lose each other's changes.
+
+Writes that skip model signals (bulk_create, QuerySet.update) are not
+tracked; reconcile_budgets() recomputes every budget in one grouped query
+and repairs whatever drifted. It runs daily from Celery beat.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Budget
+
+logger = logging.getLogger(__name__)
+
+# Transaction fields that decide which budgets it counts toward, and how much
+TRACKED_FIELDS = ('user_id', 'transaction_type', 'transaction_date', 'category_id', 'amount')
+
+
+def budget_state(transaction):
+    """The tracked fields of a transaction, or None if it counts toward no budget"""
+    if transaction.transaction_type != 'expense' or not transaction.amount:
+        return None
+    return {field: getattr(transaction, field) for field in TRACKED_FIELDS}
+
+
+def apply_spend(state, sign):
+    """Add (sign=1) or remove (sign=-1) a transaction state's amount from its budgets"""
+    if state is None:
+        return 0
+    transaction_date = state['transaction_date']
+    if timezone.is_aware(transaction_date):
+        transaction_date = timezone.localtime(transaction_date)
+    day = transaction_date.date()
+
+    budgets = Budget.objects.filter(user_id=state['user_id'], start_date__lte=day, end_date__gte=day)
+    if state['category_id']:
+        budgets = budgets.filter(Q(category__isnull=True) | Q(category_id=state['category_id']))
+    else:
+        budgets = budgets.filter(category__isnull=True)
+    return budgets.update(spent_total=F('spent_total') + sign * Decimal(str(state['amount'])))
+
+
+def transaction_changed(previous, current):
+    """Move spend from the budgets of the previous state to those of the current one"""
+    if previous == current:
+        return
+    apply_spend(previous, -1)
+    apply_spend(current, 1)
+
+
+def reconcile_budgets(budgets=None):
+    """
+    Recompute the spend of `budgets` (default: all) and repair drifted totals
+
+    Returns the number of budgets repaired. A total that changes while this
+    runs is left alone, so concurrent updates are never overwritten.
+    """
+    queryset = Budget.objects.all() if budgets is None else budgets
+    repaired = 0
+    for pk, stored, actual in queryset.with_spent().values_list('pk', 'spent_total', 'spent').iterator():
+        if stored == actual:
+            continue
+        if Budget.objects.filter(pk=pk, spent_total=stored).update(spent_total=actual):
+            logger.warning(f"Budget {pk} spend drifted: stored {stored}, recomputed {actual}")
+            repaired += 1
+    return repaired
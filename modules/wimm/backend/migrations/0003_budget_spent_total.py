@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:36
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def populate_spent_total(apps, schema_editor):
+    Budget = apps.get_model('wimm', 'Budget')
+    Transaction = apps.get_model('wimm', 'Transaction')
+    for budget in Budget.objects.all().iterator():
+        transactions = Transaction.objects.filter(
+            user_id=budget.user_id,
+            transaction_type='expense',
+            transaction_date__date__gte=budget.start_date,
+            transaction_date__date__lte=budget.end_date,
+        )
+        if budget.category_id:
+            transactions = transactions.filter(category_id=budget.category_id)
+        total = transactions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0')
+        Budget.objects.filter(pk=budget.pk).update(spent_total=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wimm', '0002_transaction_credit_card_transaction_expense_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='spent_total',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=20),
+        ),
+        migrations.RunPython(populate_spent_total, migrations.RunPython.noop),
+    ]
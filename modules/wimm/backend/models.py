@@ -3,6 +3,8 @@ WIMM (Where Is My Money) - Financial Management Module
 Handles invoices, transactions, cash flow, and financial reporting
 """
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
@@ -223,6 +225,25 @@ class InvoiceItem(BaseModel):
         super().save(*args, **kwargs)
 
 
+class BudgetQuerySet(models.QuerySet):
+    def with_spent(self):
+        """
+        Annotate `spent`, each budget's spend recomputed from its transactions,
+        in one grouped query for the whole queryset
+        (grouped queries leave out Meta.ordering, so order explicitly)
+        """
+        expenses = Q(
+            user__transactions__transaction_type='expense',
+            user__transactions__transaction_date__date__gte=F('start_date'),
+            user__transactions__transaction_date__date__lte=F('end_date'),
+        ) & (Q(category__isnull=True) | Q(user__transactions__category=F('category')))
+        return self.annotate(spent=Coalesce(
+            models.Sum('user__transactions__amount', filter=expenses),
+            Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=20, decimal_places=4),
+        ))
+
+
 class Budget(BaseModel):
     """Budget planning and tracking"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='budgets')
@@ -246,9 +267,14 @@ class Budget(BaseModel):
     amount = models.DecimalField(max_digits=20, decimal_places=4)
     currency = models.CharField(max_length=3, default='TRY')
     
+    # Spend so far, kept up to date by budget_accounting
+    spent_total = models.DecimalField(max_digits=20, decimal_places=4, default=0, editable=False)
+    
     # Alert settings
     alert_percentage = models.IntegerField(default=80)  # Alert when 80% spent
     
+    objects = BudgetQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-start_date']
         unique_together = [['user', 'name', 'start_date']]
@@ -256,19 +282,32 @@ class Budget(BaseModel):
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
     
-    @property
-    def spent_amount(self):
-        """Calculate spent amount for this budget period"""
+    def save(self, *args, **kwargs):
+        """Recompute the spend, the period or category may have changed"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'spent_total' in update_fields:
+            self.spent_total = self.calculate_spent()
+        super().save(*args, **kwargs)
+    
+    def calculate_spent(self):
+        """Spend of this budget period from its transactions (whole days, local time)"""
         transactions = Transaction.objects.filter(
-            user=self.user,
+            user_id=self.user_id,
             transaction_type='expense',
-            transaction_date__gte=self.start_date,
-            transaction_date__lte=self.end_date
+            transaction_date__date__gte=self.start_date,
+            transaction_date__date__lte=self.end_date
         )
-        if self.category:
-            transactions = transactions.filter(category=self.category)
+        if self.category_id:
+            transactions = transactions.filter(category_id=self.category_id)
         return transactions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0')
     
+    @property
+    def spent_amount(self):
+        """Spent amount for this budget period"""
+        # Budget.objects.with_spent() annotates a fresh total
+        spent = getattr(self, 'spent', None)
+        return spent if spent is not None else self.spent_total
+    
     @property
     def remaining_amount(self):
         return self.amount - self.spent_amount
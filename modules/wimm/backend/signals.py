@@ -0,0 +1,40 @@
+"""
+Django Signals for WIMM
+Keep budget spend totals current; see budget_accounting.py
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Transaction
+from . import budget_accounting
+
+
+@receiver(pre_save, sender=Transaction)
+def transaction_saving(sender, instance, **kwargs):
+    """Remember the stored state of an updated transaction"""
+    instance._budget_previous = None
+    if instance._state.adding or kwargs.get('raw'):
+        return
+    stored = Transaction.objects.filter(pk=instance.pk).only(
+        'user', 'transaction_type', 'transaction_date', 'category', 'amount'
+    ).first()
+    if stored:
+        instance._budget_previous = budget_accounting.budget_state(stored)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    """Move the transaction's amount between budgets"""
+    if kwargs.get('raw'):
+        return
+    budget_accounting.transaction_changed(
+        getattr(instance, '_budget_previous', None),
+        budget_accounting.budget_state(instance)
+    )
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    """Take the transaction's amount out of its budgets"""
+    budget_accounting.apply_spend(budget_accounting.budget_state(instance), -1)
@@ -0,0 +1,21 @@
+"""
+Celery tasks for wimm app
+"""
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def reconcile_budget_spend():
+    """
+    Recompute every budget's spend and repair stored totals that drifted
+    Totals are kept incrementally on transaction writes; this catches writes
+    that skip signals (bulk_create, update(), raw SQL)
+    """
+    from .budget_accounting import reconcile_budgets
+
+    repaired = reconcile_budgets()
+    logger.info(f"Budget spend reconciled: {repaired} budgets repaired")
+    return repaired
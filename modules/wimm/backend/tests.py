@@ -1,3 +1,146 @@
+"""
+Tests for WIMM budget accounting
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from .budget_accounting import reconcile_budgets
+from .models import Budget, Transaction, TransactionCategory
+
+User = get_user_model()
+
+
+class BudgetAccountingTests(TestCase):
+    """Test incrementally kept budget totals against full recomputes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='saver', email='saver@test.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@test.com', password='testpass123')
+        self.food, self.rent = [
+            TransactionCategory.objects.create(name=name, slug=name.lower(), type='expense')
+            for name in ('Food', 'Rent')
+        ]
+        self.start = date(2025, 3, 1)
+        self.budgets = [
+            Budget.objects.create(
+                user=self.user, name=name, period_type='custom', start_date=start, end_date=end,
+                category=category, amount=Decimal('1000')
+            )
+            for name, start, end, category in [
+                ('March', date(2025, 3, 1), date(2025, 3, 31), None),
+                ('March food', date(2025, 3, 1), date(2025, 3, 31), self.food),
+                ('Spring rent', date(2025, 3, 15), date(2025, 5, 15), self.rent),
+                ('April', date(2025, 4, 1), date(2025, 4, 30), None),
+            ]
+        ]
+
+    def expense(self, amount, day, category=None, user=None, hour=12, **kwargs):
+        return Transaction.objects.create(
+            user=user or self.user, transaction_type=kwargs.pop('transaction_type', 'expense'),
+            amount=Decimal(amount), category=category, description='test',
+            transaction_date=timezone.make_aware(datetime.combine(day, time(hour))), **kwargs
+        )
+
+    def assert_totals_match_recompute(self):
+        recomputed = dict(Budget.objects.with_spent().values_list('pk', 'spent'))
+        for budget in Budget.objects.all():
+            self.assertEqual(budget.spent_total, recomputed[budget.pk], budget.name)
+            self.assertEqual(budget.spent_total, budget.calculate_spent(), budget.name)
+
+    def test_totals_follow_transaction_changes(self):
+        """Test create, update and delete move amounts between the right budgets"""
+        march, march_food, spring_rent, april = self.budgets
+        lunch = self.expense('40', date(2025, 3, 10), self.food)
+        # Late on the last day of the period still counts
+        self.expense('60', date(2025, 3, 31), self.rent, hour=23)
+        self.expense('500', date(2025, 3, 20), self.food, user=self.other)
+
+        spent = lambda budget: Budget.objects.get(pk=budget.pk).spent_amount
+        self.assertEqual([spent(b) for b in self.budgets], [Decimal('100'), Decimal('40'), Decimal('60'), 0])
+
+        lunch.transaction_date += timedelta(days=30)
+        lunch.amount = Decimal('45')
+        lunch.save()
+        self.assertEqual([spent(b) for b in self.budgets], [Decimal('60'), 0, Decimal('60'), Decimal('45')])
+
+        lunch.delete()
+        self.assertEqual(spent(april), 0)
+        self.assert_totals_match_recompute()
+
+    def test_randomized_churn_matches_recompute(self):
+        """Test incremental totals equal a full recompute after random creates, updates and deletes"""
+        rng = random.Random(41)
+        transactions = []
+        for _ in range(300):
+            action = rng.random()
+            if action < 0.45 or not transactions:
+                transactions.append(self.expense(
+                    f'{rng.randint(1, 50000) / 100:.2f}',
+                    self.start + timedelta(days=rng.randint(-10, 90)),
+                    rng.choice([None, self.food, self.rent]),
+                    user=rng.choice([self.user, self.user, self.other]),
+                    hour=rng.randint(0, 23),
+                    transaction_type=rng.choice(['expense', 'expense', 'expense', 'income']),
+                ))
+            elif action < 0.85:
+                transaction = rng.choice(transactions)
+                field = rng.choice(['amount', 'transaction_date', 'category', 'transaction_type', 'user'])
+                if field == 'amount':
+                    transaction.amount = Decimal(f'{rng.randint(1, 50000) / 100:.2f}')
+                elif field == 'transaction_date':
+                    transaction.transaction_date += timedelta(hours=rng.randint(-24 * 40, 24 * 40))
+                elif field == 'category':
+                    transaction.category = rng.choice([None, self.food, self.rent])
+                elif field == 'transaction_type':
+                    transaction.transaction_type = rng.choice(['expense', 'income'])
+                else:
+                    transaction.user = rng.choice([self.user, self.other])
+                transaction.save()
+            else:
+                transactions.pop(rng.randrange(len(transactions))).delete()
+
+        self.assertTrue(any(budget.spent_total for budget in Budget.objects.all()))
+        self.assert_totals_match_recompute()
+        self.assertEqual(reconcile_budgets(), 0)
+
+    def test_reconcile_repairs_untracked_writes(self):
+        """Test bulk writes that skip signals are repaired by the reconciliation job"""
+        self.expense('25', date(2025, 3, 5))
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_type='expense', amount=Decimal('75'), description='bulk',
+                        transaction_date=timezone.make_aware(datetime(2025, 3, 6, 12)))
+        ])
+        Budget.objects.filter(name='April').update(spent_total=Decimal('999'))
+
+        self.assertEqual(reconcile_budgets(), 2)
+        self.assertEqual(Budget.objects.get(name='March').spent_total, Decimal('100'))
+        self.assertEqual(Budget.objects.get(name='April').spent_total, 0)
+        self.assert_totals_match_recompute()
+
+    def test_budget_list_in_one_query(self):
+        """Test listing budgets with spend does not query per budget"""
+        for i in range(40):
+            Budget.objects.create(
+                user=self.user, name=f'Budget {i}', period_type='monthly', start_date=self.start + timedelta(days=i),
+                end_date=self.start + timedelta(days=i + 30), amount=Decimal('100')
+            )
+        self.expense('30', date(2025, 3, 20))
 
-# Create your tests here.
+        with self.assertNumQueries(1):
+            rows = [
+                (budget.spent_amount, budget.remaining_amount, budget.spent_percentage)
+                for budget in Budget.objects.filter(user=self.user).order_by('pk')
+            ]
+        with self.assertNumQueries(1):
+            annotated = [
+                (budget.spent_amount, budget.remaining_amount, budget.spent_percentage)
+                for budget in Budget.objects.filter(user=self.user).with_spent().order_by('pk')
+            ]
+        self.assertEqual(len(rows), 44)
+        self.assertEqual(rows, annotated)
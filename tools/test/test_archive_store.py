@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed release archive store
+
+The benchmark archives a synthetic project RELEASES times, changing a
+couple of files between releases, once with shutil.copytree (as the
+release pipeline used to) and once with the store.
+"""
+
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.profiles.dev.archive_store import ArchiveStore, release_excluded
+
+RELEASES = 100
+FILES = 400
+FILE_SIZE = 4096
+CHANGES_PER_RELEASE = 2
+
+
+def make_project(root, files=FILES):
+    """synthetic project tree with some content releases leave out"""
+    rng = random.Random(files)
+    for i in range(files):
+        path = root / 'modules' / f'mod{i % 20}' / f'file{i}.py'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(FILE_SIZE))
+    (root / 'tools').mkdir()
+    (root / 'tools' / 'run.sh').write_text('#!/bin/sh\necho run\n')
+    (root / 'tools' / 'run.sh').chmod(0o755)
+    for excluded in ('.git/HEAD', 'data/log.txt', 'archive/old.txt', 'mod/__pycache__/x.pyc', 'dump.sql'):
+        (root / excluded).parent.mkdir(parents=True, exist_ok=True)
+        (root / excluded).write_text('excluded')
+    return root
+
+
+def touch_files(root, release, count=CHANGES_PER_RELEASE):
+    """change a few files, as a release with small diffs would"""
+    rng = random.Random(release)
+    for i in rng.sample(range(FILES), count):
+        path = root / 'modules' / f'mod{i % 20}' / f'file{i}.py'
+        with open(path, 'ab') as f:
+            f.write(f'# release {release}\n'.encode())
+
+
+def tree_files(root):
+    return {
+        str(path.relative_to(root)): path.read_bytes()
+        for path in root.rglob('*') if path.is_file()
+    }
+
+
+def test_snapshot_excludes_and_materializes():
+    """Test a snapshot skips excluded paths and hardlinks its tree"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project')
+        store = ArchiveStore(source / 'archive')
+        manifest, stats = store.snapshot(source, 'unibos_v1.0.0_b1', extra_files={'README.txt': 'v1.0.0\n'})
+
+        assert stats.files == FILES + 2
+        assert 'tools/run.sh' in manifest.files and 'README.txt' in manifest.files
+        assert not any(path.startswith(('.git', 'data', 'archive', 'mod/')) or path.endswith('.sql') for path in manifest.files)
+
+        tree = store.versions_dir / 'unibos_v1.0.0_b1'
+        assert (tree / 'README.txt').read_text() == 'v1.0.0\n'
+        assert os.access(tree / 'tools' / 'run.sh', os.X_OK)
+        sample = tree / 'modules' / 'mod0' / 'file0.py'
+        assert sample.read_bytes() == (source / 'modules' / 'mod0' / 'file0.py').read_bytes()
+        assert sample.stat().st_nlink == 2  # the object and this tree
+        assert not sample.stat().st_mode & stat.S_IWUSR
+
+
+def test_successive_snapshots_store_only_changes():
+    """Test unchanged files are neither re-read nor re-stored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project')
+        store = ArchiveStore(source / 'archive')
+        store.snapshot(source, 'a')
+        touch_files(source, 1)
+        (source / 'new.txt').write_text('new')
+        (source / 'tools' / 'run.sh').unlink()
+        _, stats = store.snapshot(source, 'b')
+
+        assert stats.hashed == CHANGES_PER_RELEASE + 1
+        assert stats.new_objects == CHANGES_PER_RELEASE + 1
+        changes = store.diff('a', 'b')
+        assert changes['added'] == ['new.txt']
+        assert changes['removed'] == ['tools/run.sh']
+        assert len(changes['changed']) == CHANGES_PER_RELEASE
+        assert store.diff('b', 'b') == {'added': [], 'removed': [], 'changed': []}
+
+
+def test_restore_and_gc():
+    """Test restore gives a writable copy and gc frees only unreferenced objects"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project')
+        store = ArchiveStore(Path(tmp) / 'archive')
+        store.snapshot(source, 'a', materialize='none')
+        expected = tree_files(store.materialize('a', Path(tmp) / 'check'))
+        touch_files(source, 1)
+        store.snapshot(source, 'b', materialize='copy')
+
+        restored = store.restore('a', Path(tmp) / 'restored')
+        assert tree_files(restored) == expected
+        (restored / 'tools' / 'run.sh').write_text('edited')
+
+        assert store.gc() == (0, 0)
+        store.delete('a')
+        removed, freed = store.gc()
+        assert removed == CHANGES_PER_RELEASE and freed > 0
+        # b is untouched: its objects and tree still match
+        assert store.gc() == (0, 0)
+        assert tree_files(store.versions_dir / 'b') == tree_files(store.restore('b', Path(tmp) / 'b'))
+
+
+def test_adopt_full_copy():
+    """Test an old full-copy archive moves into the store unchanged"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project')
+        store = ArchiveStore(Path(tmp) / 'archive')
+        old = store.versions_dir / 'unibos_v0.9.0_b20240101000000'
+        shutil.copytree(source / 'modules', old / 'modules')
+        expected = tree_files(old)
+
+        store.adopt(old.name)
+        assert tree_files(old) == expected
+        manifest = store.load_manifest(old.name)
+        assert (manifest.version, manifest.build) == ('0.9.0', '20240101000000')
+
+        # the next release shares every object with the adopted one
+        _, stats = store.snapshot(source, 'unibos_v1.0.0_b1')
+        assert stats.new_objects == 1  # tools/run.sh
+
+
+def test_symlinks_and_empty_dirs_match_copytree():
+    """Test linked files and directories are archived as copytree copied them"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project', files=20)
+        (source / 'shared').mkdir()
+        (source / 'shared' / 'config.txt').write_text('shared')
+        os.symlink('shared/config.txt', source / 'config.txt')
+        os.symlink('shared', source / 'linked')
+        os.symlink('..', source / 'shared' / 'up')  # loop
+        os.symlink('missing.txt', source / 'dangling.txt')
+        (source / 'uploads' / 'empty').mkdir(parents=True)
+
+        store = ArchiveStore(Path(tmp) / 'archive')
+        manifest, _ = store.snapshot(source, 'a')
+        assert manifest.files['config.txt'][0] == manifest.files['shared/config.txt'][0]
+        assert 'linked/config.txt' in manifest.files
+        assert not any(path.startswith(('shared/up/', 'linked/up/')) for path in manifest.files)
+        assert 'dangling.txt' not in manifest.files
+        # mod/ holds only an excluded __pycache__; copytree made it empty too
+        assert manifest.dirs == ['mod', 'uploads/empty']
+
+        tree = store.versions_dir / 'a'
+        assert (tree / 'config.txt').read_text() == 'shared' and not (tree / 'config.txt').is_symlink()
+        assert (tree / 'linked' / 'config.txt').read_text() == 'shared'
+        assert (tree / 'uploads' / 'empty').is_dir()
+        assert (store.restore('a', Path(tmp) / 'restored') / 'uploads' / 'empty').is_dir()
+
+
+def test_benchmark_successive_releases():
+    """Benchmark archive time and bytes written, copytree vs store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_project(Path(tmp) / 'project')
+
+        copies = Path(tmp) / 'copies'
+        copy_bytes = 0
+        started = time.perf_counter()
+        for release in range(RELEASES):
+            touch_files(source, release)
+            shutil.copytree(source, copies / f'r{release}', ignore=lambda d, names: [
+                n for n in names if release_excluded(os.path.relpath(os.path.join(d, n), source), n)
+            ])
+            copy_bytes += sum(p.stat().st_size for p in (copies / f'r{release}').rglob('*') if p.is_file())
+        copy_seconds = time.perf_counter() - started
+
+        source = make_project(Path(tmp) / 'project2')
+        store = ArchiveStore(Path(tmp) / 'archive')
+        store_bytes = 0
+        started = time.perf_counter()
+        for release in range(RELEASES):
+            touch_files(source, release)
+            _, stats = store.snapshot(source, f'r{release}')
+            store_bytes += stats.bytes_written
+        store_seconds = time.perf_counter() - started
+
+        print(f"\n  {RELEASES} releases of {FILES} files, {CHANGES_PER_RELEASE} changed per release")
+        print(f"  copytree: {copy_seconds:6.2f}s  {copy_bytes / 1024 / 1024:8.1f} MB written")
+        print(f"  store:    {store_seconds:6.2f}s  {store_bytes / 1024 / 1024:8.1f} MB written "
+              f"({store.stored_size() / 1024 / 1024:.1f} MB of objects)")
+        assert store_bytes < copy_bytes / 10
+        assert tree_files(store.versions_dir / f'r{RELEASES - 1}') == tree_files(copies / f'r{RELEASES - 1}')
+
+
+if __name__ == '__main__':
+    test_snapshot_excludes_and_materializes()
+    test_successive_snapshots_store_only_changes()
+    test_restore_and_gc()
+    test_adopt_full_copy()
+    test_symlinks_and_empty_dirs_match_copytree()
+    test_benchmark_successive_releases()
+    print("\n✅ archive store tests passed!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test HubDeployer remote execution against a fake ssh
+
+The fake ssh runs commands locally with bash, against stub sudo, git,
+python3, systemctl, curl and chown, and sleeps for a handshake on every
+connection it would have opened. A ControlMaster is a marker file at the
+ControlPath; sessions on it skip the handshake.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from deploy.config import DeployConfig
+from deploy.deploy import HubDeployer
+from deploy.remote import RemoteShell
+
+HANDSHAKE_SECONDS = 0.2
+
+FAKE_SSH = '''#!{python} -S
+import os, sys, time
+args, opts, control = sys.argv[1:], {{}}, None
+while args and args[0].startswith('-'):
+    flag = args.pop(0)
+    if flag == '-o':
+        key, value = args.pop(0).split('=', 1)
+        opts[key] = value
+    elif flag == '-O':
+        control = args.pop(0)
+target, command = args[0], ' '.join(args[1:])
+path = opts.get('ControlPath')
+
+def connect():
+    with open(os.environ['FAKE_SSH_LOG'], 'a') as log:
+        log.write('connect\\n')
+    time.sleep({handshake})
+
+if control == 'check':
+    sys.exit(0 if os.path.exists(path) else 255)
+if control == 'exit':
+    os.remove(path)
+    sys.exit(0)
+if opts.get('ControlMaster') == 'yes':
+    connect()
+    open(path, 'w').close()
+    sys.exit(0)
+if not (path and os.path.exists(path)):
+    connect()
+os.execvp('bash', ['bash', '-c', command])
+'''
+
+STUBS = {
+    # only cleaning and the postgres commands run; FAKE_DB names an existing database
+    'sudo': (
+        'case "$1" in\n'
+        '  rm) exec "$@" ;;\n'
+        '  -u) shift 2\n'
+        '      [ "$1 $2" = "psql -lqt" ] && [ -n "$FAKE_DB" ] && echo " $FAKE_DB | postgres"\n'
+        '      [ "$1" = pg_dump ] && echo "-- dump of $2" ;;\n'
+        'esac\n'
+        'exit 0'
+    ),
+    'chown': 'exit 0',
+    'git': 'dest="${@: -1}"; mkdir -p "$dest"/modules/alpha "$dest"/modules/beta "$dest"/core/clients/web',
+    'python3': 'mkdir -p venv/bin && for tool in pip python; do printf "#!/bin/sh\\nexit 0\\n" > venv/bin/$tool; chmod +x venv/bin/$tool; done',
+    'systemctl': '[ "$1" = is-active ] && echo active; exit 0',
+    'curl': 'printf 200',
+}
+
+
+def write_executable(path, content):
+    path.write_text(content)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+
+def make_fake_ssh(root):
+    """fake ssh binary and stub bin dir under root"""
+    bin_dir = root / 'bin'
+    bin_dir.mkdir()
+    for name, body in STUBS.items():
+        write_executable(bin_dir / name, f"#!/bin/bash\n{body}\n")
+    ssh = root / 'ssh'
+    write_executable(ssh, FAKE_SSH.format(python=sys.executable, handshake=HANDSHAKE_SECONDS))
+    os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    os.environ['FAKE_SSH_LOG'] = str(root / 'connections.log')
+    return ssh
+
+
+def run_deploy(root, ssh, multiplex):
+    """deploy into root/server, returning (deployer, result, connections, seconds)"""
+    deploy_path = root / 'server' / 'unibos'
+    config = DeployConfig(
+        name='test', host='localhost', deploy_path=str(deploy_path),
+        venv_path=f"{deploy_path}/core/clients/web/venv", env_vars={'SECRET_KEY': 'x'}
+    )
+    deployer = HubDeployer(config, verbose=False)
+    deployer.remote = RemoteShell(config.ssh_target, config.port, ssh_binary=str(ssh), multiplex=multiplex)
+    deployer.log_dir = root / 'logs'
+    deployer.HEALTH_CHECK_WAIT = 0
+
+    log = Path(os.environ['FAKE_SSH_LOG'])
+    log.write_text('')
+    started = time.perf_counter()
+    result = deployer.deploy()
+    seconds = time.perf_counter() - started
+    return deployer, result, len(log.read_text().splitlines()), seconds
+
+
+def test_run_batch_splits_results():
+    """Test probes in one round trip keep their own output and exit code"""
+    with tempfile.TemporaryDirectory() as tmp:
+        ssh = make_fake_ssh(Path(tmp))
+        with RemoteShell('ubuntu@hub', ssh_binary=str(ssh)) as remote:
+            results = remote.run_batch(["echo yes", "printf 'a\\nb'", "false", "echo no; exit 3"])
+            assert [r.stdout for r in results] == ["yes\n", "a\nb", "", "no\n"]
+            assert [r.returncode for r in results] == [0, 0, 1, 3]
+            assert (remote.commands, remote.connections) == (1, 1)
+        assert remote.control_path is None
+
+
+def test_deploy_shares_one_connection():
+    """Test a deploy opens one ssh connection and logs step timings"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ssh = make_fake_ssh(root)
+
+        (root / 'unshared').mkdir()
+        deployer, result, unshared, unshared_seconds = run_deploy(root / 'unshared', ssh, multiplex=False)
+        assert result.success, result.message
+        assert unshared == deployer.remote.commands
+
+        (root / 'shared').mkdir()
+        deployer, result, shared, shared_seconds = run_deploy(root / 'shared', ssh, multiplex=True)
+        assert result.success, result.message
+        assert shared == 1
+        print(f"\n  one connection per command: {unshared} connections, {unshared_seconds:.2f}s")
+        print(f"  multiplexed:                {shared} connection, {shared_seconds:.2f}s")
+
+        deployed = root / 'shared' / 'server' / 'unibos'
+        assert (deployed / 'modules' / 'alpha' / '.enabled').exists()
+        assert (deployed / 'data' / 'backups').is_dir()
+        assert (deployed / 'core' / 'clients' / 'web' / '.env').read_text() == 'SECRET_KEY=x\n'
+
+        assert sorted(step for step, _ in deployer.step_timings) == sorted(step for step, _ in HubDeployer.STEPS)
+        log_file = next((root / 'shared' / 'logs').glob('deploy_test_*.log'))
+        content = log_file.read_text()
+        assert 'step timings:' in content and '  database ' in content
+        assert f"ssh: {deployer.remote.commands} commands over 1 connections" in content
+        # concurrent lanes log in lane order, not interleaved
+        assert content.index('dependencies installed') < content.index('unibos-hub cli installed') < content.index('environment file created')
+
+
+def test_predeploy_backup_survives_the_clean():
+    """Test a database dump taken before the deploy is kept when there was no data directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ssh = make_fake_ssh(root)
+        (root / 'server' / 'unibos' / 'old').mkdir(parents=True)
+        os.environ['FAKE_DB'] = 'unibos_test'
+        try:
+            _, result, _, _ = run_deploy(root, ssh, multiplex=True)
+        finally:
+            del os.environ['FAKE_DB']
+        assert result.success, result.message
+
+        deployed = root / 'server' / 'unibos'
+        assert not (deployed / 'old').exists()
+        dumps = list((deployed / 'data' / 'backups').glob('test_unibos_test_predeploy_*.sql.gz'))
+        assert len(dumps) == 1 and dumps[0].stat().st_size > 0
+
+
+if __name__ == '__main__':
+    test_run_batch_splits_results()
+    test_deploy_shares_one_connection()
+    test_predeploy_backup_survives_the_clean()
+    print("\n✅ deploy remote tests passed!")
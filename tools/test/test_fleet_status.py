@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the manager fleet status collector against fake hosts
+
+The fake ssh waits one round trip, then runs the probe locally with bash
+against stub git and systemctl. Hosts named slow-* never answer and
+down-* refuse the connection.
+"""
+
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.profiles.manager.fleet import FleetStatusCollector
+
+ROUND_TRIP = 1.0
+
+FAKE_SSH = '''#!/bin/bash
+while [[ "$1" == -* ]]; do
+    [[ "$1" == -o ]] && shift
+    shift
+done
+host="$1"
+echo "$host" >> "{log}"
+case "$host" in
+    slow-*) exec sleep 60 ;;
+    down-*) echo "ssh: connect to host $host port 22: Connection refused" >&2; exit 255 ;;
+esac
+sleep {round_trip}
+PATH="{bin_dir}:$PATH" exec bash -c "$2"
+'''
+
+STUBS = {
+    'git': '[ "$1" = branch ] && echo main || echo abc1234',
+    'systemctl': 'echo active',
+}
+
+
+def write_executable(path, content):
+    path.write_text(content)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+
+def make_collector(root, **kwargs):
+    """collector using a fake ssh under root; returns (collector, connection log)"""
+    bin_dir = root / 'bin'
+    bin_dir.mkdir()
+    for name, body in STUBS.items():
+        write_executable(bin_dir / name, f"#!/bin/bash\n{body}\n")
+    log = root / 'connections.log'
+    log.write_text('')
+    ssh = root / 'ssh'
+    write_executable(ssh, FAKE_SSH.format(log=log, round_trip=ROUND_TRIP, bin_dir=bin_dir))
+    collector = FleetStatusCollector(ssh_binary=str(ssh), deploy_path=str(root), **kwargs)
+    return collector, log
+
+
+def test_status_fields():
+    """Test one probe per host fills in every field"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, log = make_collector(Path(tmp))
+        status = collector.collect(['node-1'])['node-1']
+        assert status.reachable, status.error
+        assert (status.branch, status.commit, status.service) == ('main', 'abc1234', 'active')
+        assert set(status.disk) == {'size', 'used', 'available', 'percent'}
+        assert status.to_dict()['disk']['percent'].endswith('%')
+        assert log.read_text().split() == ['node-1']
+
+
+def test_status_time_stays_near_one_round_trip():
+    """Test hosts are checked concurrently, up to 50"""
+    print()
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, _ = make_collector(Path(tmp))
+        for count in (1, 10, 25, 50):
+            hosts = [f'node-{i}' for i in range(count)]
+            started = time.perf_counter()
+            statuses = collector.collect(hosts, refresh=True)
+            elapsed = time.perf_counter() - started
+            print(f"  {count:>3} hosts: {elapsed:.2f}s ({elapsed / ROUND_TRIP:.1f} round trips)")
+            assert all(status.reachable for status in statuses.values())
+            # checked one after another, this would be count round trips
+            assert elapsed < ROUND_TRIP * 2.5
+
+
+def test_timeouts_and_streaming():
+    """Test a hung host times out on its own while the others stream in first"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, _ = make_collector(Path(tmp), timeout=2)
+        started = time.perf_counter()
+        order = [status.host for status in collector.iter_statuses(['slow-1', 'node-1', 'down-1'])]
+        elapsed = time.perf_counter() - started
+
+        assert order[-1] == 'slow-1'
+        assert elapsed < 3
+        statuses = collector.collect(['slow-1', 'node-1', 'down-1'])
+        assert statuses['slow-1'].error == 'timeout after 2s'
+        assert 'Connection refused' in statuses['down-1'].error
+        assert statuses['node-1'].reachable
+
+
+def test_cache_ttl():
+    """Test repeated refreshes within the ttl don't reconnect"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, log = make_collector(Path(tmp), ttl=0.5)
+        hosts = ['node-1', 'node-2']
+        first = collector.collect(hosts)
+        assert collector.collect(hosts) == first
+        assert len(log.read_text().split()) == 2
+
+        time.sleep(0.5)
+        collector.collect(hosts)
+        assert len(log.read_text().split()) == 4
+        collector.collect(hosts, refresh=True)
+        assert len(log.read_text().split()) == 6
+
+
+if __name__ == '__main__':
+    test_status_fields()
+    test_status_time_stays_near_one_round_trip()
+    test_timeouts_and_streaming()
+    test_cache_ttl()
+    print("\n✅ fleet status tests passed!")
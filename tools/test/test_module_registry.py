@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test the module registry's manifest index
+
+Synthetic module trees (copies of a real module.json under new ids) are
+built in a temporary UNIBOS root. The startup benchmark runs the CLI's
+`module list` and `manage.py check` against them; manage.py needs the
+environment it normally runs with (SECRET_KEY, DJANGO_SETTINGS_MODULE)
+and is skipped when check fails.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.base.registry import ModuleRegistry
+
+TEMPLATE = json.loads((project_root / 'modules' / 'movies' / 'module.json').read_text())
+STARTUP_RUNS = 3
+
+CLI = "from core.clients.cli.framework.commands.module import module_group; module_group(['list', '--json'])"
+
+
+def make_modules(root, count, enable=True):
+    """root/modules with count modules, every third one enabled"""
+    modules_dir = root / 'modules'
+    for i in range(count):
+        module_dir = modules_dir / f'synthetic{i:03d}'
+        module_dir.mkdir(parents=True)
+        (module_dir / 'module.json').write_text(json.dumps(
+            dict(TEMPLATE, id=f'synthetic{i:03d}', name=f'Synthetic {i}'), indent=2
+        ))
+        if enable and i % 3 == 0:
+            (module_dir / '.enabled').touch()
+    (modules_dir / '_template').mkdir()
+    (modules_dir / 'README.md').write_text('modules')
+    return modules_dir
+
+
+class ReadCounter:
+    """counts module.json reads by the registry"""
+
+    def __init__(self):
+        self.count = 0
+        self.read = ModuleRegistry._read_manifest
+
+    def __enter__(self):
+        def counting_read(registry, *args, **kwargs):
+            self.count += 1
+            return self.read(registry, *args, **kwargs)
+        ModuleRegistry._read_manifest = counting_read
+        return self
+
+    def __exit__(self, *exc):
+        ModuleRegistry._read_manifest = self.read
+
+
+def test_index_reuses_unchanged_manifests():
+    """Test a second startup parses no manifests and matches a fresh scan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        modules_dir = make_modules(Path(tmp), 30)
+        index = Path(tmp) / 'data' / 'cache' / 'module_registry.index'
+
+        with ReadCounter() as reads:
+            cold = ModuleRegistry(modules_dir)
+        assert reads.count == 30 and index.exists()
+        assert cold.index_path == index
+
+        mtime = index.stat().st_mtime_ns
+        with ReadCounter() as reads:
+            warm = ModuleRegistry(modules_dir)
+        assert reads.count == 0
+        assert index.stat().st_mtime_ns == mtime  # nothing rewritten
+
+        fresh = ModuleRegistry(modules_dir, use_index=False)
+        assert fresh.get_module_stats() == warm.get_module_stats() == cold.get_module_stats()
+        assert warm.get_django_apps() == fresh.get_django_apps()
+        assert len(warm.get_django_apps()) == 10
+        assert warm.get_module('synthetic000').module_path == modules_dir / 'synthetic000'
+
+
+def test_index_picks_up_changes():
+    """Test edits, enable/disable, new and removed modules invalidate their entries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        modules_dir = make_modules(Path(tmp), 10)
+        registry = ModuleRegistry(modules_dir)
+
+        # in-place edit, different size
+        json_file = modules_dir / 'synthetic001' / 'module.json'
+        json_file.write_text(json_file.read_text().replace('1.0.0', '1.0.10'))
+        # enable through the API, disable by hand
+        registry.enable_module('synthetic002')
+        (modules_dir / 'synthetic003' / '.enabled').unlink()
+        # new and removed modules
+        new = modules_dir / 'added'
+        new.mkdir()
+        (new / 'module.json').write_text(json.dumps(dict(TEMPLATE, id='added')))
+        (modules_dir / 'synthetic004' / 'module.json').unlink()
+        # a broken manifest warns every time without stopping discovery
+        (modules_dir / 'synthetic005' / 'module.json').write_text('{broken')
+
+        with ReadCounter() as reads:
+            registry = ModuleRegistry(modules_dir)
+        assert reads.count == 5  # refreshed: edited, enabled, disabled, added, broken
+        assert registry.get_module('synthetic001').version == '1.0.10'
+        assert registry.get_module('synthetic002').enabled
+        assert not registry.get_module('synthetic003').enabled
+        assert registry.get_module('added') and not registry.get_module('synthetic004')
+        assert not registry.get_module('synthetic005')
+
+        with ReadCounter() as reads:
+            again = ModuleRegistry(modules_dir)
+        assert reads.count == 0
+        assert again.get_module_stats() == registry.get_module_stats()
+
+
+def test_index_can_be_disabled():
+    """Test UNIBOS_REGISTRY_INDEX=off scans without writing an index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        modules_dir = make_modules(Path(tmp), 5)
+        os.environ['UNIBOS_REGISTRY_INDEX'] = 'off'
+        try:
+            registry = ModuleRegistry(modules_dir)
+        finally:
+            del os.environ['UNIBOS_REGISTRY_INDEX']
+        assert registry.index_path is None
+        assert len(registry.modules) == 5
+        assert not (Path(tmp) / 'data').exists()
+
+
+def git_root_scan(modules_dir):
+    """registry startup as it was: git rev-parse, then parse every manifest"""
+    subprocess.run(['git', 'rev-parse', '--show-toplevel'], capture_output=True, text=True, timeout=2)
+    return ModuleRegistry(modules_dir, use_index=False)
+
+
+def timed(function, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def test_benchmark_registry_startup():
+    """Benchmark registry construction and CLI / manage.py check startup, 20 and 200 modules"""
+    print()
+    for count in (20, 200):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            # nothing enabled: manage.py would import the synthetic backends
+            modules_dir = make_modules(root, count, enable=False)
+            index = root / 'data' / 'cache' / 'module_registry.index'
+
+            before = timed(lambda: git_root_scan(modules_dir), 5)
+            no_index = timed(lambda: ModuleRegistry(modules_dir, use_index=False), 5)
+            ModuleRegistry(modules_dir)
+            warm = timed(lambda: ModuleRegistry(modules_dir), 5)
+            print(f"  {count} modules, registry: git + scan {before * 1000:.1f} ms, "
+                  f"scan {no_index * 1000:.1f} ms, index {warm * 1000:.1f} ms")
+
+            env = dict(os.environ, UNIBOS_ROOT=str(root))
+            commands = {
+                'cli module list': [sys.executable, '-c', CLI],
+                'manage.py check': [sys.executable, str(project_root / 'core' / 'clients' / 'web' / 'manage.py'), 'check'],
+            }
+            for label, command in commands.items():
+                def run(mode):
+                    result = subprocess.run(
+                        command, env=dict(env, UNIBOS_REGISTRY_INDEX=mode),
+                        cwd=project_root, capture_output=True, text=True
+                    )
+                    if result.returncode != 0:
+                        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+                try:
+                    off = timed(lambda: run('off'), STARTUP_RUNS)
+                    run(str(index))
+                    cached = timed(lambda: run(str(index)), STARTUP_RUNS)
+                except RuntimeError as e:
+                    print(f"    {label:<16} skipped: {e}")
+                    continue
+                print(f"    {label:<16} no index {off * 1000:7.0f} ms   index {cached * 1000:7.0f} ms")
+
+            assert warm < no_index
+
+
+if __name__ == '__main__':
+    test_index_reuses_unchanged_manifests()
+    test_index_picks_up_changes()
+    test_index_can_be_disabled()
+    test_benchmark_registry_startup()
+    print("\n✅ module registry tests passed!")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test the SDK's tiered UnibosCache
+
+The shared tier is a Django LocMemCache wrapped to count calls and,
+for the benchmark, to wait a Redis-like round trip on every call.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add SDK to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / 'core' / 'sdk' / 'python'))
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from unibos_sdk import UnibosCache
+
+ROUND_TRIP = 0.0005  # Redis on the same network: ~0.5 ms per call
+HOT_READS = 20000
+
+
+class RemoteBackend:
+    """shared cache stand-in: counts calls, optionally waits a round trip per call"""
+
+    def __init__(self, round_trip=0.0):
+        self.cache = LocMemCache(f'test-{id(self)}', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+        self.round_trip = round_trip
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.round_trip:
+                time.sleep(self.round_trip)
+            return method(*args, **kwargs)
+        return call
+
+
+def test_clear_leaves_other_namespaces_intact():
+    """Test clearing one namespace drops only its keys"""
+    backend = RemoteBackend()
+    movies = UnibosCache('movies', backend=backend)
+    music = UnibosCache('music', backend=backend)
+    movies.set_many({'top': [1, 2], 'genres': ['drama']})
+    music.set_many({'top': [3, 4], 'albums': ['x']})
+    plain = backend.cache
+    plain.set('unrelated', 'kept')
+
+    assert movies.clear()
+    assert movies.get('top') is None and movies.get_many(['top', 'genres']) == {}
+    assert music.get_many(['top', 'albums']) == {'top': [3, 4], 'albums': ['x']}
+    assert plain.get('unrelated') == 'kept'
+
+    # another process's instance of the namespace sees the clear too
+    other = UnibosCache('movies', backend=backend, l1_ttl=0)
+    assert other.get('genres') is None
+    other.set('top', [5])
+    assert other.get('top') == [5]
+    assert UnibosCache('music', backend=backend).get('top') == [3, 4]
+
+
+def test_clear_survives_evicted_generation():
+    """Test entries don't come back when the generation counter is evicted"""
+    backend = RemoteBackend()
+    cache = UnibosCache('wims', backend=backend, l1_size=0)
+    cache.set('stock', 10)
+    backend.cache.delete('wims:__generation__')
+    assert UnibosCache('wims', backend=backend, l1_size=0).get('stock') is None
+    assert cache.clear()
+    assert cache.get('stock') is None
+
+
+def test_l1_tier_and_expiry():
+    """Test hot keys are served in process until the L1 ttl runs out"""
+    backend = RemoteBackend()
+    cache = UnibosCache('store', backend=backend, l1_ttl=0.2, l1_size=2)
+    cache.set('a', 1)
+    calls = backend.calls
+    assert [cache.get('a') for _ in range(100)] == [1] * 100
+    assert backend.calls == calls
+
+    # a write from another process shows up once the L1 entry expires
+    UnibosCache('store', backend=backend).set('a', 2)
+    assert cache.get('a') == 1
+    time.sleep(0.25)
+    assert cache.get('a') == 2
+
+    # bounded: least recently used entries go first
+    cache.set_many({'b': 1, 'c': 1})
+    assert cache.stats()['l1_entries'] == 2
+    assert cache.delete('c') and cache.get('c') is None
+
+    stats = cache.stats()
+    assert stats['l1_hits'] >= 100 and stats['backend_hits'] >= 1 and stats['misses'] == 1
+    assert 0 < stats['hit_rate'] < 1
+
+
+def test_batches_use_one_round_trip():
+    """Test get_many/set_many/delete_many make one backend call each"""
+    backend = RemoteBackend()
+    cache = UnibosCache('music', backend=backend, l1_size=0)
+    cache.get('warm')  # reads the generation
+    keys = [f'track:{i}' for i in range(50)]
+
+    for operation in (
+        lambda: cache.set_many({key: key for key in keys}, timeout=60),
+        lambda: cache.get_many(keys + ['missing']),
+        lambda: cache.delete_many(keys[:10]),
+    ):
+        calls = backend.calls
+        operation()
+        assert backend.calls == calls + 1
+    assert len(cache.get_many(keys)) == 40
+
+
+def test_get_or_set_computes_once():
+    """Test concurrent misses on one key share a single compute"""
+    backend = RemoteBackend(round_trip=0.001)
+    cache = UnibosCache('birlikteyiz', backend=backend)
+    computed = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.1)
+        return 'quakes'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set('latest', compute))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['quakes'] * 20
+    assert len(computed) == 1
+    assert cache.stats()['computes'] == 1
+
+
+def test_benchmark_hot_key_reads():
+    """Benchmark module-level hot-key reads, backend only vs L1 tier"""
+    print(f"\n  {HOT_READS} reads of 10 hot keys, {ROUND_TRIP * 1000:.1f} ms backend round trip")
+    for label, l1_size in (('backend only', 0), ('l1 + backend', 1024)):
+        backend = RemoteBackend(round_trip=ROUND_TRIP)
+        cache = UnibosCache('movies', backend=backend, l1_size=l1_size)
+        cache.set_many({f'hot:{i}': {'id': i} for i in range(10)})
+        calls = backend.calls
+
+        started = time.perf_counter()
+        for i in range(HOT_READS):
+            cache.get(f'hot:{i % 10}')
+        elapsed = time.perf_counter() - started
+        print(f"  {label:<13} {elapsed * 1e6 / HOT_READS:8.1f} us/read  {backend.calls - calls:>6} backend calls")
+        if l1_size:
+            assert backend.calls - calls <= 20
+            assert elapsed / HOT_READS < ROUND_TRIP / 5
+
+
+if __name__ == '__main__':
+    test_clear_leaves_other_namespaces_intact()
+    test_clear_survives_evicted_generation()
+    test_l1_tier_and_expiry()
+    test_batches_use_one_round_trip()
+    test_get_or_set_computes_once()
+    test_benchmark_hot_key_reads()
+    print("\n✅ unibos cache tests passed!")